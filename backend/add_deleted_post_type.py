@@ -15,7 +15,7 @@ from sqlalchemy import text
 def add_deleted_post_type():
     """Add 'deleted' type to the post_type_enum"""
     
-    app = create_app()
+    app = create_app(start_workers=False)
     
     with app.app_context():
         try:
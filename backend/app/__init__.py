@@ -4,7 +4,8 @@ from .config import Config
 from .extensions import db, migrate, jwt, mail, socketio
 import os
 
-def create_app(config_class=Config):
+def create_app(config_class=Config, start_workers=None):
+    """Build the app; background workers only start in the serving process (see app.utils.workers)"""
     app = Flask(__name__)
     app.config.from_object(config_class)
 
@@ -32,7 +33,7 @@ def create_app(config_class=Config):
                      "http://localhost:3000"
                  ],
                  "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-                 "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept", "Origin"],
+                 "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept", "Origin", "Idempotency-Key"],
                  "expose_headers": ["Content-Type", "X-Total-Count"],
                  "supports_credentials": True,
                  "max_age": 3600
@@ -68,6 +69,7 @@ def create_app(config_class=Config):
     from .routes.users import users_bp
     from .routes.health import health_bp
     from .routes.uploads import uploads_bp
+    from .routes.storage import storage_bp
     from .routes.chat import chat_bp
     from .routes.tasks import tasks_bp
     from .routes.oauth import oauth_bp, register_oauth
@@ -79,6 +81,7 @@ def create_app(config_class=Config):
     from .routes.notifications import notifications_bp
     from .routes.materials import materials_bp
     from .routes.conversations import conversations_bp
+    from .routes.jobs import jobs_bp
     from .api.community import community_bp
 
     app.register_blueprint(auth_bp)
@@ -86,6 +89,7 @@ def create_app(config_class=Config):
     app.register_blueprint(users_bp)
     app.register_blueprint(health_bp)
     app.register_blueprint(uploads_bp)
+    app.register_blueprint(storage_bp)
     app.register_blueprint(chat_bp)
     app.register_blueprint(tasks_bp)
     register_oauth(app)
@@ -97,6 +101,7 @@ def create_app(config_class=Config):
     app.register_blueprint(notifications_bp)
     app.register_blueprint(materials_bp, url_prefix='/api/materials')
     app.register_blueprint(conversations_bp)
+    app.register_blueprint(jobs_bp)
     app.register_blueprint(community_bp, url_prefix='/api')
 
     # Ensure SocketIO handlers from blueprints are recognized
@@ -107,11 +112,6 @@ def create_app(config_class=Config):
     app.register_blueprint(calendar_bp)
     register_calendar_oauth(app)
     
-    # Initialize background workers for Google Calendar sync
-    with app.app_context():
-        from .routes.goals import init_background_workers
-        init_background_workers(app)
-    
     # Global error handler to return JSON errors with CORS headers
     @app.errorhandler(Exception)
     def handle_exception(e):
@@ -133,13 +133,37 @@ def create_app(config_class=Config):
     # Create tables if they don't exist
     with app.app_context():
         db.create_all()
-        # Reset calendar_sync_in_progress for all users on startup
-        from .models.user import User
-        db.session.query(User).update({User.calendar_sync_in_progress: False})
-        db.session.commit()
+
+    # Background workers run only in the process that serves requests, not in the reloader's
+    # watcher, `flask db upgrade` or one-off scripts, which would claim jobs and abandon them
+    from .utils.workers import should_start_workers
+    if should_start_workers(app, start_workers):
+        # Google Calendar sync (resumes jobs queued before a restart)
+        from .routes.goals import init_background_workers
+        init_background_workers(app)
+
+        # Quiz/flashcard/summary/study plan generation
+        from .services.generation_jobs import init_generation_workers
+        init_generation_workers(app)
+
+        # Resume background re-embedding into a new embedding model, if one was running
+        from .services.embedding_migration import init_embedding_migrations
+        init_embedding_migrations(app)
+
+        # Periodically remove orphaned chunks, embeddings and storage objects
+        from .services.storage_gc import init_storage_gc
+        init_storage_gc(app)
+
+        # Rebalance subtask order keys that grew too long, and rank rows that have none yet
+        from .services.subtask_ordering import init_subtask_ordering
+        init_subtask_ordering(app)
+
+    # Render material thumbnails in the background
+    from .services.thumbnails import init_thumbnails
+    init_thumbnails(app)
 
     # Log the current storage backend being used
-    storage_backend = app.config.get('FILE_STORAGE', 'LOCAL').upper()
+    storage_backend = app.config.get('FILE_STORAGE', 'S3').upper()
     print("==========================================", flush=True)
     print(f"✅ Storage backend configured: {storage_backend}", flush=True)
     print("==========================================", flush=True)
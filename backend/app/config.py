@@ -9,14 +9,27 @@ class Config:
     # App Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-me')
     
-    # File Storage Configuration (LOCAL or S3)
-    FILE_STORAGE = os.getenv('FILE_STORAGE', 'LOCAL')
+    # File Storage Configuration (S3, or LOCAL to opt in to this server's disk)
+    FILE_STORAGE = os.getenv('FILE_STORAGE', 'S3')
 
     # S3 Configuration (only used if FILE_STORAGE is 'S3')
     AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
     S3_KEY = os.getenv('S3_KEY')
     S3_SECRET = os.getenv('S3_SECRET')
     S3_REGION = os.getenv('S3_REGION')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # S3-compatible endpoint (MinIO, moto server); AWS when unset
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 50))  # Connections kept by the shared client
+    S3_MULTIPART_THRESHOLD_MB = int(os.getenv('S3_MULTIPART_THRESHOLD_MB', 16))  # Server uploads above this go multipart
+    S3_MULTIPART_CHUNK_MB = int(os.getenv('S3_MULTIPART_CHUNK_MB', 16))  # Part size, server and browser uploads (min 5)
+    S3_UPLOAD_CONCURRENCY = int(os.getenv('S3_UPLOAD_CONCURRENCY', 8))  # Parts sent in parallel by the server
+    S3_MULTIPART_EXPIRY_HOURS = int(os.getenv('S3_MULTIPART_EXPIRY_HOURS', 48))  # Unfinished browser uploads are aborted after this
+
+    # Local storage (only used if FILE_STORAGE is 'LOCAL')
+    LOCAL_STORAGE_ROOT = os.getenv('LOCAL_STORAGE_ROOT', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'local_storage'))
+    LOCAL_STORAGE_URL_EXPIRES = int(os.getenv('LOCAL_STORAGE_URL_EXPIRES', 3600))  # Lifetime of signed file URLs
+    LOCAL_STORAGE_BASE_URL = os.getenv('LOCAL_STORAGE_BASE_URL', '')  # Public origin for file URLs; defaults to the request host
+    LOCAL_STORAGE_ACCEL_PREFIX = os.getenv('LOCAL_STORAGE_ACCEL_PREFIX', '')  # nginx internal location, e.g. /protected-files/
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'False').lower() == 'true'  # Apache/lighttpd mod_xsendfile
     
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
@@ -40,13 +53,94 @@ class Config:
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
     GOOGLE_DISCOVERY_URL = os.getenv('GOOGLE_DISCOVERY_URL')    
+    GOOGLE_API_ENDPOINT = os.getenv('GOOGLE_API_ENDPOINT')  # Calendar API host override (e.g. a fake Google); real API when unset
+    GOOGLE_API_BATCH_URI = os.getenv('GOOGLE_API_BATCH_URI')  # Batch endpoint override; https://www.googleapis.com/batch/calendar/v3 when unset
+    GOOGLE_API_BATCH_SIZE = int(os.getenv('GOOGLE_API_BATCH_SIZE', 50))  # Calendar writes per batch request (Google allows 50)
+    GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv('GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS', 300))  # Refresh access tokens this long before expiry
+    GOOGLE_CLIENT_CACHE_SIZE = int(os.getenv('GOOGLE_CLIENT_CACHE_SIZE', 1024))  # Users whose credentials are kept in process
     
     # Frontend URL
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
     
     # Security
     REQUIRE_EMAIL_VERIFICATION = os.getenv('REQUIRE_EMAIL_VERIFICATION', 'True').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Sent as X-Metrics-Token to read /api/health/metrics without an admin login
     
+    # Background workers start only in the serving process; 'true' / 'false' overrides that detection
+    BACKGROUND_WORKERS = os.getenv('BACKGROUND_WORKERS', '')
+
+    # Background generation jobs (quiz, flashcards, summary, study plan)
+    GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', 4))
+    GENERATION_MAX_JOBS_PER_USER = int(os.getenv('GENERATION_MAX_JOBS_PER_USER', 2))
+    GENERATION_HEARTBEAT_SECONDS = int(os.getenv('GENERATION_HEARTBEAT_SECONDS', 30))
+    GENERATION_STALE_SECONDS = int(os.getenv('GENERATION_STALE_SECONDS', 120))  # Jobs without a heartbeat this long are taken over
+
+    # Semantic answer cache for course questions
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'True').lower() == 'true'
+    SEMANTIC_CACHE_REUSE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_REUSE_THRESHOLD', 0.95))  # Serve cached answer as-is
+    SEMANTIC_CACHE_ADAPT_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_ADAPT_THRESHOLD', 0.90))  # Rephrase cached answer
+    SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_COURSE = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES_PER_COURSE', 500))
+
+    # Conversation memory: turns after the running summary are sent raw (at least the last N); older ones live in the summary
+    CONVERSATION_RECENT_MESSAGES = int(os.getenv('CONVERSATION_RECENT_MESSAGES', 6))
+    CONVERSATION_SUMMARY_BATCH = int(os.getenv('CONVERSATION_SUMMARY_BATCH', 6))
+
+    # Embeddings: new chunks and queries use the legacy model (LEGACY_EMBEDDING_MODEL) until a course is cut over
+    EMBEDDING_MIGRATION_BATCH_SIZE = int(os.getenv('EMBEDDING_MIGRATION_BATCH_SIZE', 100))
+    EMBEDDING_MIGRATION_THROTTLE_SECONDS = float(os.getenv('EMBEDDING_MIGRATION_THROTTLE_SECONDS', 1.0))  # Pause between batches
+    EMBEDDING_MIGRATION_LOCK_RETRY_SECONDS = float(os.getenv('EMBEDDING_MIGRATION_LOCK_RETRY_SECONDS', 30))  # Standby check while another process runs it
+
+    # Chunk de-duplication: identical / near-identical chunk text shares one stored embedding
+    CHUNK_DEDUP_ENABLED = os.getenv('CHUNK_DEDUP_ENABLED', 'True').lower() == 'true'
+    CHUNK_SIMHASH_MAX_DISTANCE = int(os.getenv('CHUNK_SIMHASH_MAX_DISTANCE', 3))  # Max differing SimHash bits; 0 = exact only
+
+    # Garbage collection of orphaned chunks, embeddings and stored files (off unless enabled; run_storage_gc.py --dry-run first)
+    GC_ENABLED = os.getenv('GC_ENABLED', 'False').lower() == 'true'
+    GC_INTERVAL_SECONDS = int(os.getenv('GC_INTERVAL_SECONDS', 6 * 3600))
+    GC_GRACE_SECONDS = int(os.getenv('GC_GRACE_SECONDS', 3600))  # Never collect anything younger than this
+    GC_BATCH_SIZE = int(os.getenv('GC_BATCH_SIZE', 500))
+    GC_MAX_BATCHES = int(os.getenv('GC_MAX_BATCHES', 20))  # Per orphan kind per run
+    GC_S3_PREFIXES = os.getenv('GC_S3_PREFIXES', 'thumbnails/')  # Storage key prefixes scanned, either backend
+    # Course files with no user_course_materials row may still be listed (S3-only, not yet adopted by
+    # /materials/db/migrate), so they and their chunks are only collected once that table is authoritative
+    GC_COURSE_MATERIALS = os.getenv('GC_COURSE_MATERIALS', 'False').lower() == 'true'
+
+    # Material thumbnails (PDF first page / images), rendered in a process pool
+    THUMBNAIL_WIDTHS = os.getenv('THUMBNAIL_WIDTHS', '160,320,640')  # Pixel widths rendered for each material
+    THUMBNAIL_DEFAULT_WIDTH = int(os.getenv('THUMBNAIL_DEFAULT_WIDTH', 320))  # Variant stored as thumbnail_path
+    THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))  # Render processes
+    THUMBNAIL_RENDER_TIMEOUT = int(os.getenv('THUMBNAIL_RENDER_TIMEOUT', 60))
+
+    # Subtask order keys (fractional); tasks whose keys grow past the max length are rebalanced in the background
+    SUBTASK_RANK_MAX_LENGTH = int(os.getenv('SUBTASK_RANK_MAX_LENGTH', 12))
+    SUBTASK_RANK_REBALANCE_ENABLED = os.getenv('SUBTASK_RANK_REBALANCE_ENABLED', 'True').lower() == 'true'
+    SUBTASK_RANK_SWEEP_SECONDS = int(os.getenv('SUBTASK_RANK_SWEEP_SECONDS', 3600))  # Sweep for unranked / long-keyed tasks
+    SUBTASK_RANK_SWEEP_BATCH = int(os.getenv('SUBTASK_RANK_SWEEP_BATCH', 500))  # Tasks rebalanced per sweep
+
+    # Saved quizzes/flashcards live in Postgres; optionally also write a JSON copy to file storage
+    STUDY_ARTIFACT_EXPORT = os.getenv('STUDY_ARTIFACT_EXPORT', 'False').lower() == 'true'
+
+    # Google Calendar sync workers; each user's jobs always run on the same one, in order
+    CALENDAR_SYNC_WORKERS = int(os.getenv('CALENDAR_SYNC_WORKERS', 4))
+    CALENDAR_SYNC_SLICE = int(os.getenv('CALENDAR_SYNC_SLICE', 50))  # Subtasks synced before the next user gets a turn (one full batch)
+    CALENDAR_SYNC_DRAIN_TIMEOUT = int(os.getenv('CALENDAR_SYNC_DRAIN_TIMEOUT', 30))  # Seconds to finish queued jobs on shutdown
+    CALENDAR_SYNC_DEBOUNCE_SECONDS = float(os.getenv('CALENDAR_SYNC_DEBOUNCE_SECONDS', 2))  # Quiet time before a task syncs
+    CALENDAR_SYNC_MAX_DELAY_SECONDS = float(os.getenv('CALENDAR_SYNC_MAX_DELAY_SECONDS', 30))  # Longest a burst of edits can defer it
+    CALENDAR_SYNC_MAX_ATTEMPTS = int(os.getenv('CALENDAR_SYNC_MAX_ATTEMPTS', 6))
+    CALENDAR_SYNC_BACKOFF_SECONDS = int(os.getenv('CALENDAR_SYNC_BACKOFF_SECONDS', 30))  # Doubles with every failed attempt
+    CALENDAR_SYNC_BACKOFF_MAX_SECONDS = int(os.getenv('CALENDAR_SYNC_BACKOFF_MAX_SECONDS', 3600))
+    CALENDAR_SYNC_POLL_SECONDS = float(os.getenv('CALENDAR_SYNC_POLL_SECONDS', 1))
+    CALENDAR_SYNC_STALE_SECONDS = int(os.getenv('CALENDAR_SYNC_STALE_SECONDS', 120))  # Running jobs without a heartbeat are retried
+    CALENDAR_SYNC_RETENTION_HOURS = int(os.getenv('CALENDAR_SYNC_RETENTION_HOURS', 72))  # Finished jobs are kept this long
+
+    # Periodic incremental import of every connected user's Google events
+    CALENDAR_SCHEDULE_ENABLED = os.getenv('CALENDAR_SCHEDULE_ENABLED', 'True').lower() == 'true'
+    CALENDAR_SCHEDULE_INTERVAL_SECONDS = int(os.getenv('CALENDAR_SCHEDULE_INTERVAL_SECONDS', 900))
+    CALENDAR_SCHEDULE_JITTER = float(os.getenv('CALENDAR_SCHEDULE_JITTER', 0.2))  # Each user's interval is +/- this fraction
+    CALENDAR_SCHEDULE_MAX_PER_MINUTE = int(os.getenv('CALENDAR_SCHEDULE_MAX_PER_MINUTE', 60))  # Imports started, across processes
+    CALENDAR_SCHEDULE_TICK_SECONDS = int(os.getenv('CALENDAR_SCHEDULE_TICK_SECONDS', 30))
+
     # Server configuration
     PORT = int(os.getenv('FLASK_RUN_PORT', 5000))
 
@@ -1,13 +1,21 @@
 from .user import User
 from .course import Course
 from .goal import Goal
+from .study_goal import StudyGoal, StudyTask
 from .message import Message
 from .friend import Friend
 from .document_embedding import DocumentEmbedding
 from .uploaded_file import UploadedFile
+from .shared_embedding import SharedEmbedding
 from .material_chunk import MaterialChunk
 from .conversation import Conversation
 from .conversation_message import ConversationMessage
+from .generation_job import GenerationJob
+from .semantic_answer_cache import SemanticAnswerCache
+from .embedding_version import ChunkEmbeddingVersion, EmbeddingMigration, CourseEmbeddingModel
+from .multipart_upload import MultipartUpload
+from .study_artifact import StudyArtifact
+from .calendar_sync_job import CalendarSyncJob
 from .community import CommunityPost, CommunityAnswer, CommunityPostVote, CommunityAnswerVote, CommunityPostView
 
-__all__ = ['User', 'Course', 'Goal', 'Message', 'Friend', 'DocumentEmbedding', 'UploadedFile', 'MaterialChunk', 'Conversation', 'ConversationMessage', 'CommunityPost', 'CommunityAnswer', 'CommunityPostVote', 'CommunityAnswerVote', 'CommunityPostView']
\ No newline at end of file
+__all__ = ['User', 'Course', 'Goal', 'StudyGoal', 'StudyTask', 'Message', 'Friend', 'DocumentEmbedding', 'UploadedFile', 'SharedEmbedding', 'MaterialChunk', 'Conversation', 'ConversationMessage', 'GenerationJob', 'SemanticAnswerCache', 'ChunkEmbeddingVersion', 'EmbeddingMigration', 'CourseEmbeddingModel', 'MultipartUpload', 'StudyArtifact', 'CalendarSyncJob', 'CommunityPost', 'CommunityAnswer', 'CommunityPostVote', 'CommunityAnswerVote', 'CommunityPostView']
\ No newline at end of file
@@ -0,0 +1,87 @@
+import uuid
+from datetime import datetime
+from app.init import db
+
+class CalendarSyncJob(db.Model):
+    """A pending or finished Google Calendar sync: 'sync' a task's subtasks, 'delete' one event,
+    or 'import' the user's Google events (task_id IMPORT_TASK_ID).
+
+    Rows survive restarts. While a job is pending, further requests with the same
+    dedupe_key (user, task, action) are merged into it by the partial unique index
+    below, which only covers pending rows.
+    """
+    __tablename__ = 'calendar_sync_jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    ACTION_SYNC = 'sync'
+    ACTION_DELETE = 'delete'
+    ACTION_IMPORT = 'import'
+
+    IMPORT_TASK_ID = 'google-calendar'
+
+    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False)
+    task_id = db.Column(db.String, nullable=False)
+    course_id = db.Column(db.String, nullable=True)
+    action = db.Column(db.String(20), nullable=False)
+    google_event_id = db.Column(db.String, nullable=True)  # Event to remove, for 'delete'
+    params = db.Column(db.JSON, nullable=True)  # e.g. {'full_sync': True} for 'import'
+    progress = db.Column(db.JSON, nullable=True)  # Calendars and events done so far, for 'import'
+    result = db.Column(db.JSON, nullable=True)
+    dedupe_key = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Debounce / retry backoff
+    locked_by = db.Column(db.String(255), nullable=True)  # host:pid of the process running it
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Heartbeat while running
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ux_calendar_sync_jobs_pending_key', 'dedupe_key', unique=True,
+                 postgresql_where=db.text("status = 'pending'")),
+        db.Index('ix_calendar_sync_jobs_due', 'status', 'run_after'),
+        db.Index('ix_calendar_sync_jobs_user_status', 'user_id', 'status'),
+    )
+
+    @staticmethod
+    def build_dedupe_key(user_id, task_id, action, google_event_id=None, params=None):
+        """Requests with the same key are merged while pending; each deleted event is its own job"""
+        key = f"{user_id}:{task_id}:{action}"
+        if action == CalendarSyncJob.ACTION_DELETE and google_event_id:
+            key = f"{key}:{google_event_id}"
+        elif action == CalendarSyncJob.ACTION_IMPORT and (params or {}).get('full_sync'):
+            key = f"{key}:full"
+        return key[:255]
+
+    @property
+    def is_active(self):
+        return self.status in (self.STATUS_PENDING, self.STATUS_RUNNING)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'task_id': self.task_id,
+            'course_id': self.course_id,
+            'action': self.action,
+            'google_event_id': self.google_event_id,
+            'params': self.params,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'attempts': self.attempts,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<CalendarSyncJob {self.action} {self.task_id} {self.status}>'
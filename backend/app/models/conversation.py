@@ -14,6 +14,11 @@ class Conversation(db.Model):
     is_archived = db.Column(db.Boolean, default=False)
     message_count = db.Column(db.Integer, default=0)
     
+    # Rolling memory: older turns compacted into a running summary
+    summary = db.Column(db.Text, nullable=True)
+    summarized_message_count = db.Column(db.Integer, default=0)  # Oldest N messages covered by summary
+    summary_updated_at = db.Column(db.DateTime, nullable=True)
+    
     # Relationship to messages
     messages = db.relationship('ConversationMessage', backref='conversation', lazy=True, cascade='all, delete-orphan')
     
@@ -26,7 +31,8 @@ class Conversation(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_archived': self.is_archived,
-            'message_count': self.message_count
+            'message_count': self.message_count,
+            'has_summary': bool(self.summary)
         }
     
     def update_timestamp(self):
@@ -14,6 +14,10 @@ class ConversationMessage(db.Model):
     confidence = db.Column(db.Float, nullable=True)   # AI confidence score
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_conversation_messages_conversation_created', 'conversation_id', 'created_at'),
+    )
+    
     def to_dict(self):
         # Parse source_files JSON if it exists
         source_files_list = []
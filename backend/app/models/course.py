@@ -3,8 +3,7 @@ from datetime import datetime
 from app.init import db
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy import Text
-from app.utils.s3 import get_presigned_url
-import os
+from app.utils.storage import get_storage
 
 class Course(db.Model):
     __tablename__ = 'courses'
@@ -54,9 +53,7 @@ class Course(db.Model):
     def to_dict(self):
         """Convert course to dictionary for JSON serialization"""
         
-        course_image_url = self.course_image
-        if os.environ.get('FILE_STORAGE') == 'S3' and self.course_image:
-            course_image_url = get_presigned_url(self.course_image)
+        course_image_url = get_storage().url(self.course_image) if self.course_image else None
 
         return {
             'combo_id': self.combo_id,
@@ -63,26 +63,39 @@ class DocumentEmbedding(db.Model):
         }
     
     @classmethod
-    def find_similar_documents(cls, query_embedding, user_id, course_id, similarity_threshold=0.7, limit=5):
-        """Find similar documents using vector similarity search"""
+    def find_similar_documents(cls, query_embedding, user_id, course_id, similarity_threshold=0.7, limit=5, model=None):
+        """Find similar documents using vector similarity search
+        
+        With model set, compares against that model's vectors in chunk_embedding_versions
+        instead of the legacy embedding column.
+        """
         from sqlalchemy import text
         
         # Convert embedding list to PostgreSQL vector format
         embedding_str = f"[{','.join(map(str, query_embedding))}]"
         
-        query = text("""
+        if model:
+            embedding_column = 'v.embedding'
+            version_join = """JOIN chunk_embedding_versions v
+                ON v.source = 'document_embedding' AND v.source_id = de.id AND v.model = :model"""
+        else:
+            embedding_column = 'de.embedding'
+            version_join = ''
+        
+        query = text(f"""
             SELECT 
                 de.id,
                 de.document_name,
                 de.content_chunk,
                 de.chunk_index,
-                1 - (de.embedding <=> :embedding) as similarity,
+                1 - ({embedding_column} <=> :embedding) as similarity,
                 de.doc_metadata
             FROM document_embeddings de
+            {version_join}
             WHERE de.user_id = :user_id 
                 AND de.course_id = :course_id
-                AND 1 - (de.embedding <=> :embedding) > :similarity_threshold
-            ORDER BY de.embedding <=> :embedding
+                AND 1 - ({embedding_column} <=> :embedding) > :similarity_threshold
+            ORDER BY {embedding_column} <=> :embedding
             LIMIT :limit
         """)
         
@@ -91,7 +104,8 @@ class DocumentEmbedding(db.Model):
             'user_id': user_id,
             'course_id': course_id,
             'similarity_threshold': similarity_threshold,
-            'limit': limit
+            'limit': limit,
+            'model': model
         })
         
         return [dict(row) for row in result]
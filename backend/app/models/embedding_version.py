@@ -0,0 +1,89 @@
+from datetime import datetime
+from pgvector.sqlalchemy import Vector
+from ..extensions import db
+
+# Model that produced the original 1536-dimension embedding columns (material_chunks,
+# document_embeddings, shared_embeddings). Fixed: those vectors do not change with settings.
+LEGACY_EMBEDDING_MODEL = 'text-embedding-ada-002'
+
+class ChunkEmbeddingVersion(db.Model):
+    """Embedding of a MaterialChunk or DocumentEmbedding row produced by a model other than the legacy one"""
+    __tablename__ = 'chunk_embedding_versions'
+
+    SOURCE_MATERIAL_CHUNK = 'material_chunk'
+    SOURCE_DOCUMENT_EMBEDDING = 'document_embedding'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(30), nullable=False)  # 'material_chunk' or 'document_embedding'
+    source_id = db.Column(db.Integer, nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    # Unconstrained on purpose: each target model has its own size (1536, 3072, ...), and every
+    # row of one model has that model's size. Searches always filter on model, so vectors of
+    # different sizes are never compared. Without a dimension pgvector cannot build an ANN index
+    # here; versioned searches are filtered to one course's chunks before ordering by distance.
+    embedding = db.Column(Vector(), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('source', 'source_id', 'model', name='uq_chunk_embedding_versions_source_model'),
+        db.Index('ix_chunk_embedding_versions_model_source', 'model', 'source', 'source_id'),
+    )
+
+
+class EmbeddingMigration(db.Model):
+    """Progress of a background re-embedding run into a target model"""
+    __tablename__ = 'embedding_migrations'
+
+    STATUS_RUNNING = 'running'
+    STATUS_PAUSED = 'paused'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    target_model = db.Column(db.String(100), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_RUNNING)
+    batch_size = db.Column(db.Integer, nullable=False, default=100)
+    throttle_seconds = db.Column(db.Float, nullable=False, default=1.0)
+    # Checkpoints: highest source id already re-embedded, so a restart resumes after it
+    last_material_chunk_id = db.Column(db.Integer, nullable=False, default=0)
+    last_document_embedding_id = db.Column(db.Integer, nullable=False, default=0)
+    processed_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'target_model': self.target_model,
+            'status': self.status,
+            'batch_size': self.batch_size,
+            'throttle_seconds': self.throttle_seconds,
+            'last_material_chunk_id': self.last_material_chunk_id,
+            'last_document_embedding_id': self.last_document_embedding_id,
+            'processed_count': self.processed_count,
+            'total_count': self.total_count,
+            'progress': round(100 * self.processed_count / self.total_count) if self.total_count else 100,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class CourseEmbeddingModel(db.Model):
+    """Per-course cutover switch: which embedding model searches for the course read from"""
+    __tablename__ = 'course_embedding_models'
+
+    course_id = db.Column(db.String, primary_key=True)  # Same course id the course's materials are stored under
+    model = db.Column(db.String(100), nullable=False)
+    switched_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'course_id': self.course_id,
+            'model': self.model,
+            'switched_at': self.switched_at.isoformat() if self.switched_at else None
+        }
@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime
+from app.init import db
+
+class GenerationJob(db.Model):
+    """A quiz/flashcard/summary/study plan generation request run in the background"""
+    __tablename__ = 'generation_jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False, index=True)
+    course_id = db.Column(db.String, nullable=True)  # Shared course id, None for course-less generations
+    job_type = db.Column(db.String(50), nullable=False)  # 'quiz', 'flashcards', 'summary', 'study_plan'
+    idempotency_key = db.Column(db.String(128), nullable=False)
+    params = db.Column(db.JSON, default=dict)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_QUEUED, index=True)
+    progress = db.Column(db.Integer, default=0)  # 0-100
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(255), nullable=True)  # host:pid of the process that has it queued or running
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed by that process; stale jobs are taken over
+
+    __table_args__ = (
+        db.Index('ix_generation_jobs_user_key', 'user_id', 'idempotency_key'),
+    )
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'course_id': self.course_id,
+            'job_type': self.job_type,
+            'idempotency_key': self.idempotency_key,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
+
+    def __repr__(self):
+        return f'<GenerationJob {self.job_type} {self.status} for {self.user_id}>'
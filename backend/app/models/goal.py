@@ -1,21 +1,41 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Text, TIMESTAMP
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Text, TIMESTAMP, event, inspect
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, column_property, Session
 from datetime import datetime, timezone
 
 from app.init import db
+from app.models.study_goal import StudyGoal, StudyTask
+from app.utils.advisory_locks import COMPAT_VIEW_ADVISORY_LOCK_KEY
+
+PLACEHOLDER_TASK_ID = 'placeholder'
+COMPAT_VIEW = 'users_courses_goal_view'
 
 
 class Goal(db.Model):
     """Goal model for course study goals with tasks and subtasks in a fully denormalized structure.
     Each row contains all fields (goal, task, subtask) and represents a specific subtask.
-    Multiple rows can share the same goal_id and task_id."""
+    Multiple rows can share the same goal_id and task_id.
+
+    goal_completed and task_completed are read from and written to the goal's
+    StudyGoal and the task's StudyTask when they exist, so toggling them does
+    not rewrite every row of the goal; the columns here only seed those records
+    and serve rows that have none (placeholders, imported calendar events).
+    users_courses_goal_view shows the rows with the current flags for SQL readers.
+    """
     __tablename__ = 'users_courses_goal'
     
+    # Rows imported from Google Calendar; each event is imported once per user
+    IMPORTED_EVENT_WHERE = "is_external AND google_event_id IS NOT NULL"
+
     # Add index for google_event_id to optimize sync performance
     __table_args__ = (
         db.Index('ix_goal_google_event_id', 'google_event_id'),
+        db.Index('ix_goal_user_course_goal', 'user_id', 'course_id', 'goal_id'),  # Course goal listings
+        db.Index('ix_goal_user_task_rank', 'user_id', 'task_id', 'subtask_rank'),  # A task's subtasks in order
+        db.Index('ux_goal_user_imported_event', 'user_id', 'google_event_id', unique=True,
+                 postgresql_where=db.text(IMPORTED_EVENT_WHERE)),
     )
 
     id = Column(String, primary_key=True)  # Primary key for the row
@@ -26,19 +46,19 @@ class Goal(db.Model):
     goal_id = Column(String, nullable=False)  # ID of the goal this row belongs to
     goal_descr = Column(Text, nullable=False)
     due_date = Column(DateTime(timezone=True), nullable=True)
-    goal_completed = Column(Boolean, default=False)
+    _goal_completed = Column('goal_completed', Boolean, default=False)
     
     # Task fields
     task_id = Column(String, nullable=False)  # ID of the task this row belongs to
     task_title = Column(String(255), nullable=False)
     task_descr = Column(Text, nullable=True)
-    task_completed = Column(Boolean, default=False)
+    _task_completed = Column('task_completed', Boolean, default=False)
     
     # Subtask fields
     subtask_id = Column(String, nullable=False)  # ID of the subtask this row represents
     subtask_descr = Column(String(255), nullable=False)
     subtask_type = Column(String(50), nullable=False, default="other")
-    subtask_completed = Column(Boolean, default=False)
+    subtask_completed = column_property(Column(Boolean, default=False), active_history=True)  # Old value feeds the progress counters
     
     created_at = Column(DateTime(timezone=True),
                     default=lambda: datetime.now(timezone.utc))   
@@ -60,6 +80,14 @@ class Goal(db.Model):
     # Relationships
     user = relationship("User", back_populates="goals")
     course = relationship("Course", back_populates="goals")
+    study_goal = relationship(
+        StudyGoal, lazy='joined', viewonly=True,
+        primaryjoin="and_(foreign(Goal.user_id) == StudyGoal.user_id, foreign(Goal.goal_id) == StudyGoal.goal_id)"
+    )
+    study_task = relationship(
+        StudyTask, lazy='joined', viewonly=True,
+        primaryjoin="and_(foreign(Goal.user_id) == StudyTask.user_id, foreign(Goal.task_id) == StudyTask.task_id)"
+    )
     
     # Additional fields added
     task_due_date = Column(DateTime(timezone=True), nullable=True)
@@ -72,6 +100,8 @@ class Goal(db.Model):
     started_by_subtask = Column(String, nullable=True)
     task_has_ever_been_completed = Column(Boolean, default=False)
     subtask_order = Column(db.Integer, nullable=True)
+    # Fractional ordering key (utils/fractional_index); compared bytewise, so the "C" collation
+    subtask_rank = Column(String(collation='C'), nullable=True)
     
     # Canvas-style time tracking fields
     subtask_engagement_start = Column(DateTime(timezone=True), nullable=True)
@@ -94,7 +124,7 @@ class Goal(db.Model):
                  task_due_date=None, task_engagement_start=None, task_engagement_end=None, 
                  task_estimated_time_minutes=None, task_actual_time_minutes=None, 
                  task_is_being_tracked=False, task_actual_time_seconds=None, started_by_subtask=None,
-                 task_has_ever_been_completed=False, subtask_order=None, 
+                 task_has_ever_been_completed=False, subtask_order=None, subtask_rank=None,
                  subtask_engagement_start=None, subtask_engagement_end=None, 
                  subtask_total_active_minutes=None, subtask_last_interaction=None,
                  workMinutesPerDay = None, frequency = None, is_conflicting=False):
@@ -144,6 +174,7 @@ class Goal(db.Model):
         self.started_by_subtask = started_by_subtask
         self.task_has_ever_been_completed = task_has_ever_been_completed
         self.subtask_order = subtask_order
+        self.subtask_rank = subtask_rank
         
         # Canvas-style time tracking fields
         self.subtask_engagement_start = subtask_engagement_start
@@ -156,6 +187,60 @@ class Goal(db.Model):
         
         self.is_conflicting = is_conflicting
         
+    @hybrid_property
+    def goal_completed(self):
+        if self.study_goal is not None:
+            return self.study_goal.goal_completed
+        return self._goal_completed
+
+    @goal_completed.setter
+    def goal_completed(self, value):
+        if self.study_goal is not None:
+            self.study_goal.goal_completed = bool(value)
+        else:
+            self._goal_completed = value
+
+    @goal_completed.expression
+    def goal_completed(cls):
+        return db.func.coalesce(
+            db.select(StudyGoal.goal_completed).where(
+                StudyGoal.user_id == cls.user_id, StudyGoal.goal_id == cls.goal_id
+            ).scalar_subquery(),
+            cls._goal_completed
+        )
+
+    @hybrid_property
+    def task_completed(self):
+        if self.study_task is not None:
+            return self.study_task.task_completed
+        return self._task_completed
+
+    @task_completed.setter
+    def task_completed(self, value):
+        if self.study_task is not None:
+            self.study_task.task_completed = bool(value)
+        else:
+            self._task_completed = value
+
+    @task_completed.expression
+    def task_completed(cls):
+        return db.func.coalesce(
+            db.select(StudyTask.task_completed).where(
+                StudyTask.user_id == cls.user_id, StudyTask.task_id == cls.task_id
+            ).scalar_subquery(),
+            cls._task_completed
+        )
+
+    @property
+    def tracks_progress(self):
+        """Rows counted in StudyGoal/StudyTask: everything but imported calendar events"""
+        return not self.is_external
+
+    @classmethod
+    def subtask_ordering(cls):
+        """ORDER BY for a task's subtasks: by rank, then rows not ranked yet by their legacy order"""
+        return (cls.subtask_rank.asc().nulls_last(), cls.subtask_order.asc().nulls_last(), cls.created_at.asc())
+
     @classmethod
     def create_for_goal(cls, user_id, course_id, goal_descr, due_date=None):
         """Create a new goal with a single task and subtask"""
@@ -227,6 +312,7 @@ class Goal(db.Model):
             'started_by_subtask': self.started_by_subtask,
             'task_has_ever_been_completed': self.task_has_ever_been_completed,
             'subtask_order': self.subtask_order,
+            'subtask_rank': self.subtask_rank,
             'subtask_engagement_start': self._fmt(self.subtask_engagement_start),
             'subtask_engagement_end': self._fmt(self.subtask_engagement_end),
             'subtask_total_active_minutes': self.subtask_total_active_minutes,
@@ -234,4 +320,292 @@ class Goal(db.Model):
             'workMinutesPerDay': self.workMinutesPerDay,
             'frequency': self.frequency,
             'is_conflicting': self.is_conflicting
-        } 
\ No newline at end of file
+        } 
+
+def _committed(row, attr):
+    """Value of attr as last loaded from the database"""
+    history = inspect(row).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(row, attr)
+
+
+def _changed(row, attr):
+    """(old, new) when attr was changed in this flush, else None"""
+    history = inspect(row).attrs[attr].history
+    if not history.added:
+        return None
+    old = history.deleted[0] if history.deleted else None
+    return (bool(old), bool(history.added[0])) if bool(old) != bool(history.added[0]) else None
+
+
+@event.listens_for(Session, 'after_flush')
+def maintain_progress_counters(session, flush_context):
+    """Apply this flush's subtask and task changes to the StudyTask/StudyGoal counters.
+
+    Each counter is changed with one atomic UPDATE ... SET n = n + delta per task and
+    goal touched, so completing a subtask costs a fixed number of writes however
+    large its goal is. Tasks left without subtasks are removed.
+
+    A delta is only right on top of a correct record. When the goal's StudyGoal or a
+    touched task's StudyTask does not exist yet (a new goal or task, or tables that
+    create_all made empty before the backfill migration ran), the goal's counters are
+    rebuilt from its rows with recompute_progress_counters instead.
+    """
+    tasks, goals = {}, {}
+
+    def goal_entry(row):
+        key = (row.user_id, row.goal_id)
+        if key not in goals:
+            goals[key] = {'total_tasks': 0, 'completed_tasks': 0, 'total_subtasks': 0, 'completed_subtasks': 0}
+        return goals[key]
+
+    def task_entry(row):
+        key = (row.user_id, row.task_id)
+        if key not in tasks:
+            tasks[key] = {'goal': (row.user_id, row.goal_id), 'total': 0, 'completed': 0}
+        return tasks[key]
+
+    for row in session.new:
+        if isinstance(row, Goal) and row.tracks_progress:
+            goal_entry(row)
+            if row.task_id != PLACEHOLDER_TASK_ID:
+                entry = task_entry(row)
+                entry['total'] += 1
+                entry['completed'] += int(bool(row.subtask_completed))
+    for row in session.deleted:
+        if isinstance(row, Goal) and _committed(row, 'is_external') is not True \
+                and _committed(row, 'task_id') != PLACEHOLDER_TASK_ID:
+            goal_entry(row)
+            entry = task_entry(row)
+            entry['total'] -= 1
+            entry['completed'] -= int(bool(_committed(row, 'subtask_completed')))
+    for obj in session.dirty:
+        if isinstance(obj, Goal) and obj.tracks_progress and obj.task_id != PLACEHOLDER_TASK_ID:
+            change = _changed(obj, 'subtask_completed')
+            if change:
+                goal_entry(obj)
+                task_entry(obj)['completed'] += int(change[1]) - int(change[0])
+        elif isinstance(obj, StudyTask):
+            change = _changed(obj, 'task_completed')
+            if change:
+                key = (obj.user_id, obj.goal_id)
+                goals.setdefault(key, {'total_tasks': 0, 'completed_tasks': 0, 'total_subtasks': 0,
+                                       'completed_subtasks': 0})
+                goals[key]['completed_tasks'] += int(change[1]) - int(change[0])
+    if not tasks and not goals:
+        return
+
+    connection = session.connection()
+    now = datetime.now(timezone.utc)
+    removed_tasks = []
+    task_table = StudyTask.__table__
+    goal_table = StudyGoal.__table__
+
+    unseeded = _unseeded_goals(connection, tasks, goals)
+    if unseeded:
+        for user_id, goal_id in unseeded:
+            recompute_progress_counters(user_id, goal_id, connection=connection)
+        reseeded_tasks = [key for key, entry in tasks.items() if entry['goal'] in unseeded]
+        if reseeded_tasks:
+            kept = set(connection.execute(
+                db.select(task_table.c.user_id, task_table.c.task_id).where(
+                    db.tuple_(task_table.c.user_id, task_table.c.task_id).in_(reseeded_tasks)
+                )
+            ).all())
+            removed_tasks.extend(key for key in reseeded_tasks if tuple(key) not in kept)
+    touched_tasks, touched_goals = list(tasks), list(goals)
+    tasks = {key: entry for key, entry in tasks.items() if entry['goal'] not in unseeded}
+    goals = {key: entry for key, entry in goals.items() if key not in unseeded}
+
+    for (user_id, task_id), entry in tasks.items():
+        goal = goals[entry['goal']]
+        goal['total_subtasks'] += entry['total']
+        goal['completed_subtasks'] += entry['completed']
+        if not entry['total'] and not entry['completed']:
+            continue
+        row = connection.execute(task_table.update().where(
+            task_table.c.user_id == user_id, task_table.c.task_id == task_id
+        ).values(
+            total_subtasks=task_table.c.total_subtasks + entry['total'],
+            completed_subtasks=task_table.c.completed_subtasks + entry['completed'],
+            updated_at=now
+        ).returning(task_table.c.task_completed, task_table.c.total_subtasks)).one_or_none()
+        if row is None:
+            continue
+        task_completed, total_subtasks = row
+        if total_subtasks <= 0:
+            connection.execute(task_table.delete().where(
+                task_table.c.user_id == user_id, task_table.c.task_id == task_id
+            ))
+            goal['total_tasks'] -= 1
+            goal['completed_tasks'] -= int(task_completed)
+            removed_tasks.append((user_id, task_id))
+
+    counters = ('total_tasks', 'completed_tasks', 'total_subtasks', 'completed_subtasks')
+    for (user_id, goal_id), entry in goals.items():
+        if not any(entry[name] for name in counters):
+            continue
+        connection.execute(goal_table.update().where(
+            goal_table.c.user_id == user_id, goal_table.c.goal_id == goal_id
+        ).values({name: goal_table.c[name] + entry[name] for name in counters}, updated_at=now))
+
+    session.info['progress_counters_touched'] = (touched_tasks, touched_goals, removed_tasks)
+
+
+def _unseeded_goals(connection, tasks, goals):
+    """Goals whose StudyGoal, or the StudyTask of a task touched in this flush, does not exist"""
+    goal_table, task_table = StudyGoal.__table__, StudyTask.__table__
+    existing_goals = set(connection.execute(
+        db.select(goal_table.c.user_id, goal_table.c.goal_id).where(
+            db.tuple_(goal_table.c.user_id, goal_table.c.goal_id).in_(list(goals))
+        )
+    ).all())
+    unseeded = {key for key in goals if tuple(key) not in existing_goals}
+    if tasks:
+        existing_tasks = set(connection.execute(
+            db.select(task_table.c.user_id, task_table.c.task_id).where(
+                db.tuple_(task_table.c.user_id, task_table.c.task_id).in_(list(tasks))
+            )
+        ).all())
+        unseeded.update(entry['goal'] for key, entry in tasks.items() if tuple(key) not in existing_tasks)
+    return unseeded
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def expire_progress_counters(session, flush_context):
+    """Make loaded StudyTask/StudyGoal objects re-read the counters changed in SQL"""
+    touched = session.info.pop('progress_counters_touched', None)
+    if not touched:
+        return
+    task_keys, goal_keys, removed_tasks = touched
+    for model, keys in ((StudyTask, task_keys), (StudyGoal, goal_keys)):
+        for key in keys:
+            obj = session.identity_map.get(session.identity_key(model, key))
+            if obj is None:
+                continue
+            if model is StudyTask and key in removed_tasks:
+                session.expunge(obj)
+            else:
+                session.expire(obj)
+
+
+def recompute_progress_counters(user_id, goal_id, task_flags=None, derive_goal_completion=False, connection=None):
+    """Rebuild a goal's StudyTask/StudyGoal counters from its rows, in the current transaction.
+
+    For writes that bypass the ORM (and so the flush listener), e.g. bulk edits, and
+    for the listener itself when a record is missing (it passes its connection).
+    Existing tasks keep their completion flag unless task_flags ({task_id: bool})
+    sets it; new ones start from their rows. With derive_goal_completion the goal
+    is complete when it has tasks and all of them are.
+    """
+    executor = connection if connection is not None else db.session
+    params = {'user_id': user_id, 'goal_id': goal_id}
+    executor.execute(db.text("""
+        INSERT INTO study_tasks (user_id, task_id, goal_id, course_id, task_completed,
+                                 total_subtasks, completed_subtasks, created_at, updated_at)
+        SELECT user_id, task_id, MIN(goal_id), MIN(course_id), COALESCE(BOOL_AND(task_completed), false),
+               COUNT(*), COUNT(*) FILTER (WHERE subtask_completed), now(), now()
+        FROM users_courses_goal
+        WHERE user_id = :user_id AND goal_id = :goal_id
+          AND NOT COALESCE(is_external, false) AND task_id <> 'placeholder'
+        GROUP BY user_id, task_id
+        ON CONFLICT (user_id, task_id) DO UPDATE
+        SET goal_id = excluded.goal_id,
+            total_subtasks = excluded.total_subtasks,
+            completed_subtasks = excluded.completed_subtasks,
+            updated_at = excluded.updated_at
+    """), params)
+    executor.execute(db.text("""
+        DELETE FROM study_tasks st
+        WHERE st.user_id = :user_id AND st.goal_id = :goal_id
+          AND NOT EXISTS (
+              SELECT 1 FROM users_courses_goal r
+              WHERE r.user_id = st.user_id AND r.task_id = st.task_id AND NOT COALESCE(r.is_external, false)
+          )
+    """), params)
+    if task_flags:
+        table = StudyTask.__table__
+        flags = db.values(
+            db.column('task_id', db.String), db.column('task_completed', db.Boolean), name='flags'
+        ).data(list(task_flags.items()))
+        executor.execute(
+            table.update().where(
+                table.c.user_id == user_id, table.c.task_id == flags.c.task_id
+            ).values(task_completed=flags.c.task_completed, updated_at=db.func.now())
+        )
+    executor.execute(db.text("""
+        INSERT INTO study_goals (user_id, goal_id, course_id, goal_completed, total_tasks, completed_tasks,
+                                 total_subtasks, completed_subtasks, created_at, updated_at)
+        SELECT r.user_id, r.goal_id, MIN(r.course_id), COALESCE(BOOL_AND(r.goal_completed), false),
+               COALESCE(MAX(t.total_tasks), 0), COALESCE(MAX(t.completed_tasks), 0),
+               COALESCE(MAX(t.total_subtasks), 0), COALESCE(MAX(t.completed_subtasks), 0), now(), now()
+        FROM users_courses_goal r
+        LEFT JOIN (
+            SELECT user_id, goal_id, COUNT(*) AS total_tasks, COUNT(*) FILTER (WHERE task_completed) AS completed_tasks,
+                   SUM(total_subtasks) AS total_subtasks, SUM(completed_subtasks) AS completed_subtasks
+            FROM study_tasks WHERE user_id = :user_id AND goal_id = :goal_id
+            GROUP BY user_id, goal_id
+        ) t ON t.user_id = r.user_id AND t.goal_id = r.goal_id
+        WHERE r.user_id = :user_id AND r.goal_id = :goal_id AND NOT COALESCE(r.is_external, false)
+        GROUP BY r.user_id, r.goal_id
+        ON CONFLICT (user_id, goal_id) DO UPDATE
+        SET total_tasks = excluded.total_tasks,
+            completed_tasks = excluded.completed_tasks,
+            total_subtasks = excluded.total_subtasks,
+            completed_subtasks = excluded.completed_subtasks,
+            goal_completed = CASE WHEN :derive
+                                  THEN excluded.total_tasks > 0 AND excluded.completed_tasks = excluded.total_tasks
+                                  ELSE study_goals.goal_completed END,
+            updated_at = excluded.updated_at
+    """), dict(params, derive=derive_goal_completion))
+
+
+def goal_view_sql(column_names):
+    """CREATE VIEW for users_courses_goal with goal/task completion taken from study_goals/study_tasks"""
+    overlays = {
+        'goal_completed': 'COALESCE(sg.goal_completed, g.goal_completed) AS goal_completed',
+        'task_completed': 'COALESCE(st.task_completed, g.task_completed) AS task_completed'
+    }
+    select_list = ',\n       '.join(overlays.get(name, f'g."{name}"') for name in column_names)
+    return (
+        f"CREATE VIEW {COMPAT_VIEW} AS\n"
+        f"SELECT {select_list}\n"
+        "FROM users_courses_goal g\n"
+        "LEFT JOIN study_goals sg ON sg.user_id = g.user_id AND sg.goal_id = g.goal_id\n"
+        "LEFT JOIN study_tasks st ON st.user_id = g.user_id AND st.task_id = g.task_id"
+    )
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_compat_view(target, connection, **kw):
+    """Create users_courses_goal_view, or rebuild it when the table gained columns it does not list.
+
+    Runs on every create_all, so it leaves an up-to-date view alone; processes starting
+    together take an advisory lock so only one of them rebuilds it.
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    try:
+        with connection.begin_nested():
+            column_names = [column['name'] for column in inspect(connection).get_columns('users_courses_goal')]
+            if _compat_view_columns(connection) == column_names:
+                return
+            connection.execute(db.select(db.func.pg_advisory_xact_lock(COMPAT_VIEW_ADVISORY_LOCK_KEY)))
+            if _compat_view_columns(connection) == column_names:
+                return  # Another process rebuilt it while we waited
+            connection.execute(db.text(f"DROP VIEW IF EXISTS {COMPAT_VIEW}"))
+            connection.execute(db.text(goal_view_sql(column_names)))
+    except Exception as e:
+        print(f"Could not create {COMPAT_VIEW}: {str(e)}")
+
+
+def _compat_view_columns(connection):
+    """Columns users_courses_goal_view lists now, in order; None when it does not exist"""
+    rows = connection.execute(db.text(
+        "SELECT attname FROM pg_attribute "
+        "WHERE attrelid = to_regclass(:view) AND attnum > 0 AND NOT attisdropped ORDER BY attnum"
+    ), {'view': COMPAT_VIEW}).all()
+    return [row[0] for row in rows] or None
@@ -1,19 +1,27 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, Text, ForeignKey, event
 from sqlalchemy.dialects.postgresql import ARRAY
 from pgvector.sqlalchemy import Vector
 from ..extensions import db
+from .shared_embedding import SharedEmbedding
 
 class MaterialChunk(db.Model):
     __tablename__ = 'material_chunks'
-    
+
     id = db.Column(db.Integer, primary_key=True)
     file_id = db.Column(db.Integer, db.ForeignKey('uploaded_files.id'), nullable=False)
     chunk_index = db.Column(db.Integer, nullable=False)
     chunk_text = db.Column(db.Text, nullable=False)
-    embedding = db.Column(Vector(1536))  # OpenAI embeddings are 1536 dimensions
+    embedding = db.Column(Vector(1536))  # OpenAI embeddings are 1536 dimensions; NULL when shared_embedding_id is set
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    shared_embedding_id = db.Column(db.Integer, db.ForeignKey('shared_embeddings.id'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
+
+    @classmethod
+    def embedding_expression(cls):
+        """The chunk's vector whether stored inline or shared - outer join SharedEmbedding to use it"""
+        return db.func.coalesce(cls.embedding, SharedEmbedding.embedding, type_=Vector(1536))
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -22,3 +30,14 @@ class MaterialChunk(db.Model):
             'chunk_text': self.chunk_text[:200] + '...' if len(self.chunk_text) > 200 else self.chunk_text,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+@event.listens_for(MaterialChunk, 'after_delete')
+def release_shared_embedding(mapper, connection, target):
+    """Drop the chunk's reference; unreferenced shared embeddings are pruned separately"""
+    if target.shared_embedding_id:
+        connection.execute(
+            SharedEmbedding.__table__.update().where(
+                SharedEmbedding.__table__.c.id == target.shared_embedding_id
+            ).values(ref_count=SharedEmbedding.__table__.c.ref_count - 1)
+        )
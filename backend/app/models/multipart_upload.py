@@ -0,0 +1,57 @@
+import uuid
+from datetime import datetime
+from app.init import db
+
+class MultipartUpload(db.Model):
+    """A large material upload sent by the browser straight to S3 in parts.
+
+    Tracks the S3 UploadId and the parts confirmed so far, so an interrupted
+    upload can be resumed by sending only the missing parts.
+    """
+    __tablename__ = 'multipart_uploads'
+
+    STATUS_IN_PROGRESS = 'in_progress'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+
+    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False, index=True)
+    course_id = db.Column(db.String, nullable=False, index=True)  # Shared course id
+    storage_key = db.Column(db.String(500), nullable=False)
+    upload_id = db.Column(db.String(1024), nullable=False)  # S3 UploadId
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(255), nullable=True)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    part_size = db.Column(db.BigInteger, nullable=False)
+    part_count = db.Column(db.Integer, nullable=False)
+    parts = db.Column(db.JSON, default=dict)  # {"<part number>": {"etag": ..., "size": ...}}
+    status = db.Column(db.String(20), nullable=False, default=STATUS_IN_PROGRESS, index=True)
+    material_id = db.Column(db.String, nullable=True)  # UserCourseMaterial created on completion
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def missing_parts(self):
+        uploaded = self.parts or {}
+        return [number for number in range(1, self.part_count + 1) if str(number) not in uploaded]
+
+    def to_dict(self):
+        uploaded = self.parts or {}
+        return {
+            'id': self.id,
+            'course_id': self.course_id,
+            'filename': self.filename,
+            'storage_key': self.storage_key,
+            'total_size': self.total_size,
+            'part_size': self.part_size,
+            'part_count': self.part_count,
+            'uploaded_parts': sorted(int(number) for number in uploaded),
+            'missing_parts': self.missing_parts(),
+            'uploaded_bytes': sum(part.get('size', 0) for part in uploaded.values()),
+            'status': self.status,
+            'material_id': self.material_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<MultipartUpload {self.filename} {self.status}>'
@@ -0,0 +1,40 @@
+from datetime import datetime
+from pgvector.sqlalchemy import Vector
+from ..extensions import db
+from .embedding_version import LEGACY_EMBEDDING_MODEL
+
+class SemanticAnswerCache(db.Model):
+    """A generated course answer keyed by its question embedding and the chunks it was built from"""
+    __tablename__ = 'semantic_answer_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.String, nullable=False, index=True)  # Shared course id, so all sections share entries
+    question = db.Column(db.Text, nullable=False)
+    # Model that embedded the question; lookups only compare entries of the course's current model
+    embedding_model = db.Column(db.String(100), nullable=False, default=LEGACY_EMBEDDING_MODEL)
+    # Unconstrained like chunk_embedding_versions.embedding: a course cut over to another model
+    # stores vectors of that model's size
+    question_embedding = db.Column(Vector(), nullable=False)
+    chunk_ids = db.Column(db.JSON, default=list)
+    chunks_fingerprint = db.Column(db.String(64), nullable=False)  # Hash of the retrieved chunk contents
+    answer = db.Column(db.Text, nullable=False)
+    source_files = db.Column(db.JSON, default=list)
+    confidence = db.Column(db.Float, default=0.0)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'course_id': self.course_id,
+            'question': self.question,
+            'embedding_model': self.embedding_model,
+            'chunk_ids': self.chunk_ids or [],
+            'answer': self.answer,
+            'source_files': self.source_files or [],
+            'confidence': self.confidence,
+            'hit_count': self.hit_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_hit_at': self.last_hit_at.isoformat() if self.last_hit_at else None
+        }
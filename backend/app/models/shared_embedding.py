@@ -0,0 +1,39 @@
+from datetime import datetime
+from pgvector.sqlalchemy import Vector
+from ..extensions import db
+
+class SharedEmbedding(db.Model):
+    """One stored embedding shared by every material chunk with the same (or nearly the same) text"""
+    __tablename__ = 'shared_embeddings'
+
+    id = db.Column(db.Integer, primary_key=True)
+    model = db.Column(db.String(100), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)  # sha256 of the normalized chunk text
+    simhash = db.Column(db.BigInteger, nullable=False)  # 64-bit SimHash stored signed
+    simhash_band0 = db.Column(db.Integer, nullable=False, index=True)
+    simhash_band1 = db.Column(db.Integer, nullable=False, index=True)
+    simhash_band2 = db.Column(db.Integer, nullable=False, index=True)
+    simhash_band3 = db.Column(db.Integer, nullable=False, index=True)
+    embedding = db.Column(Vector(1536), nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # Number of material chunks pointing here
+    byte_size = db.Column(db.Integer, nullable=False, default=0)  # Stored size of the vector
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'model', name='uq_shared_embeddings_hash_model'),
+    )
+
+    @staticmethod
+    def vector_bytes(embedding) -> int:
+        """pgvector stores 4-byte floats plus an 8-byte header"""
+        return 4 * len(embedding) + 8
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'model': self.model,
+            'content_hash': self.content_hash,
+            'ref_count': self.ref_count,
+            'byte_size': self.byte_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
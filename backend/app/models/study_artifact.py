@@ -0,0 +1,60 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from app.init import db
+
+class StudyArtifact(db.Model):
+    """A generated quiz or flashcard set, stored in Postgres.
+
+    The UserCourseMaterial that lists it has file_path 'artifact://<id>'.
+    JSONB values are TOASTed and compressed by Postgres (lz4 when available,
+    see below), so large quizzes cost little space and one indexed read.
+    """
+    __tablename__ = 'study_artifacts'
+
+    TYPE_QUIZ = 'quiz'
+    TYPE_FLASHCARDS = 'flashcards'
+
+    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String, db.ForeignKey('users.id'), nullable=False, index=True)
+    course_id = db.Column(db.String, nullable=False, index=True)  # combo_id, like UserCourseMaterial.course_id
+    artifact_type = db.Column(db.String(20), nullable=False)
+    content = db.Column(JSONB, nullable=False)
+    content_size = db.Column(db.Integer, nullable=True)  # Bytes of the serialized JSON
+    export_path = db.Column(db.String(500), nullable=True)  # Storage copy, when STUDY_ARTIFACT_EXPORT is on
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, include_content=False):
+        data = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'course_id': self.course_id,
+            'artifact_type': self.artifact_type,
+            'content_size': self.content_size,
+            'export_path': self.export_path,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_content:
+            data['content'] = self.content
+        return data
+
+    def __repr__(self):
+        return f'<StudyArtifact {self.artifact_type} {self.id}>'
+
+
+@event.listens_for(StudyArtifact.__table__, 'after_create')
+def use_lz4_compression(target, connection, **kw):
+    """Compress artifact JSON with lz4 instead of pglz where the server supports it (Postgres 14+)"""
+    if connection.dialect.name != 'postgresql':
+        return
+    version = connection.execute(db.text("SELECT current_setting('server_version_num')::int")).scalar()
+    if version < 140000:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(db.text('ALTER TABLE study_artifacts ALTER COLUMN content SET COMPRESSION lz4'))
+    except Exception as e:
+        print(f"lz4 compression unavailable for study_artifacts, using the default: {str(e)}")
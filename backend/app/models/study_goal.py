@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Integer
+from sqlalchemy.orm import column_property
+
+from app.init import db
+
+
+class StudyGoal(db.Model):
+    """One row per goal: its completion flag and progress counters.
+
+    users_courses_goal keeps one row per subtask. The goal- and task-level state
+    that used to be repeated (and rewritten) on every one of those rows lives here
+    and in StudyTask, so completing a subtask touches a fixed number of rows.
+    The counters are kept up to date by a flush listener on Goal (see models/goal.py).
+    Imported Google Calendar rows are not tracked here.
+    """
+    __tablename__ = 'study_goals'
+
+    user_id = Column(String, ForeignKey('users.id'), primary_key=True)
+    goal_id = Column(String, primary_key=True)
+    course_id = Column(String, nullable=False, index=True)  # combo_id
+    goal_completed = Column(Boolean, nullable=False, default=False)
+    total_tasks = Column(Integer, nullable=False, default=0)
+    completed_tasks = Column(Integer, nullable=False, default=0)
+    total_subtasks = Column(Integer, nullable=False, default=0)
+    completed_subtasks = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+
+    @property
+    def progress(self):
+        if not self.total_subtasks:
+            return 0
+        return round((self.completed_subtasks / self.total_subtasks) * 100)
+
+    def refresh_completion(self):
+        """A goal is complete when it has tasks and all of them are"""
+        self.goal_completed = self.total_tasks > 0 and self.completed_tasks == self.total_tasks
+
+    def to_dict(self):
+        return {
+            'goal_id': self.goal_id,
+            'course_id': self.course_id,
+            'goal_completed': self.goal_completed,
+            'total_tasks': self.total_tasks,
+            'completed_tasks': self.completed_tasks,
+            'total_subtasks': self.total_subtasks,
+            'completed_subtasks': self.completed_subtasks,
+            'progress': self.progress
+        }
+
+    def __repr__(self):
+        return f'<StudyGoal {self.goal_id} {self.completed_tasks}/{self.total_tasks}>'
+
+
+class StudyTask(db.Model):
+    """One row per task: its completion flag and subtask counters (see StudyGoal)"""
+    __tablename__ = 'study_tasks'
+
+    user_id = Column(String, ForeignKey('users.id'), primary_key=True)
+    task_id = Column(String, primary_key=True)
+    goal_id = Column(String, nullable=False)
+    course_id = Column(String, nullable=False)
+    task_completed = column_property(Column(Boolean, nullable=False, default=False), active_history=True)
+    total_subtasks = Column(Integer, nullable=False, default=0)
+    completed_subtasks = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('ix_study_tasks_user_goal', 'user_id', 'goal_id'),
+    )
+
+    def refresh_completion(self):
+        """A task is complete when it has subtasks and all of them are"""
+        self.task_completed = self.total_subtasks > 0 and self.completed_subtasks == self.total_subtasks
+
+    def __repr__(self):
+        return f'<StudyTask {self.task_id} {self.completed_subtasks}/{self.total_subtasks}>'
@@ -4,22 +4,33 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, decode_token
 from app.models.user import User
 from app.extensions import db
 from datetime import datetime, timedelta, timezone
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.oauth2.credentials import Credentials
+from googleapiclient.http import BatchHttpRequest
 from app.models.goal import Goal
 from dateutil.parser import isoparse
 from datetime import timezone
 from app.models.course import Course
-from sqlalchemy import asc
-import requests
+from app.models.calendar_sync_job import CalendarSyncJob
+from app.services.calendar_sync import queue_calendar_sync
+from app.services.google_clients import build_calendar_service, ensure_fresh_token, forget_user, get_calendar_service
+from sqlalchemy.dialects.postgresql import insert
+import time
 import pytz
-from typing import Optional
+from typing import Optional, Dict, List, Tuple, Callable
 import uuid
+from app.utils import metrics
+from app.utils.cache import TTLCache
 
 calendar_bp = Blueprint('calendar', __name__)
 oauth = OAuth()
 
+GOOGLE_BATCH_LIMIT = 50  # Most requests Google accepts in one batch for Calendar
+UPSERT_CHUNK_SIZE = 500  # Imported events per INSERT ... ON CONFLICT statement
+DEFAULT_CALENDAR_NAME = "CourseMate Tasks"
+
+# (user_id, calendar name) -> calendarId, so a sync does not scan calendarList per subtask
+_calendar_ids = TTLCache(max_entries=4096, default_ttl=3600)
+
 def register_calendar_oauth(app):
     oauth.init_app(app)
     oauth.register(
@@ -79,115 +90,54 @@ def calendar_callback():
     user.token_expiry = (datetime.now(timezone.utc)
                         + timedelta(seconds=token["expires_in"]))    
     db.session.commit()
+    forget_user(user.id)
         
+    # The initial full sync runs in the background; calendar_synced is set when it completes
     try:
-        sync_google_events(user, full_sync=True)
-        user.calendar_synced = True
-        db.session.commit()
+        queue_google_import(user.id, full_sync=True)
     except Exception as e:
-        db.session.rollback()
-        current_app.logger.exception("initial Google Calendar sync failed")
+        current_app.logger.exception("queueing initial Google Calendar sync failed")
         return jsonify({"error": str(e)}), 500
 
     return redirect("http://localhost:3001/calendar")
 
 # Helper: Refresh token if expired
 def refresh_google_token(user: User):
-    """Refresh Google OAuth access token using refresh token"""
-    if not user.google_refresh_token:
-        print(f"❌ No refresh token found for user {user.id}")
-        raise ValueError("No refresh token found")
-    
-    if user.token_expiry and user.token_expiry > datetime.now(timezone.utc):
-        print(f"✅ Token still valid for user {user.id}, expiry: {user.token_expiry}")
-        return # Token is still valid
-
-    print(f"🔄 Refreshing token for user {user.id}")
-    
-    # Token is expired, refresh it
-    token_url = "https://oauth2.googleapis.com/token"
-    data = {
-        "client_id": current_app.config["GOOGLE_CLIENT_ID"],
-        "client_secret": current_app.config["GOOGLE_CLIENT_SECRET"],
-        "refresh_token": user.google_refresh_token,
-        "grant_type": "refresh_token"
-    }
+    """Refresh Google OAuth access token using refresh token (shortly before it expires; see google_clients)"""
+    ensure_fresh_token(user)
 
-    try:
-        response = requests.post(token_url, data=data)
-        print(f"🔍 Token refresh response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            new_token = response.json()
-            user.google_access_token = new_token["access_token"]
-            user.token_expiry = (datetime.now(timezone.utc)
-                                + timedelta(seconds=new_token["expires_in"]))
-            db.session.commit()
-            print(f"✅ Successfully refreshed token for user {user.id}")
-        else:
-            error_data = response.json() if response.content else {}
-            error_message = error_data.get('error_description', error_data.get('error', 'Unknown error'))
-            print(f"❌ Failed to refresh token for user {user.id}: {response.status_code}")
-            print(f"❌ Error details: {error_message}")
-            print(f"❌ Response content: {response.text}")
-            
-            # Handle specific error cases
-            if response.status_code == 400:
-                if 'invalid_grant' in error_message.lower():
-                    print(f"⚠️  Invalid grant - user {user.id} needs to re-authenticate")
-                    # Clear the invalid refresh token
-                    user.google_refresh_token = None
-                    user.google_access_token = None
-                    user.token_expiry = None
-                    db.session.commit()
-                    raise ValueError("Invalid grant - user needs to re-authenticate")
-                elif 'invalid_client' in error_message.lower():
-                    print(f"⚠️  Invalid client credentials for user {user.id}")
-                    raise ValueError("Invalid client credentials")
-                else:
-                    print(f"⚠️  Unknown 400 error for user {user.id}: {error_message}")
-                    raise ValueError(f"Token refresh failed: {error_message}")
-            else:
-                raise ValueError(f"Token refresh failed with status {response.status_code}: {error_message}")
-                
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Network error during token refresh for user {user.id}: {str(e)}")
-        raise ValueError(f"Network error during token refresh: {str(e)}")
-    except Exception as e:
-        print(f"❌ Unexpected error during token refresh for user {user.id}: {str(e)}")
-        raise ValueError(f"Unexpected error during token refresh: {str(e)}")
-    
-    
-def sync_google_events(user: User, full_sync: bool = True):
-    refresh_google_token(user)
-    if not user.google_access_token:
-        raise ValueError("No access token found")    
-    
+def sync_google_events(user: User, full_sync: bool = True, progress: Optional[Callable[[dict], None]] = None):
+    """Import the user's Google events; progress (if given) is called with running totals after each page"""
+    service = get_calendar_service(user)
     course_id = ensure_google_calendar_course(user)
     
-    credentials = Credentials(
-                        token=user.google_access_token,
-                        refresh_token=user.google_refresh_token,
-                        token_uri="https://oauth2.googleapis.com/token",
-                        client_id=current_app.config["GOOGLE_CLIENT_ID"],
-                        client_secret=current_app.config["GOOGLE_CLIENT_SECRET"],
-        scopes=["https://www.googleapis.com/auth/calendar"]
-    )
-    
-    service = build("calendar", "v3", credentials=credentials, cache_discovery=False)
     calendar_list = service.calendarList().list().execute()
     calendars = calendar_list.get("items", [])
     if not calendars:
         raise ValueError("No calendars found")
     
     token_map = user.google_sync_tokens or {}
+    started = time.perf_counter()
     processed_calendars = 0
     total_events_processed = 0
     total_events_created = 0
     total_events_updated = 0
     total_events_deleted = 0
-    
-    for cal in calendars:
+
+    def report(calendars_done, cal_name=None):
+        if progress:
+            progress({
+                'calendars_total': len(calendars),
+                'calendars_done': calendars_done,
+                'calendar': cal_name,
+                'processed': total_events_processed,
+                'created': total_events_created,
+                'updated': total_events_updated,
+                'deleted': total_events_deleted
+            })
+
+    report(0)
+    for cal_index, cal in enumerate(calendars):
         cal_id = cal["id"]
         cal_name = cal.get("summary", "Untitled")
         cal_color = cal.get("backgroundColor", "#4285f4")  # Default Google Calendar blue
@@ -248,111 +198,18 @@ def sync_google_events(user: User, full_sync: bool = True):
                     db.session.commit()
                 break
             
-            # Pre-fetch all existing events for this batch to reduce database queries
-            event_ids = [item.get('id') for item in events if item.get('id')]
-            existing_events = {}
-            if event_ids:
-                # Use the index for efficient lookup
-                existing_goals = Goal.query.filter(
-                    Goal.google_event_id.in_(event_ids),
-                    Goal.user_id == user.id
-                ).all()
-                existing_events = {goal.google_event_id: goal for goal in existing_goals}
-            
-            for item in events:
-                calendar_events_processed += 1
-                total_events_processed += 1
-                
-                event_id = item.get('id')
-                if not event_id:
-                    continue
-                
-                # Log the event being processed
-                current_app.logger.info(f"Processing event: {event_id} - {item.get('summary')} - Status: {item.get('status')}")
-                
-                # Skip events that were created by this application to avoid circular sync
-                extended_props = item.get("extendedProperties", {})
-                private_props = extended_props.get("private", {})
-                if private_props.get("source") == "coursemate-app":
-                    current_app.logger.info(f"Skipping application-created event: {event_id} - {item.get('summary')}")
-                    continue
-                
-                # Also skip events that already exist in our database with sync_status "Synced"
-                # (these are likely events created by our app before the metadata fix)
-                existing_synced = Goal.query.filter_by(google_event_id=event_id, sync_status="Synced").first()
-                if existing_synced:
-                    current_app.logger.info(f"Skipping already synced event: {event_id} - {item.get('summary')}")
-                    continue
-                
-                # Handle deleted events
-                if item.get("status") == "cancelled":
-                    existing_rows = existing_events.get(event_id)
-                    if existing_rows:
-                        current_app.logger.info(f"Deleting rows for cancelled event: {event_id}")
-                        db.session.delete(existing_rows)
-                        calendar_events_deleted += 1
-                        total_events_deleted += 1
-                    continue
-                
-                # Check if event exists using the pre-fetched data
-                existing_goal = existing_events.get(event_id)
-                
-                if existing_goal:
-                    # Update existing goal
-                    start_raw = item["start"].get("dateTime") or item["start"].get("date")
-                    end_raw = item["end"].get("dateTime") or item["end"].get("date")
-                    
-                    # Parse new times for comparison
-                    if "T" in end_raw:
-                        new_due_date = isoparse(end_raw).astimezone(timezone.utc)
-                    else:
-                        new_due_date = isoparse(end_raw + "T00:00:00Z").astimezone(timezone.utc)
-                    
-                    if "T" in start_raw:
-                        new_start_time = isoparse(start_raw).astimezone(timezone.utc)
-                    else:
-                        new_start_time = isoparse(start_raw + "T00:00:00Z").astimezone(timezone.utc)
-                    
-                    if "T" in end_raw:
-                        new_end_time = isoparse(end_raw).astimezone(timezone.utc)
-                    else:
-                        new_end_time = isoparse(end_raw + "T00:00:00Z").astimezone(timezone.utc)
-                    
-                    new_task_descr = item.get("description", "")
-                    new_goal_descr = f"Imported from {cal_name}"
-                    
-                    # Check if any fields have actually changed
-                    has_changes = (
-                        existing_goal.goal_descr != new_goal_descr or
-                        existing_goal.task_descr != new_task_descr or
-                        existing_goal.due_date != new_due_date or
-                        existing_goal.start_time != new_start_time or
-                        existing_goal.end_time != new_end_time
-                    )
-                    
-                    if has_changes:
-                        current_app.logger.info(f"Updating existing goal for event: {event_id} - {item.get('summary')}")
-                        # Update fields if needed
-                        existing_goal.goal_descr = new_goal_descr
-                        existing_goal.task_descr = new_task_descr
-                        existing_goal.due_date = new_due_date
-                        existing_goal.start_time = new_start_time
-                        existing_goal.end_time = new_end_time
-                        existing_goal.updated_at = datetime.now(timezone.utc)
-                        calendar_events_updated += 1
-                        total_events_updated += 1
-                    else:
-                        current_app.logger.debug(f"No changes detected for event: {event_id} - {item.get('summary')}")
-                else:
-                    # Create new goal
-                    current_app.logger.info(f"Creating new goal for event: {event_id} - {item.get('summary')}")
-                    goal = convert_google_event_to_goal(user.id, course_id, event=item, calendar_name=cal_name, calendar_color=cal_color)
-                    db.session.add(goal)
-                    calendar_events_created += 1
-                    total_events_created += 1
-            
-            # Commit all changes for this batch at once (faster with index)
+            # Apply the whole page with one upsert per chunk and a single DELETE
+            page_counts = apply_google_event_page(user, course_id, events, cal_name, cal_color)
+            calendar_events_processed += len(events)
+            total_events_processed += len(events)
+            calendar_events_created += page_counts['created']
+            total_events_created += page_counts['created']
+            calendar_events_updated += page_counts['updated']
+            total_events_updated += page_counts['updated']
+            calendar_events_deleted += page_counts['deleted']
+            total_events_deleted += page_counts['deleted']
             db.session.commit()
+            report(cal_index, cal_name)
             
             page_token = feed.get("nextPageToken")
             if page_token:
@@ -367,14 +224,97 @@ def sync_google_events(user: User, full_sync: bool = True):
                 db.session.commit()
             break
         
+        report(cal_index + 1, cal_name)
         current_app.logger.info(f"Calendar {cal_name}: {calendar_events_processed} processed, {calendar_events_created} created, {calendar_events_updated} updated, {calendar_events_deleted} deleted")
     
-    current_app.logger.info(f"Sync completed: {processed_calendars} calendars processed, {total_events_processed} total events ({total_events_created} created, {total_events_updated} updated, {total_events_deleted} deleted)")
-    # Index on Goal.google_event_id provides optimal sync performance for lookups.
+    elapsed = time.perf_counter() - started
+    events_per_second = total_events_processed / elapsed if elapsed > 0 else 0.0
+    metrics.increment('calendar.events_ingested', total_events_processed)
+    metrics.observe('calendar.sync_ms', elapsed * 1000)
+    metrics.set_gauge('calendar.last_sync_events_per_second', round(events_per_second, 1))
+    current_app.logger.info(f"Sync completed: {processed_calendars} calendars processed, {total_events_processed} total events ({total_events_created} created, {total_events_updated} updated, {total_events_deleted} deleted) in {elapsed:.1f}s, {events_per_second:.0f} events/s")
+    return {
+        'calendars': processed_calendars,
+        'processed': total_events_processed,
+        'created': total_events_created,
+        'updated': total_events_updated,
+        'deleted': total_events_deleted,
+        'seconds': round(elapsed, 3),
+        'events_per_second': round(events_per_second, 1)
+    }
+
+def apply_google_event_page(user: User, course_id: str, events: List[dict], cal_name: str, cal_color: str) -> Dict[str, int]:
+    """Store one page of Google events for a user: set-based, in the caller's transaction.
+
+    New and changed events go in through INSERT ... ON CONFLICT on the imported-event
+    index (user_id, google_event_id); unchanged ones are left alone. Cancelled events
+    are removed with one DELETE. Events this app created, and events already linked
+    to one of the user's synced subtasks, are skipped.
+    """
+    rows = {}
+    cancelled = set()
+    for item in events:
+        event_id = item.get('id')
+        if not event_id:
+            continue
+        # Skip events that were created by this application to avoid circular sync
+        private_props = item.get("extendedProperties", {}).get("private", {})
+        if private_props.get("source") == "coursemate-app":
+            continue
+        if item.get("status") == "cancelled":
+            cancelled.add(event_id)
+            rows.pop(event_id, None)
+        else:
+            try:
+                rows[event_id] = google_event_values(user.id, course_id, item, cal_name, cal_color)
+            except ValueError as e:
+                current_app.logger.warning(f"Skipping event {event_id}: {e}")
+            cancelled.discard(event_id)
+
+    # Events already linked to a synced subtask (created by the app before the metadata fix)
+    page_ids = list(rows) + list(cancelled)
+    synced = set()
+    if page_ids:
+        synced = {row[0] for row in db.session.query(Goal.google_event_id).filter(
+            Goal.user_id == user.id,
+            Goal.google_event_id.in_(page_ids),
+            Goal.sync_status == "Synced"
+        )}
+
+    counts = {'created': 0, 'updated': 0, 'deleted': 0}
+    deletable = [event_id for event_id in cancelled if event_id not in synced]
+    if deletable:
+        counts['deleted'] = Goal.query.filter(
+            Goal.user_id == user.id,
+            Goal.google_event_id.in_(deletable),
+            db.or_(Goal.sync_status.is_(None), Goal.sync_status != "Synced")
+        ).delete(synchronize_session=False)
+
+    now = datetime.now(timezone.utc)
+    values = [
+        dict(row, id=str(uuid.uuid4()), created_at=now, updated_at=now, sync_status="Not Synced",
+             task_is_being_tracked=False, task_has_ever_been_completed=False, is_conflicting=False, frequency={})
+        for event_id, row in rows.items() if event_id not in synced
+    ]
+    table = Goal.__table__
+    changing = ('goal_descr', 'task_title', 'task_descr', 'subtask_descr', 'due_date', 'start_time', 'end_time',
+                'google_etag', 'google_source', 'google_calendar_color')
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(values[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.google_event_id],
+            index_where=db.text(Goal.IMPORTED_EVENT_WHERE),
+            set_=dict({column: stmt.excluded[column] for column in changing}, updated_at=now),
+            where=db.or_(*[table.c[column].is_distinct_from(stmt.excluded[column]) for column in changing])
+        ).returning(db.literal_column('xmax = 0'))
+        for (inserted,) in db.session.execute(stmt):
+            counts['created' if inserted else 'updated'] += 1
+    return counts
     
 
 
-def convert_google_event_to_goal(user_id, course_id, event, calendar_name, calendar_color):
+def google_event_values(user_id, course_id, event, calendar_name, calendar_color) -> dict:
+    """Goal fields for an imported Google event"""
     start_raw = event["start"].get("dateTime") or event["start"].get("date")
     end_raw = event["end"].get("dateTime") or event["end"].get("date")
 
@@ -403,7 +343,7 @@ def convert_google_event_to_goal(user_id, course_id, event, calendar_name, calen
     if len(subtask_descr) > 255:
         subtask_descr = subtask_descr[:255]
     
-    return Goal(
+    return dict(
         user_id=user_id,
         course_id=course_id,
         goal_id="Google Calendar",
@@ -427,6 +367,9 @@ def convert_google_event_to_goal(user_id, course_id, event, calendar_name, calen
         google_calendar_color=calendar_color
     )
 
+def convert_google_event_to_goal(user_id, course_id, event, calendar_name, calendar_color):
+    return Goal(**google_event_values(user_id, course_id, event, calendar_name, calendar_color))
+
 def ensure_google_calendar_course(user) -> str:
     """Ensure a Google Calendar course exists for the user and return its combo_id"""
     stub_id = f"google-calendar-{user.id}"
@@ -455,26 +398,106 @@ def ensure_google_calendar_course(user) -> str:
     
     return stub_id
 
-def get_or_create_calendar(service, cal_name):
-    """Return calendarId for `cal_name`; create it if missing."""
+def get_or_create_calendar(service, cal_name, user_id=None):
+    """Return calendarId for `cal_name`; create it if missing.
+
+    With a user_id the answer is cached, and one calendarList scan caches every
+    calendar the user has, so syncing many courses costs a single scan.
+    """
     if not cal_name:
-        cal_name = "CourseMate Tasks"  # Default calendar name
-    
+        cal_name = DEFAULT_CALENDAR_NAME  # Default calendar name
+
+    if user_id is not None:
+        cached = _calendar_ids.get((user_id, cal_name))
+        if cached:
+            metrics.increment('calendar.calendar_id_cache_hits')
+            return cached
+        metrics.increment('calendar.calendar_id_cache_misses')
+
+    found = None
+    seen = set()
     page_token = None
     while True:
         feed = service.calendarList().list(pageToken=page_token).execute()
         for item in feed.get("items", []):
-            if item.get("summary") == cal_name:
-                return item["id"]
+            name = item.get("summary")
+            if name and name not in seen:  # First match wins, as before
+                seen.add(name)
+                if user_id is not None:
+                    _calendar_ids.set((user_id, name), item["id"])
+                if name == cal_name and found is None:
+                    found = item["id"]
         page_token = feed.get("nextPageToken")
         if not page_token:
             break
+    if found:
+        return found
 
     new_cal = service.calendars().insert(
         body={"summary": cal_name}
     ).execute()
+    if user_id is not None:
+        _calendar_ids.set((user_id, cal_name), new_cal["id"])
     return new_cal["id"]
 
+def forget_calendar_id(user_id, cal_name):
+    """Drop a cached calendarId, e.g. after the calendar was deleted in Google"""
+    _calendar_ids.delete((user_id, cal_name or DEFAULT_CALENDAR_NAME))
+
+def subtask_course_title(user: User, subtask: Goal) -> str:
+    """Title of the course a subtask belongs to, used as its Google calendar's name"""
+    # Try to find the course by combo_id first, then by id
+    course = Course.query.filter_by(combo_id=subtask.course_id, user_id=user.id).first()
+    if not course:
+        # Fallback to searching by id
+        course = Course.query.filter_by(id=subtask.course_id, user_id=user.id).first()
+
+    if course:
+        return course.title
+    print(f"⚠️  Course not found for course_id: {subtask.course_id}, using fallback title")
+    return f"Course {subtask.course_id}"
+
+def subtask_event_body(subtask: Goal, course_title: Optional[str]) -> dict:
+    """Google Calendar event for a subtask with start/end times"""
+    # Convert UTC times to local timezone for Google Calendar
+    local_tz = pytz.timezone('America/New_York')  # Default timezone
+
+    # Convert UTC to local time
+    start_time_local = subtask.start_time.replace(tzinfo=timezone.utc).astimezone(local_tz)
+    end_time_local = subtask.end_time.replace(tzinfo=timezone.utc).astimezone(local_tz)
+
+    # Create event description with task due date, goal, and course info
+    description_parts = []
+    if subtask.task_due_date:
+        task_due_str = subtask.task_due_date.strftime('%Y-%m-%d')
+        description_parts.append(f"Task Due: {task_due_str}")
+    if subtask.goal_descr:
+        description_parts.append(f"Goal: {subtask.goal_descr}")
+    if course_title:
+        description_parts.append(f"Course: {course_title}")
+
+    event_description = "\n".join(description_parts) if description_parts else "CourseMate Task"
+
+    return {
+        'summary': f"{subtask.subtask_descr} ({'Completed' if subtask.subtask_completed else 'Incomplete'})",
+        'description': event_description,
+        'start': {
+            'dateTime': start_time_local.isoformat(),
+            'timeZone': str(local_tz)
+        },
+        'end': {
+            'dateTime': end_time_local.isoformat(),
+            'timeZone': str(local_tz)
+        },
+        'extendedProperties': {
+            'private': {
+                'source': 'coursemate-app',
+                'subtask_id': subtask.subtask_id,
+                'task_id': subtask.task_id
+            }
+        }
+    }
+
 def sync_subtask_to_google_calendar(user: User, subtask: Goal, course_title: Optional[str] = None):
     """
     Sync a subtask to Google Calendar as an individual event. 
@@ -484,7 +507,7 @@ def sync_subtask_to_google_calendar(user: User, subtask: Goal, course_title: Opt
         print(f"🔄 Starting Google Calendar sync for subtask {subtask.subtask_id} (Task: {subtask.task_title})")
         
         try:
-            refresh_google_token(user)
+            service = get_calendar_service(user)
         except ValueError as e:
             if "needs to re-authenticate" in str(e):
                 print(f"❌ User {user.id} needs to re-authenticate with Google Calendar")
@@ -496,65 +519,16 @@ def sync_subtask_to_google_calendar(user: User, subtask: Goal, course_title: Opt
                 print(f"❌ Token refresh failed: {str(e)}")
                 return False
         
-        if not user.google_access_token:
-            print(f"❌ No Google access token for user {user.id}")
-            return False
-        
         # Get course title if not provided
         if not course_title:
-            # Try to find the course by combo_id first, then by id
-            course = Course.query.filter_by(combo_id=subtask.course_id, user_id=user.id).first()
-            if not course:
-                # Fallback to searching by id
-                course = Course.query.filter_by(id=subtask.course_id, user_id=user.id).first()
-            
-            if course:
-                course_title = course.title
-            else:
-                print(f"⚠️  Course not found for course_id: {subtask.course_id}, using fallback title")
-                course_title = f"Course {subtask.course_id}"
-        
-        # Convert UTC times to local timezone for Google Calendar
-        local_tz = pytz.timezone('America/New_York')  # Default timezone
+            course_title = subtask_course_title(user, subtask)
         
         if not subtask.start_time or not subtask.end_time:
             print(f"⚠️  Skipping subtask {subtask.subtask_id}: No start/end times")
             return False
         
-        # Convert UTC to local time
-        start_time_local = subtask.start_time.replace(tzinfo=timezone.utc).astimezone(local_tz)
-        end_time_local = subtask.end_time.replace(tzinfo=timezone.utc).astimezone(local_tz)
-        
-        # Format for Google Calendar API
-        start_time_str = start_time_local.isoformat()
-        end_time_str = end_time_local.isoformat()
-        
-        # Create event description with task due date, goal, and course info
-        description_parts = []
-        if subtask.task_due_date:
-            task_due_str = subtask.task_due_date.strftime('%Y-%m-%d')
-            description_parts.append(f"Task Due: {task_due_str}")
-        if subtask.goal_descr:
-            description_parts.append(f"Goal: {subtask.goal_descr}")
-        if course_title:
-            description_parts.append(f"Course: {course_title}")
-        
-        event_description = "\n".join(description_parts) if description_parts else "CourseMate Task"
-        
-        # Build credentials and service
-        credentials = Credentials(
-            token=user.google_access_token,
-            refresh_token=user.google_refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=current_app.config["GOOGLE_CLIENT_ID"],
-            client_secret=current_app.config["GOOGLE_CLIENT_SECRET"],
-            scopes=["https://www.googleapis.com/auth/calendar"]
-        )
-        
-        service = build("calendar", "v3", credentials=credentials, cache_discovery=False)
-        
         # Get or create calendar for this course
-        calendar_id = get_or_create_calendar(service, course_title)
+        calendar_id = get_or_create_calendar(service, course_title, user.id)
         
         # Check if event already exists
         existing_event = None
@@ -572,25 +546,7 @@ def sync_subtask_to_google_calendar(user: User, subtask: Goal, course_title: Opt
                     raise
         
         # Prepare event data
-        event_data = {
-            'summary': f"{subtask.subtask_descr} ({'Completed' if subtask.subtask_completed else 'Incomplete'})",
-            'description': event_description,
-            'start': {
-                'dateTime': start_time_str,
-                'timeZone': str(local_tz)
-            },
-            'end': {
-                'dateTime': end_time_str,
-                'timeZone': str(local_tz)
-            },
-            'extendedProperties': {
-                'private': {
-                    'source': 'coursemate-app',
-                    'subtask_id': subtask.subtask_id,
-                    'task_id': subtask.task_id
-                }
-            }
-        }
+        event_data = subtask_event_body(subtask, course_title)
         
         if existing_event:
             # Update existing event
@@ -632,14 +588,95 @@ def sync_subtask_to_google_calendar(user: User, subtask: Goal, course_title: Opt
         print(f"❌ Unexpected error syncing subtask {subtask.subtask_id}: {str(e)}")
         return False
 
+def _new_batch(service, callback):
+    """Batch request for the calendar API; GOOGLE_API_BATCH_URI overrides Google's batch endpoint"""
+    batch_uri = current_app.config.get('GOOGLE_API_BATCH_URI')
+    if batch_uri:
+        return BatchHttpRequest(callback=callback, batch_uri=batch_uri)
+    return service.new_batch_http_request(callback=callback)
+
+def write_subtask_events(service, calendar_id: str, subtasks: List[Goal], course_title: Optional[str]) -> Dict[str, object]:
+    """Insert/update the events for subtasks in batch requests of up to GOOGLE_API_BATCH_SIZE.
+
+    Subtasks with an event are updated; when Google no longer has that event it is
+    created again. Returns {subtask.id: event dict or the HttpError it failed with}.
+    Nothing is written to the database.
+    """
+    batch_size = max(1, min(current_app.config.get('GOOGLE_API_BATCH_SIZE', GOOGLE_BATCH_LIMIT), GOOGLE_BATCH_LIMIT))
+    results = {}
+
+    def store(request_id, response, exception):
+        results[request_id] = exception if exception is not None else response
+
+    def send(operations):
+        for start in range(0, len(operations), batch_size):
+            batch = _new_batch(service, store)
+            for subtask, event_id in operations[start:start + batch_size]:
+                body = subtask_event_body(subtask, course_title)
+                if event_id:
+                    request = service.events().update(calendarId=calendar_id, eventId=event_id, body=body)
+                else:
+                    request = service.events().insert(calendarId=calendar_id, body=body)
+                batch.add(request, request_id=str(subtask.id))
+            batch.execute()
+            metrics.increment('calendar.batch_requests')
+
+    send([(subtask, subtask.google_event_id) for subtask in subtasks])
+    missing = [
+        (subtask, None) for subtask in subtasks
+        if subtask.google_event_id and isinstance(results.get(str(subtask.id)), HttpError)
+        and results[str(subtask.id)].resp.status in (404, 410)
+    ]
+    if missing:
+        send(missing)
+    return results
+
+def sync_subtasks_to_google_calendar(user: User, subtasks: List[Goal], course_title: Optional[str] = None,
+                                     service=None) -> Tuple[int, int]:
+    """Sync many subtasks of one course with batched API calls; returns (synced, failed).
+
+    One service object and one calendar lookup serve every subtask. Raises ValueError
+    when the user's Google token cannot be refreshed.
+    """
+    timed = [subtask for subtask in subtasks if subtask.start_time and subtask.end_time]
+    if not timed:
+        return 0, 0
+
+    if service is None:
+        service = get_calendar_service(user)
+
+    if not course_title:
+        course_title = subtask_course_title(user, timed[0])
+    calendar_id = get_or_create_calendar(service, course_title, user.id)
+    results = write_subtask_events(service, calendar_id, timed, course_title)
+
+    synced = failed = 0
+    for subtask in timed:
+        result = results.get(str(subtask.id))
+        if isinstance(result, dict) and result.get('id'):
+            subtask.google_event_id = result['id']
+            subtask.google_calendar_id = calendar_id
+            subtask.sync_status = "Synced"
+            synced += 1
+        else:
+            failed += 1
+            print(f"❌ Google Calendar API error for subtask {subtask.subtask_id}: {result}")
+            if isinstance(result, HttpError) and result.resp.status == 404 and not subtask.google_event_id:
+                # An insert into a missing calendar: it was deleted in Google, look it up again next time
+                forget_calendar_id(user.id, course_title)
+    db.session.commit()
+    metrics.increment('calendar.events_written', synced)
+    print(f"✅ Calendar events synced in batches: {synced}/{len(timed)} ({failed} failed)")
+    return synced, failed
+
 def sync_task_to_google_calendar(user: User, task: Goal, course_title: Optional[str] = None):
     """
     Sync a task to Google Calendar by syncing all its subtasks as individual events.
-    This function now delegates to sync_subtask_to_google_calendar for each subtask.
+    The subtasks' events are written in batched requests.
     """
     try:
         # Get all subtasks for this task
-        all_subtasks = Goal.query.filter_by(task_id=task.task_id, user_id=user.id).order_by(asc(Goal.subtask_order)).all()
+        all_subtasks = Goal.query.filter_by(task_id=task.task_id, user_id=user.id).order_by(*Goal.subtask_ordering()).all()
         
         if not all_subtasks:
             current_app.logger.warning("Task %s has no subtasks, skipping Google Calendar sync", task.task_id)
@@ -650,11 +687,7 @@ def sync_task_to_google_calendar(user: User, task: Goal, course_title: Optional[
             course = Course.query.get(task.course_id)
             course_title = course.title if course else str(task.course_id)
         
-        # Sync each subtask as an individual event
-        success_count = 0
-        for subtask in all_subtasks:
-            if sync_subtask_to_google_calendar(user, subtask, course_title):
-                success_count += 1
+        success_count, _ = sync_subtasks_to_google_calendar(user, all_subtasks, course_title)
         
         current_app.logger.info("Synced %d/%d subtasks for task %s to Google Calendar", 
                                success_count, len(all_subtasks), task.task_id)
@@ -680,21 +713,7 @@ def delete_task_from_google_calendar(user: User, task):
         
         print(f"🗑️  Attempting to delete Google Calendar event {google_event_id} from calendar {google_calendar_id or 'primary'}")
         
-        refresh_google_token(user)
-        if not user.google_access_token:
-            print(f"❌ No Google access token for user {user.id}")
-            return False
-        
-        # Build credentials
-        creds = Credentials(
-            token=user.google_access_token,
-            refresh_token=user.google_refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=current_app.config["GOOGLE_CLIENT_ID"],
-            client_secret=current_app.config["GOOGLE_CLIENT_SECRET"],
-            scopes=["https://www.googleapis.com/auth/calendar"],
-        )
-        service = build("calendar", "v3", credentials=creds, cache_discovery=False)
+        service = get_calendar_service(user)
         
         # Try to delete from the specific calendar first
         calendar_to_try = google_calendar_id or "primary"
@@ -806,9 +825,21 @@ def check_google_auth_status():
         current_app.logger.error(f"Error checking auth status: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def queue_google_import(user_id: str, full_sync: bool = False) -> CalendarSyncJob:
+    """Queue an import of the user's Google events (joining one already pending) and return its job"""
+    job_id, _ = queue_calendar_sync(CalendarSyncJob.ACTION_IMPORT, user_id, CalendarSyncJob.IMPORT_TASK_ID,
+                                    params={'full_sync': full_sync}, debounce_seconds=0)
+    return CalendarSyncJob.query.get(job_id)
+
+def latest_import_job(user_id: str) -> Optional[CalendarSyncJob]:
+    return CalendarSyncJob.query.filter_by(
+        user_id=user_id, action=CalendarSyncJob.ACTION_IMPORT
+    ).order_by(CalendarSyncJob.created_at.desc()).first()
+
 @calendar_bp.route("/api/calendar/sync", methods=["POST"])
 @jwt_required()
 def trigger_google_calendar_sync():
+    """Start a background import; poll /api/calendar/sync/<job_id> or listen for calendar_sync_update"""
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -817,21 +848,28 @@ def trigger_google_calendar_sync():
         if not user.google_access_token:
             return jsonify({"error": "Google Calendar not connected"}), 400
 
-        user.calendar_sync_in_progress = True
-        db.session.commit()
-        try:
-            sync_google_events(user, full_sync=False)
-        finally:
-            user.calendar_sync_in_progress = False
-            db.session.commit()
-
-        return jsonify({"message": "Google Calendar sync completed successfully"}), 200
+        data = request.get_json(silent=True) or {}
+        job = queue_google_import(user.id, full_sync=bool(data.get('full_sync', False)))
+        return jsonify({
+            "message": "Google Calendar sync started",
+            "job_id": job.id,
+            "job": job.to_dict()
+        }), 202
     except Exception as e:
-        user.calendar_sync_in_progress = False
-        db.session.commit()
-        current_app.logger.exception("Error during Google Calendar sync: %s", str(e))
+        current_app.logger.exception("Error starting Google Calendar sync: %s", str(e))
         return jsonify({"error": f"Sync failed: {str(e)}"}), 500
 
+@calendar_bp.route("/api/calendar/sync/<job_id>", methods=["GET"])
+@jwt_required()
+def get_sync_job(job_id):
+    user_id = get_jwt_identity()
+    job = CalendarSyncJob.query.filter_by(
+        id=job_id, user_id=user_id, action=CalendarSyncJob.ACTION_IMPORT
+    ).first()
+    if not job:
+        return jsonify({"error": "Sync job not found"}), 404
+    return jsonify({"job": job.to_dict()}), 200
+
 @calendar_bp.route("/api/calendar/sync-status", methods=["GET"])
 @jwt_required()
 def get_sync_status():
@@ -839,7 +877,11 @@ def get_sync_status():
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
-    return jsonify({"calendar_sync_in_progress": user.calendar_sync_in_progress}), 200
+    job = latest_import_job(user.id)
+    return jsonify({
+        "calendar_sync_in_progress": bool(job and job.is_active),
+        "job": job.to_dict() if job else None
+    }), 200
 
 def cleanup_orphaned_google_calendar_events():
     """Clean up Google Calendar events that reference non-existent courses"""
@@ -909,6 +951,7 @@ def disconnect_google_calendar():
         user.calendar_sync_in_progress = False
 
         db.session.commit()
+        forget_user(user.id)
         print(f"✅ Google Calendar disconnected but login refresh token retained for user {user.id}")
         return jsonify({"message": "Google Calendar disconnected successfully"}), 200
 
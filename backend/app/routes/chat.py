@@ -2,6 +2,8 @@ from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.course import Course
 from app.models.user import User
+from app.models.conversation import Conversation
+from app.services.conversation_memory import load_conversation_memory
 from app.init import db
 from datetime import datetime
 import sys
@@ -45,11 +47,23 @@ def send_message():
     message = data.get('message', '').strip()
     course_id = data.get('course_id')
     conversation_history = data.get('conversation_history', [])
+    conversation_summary = data.get('conversation_summary')
     
     if not message:
         return jsonify({'error': 'Message is required'}), 400
     
     try:
+        # A stored conversation supplies its own summary and recent turns
+        conversation_id = data.get('conversation_id')
+        if conversation_id:
+            conversation = Conversation.query.filter_by(id=conversation_id, user_id=current_user_id).first()
+            if conversation:
+                conversation_summary, recent_turns = load_conversation_memory(conversation)
+                conversation_history = [
+                    {'type': 'user' if turn['role'] == 'user' else 'ai', 'content': turn['content']}
+                    for turn in recent_turns
+                ]
+        
         # Get course context if course_id is provided
         course_context = None
         materials_context = None
@@ -110,7 +124,8 @@ Description: {course.description}
             message=message,
             conversation_history=conversation_history,
             course_context=course_context,
-            materials_context=materials_context
+            materials_context=materials_context,
+            conversation_summary=conversation_summary
         )
         
         if result.get('success'):
@@ -4,6 +4,7 @@ from app.models.conversation import Conversation
 from app.models.conversation_message import ConversationMessage
 from app.models.course import Course
 from app.extensions import db
+from app.services.conversation_memory import load_conversation_memory, schedule_summary_update
 from datetime import datetime
 import logging
 
@@ -194,6 +195,9 @@ def send_message_to_conversation(conversation_id):
         if not conversation:
             return jsonify({'error': 'Conversation not found'}), 404
         
+        # Conversation context for AI: running summary of older turns plus the last few messages
+        conversation_summary, conversation_context = load_conversation_memory(conversation)
+        
         # Create user message
         user_message = ConversationMessage.create_user_message(
             conversation_id=conversation_id,
@@ -201,19 +205,6 @@ def send_message_to_conversation(conversation_id):
         )
         db.session.add(user_message)
         
-        # Get conversation history for AI context
-        previous_messages = ConversationMessage.query.filter_by(
-            conversation_id=conversation_id
-        ).order_by(ConversationMessage.created_at.asc()).all()
-        
-        # Build conversation context for AI (last 10 messages)
-        conversation_context = []
-        for msg in previous_messages[-10:]:  # Last 10 messages for context
-            conversation_context.append({
-                'role': msg.message_type,
-                'content': msg.content
-            })
-        
         # Add current user message to context
         conversation_context.append({
             'role': 'user',
@@ -240,6 +231,7 @@ def send_message_to_conversation(conversation_id):
                     course_id=course.id,  # Use individual course ID for RAG lookup
                     user_id=current_user_id,
                     conversation_context=conversation_context,
+                    conversation_summary=conversation_summary,
                     top_k=5
                 )
             else:
@@ -275,6 +267,9 @@ def send_message_to_conversation(conversation_id):
         
         db.session.commit()
         
+        # Compact turns that fell out of the recent window after the response is sent
+        schedule_summary_update(conversation_id)
+        
         return jsonify({
             'success': True,
             'message': assistant_message.to_dict(),
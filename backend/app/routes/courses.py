@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.course import Course
 from app.models.user import User
@@ -7,16 +7,19 @@ from datetime import datetime
 import os
 import uuid
 from werkzeug.utils import secure_filename
-from app.utils.s3 import upload_file_to_s3, list_files_in_s3, delete_file_from_s3, get_presigned_url
+from app.utils.storage import get_storage
 from app.utils.llama_index_service import insert_placeholder_embedding, LlamaIndexService
 import traceback
 import uuid
+import json
+import itertools
 from app.models.goal import Goal
 from app.models.user_course_material import UserCourseMaterial
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
+from app.services.study_plan_service import StudyPlanService, StudyPlanError, load_course_material_text
+from app.services import multipart_uploads
+from app.services.study_artifacts import save_artifact, load_artifact_content, delete_artifact, is_artifact_path
+from app.services.thumbnails import queue_thumbnails, thumbnail_variant_keys, THUMBNAIL_PREFIX
+from app.routes.jobs import wants_background_job, enqueue_generation_job
 
 courses_bp = Blueprint('courses', __name__, url_prefix='/api/courses')
 
@@ -281,15 +284,15 @@ def upload_banner(course_id):
         # Delete old banner if it exists
         if course.course_image:
             try:
-                delete_file_from_s3(course.course_image)
+                get_storage().delete(course.course_image)
             except Exception as e:
                 print(f"Warning: Failed to delete old banner: {str(e)}")
         s3_path = f"banners/{course_id}/{filename}"
         try:
-            upload_file_to_s3(file, s3_path)
-            course.course_image = s3_path  # Store S3 key
+            get_storage().save(file, s3_path)
+            course.course_image = s3_path  # Store storage key
         except Exception as e:
-            return jsonify({'error': f'S3 upload failed: {str(e)}'}), 500
+            return jsonify({'error': f'Upload failed: {str(e)}'}), 500
         db.session.commit()
         return jsonify({
             'message': 'Banner uploaded successfully',
@@ -307,7 +310,7 @@ def delete_banner(course_id):
     if not course.course_image:
         return jsonify({'error': 'No banner image to delete'}), 404
     try:
-        delete_file_from_s3(course.course_image)
+        get_storage().delete(course.course_image)
         course.course_image = None
         db.session.commit()
         return jsonify({
@@ -387,6 +390,7 @@ def upload_material(course_id):
     try:
         from app.services.course_rag_service import CourseDocumentProcessor
         course_processor = CourseDocumentProcessor()
+        storage = get_storage()
         s3_path = f"courses/{course_id}/{filename}"
         if should_process:
             import tempfile
@@ -401,45 +405,21 @@ def upload_material(course_id):
                     course_id=course_id,
                     user_id=current_user_id
                 )
-                with open(temp_file_path, 'rb') as temp_file_obj:
-                    upload_file_to_s3(temp_file_obj, s3_path)
+                # Local storage renames the temp file into place instead of copying it again
+                storage.save_path(temp_file_path, s3_path, move=True)
             except Exception as e:
                 print(f"Processing error: {str(e)}")
-                upload_file_to_s3(file, s3_path)
+                file.stream.seek(0)
+                storage.save(file, s3_path)
             finally:
                 if temp_file_path and os.path.exists(temp_file_path):
                     os.unlink(temp_file_path)
         else:
-            upload_file_to_s3(file, s3_path)
+            storage.save(file, s3_path)
         file_path = s3_path
         file_url = s3_path
         combo_id = f"{course_id}+{current_user_id}+{filename}"
         thumbnail_path = None
-        if file_extension == 'pdf' and fitz is not None:
-            try:
-                import tempfile
-                import boto3
-                from app.utils.s3 import get_s3_client
-                s3_client = get_s3_client()
-                bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
-                    s3_client.download_fileobj(bucket_name, file_path, temp_pdf)
-                    temp_pdf_path = temp_pdf.name
-                doc = fitz.open(temp_pdf_path)
-                page = doc.load_page(0)
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                thumb_filename = f"{os.path.splitext(filename)[0]}_thumb.png"
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_thumb:
-                    pix.save(temp_thumb.name)
-                    temp_thumb_path = temp_thumb.name
-                s3_thumb_path = f"thumbnails/{course_id}/{thumb_filename}"
-                with open(temp_thumb_path, 'rb') as thumb_file:
-                    upload_file_to_s3(thumb_file, s3_thumb_path)
-                thumbnail_path = s3_thumb_path
-                os.unlink(temp_thumb_path)
-                doc.close()
-            except Exception as e:
-                print(f"Failed to generate PDF thumbnail: {e}")
         material = UserCourseMaterial(
             user_id=current_user_id,
             course_id=f"{course_id}+{current_user_id}",
@@ -456,33 +436,183 @@ def upload_material(course_id):
         )
         db.session.add(material)
         db.session.commit()
+
+        # Thumbnails are rendered in the background; clients get 'material_thumbnail_ready' over the socket
+        try:
+            queue_thumbnails(material.id)
+        except Exception as e:
+            print(f"Failed to queue thumbnails for {filename}: {e}")
         
         # Generate presigned URLs for response (like course banners and list materials)
-        from app.utils.s3 import get_presigned_url
-        presigned_file_url = get_presigned_url(file_url) if file_url else None
-        presigned_thumbnail_url = get_presigned_url(thumbnail_path) if thumbnail_path else None
+        presigned_file_url = storage.url(file_url) if file_url else None
+        presigned_thumbnail_url = storage.url(thumbnail_path) if thumbnail_path else None
         
         return jsonify({
             'url': presigned_file_url, 
             'filename': filename,
+            'material_id': material.id,
             'thumbnail_url': presigned_thumbnail_url
         }), 201
     except Exception as e:
         print("Exception in upload_material:", e)
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
-@courses_bp.route('/<course_id>/materials', methods=['GET'])
+@courses_bp.route('/<course_id>/materials/multipart', methods=['POST'])
 @jwt_required()
-def list_materials(course_id):
-    s3_prefix = f"courses/{course_id}/"
-    files_data = list_files_in_s3(s3_prefix)
+def start_multipart_upload(course_id):
+    """Start (or resume) a direct-to-S3 upload: body {filename, size, content_type}"""
+    current_user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    try:
+        upload = multipart_uploads.start_upload(
+            current_user_id, course_id, data.get('filename'), data.get('size'), data.get('content_type')
+        )
+        return jsonify({
+            'upload': upload.to_dict(),
+            'part_urls': multipart_uploads.presign_parts(upload) if upload.missing_parts() else {}
+        }), 201
+    except multipart_uploads.MultipartUploadError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error starting multipart upload: {str(e)}")
+        return jsonify({'error': f'Failed to start upload: {str(e)}'}), 500
+
+@courses_bp.route('/<course_id>/materials/multipart/<upload_id>', methods=['GET'])
+@jwt_required()
+def get_multipart_upload(course_id, upload_id):
+    """Upload state checked against S3, with URLs for the parts still missing (for resuming)"""
+    current_user_id = get_jwt_identity()
+    try:
+        upload = multipart_uploads.get_upload(upload_id, current_user_id, course_id)
+        upload = multipart_uploads.sync_parts(upload)
+        part_urls = {}
+        if upload.status == upload.STATUS_IN_PROGRESS and upload.missing_parts():
+            part_urls = multipart_uploads.presign_parts(upload)
+        return jsonify({'upload': upload.to_dict(), 'part_urls': part_urls}), 200
+    except multipart_uploads.MultipartUploadError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        print(f"Error getting multipart upload {upload_id}: {str(e)}")
+        return jsonify({'error': f'Failed to get upload: {str(e)}'}), 500
+
+@courses_bp.route('/<course_id>/materials/multipart/<upload_id>/parts', methods=['POST'])
+@jwt_required()
+def presign_multipart_parts(course_id, upload_id):
+    """Fresh upload URLs for specific parts: body {part_numbers: [...]} (default: all missing)"""
+    current_user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = multipart_uploads.get_upload(upload_id, current_user_id, course_id)
+        return jsonify({'part_urls': multipart_uploads.presign_parts(upload, data.get('part_numbers'))}), 200
+    except multipart_uploads.MultipartUploadError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        print(f"Error presigning parts for upload {upload_id}: {str(e)}")
+        return jsonify({'error': f'Failed to presign parts: {str(e)}'}), 500
+
+@courses_bp.route('/<course_id>/materials/multipart/<upload_id>/parts/<int:part_number>', methods=['PUT'])
+@jwt_required()
+def record_multipart_part(course_id, upload_id, part_number):
+    """Confirm a part the browser uploaded: body {etag, size}"""
+    current_user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    try:
+        upload = multipart_uploads.record_part(
+            upload_id, current_user_id, course_id, part_number, data.get('etag'), data.get('size')
+        )
+        return jsonify({'upload': upload.to_dict()}), 200
+    except multipart_uploads.MultipartUploadError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error recording part {part_number} of upload {upload_id}: {str(e)}")
+        return jsonify({'error': f'Failed to record part: {str(e)}'}), 500
+
+@courses_bp.route('/<course_id>/materials/multipart/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_multipart_upload(course_id, upload_id):
+    """Assemble the uploaded parts into the material and queue its processing"""
+    current_user_id = get_jwt_identity()
+    try:
+        upload = multipart_uploads.get_upload(upload_id, current_user_id, course_id, lock=True)
+        result = multipart_uploads.complete_upload(upload)
+        material = UserCourseMaterial.query.get(result['material_id'])
+        if material:
+            material_dict = material.to_dict()
+            material_dict['url'] = get_storage().url(material.file_path)
+            result['material'] = material_dict
+        return jsonify(result), 201
+    except multipart_uploads.MultipartUploadError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error completing multipart upload {upload_id}: {str(e)}")
+        return jsonify({'error': f'Failed to complete upload: {str(e)}'}), 500
+
+@courses_bp.route('/<course_id>/materials/multipart/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_multipart_upload(course_id, upload_id):
+    current_user_id = get_jwt_identity()
+    try:
+        upload = multipart_uploads.get_upload(upload_id, current_user_id, course_id)
+        return jsonify({'upload': multipart_uploads.abort_upload(upload).to_dict()}), 200
+    except multipart_uploads.MultipartUploadError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error aborting multipart upload {upload_id}: {str(e)}")
+        return jsonify({'error': f'Failed to abort upload: {str(e)}'}), 500
+
+def _material_files(files_data):
+    """Storage listing entries shown as course materials (banners excluded)"""
     filtered_files = []
     for file_data in files_data:
         if 'banner' in file_data['key'].lower():
             continue
         file_data['name'] = os.path.basename(file_data['key'])
         filtered_files.append(file_data)
-    return jsonify(filtered_files)
+    return filtered_files
+
+@courses_bp.route('/<course_id>/materials', methods=['GET'])
+@jwt_required()
+def list_materials(course_id):
+    """
+    Files in the course folder. With ?limit= (and ?cursor= set to the previous
+    response's next_cursor) returns one page as {'items': [...], 'next_cursor': ...};
+    otherwise streams the whole folder as a JSON array, one listing page at a time.
+    """
+    storage = get_storage()
+    s3_prefix = f"courses/{course_id}/"
+    if 'limit' in request.args or 'cursor' in request.args:
+        try:
+            limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        page = storage.list_page(s3_prefix, request.args.get('cursor'), limit)
+        page['items'] = _material_files(page['items'])
+        return jsonify(page)
+
+    # Fetch the first page before responding so listing errors still return a 500
+    pages = storage.iter_files(s3_prefix)
+    try:
+        first_page = next(pages, [])
+    except Exception as e:
+        print(f"Error listing materials for course {course_id}: {str(e)}")
+        return jsonify({'error': f'Failed to list materials: {str(e)}'}), 500
+
+    def generate():
+        yield '['
+        separator = ''
+        for page in itertools.chain([first_page], pages):
+            for file_data in _material_files(page):
+                yield separator + json.dumps(file_data)
+                separator = ','
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 @courses_bp.route('/<course_id>/materials/<path:filename>', methods=['DELETE'])
 @jwt_required()
@@ -504,40 +634,33 @@ def delete_material(course_id, filename):
                 )
             except Exception as e:
                 print(f"Warning: Failed to delete embeddings for {actual_filename}: {str(e)}")
-        delete_file_from_s3(filename)
-        return jsonify({'message': 'File deleted successfully from S3'}), 200
+            # Drop the course search chunks too; anything missed here is left to the storage GC
+            try:
+                from app.services.storage_gc import delete_course_file_chunks
+                delete_course_file_chunks(course_id, current_user_id, actual_filename)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Warning: Failed to delete chunks for {actual_filename}: {str(e)}")
+        get_storage().delete(filename)
+        return jsonify({'message': 'File deleted successfully from storage'}), 200
     except Exception as e:
         return jsonify({'error': f'Delete failed: {str(e)}'}), 500
 
 @courses_bp.route('/<course_id>/materials/<path:filename>/content', methods=['GET'])
 @jwt_required()
 def get_material_content(course_id, filename):
-    current_user_id = get_jwt_identity()
     try:
         actual_filename = filename.split('/')[-1] if '/' in filename else filename
         file_extension = actual_filename.rsplit('.', 1)[1].lower() if '.' in actual_filename else ''
-        supported_types = ['pdf', 'docx', 'doc', 'txt']
-        if file_extension not in supported_types:
-            return jsonify({'error': 'File type not supported for content extraction'}), 400
-        import tempfile
-        import boto3
-        from app.utils.s3 import get_s3_client
-        s3_client = get_s3_client()
-        bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
-        s3_key = f"courses/{course_id}/{actual_filename}"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-            try:
-                s3_client.download_fileobj(bucket_name, s3_key, temp_file)
-                temp_file_path = temp_file.name
-                content = extract_text_from_file(temp_file_path, file_extension)
-                return jsonify({
-                    'content': content,
-                    'filename': actual_filename,
-                    'file_type': file_extension
-                })
-            finally:
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+        content = load_course_material_text(course_id, actual_filename)
+        return jsonify({
+            'content': content,
+            'filename': actual_filename,
+            'file_type': file_extension
+        })
+    except StudyPlanError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         print(f"Error getting material content: {str(e)}")
         return jsonify({'error': f'Failed to get content: {str(e)}'}), 500
@@ -586,163 +709,24 @@ def generate_study_plan(course_id):
         if not goal_title or not document_filename:
             return jsonify({'error': 'Goal title and document filename are required'}), 400
         
-        # Get document content
-        content_response = get_material_content(course_id, document_filename)
-        if content_response.status_code != 200:
-            return content_response
-        
-        document_content = content_response.get_json()['content']
+        if wants_background_job(data):
+            return enqueue_generation_job(current_user_id, 'study_plan', {
+                'goal_title': goal_title,
+                'goal_description': goal_description,
+                'document_filename': document_filename
+            }, course_id=course_id)
         
-        # Generate study plan using OpenAI
-        import openai
-        import os
-        api_key = os.getenv('OPENAI_KEY')
-        if not api_key:
-            return jsonify({'error': 'OpenAI API key not configured'}), 500
-        client = openai.OpenAI(api_key=api_key)
-
-        # Create the prompt for study plan generation
-        prompt = f"""
-You are an expert study planner and educational consultant. Based on the following document content and learning goal, create a detailed study plan with tasks and subtasks.
-
-Document content: {document_content[:2000]}
-
-Goal: {goal_title}
-Description: {goal_description}
-
-Please create a study plan in the following JSON format:
-{{
-  "goal_title": "{goal_title}",
-  "goal_description": "{goal_description}",
-  "tasks": [
-    {{
-      "name": "Task name",
-      "description": "Task description", 
-      "estimated_hours": 2,
-      "priority": "high|medium|low",
-      "subtasks": [
-        {{
-          "name": "Subtask name",
-          "description": "Subtask description",
-          "estimated_minutes": 30,
-          "type": "reading|flashcard|quiz|practice|review|other"
-        }}
-      ]
-    }}
-  ]
-}}
-
-Guidelines:
-1. Break down the goal into at least 4 but no more than 8 manageable tasks
-2. Each task should have 2-5 subtasks
-3. Focus on practical, actionable steps
-4. Use appropriate subtask types:
-   - "reading": Reading material, studying content
-   - "flashcard": Creating or reviewing flashcards
-   - "quiz": Taking quizzes or self-assessments
-   - "practice": Doing exercises, problem-solving
-   - "review": Reviewing previous material, summary
-   - "other": Any other learning activity
-5. Estimate realistic time requirements
-6. Prioritize tasks based on importance and dependencies
-7. Make sure the plan is comprehensive but achievable
-8. Include a variety of subtask types for effective learning
-
-Return only the JSON response, no additional text.
-"""
-
-        # Call OpenAI API (new style)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert educational consultant who creates detailed, actionable study plans."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
+        result = StudyPlanService().generate(
+            course_id=course_id,
+            user_id=current_user_id,
+            goal_title=goal_title,
+            goal_description=goal_description,
+            document_filename=document_filename
         )
-
-        # Log the full OpenAI response and the raw text
-        print("[OpenAI API response]:", response)
-        try:
-            import json
-            study_plan_text = response.choices[0].message.content.strip()
-            print("[OpenAI raw response text]:", study_plan_text)
-            # Try to extract JSON from the response
-            if study_plan_text.startswith('```json'):
-                study_plan_text = study_plan_text[7:-3]  # Remove ```json and ```
-            elif study_plan_text.startswith('```'):
-                study_plan_text = study_plan_text[3:-3]  # Remove ``` and ```
-            study_plan = json.loads(study_plan_text)
-            # Print parsed variables for debugging
-            goal_title = study_plan.get('goal_title')
-            goal_description = study_plan.get('goal_description')
-            tasks = study_plan.get('tasks', [])
-            print("[Parsed goal_title]:", goal_title)
-            print("[Parsed goal_description]:", goal_description)
-            print("[Parsed tasks]:", tasks)
-            for i, task in enumerate(tasks):
-                print(f"  [Task {i+1} name]:", task.get('name'))
-                print(f"  [Task {i+1} description]:", task.get('description'))
-                print(f"  [Task {i+1} estimated_hours]:", task.get('estimated_hours'))
-                print(f"  [Task {i+1} priority]:", task.get('priority'))
-                subtasks = task.get('subtasks', [])
-                print(f"    [Task {i+1} subtasks]:", subtasks)
-                for j, subtask in enumerate(subtasks):
-                    print(f"      [Subtask {j+1} name]:", subtask.get('name'))
-                    print(f"      [Subtask {j+1} description]:", subtask.get('description'))
-                    print(f"      [Subtask {j+1} estimated_minutes]:", subtask.get('estimated_minutes'))
-                    print(f"      [Subtask {j+1} type]:", subtask.get('type'))
-            # Get the course to get the combo_id
-            course = Course.query.filter_by(id=course_id, user_id=current_user_id).first()
-            if not course:
-                return jsonify({'error': 'Course not found or you do not have access'}), 404
-            
-            # Generate a new goal_id for this plan
-            new_goal_id = str(uuid.uuid4())
-            user_id = current_user_id
-            # Insert each task and subtask as a row
-            for task in tasks:
-                task_id = str(uuid.uuid4())
-                task_title = task.get('name')
-                task_descr = task.get('description')
-                task_completed = False
-                for subtask in task.get('subtasks', []):
-                    subtask_id = str(uuid.uuid4())
-                    subtask_descr = subtask.get('name')
-                    subtask_type = subtask.get('type', 'other')
-                    subtask_completed = False
-                    # Create Goal row (one per subtask)
-                    goal_row = Goal(
-                        user_id=user_id,
-                        course_id=course.combo_id,
-                        goal_id=new_goal_id,
-                        goal_descr=goal_title,
-                        due_date=None,  # You can set due_date from AI if available
-                        goal_completed=False,
-                        task_id=task_id,
-                        task_title=task_title,
-                        task_descr=task_descr,
-                        task_completed=task_completed,
-                        subtask_id=subtask_id,
-                        subtask_descr=subtask_descr,
-                        subtask_type=subtask_type,
-                        subtask_completed=subtask_completed,
-                        is_conflicting=False  # Default to False for AI-generated plans
-                    )
-                    db.session.add(goal_row)
-            db.session.commit()
-            print(f"[Inserted AI-generated goal_id]: {new_goal_id}")
-            return jsonify({
-                'success': True,
-                'goal_id': new_goal_id,
-                'message': 'AI-generated study plan inserted into database.'
-            })
-        except json.JSONDecodeError as e:
-            print(f"Error parsing OpenAI response: {e}")
-            print(f"Response content: {study_plan_text}")
-            return jsonify({'error': 'Failed to parse AI response'}), 500
+        return jsonify(result)
         
+    except StudyPlanError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         print(f"Error generating study plan: {str(e)}")
         return jsonify({'error': f'Failed to generate study plan: {str(e)}'}), 500 
@@ -753,13 +737,19 @@ def list_user_course_materials(course_id):
     current_user_id = get_jwt_identity()
     combo_id = f"{course_id}+{current_user_id}"
     materials = UserCourseMaterial.query.filter_by(course_id=combo_id, user_id=current_user_id).order_by(UserCourseMaterial.created_at.desc()).all()
-    result = []
-    for m in materials:
-        d = m.to_dict()
-        from app.utils.s3 import get_presigned_url
-        d['url'] = get_presigned_url(d['file_path']) if d['file_path'] else None
-        d['thumbnail_url'] = get_presigned_url(d['thumbnail_path']) if d.get('thumbnail_path') else None
-        result.append(d)
+    result = [m.to_dict() for m in materials]
+    variants = {d['id']: thumbnail_variant_keys(d.get('thumbnail_path')) for d in result}
+    keys = [key for d in result for key in (d['file_path'], d.get('thumbnail_path')) if key and not is_artifact_path(key)]
+    keys += [key for by_format in variants.values() for by_width in by_format.values() for key in by_width.values()]
+    urls = get_storage().urls(keys)
+    for d in result:
+        d['url'] = urls.get(d['file_path']) if d['file_path'] and not is_artifact_path(d['file_path']) else None
+        d['thumbnail_url'] = urls.get(d['thumbnail_path']) if d.get('thumbnail_path') else None
+        # {format: {width: url}} for srcset / <picture>
+        d['thumbnails'] = {
+            fmt: {width: urls.get(key) for width, key in by_width.items()}
+            for fmt, by_width in variants[d['id']].items()
+        }
     return jsonify(result), 200
 
 @courses_bp.route('/<course_id>/materials/db/<material_id>', methods=['PATCH', 'PUT'])
@@ -814,22 +804,28 @@ def delete_user_course_material(course_id, material_id):
                 )
             except Exception as e:
                 print(f"Warning: Failed to delete embeddings for {material_name}: {str(e)}")
-        
-        # Delete from S3 (main file)
-        if file_path:
+            
+            # Drop the course search chunks in the same transaction as the material row
+            from app.services.storage_gc import delete_course_file_chunks
+            delete_course_file_chunks(course_id, current_user_id, material_name)
+        
+        # Generated quizzes/flashcards live in the database
+        if is_artifact_path(file_path):
+            delete_artifact(material)
+        # Delete from storage (main file)
+        elif file_path:
             try:
-                from app.utils.s3 import delete_file_from_s3
-                delete_file_from_s3(file_path)
+                get_storage().delete(file_path)
             except Exception as e:
-                print(f"Warning: Failed to delete file from S3: {file_path}: {str(e)}")
+                print(f"Warning: Failed to delete file from storage: {file_path}: {str(e)}")
         
-        # Delete thumbnail from S3 if exists
-        if thumbnail_path:
+        # Delete thumbnail from storage if exists; content-hash thumbnails may be shared
+        # with other materials and are left to the storage GC
+        if thumbnail_path and not thumbnail_path.startswith(THUMBNAIL_PREFIX):
             try:
-                from app.utils.s3 import delete_file_from_s3
-                delete_file_from_s3(thumbnail_path)
+                get_storage().delete(thumbnail_path)
             except Exception as e:
-                print(f"Warning: Failed to delete thumbnail from S3: {thumbnail_path}: {str(e)}")
+                print(f"Warning: Failed to delete thumbnail from storage: {thumbnail_path}: {str(e)}")
         
         # Delete from database
         db.session.delete(material)
@@ -837,7 +833,7 @@ def delete_user_course_material(course_id, material_id):
         
         return jsonify({
             'success': True, 
-            'message': 'Material deleted successfully from database and S3'
+            'message': 'Material deleted successfully from database and storage'
         }), 200
         
     except Exception as e:
@@ -859,14 +855,13 @@ def update_last_accessed(course_id, material_id):
 @jwt_required()
 def migrate_existing_materials_to_db(course_id):
     current_user_id = get_jwt_identity()
-    from app.utils.s3 import list_files_in_s3
     from app.models.course import Course
     combo_id = f"{course_id}+{current_user_id}"
     course_row = Course.query.filter_by(combo_id=combo_id, user_id=current_user_id).first()
     if not course_row:
         return jsonify({'error': f'User is not enrolled in course {combo_id}.'}), 400
     s3_prefix = f"courses/{course_id}/"
-    files_data = list_files_in_s3(s3_prefix)
+    files_data = (obj for page in get_storage().iter_objects(s3_prefix) for obj in page)
     migrated = []
     for file_data in files_data:
         key = file_data['key']
@@ -912,6 +907,14 @@ def generate_course_quiz(course_id):
         question_type = data.get('type', 'multiple_choice')
         question_config = data.get('question_config')  # Fine-grained configuration
         
+        if wants_background_job(data):
+            return enqueue_generation_job(current_user_id, 'quiz', {
+                'topic': topic,
+                'num_questions': num_questions,
+                'type': question_type,
+                'question_config': question_config
+            }, course_id=course_id)
+        
         # Initialize course RAG service
         from app.services.rag_service import RAGService
         rag = RAGService()
@@ -931,6 +934,30 @@ def generate_course_quiz(course_id):
         traceback.print_exc()
         return jsonify({'error': f'Failed to generate quiz: {str(e)}'}), 500
 
+@courses_bp.route('/<course_id>/materials/generate-quiz/stream', methods=['POST'])
+@jwt_required()
+def stream_course_quiz(course_id):
+    """Stream quiz generation as newline-delimited JSON, one event per completed question"""
+    data = request.get_json() or {}
+    
+    from app.services.rag_service import RAGService
+    rag = RAGService()
+    events = rag.generate_quiz_stream(
+        topic=data.get('topic'),
+        num_questions=data.get('num_questions', 5),
+        question_type=data.get('type', 'multiple_choice'),
+        question_config=data.get('question_config')
+    )
+    
+    def generate():
+        for event in events:
+            yield json.dumps(event) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let a proxy buffer the stream
+    })
+
 @courses_bp.route('/<course_id>/materials/save-quiz', methods=['POST'])
 @jwt_required()
 def save_quiz_as_material(course_id):
@@ -957,57 +984,15 @@ def save_quiz_as_material(course_id):
         material_name = data.get('material_name')
         print(f"DEBUG: Quiz data type: {type(quiz_data)}, Material name: {material_name}")
         
-        # Create a JSON file content for the quiz
-        import json
-        quiz_content = json.dumps(quiz_data, indent=2)
-        print(f"DEBUG: Quiz content length: {len(quiz_content)}")
-        
-        # Generate a unique filename for the quiz
-        quiz_filename = f"quiz_{uuid.uuid4()}.json"
-        print(f"DEBUG: Generated filename: {quiz_filename}")
-        
-        # Save to S3 with quiz content
-        from app.utils.s3 import upload_file_to_s3
-        from io import BytesIO
-        
-        file_buffer = BytesIO(quiz_content.encode('utf-8'))
-        file_buffer.seek(0)
-        
-        s3_path = f"courses/{combo_id}/materials/{quiz_filename}"
-        print(f"DEBUG: Uploading to S3 path: {s3_path}")
-        
-        # Use the S3 upload function which will set the correct content type
-        s3_url = upload_file_to_s3(file_buffer, s3_path)
-        print(f"DEBUG: S3 upload result: {s3_url}")
-        
-        if not s3_url:
-            print("ERROR: Failed to upload to S3")
-            return jsonify({'error': 'Failed to upload quiz to storage'}), 500
-        
-        # Create database record
-        material = UserCourseMaterial(
-            user_id=current_user_id,
-            course_id=combo_id,
-            file_path=s3_path,
-            material_name=material_name,
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            file_type='quiz',
-            file_size=len(quiz_content),
-            original_filename=f"{material_name}.json"
-        )
-        
-        db.session.add(material)
-        print("DEBUG: Added material to session")
+        # Store the quiz in the database; the material lists it as artifact://<id>
+        artifact, material = save_artifact(current_user_id, combo_id, 'quiz', material_name, quiz_data)
+        print(f"DEBUG: Saving quiz as study artifact {artifact.id}")
         db.session.commit()
         print("DEBUG: Committed to database")
         
         # Return the saved material data
         result = material.to_dict()
-        presigned_url = get_presigned_url(result['file_path']) if result['file_path'] else None
-        result['url'] = presigned_url
-        print(f"DEBUG: Generated presigned URL: {presigned_url}")
+        result['url'] = None
         print(f"DEBUG: Returning success response")
         
         return jsonify({
@@ -1026,7 +1011,7 @@ def save_quiz_as_material(course_id):
 @courses_bp.route('/<course_id>/materials/<material_id>/quiz-data', methods=['GET'])
 @jwt_required()
 def get_quiz_data(course_id, material_id):
-    """Fetch quiz data from S3 through backend to avoid CORS issues"""
+    """Fetch saved quiz data (a single database read, or cached)"""
     current_user_id = get_jwt_identity()
     combo_id = f"{course_id}+{current_user_id}"
     
@@ -1046,16 +1031,9 @@ def get_quiz_data(course_id, material_id):
         
         print(f"DEBUG: Found material with file_path: {material.file_path}")
         
-        # Download the quiz data from S3
-        from app.utils.s3 import download_file_from_s3
-        import json
-        
-        quiz_content = download_file_from_s3(material.file_path)
-        if not quiz_content:
+        quiz_data = load_artifact_content(material)
+        if quiz_data is None:
             return jsonify({'error': 'Failed to load quiz data from storage'}), 500
-        
-        # Parse the JSON content
-        quiz_data = json.loads(quiz_content)
         print(f"DEBUG: Successfully loaded quiz data")
         
         return jsonify({
@@ -1096,57 +1074,15 @@ def save_flashcards_as_material(course_id):
         material_name = data.get('material_name')
         print(f"DEBUG: Flashcards data type: {type(flashcards_data)}, Material name: {material_name}")
         
-        # Create a JSON file content for the flashcards
-        import json
-        flashcards_content = json.dumps(flashcards_data, indent=2)
-        print(f"DEBUG: Flashcards content length: {len(flashcards_content)}")
-        
-        # Generate a unique filename for the flashcards
-        flashcards_filename = f"flashcards_{uuid.uuid4()}.json"
-        print(f"DEBUG: Generated filename: {flashcards_filename}")
-        
-        # Save to S3 with flashcards content
-        from app.utils.s3 import upload_file_to_s3
-        from io import BytesIO
-        
-        file_buffer = BytesIO(flashcards_content.encode('utf-8'))
-        file_buffer.seek(0)
-        
-        s3_path = f"courses/{combo_id}/materials/{flashcards_filename}"
-        print(f"DEBUG: Uploading to S3 path: {s3_path}")
-        
-        # Use the S3 upload function which will set the correct content type
-        s3_url = upload_file_to_s3(file_buffer, s3_path)
-        print(f"DEBUG: S3 upload result: {s3_url}")
-        
-        if not s3_url:
-            print("ERROR: Failed to upload to S3")
-            return jsonify({'error': 'Failed to upload flashcards to storage'}), 500
-        
-        # Create database record
-        material = UserCourseMaterial(
-            user_id=current_user_id,
-            course_id=combo_id,
-            file_path=s3_path,
-            material_name=material_name,
-            is_pinned=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            file_type='flashcards',
-            file_size=len(flashcards_content),
-            original_filename=f"{material_name}.json"
-        )
-        
-        db.session.add(material)
-        print("DEBUG: Added material to session")
+        # Store the flashcards in the database; the material lists it as artifact://<id>
+        artifact, material = save_artifact(current_user_id, combo_id, 'flashcards', material_name, flashcards_data)
+        print(f"DEBUG: Saving flashcards as study artifact {artifact.id}")
         db.session.commit()
         print("DEBUG: Committed to database")
         
         # Return the saved material data
         result = material.to_dict()
-        presigned_url = get_presigned_url(result['file_path']) if result['file_path'] else None
-        result['url'] = presigned_url
-        print(f"DEBUG: Generated presigned URL: {presigned_url}")
+        result['url'] = None
         print(f"DEBUG: Returning success response")
         
         return jsonify({
@@ -1185,16 +1121,9 @@ def get_flashcards_data(course_id, material_id):
         
         print(f"DEBUG: Found material: {material.material_name}")
         
-        # Download the file from S3
-        from app.utils.s3 import download_file_from_s3
-        file_content = download_file_from_s3(material.file_path)
-        
-        if not file_content:
+        flashcards_data = load_artifact_content(material)
+        if flashcards_data is None:
             return jsonify({'error': 'Failed to load flashcards from storage'}), 500
-        
-        # Parse the JSON content
-        import json
-        flashcards_data = json.loads(file_content)
         print(f"DEBUG: Loaded flashcards data successfully")
         
         return jsonify({
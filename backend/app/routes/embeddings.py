@@ -2,6 +2,13 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.utils.embedding_service import EmbeddingService
 from app.models.document_embedding import DocumentEmbedding
+from app.models.embedding_version import EmbeddingMigration
+from app.models.user import User
+from app.services.chunk_dedup import dedup_report
+from app.services.embedding_migration import (
+    start_embedding_migration, pause_embedding_migration, resume_embedding_migration,
+    course_embedding_model, set_course_embedding_model
+)
 import os
 import PyPDF2
 import docx
@@ -228,4 +235,114 @@ def get_document_summary(course_id, document_name):
     
     except Exception as e:
         print(f"Error getting document summary: {e}")
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+def is_admin(user_id):
+    user = User.query.get(user_id)
+    return bool(user and user.role == 'admin')
+
+@embeddings_bp.route('/migrations', methods=['POST'])
+@jwt_required()
+def create_embedding_migration():
+    """Start re-embedding all stored chunks into another embedding model (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json() or {}
+        migration = start_embedding_migration(
+            data.get('target_model'),
+            batch_size=data.get('batch_size'),
+            throttle_seconds=data.get('throttle_seconds')
+        )
+        return jsonify({'success': True, 'migration': migration.to_dict()}), 202
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error starting embedding migration: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@embeddings_bp.route('/migrations', methods=['GET'])
+@jwt_required()
+def list_embedding_migrations():
+    """List embedding migrations with their progress (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        migrations = EmbeddingMigration.query.order_by(EmbeddingMigration.created_at.desc()).all()
+        return jsonify({'success': True, 'migrations': [m.to_dict() for m in migrations]})
+    
+    except Exception as e:
+        print(f"Error listing embedding migrations: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@embeddings_bp.route('/migrations/<int:migration_id>/<action>', methods=['POST'])
+@jwt_required()
+def control_embedding_migration(migration_id, action):
+    """Pause or resume an embedding migration (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        if action == 'pause':
+            migration = pause_embedding_migration(migration_id)
+        elif action == 'resume':
+            migration = resume_embedding_migration(migration_id)
+        else:
+            return jsonify({'error': 'Action must be pause or resume'}), 400
+        
+        if not migration:
+            return jsonify({'error': 'Migration not found'}), 404
+        return jsonify({'success': True, 'migration': migration.to_dict()})
+    
+    except Exception as e:
+        print(f"Error updating embedding migration: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@embeddings_bp.route('/courses/<course_id>/model', methods=['GET'])
+@jwt_required()
+def get_course_embedding_model(course_id):
+    """Which embedding model a course's searches currently use"""
+    try:
+        return jsonify({'success': True, 'course_id': course_id, 'model': course_embedding_model(course_id)})
+    
+    except Exception as e:
+        print(f"Error getting course embedding model: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@embeddings_bp.route('/courses/<course_id>/model', methods=['PUT'])
+@jwt_required()
+def cutover_course_embedding_model(course_id):
+    """Switch a course's searches to a migrated embedding model, or back to the legacy one (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json() or {}
+        if not data.get('model'):
+            return jsonify({'error': 'model is required'}), 400
+        
+        model = set_course_embedding_model(course_id, data['model'], force=bool(data.get('force')))
+        return jsonify({'success': True, 'course_id': course_id, 'model': model})
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        print(f"Error switching course embedding model: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@embeddings_bp.route('/dedup-report', methods=['GET'])
+@jwt_required()
+def get_dedup_report():
+    """Storage saved by sharing embeddings between duplicate chunks (admin only)"""
+    try:
+        if not is_admin(get_jwt_identity()):
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        return jsonify({'success': True, 'report': dedup_report()})
+    
+    except Exception as e:
+        print(f"Error building dedup report: {e}")
+        return jsonify({'error': str(e)}), 500
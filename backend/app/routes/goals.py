@@ -4,135 +4,100 @@ from urllib.parse import unquote
 from flask import Blueprint, request, jsonify, current_app, g
 from datetime import date, datetime, timezone, timedelta
 import uuid
-from app.models.goal import Goal
+from app.models.goal import Goal, PLACEHOLDER_TASK_ID
+from app.models.study_goal import StudyGoal, StudyTask
 from app.models.course import Course
 from app.init import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError
-from app.routes.calendar import delete_task_from_google_calendar, sync_subtask_to_google_calendar
 from app.models.user import User
-import threading
-import queue
-import time
-from sqlalchemy import asc
-
-# Background task queue for Google Calendar sync
-sync_queue = queue.Queue()
-sync_thread = None
-app_instance = None  # Store the Flask app instance
-
-def background_sync_worker():
-    """Background worker to handle Google Calendar sync tasks"""
-    global app_instance
-    
-    while True:
-        try:
-            # Get task from queue (blocking)
-            task_data = sync_queue.get(timeout=1)
-            if task_data is None:  # Shutdown signal
-                break
-                
-            action, user_id, task_id, course_id, google_event_id = task_data
-            
-            # Use the stored app instance to create context
-            if app_instance:
-                with app_instance.app_context():
-                    try:
-                        if action == "delete" and google_event_id:
-                            # For deletion, we already have the Google Calendar event ID
-                            user = User.query.get(user_id)
-                            if user and user.google_access_token:
-                                # Create a minimal task object with the event ID for deletion
-                                class MinimalTask:
-                                    def __init__(self, event_id, calendar_id=None):
-                                        self.google_event_id = event_id
-                                        self.google_calendar_id = calendar_id
-                                        self.task_id = task_id
-                                
-                                minimal_task = MinimalTask(google_event_id)
-                                print(f"Starting deletion of Google Calendar event: {google_event_id} for task {task_id}")
-                                result = delete_task_from_google_calendar(user, minimal_task)
-                                print(f"Deletion result for task {task_id}: {result}")
-                            else:
-                                print(f"Cannot delete Google Calendar event: user {user_id} not found or no access token")
-                        else:
-                            # For sync operations, get user and task from database
-                            user = User.query.get(user_id)
-                            if not user or not user.google_access_token:
-                                print(f"Skipping sync for user {user_id}: no Google access token")
-                                continue
-                                
-                            # Get all subtasks for this task
-                            subtasks = Goal.query.filter_by(task_id=task_id, user_id=user_id).all()
-                            if not subtasks:
-                                print(f"No subtasks found for task {task_id}, skipping sync")
-                                continue
-                            
-                            course = Course.query.get(course_id) if course_id else None
-                            course_title = course.title if course else str(course_id) if course_id else "CourseMate Tasks"
-                            
-                            print(f"Processing background sync: {action} for task {task_id} with {len(subtasks)} subtasks")
-                            
-                            if action == "sync":
-                                # Add a small delay to allow for automatic subtask creation
-                                # This is especially important when syncing after subtask deletion
-                                time.sleep(0.2)  # 200ms delay
-                                
-                                # Refresh subtask data to get the latest state including any auto-created subtasks
-                                subtasks = Goal.query.filter_by(task_id=task_id, user_id=user_id).all()
-                                if subtasks:
-                                    print(f"🔄 Starting Google Calendar sync for task {task_id} with {len(subtasks)} subtasks")
-                                    # Sync each subtask as an individual event
-                                    success_count = 0
-                                    for subtask in subtasks:
-                                        if subtask.start_time and subtask.end_time:  # Only sync subtasks with timing
-                                            if sync_subtask_to_google_calendar(user, subtask, course_title):
-                                                success_count += 1
-                                        else:
-                                            print(f"⚠️  Skipping subtask {subtask.subtask_id}: No start/end times")
-                                    print(f"✅ Google Calendar sync completed for task {task_id}: {success_count}/{len(subtasks)} subtasks synced")
-                                else:
-                                    print(f"⚠️  Task {task_id} no longer exists after delay, skipping sync")
-                    except Exception as e:
-                        print(f"Background sync failed for task {task_id}: {str(e)}")
-                    finally:
-                        sync_queue.task_done()
-            else:
-                print("No Flask app instance available for background sync")
-                sync_queue.task_done()
-                
-        except queue.Empty:
-            continue
-        except Exception as e:
-            print(f"Background sync worker error: {str(e)}")
-            time.sleep(1)  # Avoid tight loop on errors
-
-def start_background_sync_worker():
-    """Start the background sync worker thread"""
-    global sync_thread
-    if sync_thread is None or not sync_thread.is_alive():
-        sync_thread = threading.Thread(target=background_sync_worker, daemon=True)
-        sync_thread.start()
-        print("Background Google Calendar sync worker started")
+
+from app.services.calendar_sync import init_calendar_sync, queue_calendar_sync, sync_status
+from app.services.goal_edits import GoalEdits, GoalRows
+from app.services.subtask_ordering import move_subtask, next_position, reorder_subtasks
+from app.utils.sql_stats import track_statements
 
 def init_background_workers(flask_app=None):
     """Initialize background workers - call this during app startup"""
-    global app_instance
-    if flask_app:
-        app_instance = flask_app
-    start_background_sync_worker()
+    init_calendar_sync(flask_app)
 
 def queue_google_calendar_sync(action, user_id, task_id, course_id=None, google_event_id=None):
     """Queue a Google Calendar sync task for background processing"""
     try:
-        start_background_sync_worker()
-        sync_queue.put((action, user_id, task_id, course_id, google_event_id))
-        print(f"Queued Google Calendar sync: {action} for task {task_id}")
+        _, created = queue_calendar_sync(action, user_id, task_id, course_id, google_event_id)
+        if created:
+            print(f"Queued Google Calendar sync: {action} for task {task_id}")
     except Exception as e:
         print(f"Failed to queue Google Calendar sync: {str(e)}")
 
 goals_bp = Blueprint('goals', __name__)
 
+def course_goal_summaries(user_id, combo_id):
+    """One dict per goal in a course, with its task and subtask progress.
+
+    One query returns a representative row per goal_id (DISTINCT ON, the earliest
+    created) with its StudyGoal counters joined in. Goals without one (imported
+    calendar events) are counted with a grouped query over their rows.
+    """
+    rows = Goal.query.filter(
+        Goal.course_id == combo_id, Goal.user_id == user_id
+    ).distinct(Goal.goal_id).order_by(Goal.goal_id, Goal.created_at, Goal.id).all()
+    rows.sort(key=lambda row: (row.created_at is None, row.created_at or datetime.min, row.goal_id))
+
+    untracked = [row.goal_id for row in rows if row.study_goal is None]
+    counts = {}
+    if untracked:
+        real_task = db.and_(Goal.task_id != 'placeholder', Goal.task_title.isnot(None), Goal.task_title != '')
+        counts = {row.goal_id: row for row in db.session.query(
+            Goal.goal_id.label('goal_id'),
+            db.func.count(db.distinct(Goal.task_id)).filter(real_task).label('total_tasks'),
+            db.func.count(db.distinct(Goal.task_id)).filter(db.and_(real_task, Goal._task_completed.is_(True))).label('completed_tasks'),
+            db.func.count().filter(real_task).label('total_subtasks'),
+            db.func.count().filter(db.and_(real_task, Goal.subtask_completed.is_(True))).label('completed_subtasks')
+        ).filter(
+            Goal.course_id == combo_id, Goal.user_id == user_id, Goal.goal_id.in_(untracked)
+        ).group_by(Goal.goal_id)}
+
+    result = []
+    for goal in rows:
+        goal_dict = goal.to_dict()
+        progress = goal.study_goal or counts.get(goal.goal_id)
+        total_subtasks = progress.total_subtasks if progress else 0
+        completed_subtasks = progress.completed_subtasks if progress else 0
+        goal_dict.update({
+            'total_tasks': progress.total_tasks if progress else 0,
+            'completed_tasks': progress.completed_tasks if progress else 0,
+            'total_subtasks': total_subtasks,
+            'completed_subtasks': completed_subtasks,
+            'progress': round((completed_subtasks / total_subtasks) * 100) if total_subtasks else 0
+        })
+        result.append(goal_dict)
+    return result
+
+def log_bulk_edit(route, goal_id, counts, stats):
+    """One line per bulk goal edit: rows written, statements sent and time taken"""
+    current_app.logger.info(
+        f"{route} goal={goal_id} inserted={counts['inserted']} updated={counts['updated']} "
+        f"deleted={counts['deleted']} statements={stats['statements']} "
+        f"executemany_rows={stats['executemany_rows']} ms={stats['ms']:.1f}"
+    )
+
+def refresh_goal_progress(user_id, goal_id, task_id=None):
+    """Flush pending subtask changes into the progress counters, then derive completion from them.
+
+    With task_id the task is marked complete exactly when all its subtasks are; the
+    goal is complete when all of its tasks are. Costs a fixed number of writes.
+    """
+    db.session.flush()
+    if task_id:
+        task = db.session.get(StudyTask, (user_id, task_id))
+        if task is not None:
+            task.refresh_completion()
+            db.session.flush()
+    goal = db.session.get(StudyGoal, (user_id, goal_id))
+    if goal is not None:
+        goal.refresh_completion()
+
 @goals_bp.route('/api/courses/<course_id>/goals', methods=['GET'])
 @jwt_required()
 def get_course_goals(course_id):
@@ -157,68 +122,7 @@ def get_course_goals(course_id):
                 'error': 'Course not found or you do not have access'
             }), 404
 
-        # Get all rows for this course using combo_id
-        goals = Goal.query.filter_by(course_id=course.combo_id, user_id=user_id).all()
-        
-        # Group by goal_id to get only unique goals
-        unique_goals = {}
-        for goal in goals:
-            if goal.goal_id not in unique_goals:
-                unique_goals[goal.goal_id] = goal
-        
-        # Calculate progress for each goal
-        result = []
-        for goal in unique_goals.values():
-            goal_dict = goal.to_dict()
-            
-            # Get all rows for this goal to calculate progress
-            goal_rows = [g for g in goals if g.goal_id == goal.goal_id]
-            
-            # Filter out placeholder tasks
-            real_task_rows = [g for g in goal_rows if g.task_id != 'placeholder' and g.task_title]
-            
-            if real_task_rows:
-                # Calculate task and subtask counts
-                unique_tasks = {}
-                for row in real_task_rows:
-                    if row.task_id not in unique_tasks:
-                        unique_tasks[row.task_id] = {
-                            'completed': row.task_completed,
-                            'subtasks': 0,
-                            'completed_subtasks': 0
-                        }
-                    unique_tasks[row.task_id]['subtasks'] += 1
-                    if row.subtask_completed:
-                        unique_tasks[row.task_id]['completed_subtasks'] += 1
-                
-                total_tasks = len(unique_tasks)
-                completed_tasks = sum(1 for task in unique_tasks.values() if task['completed'])
-                total_subtasks = sum(task['subtasks'] for task in unique_tasks.values())
-                completed_subtasks = sum(task['completed_subtasks'] for task in unique_tasks.values())
-                
-                # Calculate progress percentage
-                progress = 0
-                if total_subtasks > 0:
-                    progress = round((completed_subtasks / total_subtasks) * 100)
-                
-                goal_dict.update({
-                    'total_tasks': total_tasks,
-                    'completed_tasks': completed_tasks,
-                    'total_subtasks': total_subtasks,
-                    'completed_subtasks': completed_subtasks,
-                    'progress': progress
-                })
-            else:
-                # No real tasks, set default values
-                goal_dict.update({
-                    'total_tasks': 0,
-                    'completed_tasks': 0,
-                    'total_subtasks': 0,
-                    'completed_subtasks': 0,
-                    'progress': 0
-                })
-            
-            result.append(goal_dict)
+        result = course_goal_summaries(user_id, course.combo_id)
         
         return jsonify(result), 200
     
@@ -381,158 +285,32 @@ def update_goal(goal_id):
         
         data = request.get_json()
         
-        # Update goal fields across all rows
-        if 'goal_descr' in data or 'due_date' in data or 'goal_completed' in data:
-            for goal in goals:
-                if 'goal_descr' in data:
-                    goal.goal_descr = data['goal_descr']
-                
-                if 'due_date' in data:
-                    goal.due_date = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
-                
-                if 'goal_completed' in data:
-                    goal.goal_completed = data['goal_completed']
-                
-                goal.updated_at = datetime.utcnow()
-        
-        # Handle task and subtask updates
-        if 'tasks' in data:
-            # Get existing task IDs
-            existing_task_ids = {goal.task_id for goal in goals}
+        with track_statements('goals.update_goal') as stats:
+            edits = GoalEdits(GoalRows(goals), user_id, goal_id)
             
-            # Track which tasks are in the update
-            updated_task_ids = set()
+            # Goal fields are shared by all of the goal's rows
+            goal_values = {}
+            if 'goal_descr' in data:
+                goal_values['goal_descr'] = data['goal_descr']
+            if 'due_date' in data:
+                goal_values['due_date'] = datetime.fromisoformat(data['due_date']) if data['due_date'] else None
+            if 'goal_completed' in data:
+                goal_values['goal_completed'] = data['goal_completed']
+            edits.update_goal(goal_values)
             
-            for task_data in data['tasks']:
-                task_id = task_data.get('task_id')
-                
-                if task_id and task_id in existing_task_ids:
-                    # Update existing task
-                    updated_task_ids.add(task_id)
-                    task_rows = [g for g in goals if g.task_id == task_id]
-                    
-                    # Update task fields
-                    for task_row in task_rows:
-                        if 'task_title' in task_data:
-                            task_row.task_title = task_data['task_title']
-                        if 'task_descr' in task_data:
-                            task_row.task_descr = task_data['task_descr']
-                        if 'task_completed' in task_data:
-                            task_row.task_completed = task_data['task_completed']
-                    
-                    # Handle subtask updates
-                    if 'subtasks' in task_data:
-                        # Get existing subtask IDs for this task
-                        existing_subtask_ids = {g.subtask_id for g in task_rows}
-                        updated_subtask_ids = set()
-                        
-                        for subtask_data in task_data['subtasks']:
-                            subtask_id = subtask_data.get('subtask_id')
-                            
-                            if subtask_id and subtask_id in existing_subtask_ids:
-                                # Update existing subtask
-                                updated_subtask_ids.add(subtask_id)
-                                subtask_row = next((g for g in task_rows if g.subtask_id == subtask_id), None)
-                                
-                                if subtask_row:
-                                    if 'subtask_descr' in subtask_data:
-                                        subtask_row.subtask_descr = subtask_data['subtask_descr']
-                                    if 'subtask_type' in subtask_data:
-                                        subtask_row.subtask_type = subtask_data['subtask_type']
-                                    if 'subtask_completed' in subtask_data:
-                                        subtask_row.subtask_completed = subtask_data['subtask_completed']
-                            else:
-                                # Create new subtask
-                                new_subtask = Goal(
-                                    user_id=user_id,
-                                    course_id=goals[0].course_id,
-                                    goal_id=goal_id,
-                                    goal_descr=goals[0].goal_descr,
-                                    due_date=goals[0].due_date,
-                                    goal_completed=goals[0].goal_completed,
-                                    task_id=task_id,
-                                    task_title=task_rows[0].task_title,
-                                    task_descr=task_rows[0].task_descr,
-                                    task_completed=task_rows[0].task_completed,
-                                    subtask_id=subtask_data.get('subtask_id', str(uuid.uuid4())),
-                                    subtask_descr=subtask_data.get('subtask_descr', 'New Subtask'),
-                                    subtask_type=subtask_data.get('subtask_type', 'other'),
-                                    subtask_completed=subtask_data.get('subtask_completed', False),
-                                    subtask_order=subtask_data.get('subtask_order', None)
-                                )
-                                db.session.add(new_subtask)
-                        
-                        # Delete subtasks that weren't in the update
-                        for g in task_rows:
-                            if g.subtask_id not in updated_subtask_ids:
-                                db.session.delete(g)
-                else:
-                    # Create new task with subtasks
-                    new_task_id = task_data.get('task_id', str(uuid.uuid4()))
-                    
-                    if 'subtasks' in task_data and task_data['subtasks']:
-                        for subtask_data in task_data['subtasks']:
-                            new_subtask = Goal(
-                                user_id=user_id,
-                                course_id=goals[0].course_id,
-                                goal_id=goal_id,
-                                goal_descr=goals[0].goal_descr,
-                                due_date=goals[0].due_date,
-                                goal_completed=goals[0].goal_completed,
-                                task_id=new_task_id,
-                                task_title=task_data.get('task_title', 'New Task'),
-                                task_descr=task_data.get('task_descr', ''),
-                                task_completed=task_data.get('task_completed', False),
-                                subtask_id=subtask_data.get('subtask_id', str(uuid.uuid4())),
-                                subtask_descr=subtask_data.get('subtask_descr', 'New Subtask'),
-                                subtask_type=subtask_data.get('subtask_type', 'other'),
-                                subtask_completed=subtask_data.get('subtask_completed', False),
-                                subtask_order=subtask_data.get('subtask_order', None)
-                            )
-                            db.session.add(new_subtask)
-                    else:
-                        # Create task with default subtask
-                        new_subtask = Goal(
-                            user_id=user_id,
-                            course_id=goals[0].course_id,
-                            goal_id=goal_id,
-                            goal_descr=goals[0].goal_descr,
-                            due_date=goals[0].due_date,
-                            goal_completed=goals[0].goal_completed,
-                            task_id=new_task_id,
-                            task_title=task_data.get('task_title', 'New Task'),
-                            task_descr=task_data.get('task_descr', ''),
-                            task_completed=task_data.get('task_completed', False),
-                            subtask_id=str(uuid.uuid4()),
-                            subtask_descr='Default Subtask',
-                            subtask_type='other',
-                            subtask_completed=False,
-                            subtask_order=0
-                        )
-                        db.session.add(new_subtask)
-            
-            # Instead of deleting tasks that weren't in the update, we'll keep them
-            # This allows for incremental additions without losing existing data
-            
-            # After all updates, check if ALL tasks for the goal are completed (excluding placeholders)
-            all_task_ids = set(g.task_id for g in goals if g.task_id != 'placeholder')
-            all_tasks_completed = True if all_task_ids else False
-            for tid in all_task_ids:
-                task_rows = [g for g in goals if g.task_id == tid]
-                if not all(g.task_completed for g in task_rows):
-                    all_tasks_completed = False
-                    break
-            for g in goals:
-                g.goal_completed = all_tasks_completed
-        
-        db.session.commit()
+            # Unlisted tasks are kept, so tasks can be added incrementally;
+            # with a task list the goal is complete when all of its tasks are
+            if 'tasks' in data:
+                edits.plan_tasks(data['tasks'])
+            counts = edits.apply(derive_goal_completion='tasks' in data)
+            db.session.commit()
+        log_bulk_edit('update_goal', goal_id, counts, stats)
         
         # Queue Google Calendar sync for all tasks in this goal if due_date changed
         if 'due_date' in data:
-            # Get all unique task IDs for this goal (excluding placeholders)
-            task_ids = set(g.task_id for g in goals if g.task_id != 'placeholder')
-            for task_id in task_ids:
-                queue_google_calendar_sync("sync", user_id, task_id, goals[0].course_id)
+            for task_id in edits.goal.by_task:
+                if task_id != PLACEHOLDER_TASK_ID:
+                    queue_google_calendar_sync("sync", user_id, task_id, edits.goal.first.course_id)
         
         # Get the updated rows
         updated_goals = Goal.query.filter_by(goal_id=goal_id, user_id=user_id).all()
@@ -567,6 +345,8 @@ def delete_goal(goal_id):
         # Delete all rows for this goal
         for goal in goals:
             db.session.delete(goal)
+        db.session.flush()
+        StudyGoal.query.filter_by(goal_id=goal_id, user_id=user_id).delete(synchronize_session=False)
         
         db.session.commit()
         
@@ -590,8 +370,8 @@ def get_goal_tasks(goal_id):
         # Get current user from JWT
         user_id = get_jwt_identity()
         
-        # Get all rows for this goal, ordered by subtask_order
-        goals = Goal.query.filter_by(goal_id=goal_id, user_id=user_id).order_by(asc(Goal.subtask_order)).all()
+        # Get all rows for this goal, each task's subtasks in order
+        goals = Goal.query.filter_by(goal_id=goal_id, user_id=user_id).order_by(*Goal.subtask_ordering()).all()
         
         if not goals:
             return jsonify({'error': 'Goal not found or you do not have access'}), 404
@@ -607,8 +387,14 @@ def get_goal_tasks(goal_id):
             # If no real tasks, return empty array (placeholder will be handled by frontend)
             filtered_goals = []
         
-        # Return filtered rows
-        result = [goal.to_dict() for goal in filtered_goals]
+        # Return filtered rows; subtask_order is the subtask's position in its task
+        result = []
+        positions = defaultdict(int)
+        for goal in filtered_goals:
+            goal_dict = goal.to_dict()
+            goal_dict['subtask_order'] = positions[goal.task_id]
+            positions[goal.task_id] += 1
+            result.append(goal_dict)
         return jsonify(result), 200
         
     except SQLAlchemyError as e:
@@ -639,215 +425,27 @@ def update_goal_tasks(goal_id):
             print("No tasks in data for goal_id:", goal_id, "data:", data)
             return jsonify({'error': 'Tasks are required'}), 400
         
-        existing_task_ids = {goal.task_id for goal in goals}
-        
-        # Track which tasks are in the update
-        updated_task_ids = set()
-        conflicting_subtasks = set()
-        bypass = data.get('bypass')
+        goal_rows = GoalRows(goals)
         
-        if not bypass:
-            for task_data in data['tasks']:
-                task_id = task_data.get('task_id')
-                task_rows = [g for g in goals if g.task_id == task_id]
-                task_due_date = None
-
-                if 'task_due_date' in task_data and task_data['task_due_date']:
-                    try:
-                        if isinstance(task_data['task_due_date'], str):
-                            if 'T' in task_data['task_due_date']:
-                                task_due_date = datetime.fromisoformat(task_data['task_due_date'].replace('Z', '+00:00'))
-                            else:
-                                task_due_date = datetime.fromisoformat(task_data['task_due_date'] + 'T00:00:00')
-                        else:
-                            task_due_date = task_data['task_due_date']
-                    except Exception as e:
-                        current_app.logger.error(f"Error parsing task_due_date: {task_data['task_due_date']}, error: {e}")
-                        task_due_date = None
-                else:
-                    task_due_date = task_rows[0].task_due_date if task_rows and hasattr(task_rows[0], 'task_due_date') else None
-
-                if task_due_date:
-                    for subtask_row in task_rows:
-                        if getattr(subtask_row, 'task_id', None) == 'placeholder' or getattr(subtask_row, 'subtask_id', None) == 'placeholder':
-                            continue
-                        start_time = getattr(subtask_row, 'start_time', None)
-                        subtask_id = getattr(subtask_row, 'subtask_id', None)
-                        if start_time and subtask_id and start_time.date() > task_due_date.date():
-                            conflicting_subtasks.add(subtask_id)
-
+        if not data.get('bypass'):
+            conflicting_subtasks = goal_rows.conflicting_subtasks(data['tasks'])
             if conflicting_subtasks:
                 return jsonify({
-                    'conflicting_subtasks': list(conflicting_subtasks),
+                    'conflicting_subtasks': sorted(set(conflicting_subtasks)),
                     'message': 'Some subtasks have a start_time after the task due date.'
                 }), 409
 
-        for task_data in data['tasks']:
-            task_id = task_data.get('task_id')
-            print('Received task_due_date:', task_data.get('task_due_date'))
-            
-            if task_id and task_id in existing_task_ids:
-                # Update existing task
-                updated_task_ids.add(task_id)
-                task_rows = [g for g in goals if g.task_id == task_id]
-                
-                # Update task fields
-                for task_row in task_rows:
-                    for field in ['task_title', 'task_descr', 'task_completed']:
-                        if field in task_data:
-                            setattr(task_row, field, task_data[field])
-
-                    if 'task_due_date' in task_data:
-                        if task_data['task_due_date']:
-                            try:
-                                if isinstance(task_data['task_due_date'], str):
-                                    # Handle different date formats
-                                    if 'T' in task_data['task_due_date']:
-                                        task_row.task_due_date = datetime.fromisoformat(task_data['task_due_date'].replace('Z', '+00:00'))
-                                    else:
-                                        # Assume YYYY-MM-DD format
-                                        task_row.task_due_date = datetime.fromisoformat(task_data['task_due_date'] + 'T00:00:00')
-                                else:
-                                    task_row.task_due_date = task_data['task_due_date']
-                                print(f"Updated task_due_date for task {task_id}: {task_row.task_due_date}")
-                            except Exception as e:
-                                current_app.logger.error(f"Error parsing task_due_date: {task_data['task_due_date']}, error: {e}")
-                                # Keep existing value if parsing fails
-                        else:
-                            task_row.task_due_date = None
-                            print(f"Set task_due_date to None for task {task_id}")
-
-                        subtasks = Goal.query.filter_by(task_id=task_id, user_id=user_id).all()
-                        for subtask in subtasks:
-                            subtask.task_due_date = task_row.task_due_date
-                            subtask.updated_at = datetime.utcnow()
-
-                        for subtask in subtasks:
-                            if subtask.start_time and subtask.end_time:
-                                queue_google_calendar_sync("sync", user_id, subtask.task_id, subtask.course_id)
-                                print(f"🔄 Queued Google Calendar sync for subtask {subtask.subtask_id}")
-                            else:
-                                print(f"⚠️  Skipping Google Calendar sync for subtask {subtask.subtask_id}: No start/end times")
-
-                if 'subtasks' in task_data:
-                    # Get existing subtask IDs for this task
-                    existing_subtask_ids = {g.subtask_id for g in task_rows}
-                    updated_subtask_ids = set()
-                    
-                    for subtask_data in task_data['subtasks']:
-                        subtask_id = subtask_data.get('subtask_id')
-                        
-                        if subtask_id and subtask_id in existing_subtask_ids:
-                            # Update existing subtask
-                            updated_subtask_ids.add(subtask_id)
-                            subtask_row = next((g for g in task_rows if g.subtask_id == subtask_id), None)
-                            
-                            if subtask_row:
-                                for field in ['subtask_descr', 'subtask_type', 'subtask_completed']:
-                                    if field in subtask_data:
-                                        setattr(subtask_row, field, subtask_data[field])
-                        else:
-                            # Create new subtask
-                            new_subtask = Goal(
-                                user_id=user_id,
-                                course_id=goals[0].course_id,
-                                goal_id=goal_id,
-                                goal_descr=goals[0].goal_descr,
-                                due_date=goals[0].due_date,
-                                goal_completed=goals[0].goal_completed,
-                                task_id=task_id,
-                                task_title=task_rows[0].task_title,
-                                task_descr=task_rows[0].task_descr,
-                                task_completed=task_rows[0].task_completed,
-                                task_due_date=task_rows[0].task_due_date,
-                                subtask_id=subtask_data.get('subtask_id', str(uuid.uuid4())),
-                                subtask_descr=subtask_data.get('subtask_descr', 'New Subtask'),
-                                subtask_type=subtask_data.get('subtask_type', 'other'),
-                                subtask_completed=subtask_data.get('subtask_completed', False),
-                                subtask_order=subtask_data.get('subtask_order', None)
-                            )
-                            print(f"Created new subtask with task_due_date: {task_rows[0].task_due_date}")
-                            db.session.add(new_subtask)
-                    
-                    # Delete subtasks that weren't in the update
-                    for g in task_rows:
-                        if g.subtask_id not in updated_subtask_ids:
-                            db.session.delete(g)
-            else:
-                # Create new task with subtasks
-                new_task_id = task_data.get('task_id', str(uuid.uuid4()))
-                
-                if 'subtasks' in task_data and task_data['subtasks']:
-                    for subtask_data in task_data['subtasks']:
-                        new_subtask = Goal(
-                            user_id=user_id,
-                            course_id=goals[0].course_id,
-                            goal_id=goal_id,
-                            goal_descr=goals[0].goal_descr,
-                            due_date=goals[0].due_date,
-                            goal_completed=goals[0].goal_completed,
-                            task_id=new_task_id,
-                            task_title=task_data.get('task_title', 'New Task'),
-                            task_descr=task_data.get('task_descr', ''),
-                            task_completed=task_data.get('task_completed', False),
-                            task_due_date=task_data.get('task_due_date', None),
-                            subtask_id=subtask_data.get('subtask_id', str(uuid.uuid4())),
-                            subtask_descr=subtask_data.get('subtask_descr', 'New Subtask'),
-                            subtask_type=subtask_data.get('subtask_type', 'other'),
-                            subtask_completed=subtask_data.get('subtask_completed', False),
-                            subtask_order=subtask_data.get('subtask_order', None)
-                        )
-                        db.session.add(new_subtask)
-                else:
-                    # Create task with default subtask
-                    new_subtask = Goal(
-                        user_id=user_id,
-                        course_id=goals[0].course_id,
-                        goal_id=goal_id,
-                        goal_descr=goals[0].goal_descr,
-                        due_date=goals[0].due_date,
-                        goal_completed=goals[0].goal_completed,
-                        task_id=new_task_id,
-                        task_title=task_data.get('task_title', 'New Task'),
-                        task_descr=task_data.get('task_descr', ''),
-                        task_completed=task_data.get('task_completed', False),
-                        task_due_date=task_data.get('task_due_date', None),
-                        subtask_id=str(uuid.uuid4()),
-                        subtask_descr='Default Subtask',
-                        subtask_type='other',
-                        subtask_completed=False,
-                        subtask_order=0
-                    )
-                    db.session.add(new_subtask)
-        
-        # Instead of deleting tasks that weren't in the update, we'll keep them
-        # This allows for incremental additions without losing existing data
-        
-            # After all updates, check if ALL tasks for the goal are completed (excluding placeholders)
-            all_task_ids = set(g.task_id for g in goals if g.task_id != 'placeholder')
-            all_tasks_completed = True if all_task_ids else False
-            for tid in all_task_ids:
-                task_rows = [g for g in goals if g.task_id == tid]
-                if not all(g.task_completed for g in task_rows):
-                    all_tasks_completed = False
-                    break
-            for g in goals:
-                g.goal_completed = all_tasks_completed
-
-
-        
-        db.session.commit()
-        
-        # Queue Google Calendar sync for all updated tasks
-        updated_task_ids = set()
-        for task_data in data['tasks']:
-            task_id = task_data.get('task_id')
-            if task_id and task_id in existing_task_ids:
-                updated_task_ids.add(task_id)
+        with track_statements('goals.update_goal_tasks') as stats:
+            edits = GoalEdits(goal_rows, user_id, goal_id)
+            # Unlisted tasks are kept, so tasks can be added incrementally
+            edits.plan_tasks(data['tasks'], with_due_dates=True)
+            counts = edits.apply(derive_goal_completion=True)
+            db.session.commit()
+        log_bulk_edit('update_goal_tasks', goal_id, counts, stats)
         
         # Sync all updated tasks to Google Calendar
-        for task_id in updated_task_ids:
-            queue_google_calendar_sync("sync", user_id, task_id, goals[0].course_id)
+        for task_id in edits.updated_task_ids:
+            queue_google_calendar_sync("sync", user_id, task_id, goal_rows.first.course_id)
         
         # Get the updated rows
         updated_goals = Goal.query.filter_by(goal_id=goal_id, user_id=user_id).all()
@@ -1059,10 +657,8 @@ def delete_subtask(subtask_id):
         if not task_rows:
             return jsonify({'error': 'Task not found or you do not have access'}), 404
         
-        # Delete the subtask
+        # Delete the subtask; the others keep their order keys
         db.session.delete(subtask)
-        # Reindex subtask_order for all remaining subtasks of this task
-        reindex_subtasks(task_id, user_id)
         db.session.commit()
         
         # If the deleted subtask was completed, check if the task should now be incomplete
@@ -1119,8 +715,16 @@ def update_subtask(subtask_id):
         if 'subtask_type' in data:
             subtask.subtask_type = data['subtask_type']
         
-        if 'subtask_order' in data:
-            subtask.subtask_order = data['subtask_order']
+        # Moves write only this row's order key
+        try:
+            if 'after_subtask_id' in data:
+                move_subtask(subtask, after_subtask_id=data['after_subtask_id'])
+            elif 'subtask_order' in data:
+                subtask.subtask_order = data['subtask_order']
+                move_subtask(subtask, position=data['subtask_order'])
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         
         # Parse and convert times to UTC for storage
         if 'subtask_start_time' in data:
@@ -1154,38 +758,13 @@ def update_subtask(subtask_id):
         
         if 'subtask_completed' in data:
             subtask.subtask_completed = data['subtask_completed']
-            
-            # When subtask is toggled, update both task_completed and subtask_completed for this subtask
-            subtask.task_completed = data['subtask_completed']
             subtask.updated_at = datetime.utcnow()
             
-            # Now get fresh data for this task after the update
-            task_rows = Goal.query.filter_by(task_id=subtask.task_id, user_id=user_id).all()
-            
-            # Check if all subtasks are completed to update task completion status
-            all_subtasks_completed = all(row.subtask_completed for row in task_rows)
-            
-            # Update task_completed for all rows of this task based on subtask completion
-            for row in task_rows:
-                row.task_completed = all_subtasks_completed
-                row.updated_at = datetime.utcnow()
-            
-            # Get all rows for this goal
-            goal_rows = Goal.query.filter_by(goal_id=subtask.goal_id, user_id=user_id).all()
-            
-            # Get unique task IDs and their completion status
-            task_completion_map = {}
-            for row in goal_rows:
-                if row.task_id not in task_completion_map:
-                    task_completion_map[row.task_id] = row.task_completed
-            
-            # Check if all tasks are completed
-            all_tasks_completed = all(task_completion_map.values())
-        
-            # Update goal completion status for all rows
-            for row in goal_rows:
-                row.goal_completed = all_tasks_completed
-                row.updated_at = datetime.utcnow()
+            if subtask.tracks_progress:
+                # Task and goal completion follow from the counters; no other rows are rewritten
+                refresh_goal_progress(user_id, subtask.goal_id, subtask.task_id)
+            else:
+                subtask.task_completed = data['subtask_completed']
         
         if 'bypass_due_date' in data:
             subtask.is_conflicting = bool(data.get('bypass_due_date'))
@@ -1274,12 +853,8 @@ def create_subtask(task_id):
         if not task_due_date:
             task_due_date = task_row.task_due_date if hasattr(task_row, 'task_due_date') and task_row.task_due_date else task_row.due_date
         
-        # Get all existing subtask orders for this task
-        existing_orders = get_subtask_orders_for_task(task_id, user_id)
-        if existing_orders:
-            subtask_order = max(existing_orders) + 1
-        else:
-            subtask_order = 0
+        # New subtasks go at the end of the task
+        subtask_rank, subtask_order = next_position(user_id, task_id)
         
         # Debug logging
         print(f"Task due date: {task_due_date}")
@@ -1334,6 +909,7 @@ def create_subtask(task_id):
             start_time=start_time,
             end_time=end_time,
             subtask_order=subtask_order,
+            subtask_rank=subtask_rank,
             is_conflicting=data.get('bypass_due_date', False)
         )
         
@@ -1363,7 +939,8 @@ def create_subtask(task_id):
                 "subtask_id": new_subtask.subtask_id,
                 "subtask_descr": new_subtask.subtask_descr,
                 "subtask_completed": new_subtask.subtask_completed,
-                "subtask_order": new_subtask.subtask_order
+                "subtask_order": new_subtask.subtask_order,
+                "subtask_rank": new_subtask.subtask_rank
             }
         }), 201
         
@@ -1376,6 +953,46 @@ def create_subtask(task_id):
         current_app.logger.error(f"Error creating subtask: {str(e)}")
         return jsonify({'error': 'An error occurred while creating the subtask'}), 500
 
+@goals_bp.route('/api/goals/tasks/<task_id>/subtasks/order', methods=['PUT'])
+@jwt_required()
+def reorder_task_subtasks(task_id):
+    """Set the complete order of a task's subtasks: {"subtask_ids": [...]}, first to last"""
+    try:
+        # Get current user from JWT
+        user_id = get_jwt_identity()
+
+        if not Goal.query.filter_by(task_id=task_id, user_id=user_id).first():
+            return jsonify({'error': 'Task not found or you do not have access'}), 404
+
+        data = request.get_json() or {}
+        subtask_ids = data.get('subtask_ids')
+        if not isinstance(subtask_ids, list):
+            return jsonify({'error': 'subtask_ids is required'}), 400
+
+        try:
+            ranks = reorder_subtasks(user_id, task_id, subtask_ids)
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+
+        return jsonify({
+            "message": "Subtasks reordered successfully",
+            "subtasks": [
+                {"subtask_id": subtask_id, "subtask_rank": rank, "subtask_order": position}
+                for position, (subtask_id, rank) in enumerate(ranks.items())
+            ]
+        }), 200
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Database error: {str(e)}")
+        return jsonify({'error': 'Database error occurred'}), 500
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error reordering subtasks: {str(e)}")
+        return jsonify({'error': 'An error occurred while reordering subtasks'}), 500
+
 # Canvas-style time tracking endpoints
 @goals_bp.route('/api/goals/tasks/subtasks/<subtask_id>/start-engagement', methods=['POST'])
 @jwt_required()
@@ -1770,31 +1387,11 @@ def update_task(task_id):
                 # mark all subtasks as completed when task is completed
                 for row in subtask_rows:
                     row.subtask_completed = True
-                    row.task_completed = True
                     row.updated_at = now
-            else:
-                # When task is marked as incomplete, set task_completed to false for all subtask rows
-                # but keep subtask_completed unchanged
-                for row in subtask_rows:
-                    row.task_completed = False
-                    row.updated_at = now
-            
-            # update goal completion status based on current task completion states
-            goal_rows: list[Goal] = Goal.query.filter_by(goal_id=task.goal_id, user_id=user_id).all()
+            # When task is marked as incomplete, keep subtask_completed unchanged
             
-            # Get unique task IDs and their completion status
-            task_completion_map = {}
-            for row in goal_rows:
-                if row.task_id not in task_completion_map and row.task_id != 'placeholder':
-                    task_completion_map[row.task_id] = row.task_completed
-            
-            # Check if all tasks are completed
-            all_tasks_completed = all(task_completion_map.values())
-            
-            # Update goal completion status for all rows
-            for row in goal_rows:
-                row.goal_completed = all_tasks_completed
-                row.updated_at = now
+            # update goal completion status from the goal's task counters
+            refresh_goal_progress(user_id, task.goal_id)
         
         task.updated_at = now
         db.session.commit()
@@ -1948,35 +1545,18 @@ def test_background_sync():
         # Queue a test sync task
         queue_google_calendar_sync("sync", current_user_id, "test-task-id", "test-course-id")
         
+        status = sync_status()
         return jsonify({
             "message": "Test sync task queued successfully",
-            "queue_size": sync_queue.qsize(),
-            "worker_alive": sync_thread.is_alive() if sync_thread else False
+            "queue_size": status["queue_size"],
+            "worker_alive": all(shard["alive"] for shard in status["shards"]),
+            "shards": status["shards"]
         }), 200
         
     except Exception as e:
         current_app.logger.error(f"Test sync failed: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-# Helper to reindex subtask_order for all subtasks of a task
-
-def reindex_subtasks(task_id, user_id):
-    from app.models.goal import Goal
-    from sqlalchemy import asc
-    subtasks = Goal.query.filter_by(task_id=task_id, user_id=user_id).order_by(asc(Goal.subtask_order), asc(Goal.created_at)).all()
-    for idx, subtask in enumerate(subtasks):
-        subtask.subtask_order = idx
-    db.session.commit()
-
-# Helper to get all subtask orders for a task
-def get_subtask_orders_for_task(task_id, user_id):
-    """Get all subtask_order values for a given task, sorted in ascending order"""
-    from app.models.goal import Goal
-    from sqlalchemy import asc
-    subtasks = Goal.query.filter_by(task_id=task_id, user_id=user_id).order_by(asc(Goal.subtask_order)).all()
-    orders = [subtask.subtask_order for subtask in subtasks if subtask.subtask_order is not None]
-    return sorted(orders)
-
 @goals_bp.route("/api/goals/checklist", methods=["GET"])
 @jwt_required()
 def get_checklist():
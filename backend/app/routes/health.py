@@ -1,7 +1,33 @@
-from flask import Blueprint, jsonify
+import hmac
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from app.models.user import User
+from app.utils import metrics
 
 health_bp = Blueprint('health', __name__)
  
 @health_bp.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "ok"}) 
\ No newline at end of file
+    return jsonify({"status": "ok"})
+
+def has_metrics_access():
+    """Scrapers send X-Metrics-Token (METRICS_TOKEN); otherwise an admin's JWT is required"""
+    token = current_app.config.get('METRICS_TOKEN')
+    supplied = request.headers.get('X-Metrics-Token')
+    if token and supplied and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return True
+    try:
+        verify_jwt_in_request()
+    except (JWTExtendedException, PyJWTError):
+        return False
+    user = User.query.get(get_jwt_identity())
+    return bool(user and user.role == 'admin')
+
+@health_bp.route('/api/health/metrics', methods=['GET'])
+def metrics_snapshot():
+    """In-process latency and throughput metrics (e.g. quiz.first_question_ms); internal only"""
+    if not has_metrics_access():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(metrics.snapshot())
@@ -0,0 +1,82 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from app.models.generation_job import GenerationJob
+from app.services.generation_jobs import submit_generation_job, GenerationLimitError
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+
+def wants_background_job(data=None):
+    """True when the client asked for a generation to run as a background job"""
+    flag = request.args.get('async')
+    if flag is None and data:
+        flag = data.get('async')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def enqueue_generation_job(user_id, job_type, params, course_id=None):
+    """Queue a generation job for a request and build the 202 response with the job id.
+
+    Jobs belong to a user, so routes without @jwt_required pass user_id=None and the token is checked here.
+    """
+    if user_id is None:
+        try:
+            verify_jwt_in_request()
+            user_id = get_jwt_identity()
+        except (JWTExtendedException, PyJWTError) as e:
+            return jsonify({'error': f'Authentication required for background generation: {str(e)}'}), 401
+
+    data = request.get_json(silent=True) or {}
+    idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    try:
+        job, created = submit_generation_job(
+            user_id=user_id,
+            job_type=job_type,
+            params=params,
+            course_id=course_id,
+            idempotency_key=idempotency_key
+        )
+    except GenerationLimitError as e:
+        return jsonify({'error': str(e)}), 429
+
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'created': created,
+        'job': job.to_dict()
+    }), 202 if created else 200
+
+
+@jobs_bp.route('/', methods=['GET'], strict_slashes=False)
+@jwt_required()
+def list_jobs():
+    """List the current user's recent generation jobs"""
+    current_user_id = get_jwt_identity()
+    limit = int(request.args.get('limit', 20))
+    query = GenerationJob.query.filter_by(user_id=current_user_id)
+
+    status = request.args.get('status')
+    if status:
+        query = query.filter_by(status=status)
+    job_type = request.args.get('job_type')
+    if job_type:
+        query = query.filter_by(job_type=job_type)
+
+    jobs = query.order_by(GenerationJob.created_at.desc()).limit(limit).all()
+    return jsonify({
+        'success': True,
+        'jobs': [job.to_dict(include_result=False) for job in jobs]
+    }), 200
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Poll a generation job for its status and, once completed, its result"""
+    current_user_id = get_jwt_identity()
+    job = GenerationJob.query.filter_by(id=job_id, user_id=current_user_id).first()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()}), 200
@@ -7,6 +7,7 @@ from ..services.rag_service import RAGService
 from ..models.uploaded_file import UploadedFile
 from ..models.material_chunk import MaterialChunk
 from ..extensions import db
+from .jobs import wants_background_job, enqueue_generation_job
 
 materials_bp = Blueprint('materials', __name__)
 
@@ -162,6 +163,12 @@ def generate_flashcards():
         topic = data.get('topic')
         num_cards = data.get('num_cards', 10)
         
+        if wants_background_job(data):
+            return enqueue_generation_job(None, 'flashcards', {
+                'topic': topic,
+                'num_cards': num_cards
+            })
+        
         result = rag_service.generate_flashcards(topic, num_cards)
         
         return jsonify(result), 200
@@ -177,6 +184,9 @@ def generate_summary():
         data = request.get_json() or {}
         topic = data.get('topic')
         
+        if wants_background_job(data):
+            return enqueue_generation_job(None, 'summary', {'topic': topic})
+        
         result = rag_service.generate_summary(topic)
         
         return jsonify(result), 200
@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify, request
+from app.utils.storage import get_storage
+from app.services.thumbnails import THUMBNAIL_PREFIX, IMMUTABLE_CACHE_CONTROL
+
+storage_bp = Blueprint('storage', __name__, url_prefix='/api/storage')
+
+@storage_bp.route('/<path:key>', methods=['GET', 'HEAD'])
+def serve_file(key):
+    """Serves a LOCAL storage file behind a signed, expiring URL (see LocalStorage.url)"""
+    storage = get_storage()
+    if storage.name != 'LOCAL':
+        return jsonify({'error': 'Files are not served by this server'}), 404
+    if not storage.verify(key, request.args.get('expires'), request.args.get('signature')):
+        return jsonify({'error': 'Invalid or expired link'}), 403
+    try:
+        response = storage.send(key)
+        if key.startswith(THUMBNAIL_PREFIX):
+            # Content-hash keys never change content
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+    except ValueError:
+        return jsonify({'error': 'Invalid file path'}), 400
@@ -0,0 +1,683 @@
+"""
+Background Google Calendar sync: a durable job table run by user-sharded workers.
+
+Every request to sync a task (or delete an event) is a CalendarSyncJob row,
+so nothing queued is lost on restart. Requests are coalesced by (user, task,
+action): while a job is pending, another request for the same thing only
+pushes its run_after back by CALENDAR_SYNC_DEBOUNCE_SECONDS (never past
+CALENDAR_SYNC_MAX_DELAY_SECONDS from the first request), so a burst of edits
+produces one sync. The job reads the task's subtasks when it runs and so sees
+all of them.
+
+A dispatcher thread claims due jobs with FOR UPDATE SKIP LOCKED and hands
+them to CALENDAR_SYNC_WORKERS shard threads. Every user is pinned to one
+shard, and a user's jobs are only claimed while none of theirs is running
+anywhere, so they run one at a time and in order while different users sync
+in parallel. Within a shard users take turns one slice (CALENDAR_SYNC_SLICE
+subtasks) at a time, so a large study plan does not hold up everyone else.
+
+Failed jobs are retried with exponential backoff up to
+CALENDAR_SYNC_MAX_ATTEMPTS. The dispatcher keeps a heartbeat on every job
+its shards hold, queued or running; jobs left behind by a process that died
+are picked up again after CALENDAR_SYNC_STALE_SECONDS.
+
+Importing a user's Google events ('import' jobs, queued by POST
+/api/calendar/sync) runs the same way, recording progress on the job as each
+page is stored. A scheduler thread queues incremental (sync-token) imports for
+every connected user about every CALENDAR_SCHEDULE_INTERVAL_SECONDS, spread by
+a per-user jitter, while keeping all imports started across processes under
+CALENDAR_SCHEDULE_MAX_PER_MINUTE.
+
+Queue depth, queue wait and job duration are recorded in app.utils.metrics.
+On shutdown no more jobs are claimed and the workers drain what they hold for
+up to CALENDAR_SYNC_DRAIN_TIMEOUT seconds; anything not started goes back to
+pending.
+"""
+import os
+import time
+import uuid
+import zlib
+import atexit
+import random
+import socket
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from ..extensions import db, socketio
+from ..models.calendar_sync_job import CalendarSyncJob
+from ..models.goal import Goal
+from ..models.course import Course
+from ..models.user import User
+from ..utils import metrics
+from ..utils.advisory_locks import (
+    CALENDAR_CLAIM_ADVISORY_LOCK_KEY as CLAIM_ADVISORY_LOCK_KEY,
+    CALENDAR_SCHEDULE_ADVISORY_LOCK_KEY as SCHEDULE_ADVISORY_LOCK_KEY
+)
+
+PRUNE_INTERVAL_SECONDS = 3600
+
+app_instance = None  # Store the Flask app instance
+_shards: List['_Shard'] = []
+_shards_lock = threading.Lock()
+_dispatcher = None
+_scheduler = None
+_stop = threading.Event()
+_worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CalendarSyncError(Exception):
+    """Raised when a sync job did not fully succeed and should be retried"""
+
+
+class _Shard:
+    """One worker thread and the per-user job queues it serves round-robin"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.queues: 'OrderedDict[str, deque]' = OrderedDict()  # user_id -> that user's jobs, in order
+        self.depth = 0
+        self.busy = False
+        self.current: Optional[Dict[str, Any]] = None  # Job being run
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._work, name=f'calendar-sync-{index}', daemon=True)
+
+    def put(self, job: Dict[str, Any], front: bool = False):
+        with self.condition:
+            jobs = self.queues.get(job['user_id'])
+            if jobs is None:
+                jobs = self.queues[job['user_id']] = deque()
+            if front:
+                jobs.appendleft(job)
+            else:
+                jobs.append(job)
+            self.depth += 1
+            self.condition.notify()
+
+    def held_ids(self) -> List[str]:
+        """Ids of the jobs this shard holds: queued and running"""
+        with self.condition:
+            ids = [job['id'] for user_jobs in self.queues.values() for job in user_jobs]
+            if self.current:
+                ids.append(self.current['id'])
+            return ids
+
+    def take_all(self) -> List[Dict[str, Any]]:
+        """Remove and return every job not yet started"""
+        with self.condition:
+            jobs = [job for user_jobs in self.queues.values() for job in user_jobs]
+            self.queues.clear()
+            self.depth = 0
+            return jobs
+
+    def _next(self) -> Optional[Dict[str, Any]]:
+        """Wait for the next job: the head of the first user's queue; that user then goes to the back"""
+        with self.condition:
+            while not self.queues:
+                if _stop.is_set():
+                    return None
+                self.condition.wait(timeout=1)
+            user_id, jobs = next(iter(self.queues.items()))
+            job = jobs.popleft()
+            self.depth -= 1
+            if jobs:
+                self.queues.move_to_end(user_id)
+            else:
+                del self.queues[user_id]
+            self.busy = True
+            self.current = job
+            return job
+
+    def _work(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            try:
+                rest = _run(job)
+                if rest:
+                    # The rest of the job goes first in its user's queue, behind the other users
+                    self.put(rest, front=True)
+            except Exception as e:
+                print(f"Background sync worker error: {str(e)}")
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.current = None
+                    self.condition.notify_all()
+                _update_depth_gauge()
+
+
+def init_calendar_sync(flask_app=None):
+    """Start the sync shards and dispatcher, resuming jobs left by a restart - call during app startup"""
+    global app_instance, _dispatcher, _scheduler
+    if flask_app:
+        app_instance = flask_app
+    with _shards_lock:
+        if _shards:
+            return
+        _stop.clear()
+        workers = max(1, app_instance.config.get('CALENDAR_SYNC_WORKERS', 4))
+        for index in range(workers):
+            shard = _Shard(index)
+            shard.thread.start()
+            _shards.append(shard)
+        _dispatcher = threading.Thread(target=_dispatch_loop, name='calendar-sync-dispatcher', daemon=True)
+        _dispatcher.start()
+        if app_instance.config.get('CALENDAR_SCHEDULE_ENABLED', True):
+            _scheduler = threading.Thread(target=_schedule_loop, name='calendar-sync-scheduler', daemon=True)
+            _scheduler.start()
+        atexit.register(shutdown_calendar_sync)
+    print(f"Background Google Calendar sync workers started ({workers} shards)")
+
+
+def shard_for(user_id: str) -> int:
+    """Stable shard index for a user"""
+    return zlib.crc32(str(user_id).encode('utf-8')) % len(_shards)
+
+
+def queue_calendar_sync(action: str, user_id: str, task_id: str, course_id: str = None,
+                        google_event_id: str = None, params: Dict[str, Any] = None,
+                        debounce_seconds: float = None) -> Tuple[str, bool]:
+    """Record a sync/delete/import for background processing.
+
+    Returns (job id, created); created is False when the request was merged into a
+    pending job. Runs on its own connection and commits immediately, independent of
+    the caller's session.
+    """
+    config = app_instance.config if app_instance else {}
+    if debounce_seconds is None:
+        debounce_seconds = config.get('CALENDAR_SYNC_DEBOUNCE_SECONDS', 2)
+    debounce = timedelta(seconds=debounce_seconds)
+    max_delay = timedelta(seconds=config.get('CALENDAR_SYNC_MAX_DELAY_SECONDS', 30))
+    now = datetime.utcnow()
+    table = CalendarSyncJob.__table__
+    stmt = insert(table).values(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        task_id=task_id,
+        course_id=course_id,
+        action=action,
+        google_event_id=google_event_id,
+        params=params,
+        dedupe_key=CalendarSyncJob.build_dedupe_key(user_id, task_id, action, google_event_id, params),
+        status=CalendarSyncJob.STATUS_PENDING,
+        attempts=0,
+        run_after=now + debounce,
+        created_at=now,
+        updated_at=now
+    )
+    # Merge into the pending job for the same (user, task, action): push it back, within max_delay
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.dedupe_key],
+        index_where=table.c.status == CalendarSyncJob.STATUS_PENDING,
+        set_={
+            'course_id': db.func.coalesce(stmt.excluded.course_id, table.c.course_id),
+            'run_after': db.func.least(stmt.excluded.run_after, table.c.created_at + max_delay),
+            'updated_at': now
+        }
+    ).returning(table.c.id, db.literal_column('xmax = 0'))
+    with db.engine.begin() as connection:
+        job_id, created = connection.execute(stmt).one()
+    metrics.increment('calendar_sync.jobs_queued' if created else 'calendar_sync.jobs_merged')
+    return job_id, bool(created)
+
+
+def sync_status() -> Dict[str, Any]:
+    """Queue depth per shard and whether the workers are running"""
+    return {
+        'accepting': not _stop.is_set(),
+        'queue_size': sum(shard.depth for shard in _shards),
+        'pending': CalendarSyncJob.query.filter_by(status=CalendarSyncJob.STATUS_PENDING).count(),
+        'shards': [{
+            'index': shard.index,
+            'queued': shard.depth,
+            'users': len(shard.queues),
+            'busy': shard.busy,
+            'alive': shard.thread.is_alive()
+        } for shard in _shards]
+    }
+
+
+def shutdown_calendar_sync(timeout: float = None) -> bool:
+    """Stop claiming jobs and let the workers finish theirs; True when everything drained"""
+    if not _shards or _stop.is_set():
+        return True
+    if timeout is None:
+        timeout = app_instance.config.get('CALENDAR_SYNC_DRAIN_TIMEOUT', 30) if app_instance else 30
+    _stop.set()
+    deadline = time.monotonic() + timeout
+    for thread in (_dispatcher, _scheduler):
+        if thread:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+    for shard in _shards:
+        with shard.condition:
+            shard.condition.notify_all()
+            while (shard.queues or shard.busy) and time.monotonic() < deadline:
+                shard.condition.wait(timeout=max(0.0, min(1.0, deadline - time.monotonic())))
+
+    unstarted = [job['id'] for shard in _shards for job in shard.take_all()]
+    if unstarted and app_instance:
+        with app_instance.app_context():
+            try:
+                _release(unstarted)
+            finally:
+                db.session.remove()
+        print(f"Calendar sync stopped with {len(unstarted)} jobs returned to the queue")
+    for shard in _shards:
+        shard.thread.join(timeout=max(0.0, deadline - time.monotonic()))
+    return not unstarted
+
+
+def _update_depth_gauge():
+    metrics.set_gauge('calendar_sync.queue_depth', sum(shard.depth for shard in _shards))
+
+
+def _dispatch_loop():
+    """Claim due jobs into the shards until shutdown"""
+    poll_seconds = app_instance.config.get('CALENDAR_SYNC_POLL_SECONDS', 1.0)
+    stale_seconds = app_instance.config.get('CALENDAR_SYNC_STALE_SECONDS', 120)
+    last_heartbeat = 0.0
+    last_recovery = 0.0
+    last_prune = 0.0
+    while not _stop.is_set():
+        with app_instance.app_context():
+            try:
+                now = time.monotonic()
+                if now - last_heartbeat >= stale_seconds / 4:
+                    send_heartbeat()
+                    last_heartbeat = now
+                if now - last_recovery >= stale_seconds / 2:
+                    recover_stale_jobs(stale_seconds)
+                    last_recovery = now
+                if now - last_prune >= PRUNE_INTERVAL_SECONDS:
+                    prune_finished_jobs()
+                    last_prune = now
+                _claim_due_jobs()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Calendar sync dispatcher error: {str(e)}")
+            finally:
+                db.session.remove()
+        _stop.wait(poll_seconds)
+
+
+def _claim_due_jobs() -> int:
+    capacity = len(_shards) * 4 - sum(shard.depth for shard in _shards)
+    if capacity <= 0:
+        return 0
+    if not db.session.execute(db.select(db.func.pg_try_advisory_xact_lock(CLAIM_ADVISORY_LOCK_KEY))).scalar():
+        db.session.rollback()
+        return 0  # Another process is claiming right now
+
+    busy_users = db.select(CalendarSyncJob.user_id).where(CalendarSyncJob.status == CalendarSyncJob.STATUS_RUNNING)
+    now = datetime.utcnow()
+    jobs = CalendarSyncJob.query.filter(
+        CalendarSyncJob.status == CalendarSyncJob.STATUS_PENDING,
+        CalendarSyncJob.run_after <= now,
+        CalendarSyncJob.user_id.not_in(busy_users)
+    ).order_by(CalendarSyncJob.created_at).limit(capacity).with_for_update(skip_locked=True).all()
+    for job in jobs:
+        job.status = CalendarSyncJob.STATUS_RUNNING
+        job.locked_by = _worker_id
+        job.attempts += 1
+        job.updated_at = now
+    claimed = [{
+        'id': job.id,
+        'action': job.action,
+        'user_id': job.user_id,
+        'task_id': job.task_id,
+        'course_id': job.course_id,
+        'google_event_id': job.google_event_id,
+        'params': job.params or {},
+        'attempts': job.attempts,
+        'after_id': None  # Set on the rest of a job that is synced in slices
+    } for job in jobs]
+    waits = [(now - job.run_after).total_seconds() * 1000 for job in jobs]
+    db.session.commit()
+
+    for job, wait_ms in zip(claimed, waits):
+        metrics.observe('calendar_sync.queue_wait_ms', wait_ms)
+        _shards[shard_for(job['user_id'])].put(job)
+    _update_depth_gauge()
+    return len(claimed)
+
+
+def _held_job_ids() -> List[str]:
+    return [job_id for shard in _shards for job_id in shard.held_ids()]
+
+
+def send_heartbeat() -> int:
+    """Refresh updated_at on every job this process's shards hold, queued or running"""
+    held = _held_job_ids()
+    if not held:
+        return 0
+    updated = CalendarSyncJob.query.filter(
+        CalendarSyncJob.id.in_(held),
+        CalendarSyncJob.locked_by == _worker_id,
+        CalendarSyncJob.status == CalendarSyncJob.STATUS_RUNNING
+    ).update({CalendarSyncJob.updated_at: datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def recover_stale_jobs(stale_seconds: int = 120) -> int:
+    """Return running jobs whose process stopped sending heartbeats to pending"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    query = db.session.query(CalendarSyncJob.id).filter(
+        CalendarSyncJob.status == CalendarSyncJob.STATUS_RUNNING,
+        CalendarSyncJob.updated_at < cutoff
+    )
+    # Never take back what this process still holds, even if its heartbeat lagged
+    held = _held_job_ids()
+    if held:
+        query = query.filter(CalendarSyncJob.id.not_in(held))
+    stale_ids = [row[0] for row in query]
+    if stale_ids:
+        _release(stale_ids)
+        metrics.increment('calendar_sync.jobs_recovered', len(stale_ids))
+        print(f"Recovered {len(stale_ids)} interrupted calendar sync jobs")
+    return len(stale_ids)
+
+
+def prune_finished_jobs(retention_hours: int = None) -> int:
+    """Delete completed and failed jobs older than CALENDAR_SYNC_RETENTION_HOURS"""
+    if retention_hours is None:
+        retention_hours = app_instance.config.get('CALENDAR_SYNC_RETENTION_HOURS', 72)
+    deleted = CalendarSyncJob.query.filter(
+        CalendarSyncJob.status.in_([CalendarSyncJob.STATUS_COMPLETED, CalendarSyncJob.STATUS_FAILED]),
+        CalendarSyncJob.finished_at < datetime.utcnow() - timedelta(hours=retention_hours)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def _supersede(job: CalendarSyncJob):
+    """A newer request for the same thing is already pending and will do this job's work"""
+    job.status = CalendarSyncJob.STATUS_COMPLETED
+    job.finished_at = datetime.utcnow()
+    job.last_error = 'Superseded by a newer request'
+
+
+def _release(job_ids: List[str]):
+    """Put claimed jobs back to pending"""
+    for job_id in job_ids:
+        job = CalendarSyncJob.query.get(job_id)
+        if not job or job.status != CalendarSyncJob.STATUS_RUNNING:
+            continue
+        try:
+            with db.session.begin_nested():
+                job.status = CalendarSyncJob.STATUS_PENDING
+                job.locked_by = None
+                job.run_after = datetime.utcnow()
+        except IntegrityError:
+            _supersede(CalendarSyncJob.query.get(job_id))
+    db.session.commit()
+
+
+def _run(job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Run one slice of a job; returns the rest of the job when subtasks are left"""
+    with app_instance.app_context():
+        started = time.perf_counter()
+        try:
+            result = None
+            if job['action'] == CalendarSyncJob.ACTION_DELETE:
+                _delete_event(job)
+                rest = None
+            elif job['action'] == CalendarSyncJob.ACTION_IMPORT:
+                result = _import_events(job)
+                rest = None
+            else:
+                rest = _sync_task_slice(job)
+            metrics.increment('calendar_sync.slices_completed')
+            _finish(job, rest is not None, result)
+            return rest
+        except Exception as e:
+            db.session.rollback()
+            print(f"Background sync failed for task {job['task_id']}: {str(e)}")
+            _retry(job, e)
+            return None
+        finally:
+            metrics.observe('calendar_sync.slice_ms', (time.perf_counter() - started) * 1000)
+            db.session.remove()
+
+
+def _finish(job: Dict[str, Any], more: bool, result: Dict[str, Any] = None):
+    """Record a heartbeat between slices, or mark the job completed after the last one"""
+    now = datetime.utcnow()
+    values = {CalendarSyncJob.updated_at: now}
+    if not more:
+        values.update({
+            CalendarSyncJob.status: CalendarSyncJob.STATUS_COMPLETED,
+            CalendarSyncJob.finished_at: now,
+            CalendarSyncJob.last_error: None,
+            CalendarSyncJob.result: result
+        })
+        metrics.increment('calendar_sync.jobs_completed')
+    CalendarSyncJob.query.filter_by(id=job['id']).update(values, synchronize_session=False)
+    db.session.commit()
+    if not more and job['action'] == CalendarSyncJob.ACTION_IMPORT:
+        _emit_import_update(job, CalendarSyncJob.STATUS_COMPLETED, result=result)
+
+
+def _retry(job: Dict[str, Any], error: Exception):
+    """Schedule another attempt with exponential backoff and jitter, or give up"""
+    config = app_instance.config
+    record = CalendarSyncJob.query.get(job['id'])
+    if not record:
+        return
+    record.last_error = str(error)[:2000]
+    if job['attempts'] >= config.get('CALENDAR_SYNC_MAX_ATTEMPTS', 6):
+        record.status = CalendarSyncJob.STATUS_FAILED
+        record.finished_at = datetime.utcnow()
+        db.session.commit()
+        metrics.increment('calendar_sync.jobs_failed')
+        if job['action'] == CalendarSyncJob.ACTION_IMPORT:
+            _emit_import_update(job, CalendarSyncJob.STATUS_FAILED, error=record.last_error)
+        return
+    delay = min(
+        config.get('CALENDAR_SYNC_BACKOFF_SECONDS', 30) * 2 ** (job['attempts'] - 1),
+        config.get('CALENDAR_SYNC_BACKOFF_MAX_SECONDS', 3600)
+    )
+    try:
+        with db.session.begin_nested():
+            record.status = CalendarSyncJob.STATUS_PENDING
+            record.locked_by = None
+            record.run_after = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+        metrics.increment('calendar_sync.jobs_retried')
+    except IntegrityError:
+        _supersede(CalendarSyncJob.query.get(job['id']))
+    db.session.commit()
+
+
+def _emit_import_update(job: Dict[str, Any], status: str, progress: Dict[str, Any] = None,
+                        result: Dict[str, Any] = None, error: str = None):
+    try:
+        socketio.emit('calendar_sync_update', {
+            'job_id': job['id'], 'status': status, 'progress': progress, 'result': result, 'error': error
+        }, room=job['user_id'])
+    except Exception as e:
+        print(f"Failed to emit calendar sync update for {job['id']}: {str(e)}")
+
+
+def _import_events(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Pull the user's Google events into their Google Calendar course, recording progress per page"""
+    from ..routes.calendar import sync_google_events
+
+    user = User.query.get(job['user_id'])
+    if not user or not user.google_refresh_token:
+        return {'skipped': 'Google Calendar not connected'}
+    full_sync = bool(job['params'].get('full_sync'))
+
+    def report(progress: Dict[str, Any]):
+        # Doubles as the running job's heartbeat
+        CalendarSyncJob.query.filter_by(id=job['id']).update({
+            CalendarSyncJob.progress: progress,
+            CalendarSyncJob.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        _emit_import_update(job, CalendarSyncJob.STATUS_RUNNING, progress=progress)
+
+    try:
+        result = sync_google_events(user, full_sync=full_sync, progress=report)
+    except ValueError as e:
+        if "re-authenticate" in str(e):
+            print(f"❌ User {user.id} needs to re-authenticate with Google Calendar, dropping import")
+            return {'skipped': 'Google Calendar needs to be reconnected'}
+        raise
+    if full_sync and not user.calendar_synced:
+        user.calendar_synced = True
+        db.session.commit()
+    return result
+
+
+def _schedule_loop():
+    """Queue incremental imports for connected users until shutdown"""
+    tick_seconds = app_instance.config.get('CALENDAR_SCHEDULE_TICK_SECONDS', 30)
+    # Stagger processes started together
+    _stop.wait(random.uniform(0, tick_seconds))
+    while not _stop.is_set():
+        with app_instance.app_context():
+            try:
+                schedule_imports()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Calendar sync scheduler error: {str(e)}")
+            finally:
+                db.session.remove()
+        _stop.wait(tick_seconds)
+
+
+def user_import_interval(user_id: str, config=None) -> float:
+    """Seconds between scheduled imports for a user: the interval, jittered by a fixed per-user amount"""
+    config = config or app_instance.config
+    interval = config.get('CALENDAR_SCHEDULE_INTERVAL_SECONDS', 900)
+    jitter = config.get('CALENDAR_SCHEDULE_JITTER', 0.2)
+    fraction = zlib.crc32(f"schedule:{user_id}".encode('utf-8')) / 0xFFFFFFFF
+    return interval * (1 - jitter + 2 * jitter * fraction)
+
+
+def schedule_imports() -> int:
+    """Queue incremental imports for users whose interval has passed, within the per-minute budget"""
+    config = app_instance.config
+    if not db.session.execute(db.select(db.func.pg_try_advisory_xact_lock(SCHEDULE_ADVISORY_LOCK_KEY))).scalar():
+        db.session.rollback()
+        return 0  # Another process is scheduling right now
+
+    now = datetime.utcnow()
+    is_import = CalendarSyncJob.action == CalendarSyncJob.ACTION_IMPORT
+    # Budget shared by every process: imports started in the last minute, manual ones included
+    started_last_minute = CalendarSyncJob.query.filter(
+        is_import, CalendarSyncJob.created_at >= now - timedelta(minutes=1)
+    ).count()
+    budget = config.get('CALENDAR_SCHEDULE_MAX_PER_MINUTE', 60) - started_last_minute
+    if budget <= 0:
+        db.session.rollback()
+        metrics.increment('calendar_sync.schedule_throttled')
+        return 0
+
+    shortest = timedelta(seconds=config.get('CALENDAR_SCHEDULE_INTERVAL_SECONDS', 900)
+                         * (1 - config.get('CALENDAR_SCHEDULE_JITTER', 0.2)))
+    last_import = db.select(
+        CalendarSyncJob.user_id, db.func.max(CalendarSyncJob.created_at).label('last_at')
+    ).where(is_import).group_by(CalendarSyncJob.user_id).subquery()
+    active_import = db.select(CalendarSyncJob.id).where(
+        is_import,
+        CalendarSyncJob.user_id == User.id,
+        CalendarSyncJob.status.in_([CalendarSyncJob.STATUS_PENDING, CalendarSyncJob.STATUS_RUNNING])
+    ).exists()
+    candidates = db.session.query(User.id, last_import.c.last_at).outerjoin(
+        last_import, last_import.c.user_id == User.id
+    ).filter(
+        User.google_refresh_token.isnot(None),
+        User.calendar_synced.is_(True),
+        db.or_(last_import.c.last_at.is_(None), last_import.c.last_at <= now - shortest),
+        ~active_import
+    ).order_by(last_import.c.last_at.asc().nullsfirst()).limit(budget * 4).all()
+    db.session.rollback()  # Release the lock's transaction before queueing
+
+    queued = 0
+    for user_id, last_at in candidates:
+        if queued >= budget:
+            break
+        if last_at and (now - last_at).total_seconds() < user_import_interval(user_id, config):
+            continue
+        queue_calendar_sync(CalendarSyncJob.ACTION_IMPORT, user_id, CalendarSyncJob.IMPORT_TASK_ID,
+                            params={'full_sync': False}, debounce_seconds=0)
+        queued += 1
+    if queued:
+        metrics.increment('calendar_sync.imports_scheduled', queued)
+    return queued
+
+
+class _EventRef:
+    """Just enough of a Goal for delete_task_from_google_calendar"""
+
+    def __init__(self, task_id, event_id, calendar_id=None):
+        self.task_id = task_id
+        self.google_event_id = event_id
+        self.google_calendar_id = calendar_id
+
+
+def _delete_event(job: Dict[str, Any]):
+    from ..routes.calendar import delete_task_from_google_calendar
+
+    user = User.query.get(job['user_id'])
+    if not job['google_event_id']:
+        return
+    if not user or not user.google_access_token:
+        print(f"Cannot delete Google Calendar event: user {job['user_id']} not found or no access token")
+        return
+    print(f"Starting deletion of Google Calendar event: {job['google_event_id']} for task {job['task_id']}")
+    if not delete_task_from_google_calendar(user, _EventRef(job['task_id'], job['google_event_id'])):
+        raise CalendarSyncError(f"Could not delete event {job['google_event_id']}")
+
+
+def _sync_task_slice(job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    from ..routes.calendar import sync_subtasks_to_google_calendar
+
+    user = User.query.get(job['user_id'])
+    if not user or not user.google_access_token:
+        print(f"Skipping sync for user {job['user_id']}: no Google access token")
+        return None
+
+    # Read the subtasks now rather than when queued, so edits made since are included
+    slice_size = max(1, app_instance.config.get('CALENDAR_SYNC_SLICE', 50))
+    query = Goal.query.filter(
+        Goal.task_id == job['task_id'],
+        Goal.user_id == job['user_id'],
+        Goal.start_time.isnot(None),
+        Goal.end_time.isnot(None)
+    )
+    if job['after_id']:
+        query = query.filter(Goal.id > job['after_id'])
+    subtasks = query.order_by(Goal.id).limit(slice_size + 1).all()
+    if not subtasks:
+        if not job['after_id']:
+            print(f"No timed subtasks found for task {job['task_id']}, skipping sync")
+        return None
+
+    course_id = job['course_id']
+    course = Course.query.get(course_id) if course_id else None
+    course_title = course.title if course else str(course_id) if course_id else "CourseMate Tasks"
+
+    # One slice is written with batched requests (one per GOOGLE_API_BATCH_SIZE events)
+    batch = subtasks[:slice_size]
+    try:
+        success_count, failed_count = sync_subtasks_to_google_calendar(user, batch, course_title)
+    except ValueError as e:
+        if "re-authenticate" in str(e):
+            print(f"❌ User {user.id} needs to re-authenticate with Google Calendar, dropping sync")
+            return None
+        raise
+    metrics.increment('calendar_sync.subtasks_synced', success_count)
+    print(f"✅ Google Calendar sync for task {job['task_id']}: {success_count}/{len(batch)} subtasks synced")
+    if failed_count:
+        # A retry syncs the whole task again; events that did sync are updated in place
+        raise CalendarSyncError(f"{failed_count} of {len(batch)} subtasks failed to sync")
+
+    if len(subtasks) > slice_size:
+        return dict(job, after_id=batch[-1].id)
+    return None
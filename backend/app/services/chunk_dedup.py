@@ -0,0 +1,189 @@
+"""
+Ingest-time de-duplication of material chunks.
+
+Copies of a shared course, and files uploaded more than once, produce the same
+chunk text over and over. Instead of embedding and storing a vector for each
+copy, chunks point at a SharedEmbedding row that is reference counted:
+
+  1. exact duplicates are found by content hash (one query per file)
+  2. remaining chunks are compared by SimHash band to catch near duplicates
+  3. only what is left is embedded, in a single batched API call
+
+Rows whose ref_count falls to zero are removed by prune_unreferenced().
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert, BIT
+from ..models.shared_embedding import SharedEmbedding
+from ..models.material_chunk import MaterialChunk
+from ..extensions import db
+from ..utils import metrics
+from ..utils.text_fingerprint import (
+    content_hash, simhash, simhash_bands, to_signed64, SIMHASH_BITS
+)
+from .embedding_migration import embed_texts
+from ..models.embedding_version import LEGACY_EMBEDDING_MODEL
+
+
+class ChunkDeduplicator:
+    """Resolves chunk texts to shared embeddings, embedding only content not stored yet"""
+
+    def __init__(self, model: str = None, config=None):
+        config = config or current_app.config
+        self.enabled = config.get('CHUNK_DEDUP_ENABLED', True)
+        self.max_distance = config.get('CHUNK_SIMHASH_MAX_DISTANCE', 3)
+        self.model = model or LEGACY_EMBEDDING_MODEL  # shared_embeddings is a legacy column
+
+    def resolve(self, texts: List[str]) -> List[Tuple[int, str]]:
+        """Return (shared_embedding_id, content_hash) for each text and take a reference on it.
+
+        Runs inside the caller's transaction; the caller commits.
+        """
+        hashes = [content_hash(text) for text in texts]
+        text_by_hash = dict(zip(hashes, texts))
+        shared_ids: Dict[str, int] = {}
+
+        # 1. Exact duplicates
+        if text_by_hash:
+            rows = db.session.query(SharedEmbedding.id, SharedEmbedding.content_hash).filter(
+                SharedEmbedding.model == self.model,
+                SharedEmbedding.content_hash.in_(list(text_by_hash))
+            ).all()
+            shared_ids.update({digest: shared_id for shared_id, digest in rows})
+        exact_hits = len(shared_ids)
+
+        # 2. Near duplicates
+        to_embed = []
+        for digest, text in text_by_hash.items():
+            if digest in shared_ids:
+                continue
+            fingerprint = simhash(text)
+            near = self._find_near_duplicate(fingerprint)
+            if near:
+                shared_ids[digest] = near
+            else:
+                to_embed.append((digest, text, fingerprint))
+        near_hits = len(shared_ids) - exact_hits
+
+        # 3. Embed what is genuinely new
+        if to_embed:
+            embeddings = embed_texts([text for _, text, _ in to_embed], self.model)
+            for (digest, _, fingerprint), embedding in zip(to_embed, embeddings):
+                shared_ids[digest] = self._insert(digest, fingerprint, embedding)
+
+        for shared_id, references in Counter(shared_ids[digest] for digest in hashes).items():
+            SharedEmbedding.query.filter_by(id=shared_id).update(
+                {SharedEmbedding.ref_count: SharedEmbedding.ref_count + references},
+                synchronize_session=False
+            )
+
+        metrics.increment('chunk_dedup.chunks', len(texts))
+        metrics.increment('chunk_dedup.exact_hits', len(texts) - len(text_by_hash) + exact_hits)
+        metrics.increment('chunk_dedup.near_hits', near_hits)
+        metrics.increment('chunk_dedup.embedded', len(to_embed))
+        return [(shared_ids[digest], digest) for digest in hashes]
+
+    def _find_near_duplicate(self, fingerprint: int) -> Optional[int]:
+        if self.max_distance <= 0:
+            return None
+        bands = simhash_bands(fingerprint)
+        # Hamming distance in SQL (set bits of the XOR), so every band match is considered
+        # and the closest one wins, however many rows share a common band value
+        differing_bits = db.cast(SharedEmbedding.simhash.op('#')(to_signed64(fingerprint)), BIT(SIMHASH_BITS))
+        distance = db.func.length(db.func.replace(db.cast(differing_bits, db.Text), '0', ''))
+        return db.session.query(SharedEmbedding.id).filter(
+            SharedEmbedding.model == self.model,
+            db.or_(
+                SharedEmbedding.simhash_band0 == bands[0],
+                SharedEmbedding.simhash_band1 == bands[1],
+                SharedEmbedding.simhash_band2 == bands[2],
+                SharedEmbedding.simhash_band3 == bands[3]
+            ),
+            distance <= self.max_distance
+        ).order_by(distance, SharedEmbedding.id).limit(1).scalar()
+
+    def _insert(self, digest: str, fingerprint: int, embedding: List[float]) -> int:
+        bands = simhash_bands(fingerprint)
+        stmt = insert(SharedEmbedding).values(
+            model=self.model,
+            content_hash=digest,
+            simhash=to_signed64(fingerprint),
+            simhash_band0=bands[0],
+            simhash_band1=bands[1],
+            simhash_band2=bands[2],
+            simhash_band3=bands[3],
+            embedding=embedding,
+            ref_count=0,
+            byte_size=SharedEmbedding.vector_bytes(embedding)
+        )
+        # A concurrent upload may have stored the same text first; use its row
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_shared_embeddings_hash_model',
+            set_={'content_hash': stmt.excluded.content_hash}
+        ).returning(SharedEmbedding.id)
+        return db.session.execute(stmt).scalar()
+
+    def backfill(self, batch_size: int = 500) -> Dict[str, int]:
+        """Move inline chunk embeddings into the shared store, collapsing duplicates.
+
+        Reuses the vectors already stored, so no embedding API calls are made.
+        """
+        moved = 0
+        last_id = 0
+        while True:
+            chunks = MaterialChunk.query.filter(
+                MaterialChunk.id > last_id,
+                MaterialChunk.shared_embedding_id.is_(None),
+                MaterialChunk.embedding.isnot(None)
+            ).order_by(MaterialChunk.id).limit(batch_size).all()
+            if not chunks:
+                break
+
+            for chunk in chunks:
+                digest = content_hash(chunk.chunk_text)
+                shared = SharedEmbedding.query.filter_by(model=self.model, content_hash=digest).first()
+                shared_id = shared.id if shared else self._insert(digest, simhash(chunk.chunk_text), chunk.embedding)
+                SharedEmbedding.query.filter_by(id=shared_id).update(
+                    {SharedEmbedding.ref_count: SharedEmbedding.ref_count + 1}, synchronize_session=False
+                )
+                chunk.content_hash = digest
+                chunk.shared_embedding_id = shared_id
+                chunk.embedding = None
+            db.session.commit()
+            moved += len(chunks)
+            last_id = chunks[-1].id
+            print(f"Moved {moved} chunk embeddings into the shared store")
+        return {'chunks_moved': moved}
+
+    def prune_unreferenced(self) -> int:
+        """Delete shared embeddings no chunk points at any more"""
+        referenced = db.select(MaterialChunk.shared_embedding_id).where(MaterialChunk.shared_embedding_id.isnot(None))
+        deleted = SharedEmbedding.query.filter(
+            SharedEmbedding.ref_count <= 0,
+            ~SharedEmbedding.id.in_(referenced)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+def dedup_report() -> Dict[str, Any]:
+    """How much vector storage sharing saves compared with one vector per chunk"""
+    shared_rows, references, stored_bytes, saved_bytes = db.session.query(
+        db.func.count(SharedEmbedding.id),
+        db.func.coalesce(db.func.sum(SharedEmbedding.ref_count), 0),
+        db.func.coalesce(db.func.sum(SharedEmbedding.byte_size), 0),
+        db.func.coalesce(db.func.sum(
+            db.case((SharedEmbedding.ref_count > 1, (SharedEmbedding.ref_count - 1) * SharedEmbedding.byte_size), else_=0)
+        ), 0)
+    ).one()
+    inline_chunks = MaterialChunk.query.filter(MaterialChunk.embedding.isnot(None)).count()
+    return {
+        'shared_embeddings': shared_rows,
+        'shared_references': int(references),
+        'inline_embeddings': inline_chunks,
+        'stored_bytes': int(stored_bytes),
+        'bytes_saved': int(saved_bytes),
+        'dedup_ratio': round(int(references) / shared_rows, 3) if shared_rows else 0.0,
+        'embedding_calls_saved': metrics.counter_value('chunk_dedup.exact_hits') + metrics.counter_value('chunk_dedup.near_hits')
+    }
@@ -0,0 +1,132 @@
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+import openai
+from ..models.conversation import Conversation
+from ..models.conversation_message import ConversationMessage
+from ..extensions import db
+
+# One worker keeps summary updates for a conversation strictly ordered
+summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='conversation-summary')
+_pending_lock = threading.Lock()
+_pending_conversations = set()
+
+
+def load_conversation_memory(conversation: Conversation, recent_limit: int = None) -> Tuple[Optional[str], List[Dict]]:
+    """Return (running summary, every turn after it oldest-first) without loading the full history.
+
+    The summary only advances in CONVERSATION_SUMMARY_BATCH steps, so the raw turns reach back
+    to where it stops rather than just the last recent_limit; nothing falls in between. If
+    summarizing falls behind, the raw turns are capped at recent_limit + 2 batches.
+    """
+    config = current_app.config
+    if recent_limit is None:
+        recent_limit = config.get('CONVERSATION_RECENT_MESSAGES', 6)
+    max_turns = recent_limit + 2 * config.get('CONVERSATION_SUMMARY_BATCH', 6)
+
+    query = ConversationMessage.query.filter_by(conversation_id=conversation.id)
+    unsummarized = query.count() - (conversation.summarized_message_count or 0)
+    limit = min(max(recent_limit, unsummarized), max_turns)
+    recent = query.order_by(ConversationMessage.created_at.desc()).limit(limit).all()
+
+    turns = [{'role': msg.message_type, 'content': msg.content} for msg in reversed(recent)]
+    return conversation.summary, turns
+
+
+def schedule_summary_update(conversation_id: str):
+    """Queue a background refresh of the conversation's running summary"""
+    with _pending_lock:
+        if conversation_id in _pending_conversations:
+            return
+        _pending_conversations.add(conversation_id)
+    app = current_app._get_current_object()
+    summary_executor.submit(_run_summary_update, app, conversation_id)
+
+
+def _run_summary_update(app, conversation_id: str):
+    with _pending_lock:
+        _pending_conversations.discard(conversation_id)
+    with app.app_context():
+        try:
+            update_conversation_summary(conversation_id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error updating summary for conversation {conversation_id}: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def update_conversation_summary(conversation_id: str) -> bool:
+    """Fold turns that have aged out of the recent window into the stored summary.
+
+    Runs only once at least CONVERSATION_SUMMARY_BATCH unsummarized turns have
+    aged out, so the summary costs one small completion every few turns. Until
+    then load_conversation_memory still sends those turns raw.
+    """
+    conversation = Conversation.query.get(conversation_id)
+    if not conversation:
+        return False
+
+    recent_limit = current_app.config.get('CONVERSATION_RECENT_MESSAGES', 6)
+    batch_size = current_app.config.get('CONVERSATION_SUMMARY_BATCH', 6)
+    summarized = conversation.summarized_message_count or 0
+
+    total = ConversationMessage.query.filter_by(conversation_id=conversation_id).count()
+    summarize_until = total - recent_limit
+    if summarize_until - summarized < batch_size:
+        return False
+
+    messages = ConversationMessage.query.filter_by(
+        conversation_id=conversation_id
+    ).order_by(
+        ConversationMessage.created_at.asc()
+    ).offset(summarized).limit(summarize_until - summarized).all()
+    if not messages:
+        return False
+
+    new_summary = _summarize(conversation.summary, messages)
+    if not new_summary:
+        return False
+
+    # Only apply if no other update moved the summary forward meanwhile
+    updated = Conversation.query.filter_by(
+        id=conversation_id, summarized_message_count=conversation.summarized_message_count
+    ).update({
+        Conversation.summary: new_summary,
+        Conversation.summarized_message_count: summarized + len(messages),
+        Conversation.summary_updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    return bool(updated)
+
+
+def _summarize(existing_summary: Optional[str], messages: List[ConversationMessage]) -> Optional[str]:
+    transcript = "\n".join(
+        f"{'Student' if msg.message_type == 'user' else 'Tutor'}: {msg.content}" for msg in messages
+    )
+    prompt = f"""Current summary of the tutoring conversation so far:
+{existing_summary or "(none yet)"}
+
+New turns to fold into the summary:
+{transcript}
+
+Write the updated summary. Keep the topics covered, the student's questions and misunderstandings, key explanations and any decisions or follow-ups. Stay under 250 words and write it as notes, not a transcript."""
+
+    openai.api_key = openai.api_key or os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_KEY')
+    try:
+        response = openai.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You maintain concise running notes of a conversation between a student and an AI tutor."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=400,
+            temperature=0.2
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error summarizing conversation: {str(e)}")
+        return None
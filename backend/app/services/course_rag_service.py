@@ -1,10 +1,17 @@
 import os
+import time
 from typing import List, Dict, Any, Tuple
 from .document_processor import DocumentProcessor
 from .rag_service import RAGService
+from .semantic_cache import SemanticAnswerCacheService
+from .embedding_migration import course_embedding_model, legacy_embedding_model, store_versioned_embeddings
+from ..models.embedding_version import ChunkEmbeddingVersion
 from ..models.uploaded_file import UploadedFile
 from ..models.material_chunk import MaterialChunk
+from ..models.shared_embedding import SharedEmbedding
 from ..extensions import db
+from ..utils import metrics
+from ..utils.chunking import clean_text
 import openai
 
 class CourseRAGService(RAGService):
@@ -13,26 +20,40 @@ class CourseRAGService(RAGService):
     def __init__(self, openai_api_key: str = None):
         super().__init__(openai_api_key)
         self.course_document_processor = CourseDocumentProcessor(openai_api_key)
-    def answer_question_for_course(self, question: str, course_id: str, user_id: str, top_k: int = 5, conversation_context: List[Dict] = None) -> Dict[str, Any]:
-        """Answer a question using course-specific materials with optional conversation context"""
+    def answer_question_for_course(self, question: str, course_id: str, user_id: str, top_k: int = 5, conversation_context: List[Dict] = None, conversation_summary: str = None) -> Dict[str, Any]:
+        """Answer a question using course-specific materials with optional conversation context
+        
+        conversation_summary is the running summary of turns older than conversation_context.
+        """
         try:
             print(f"DEBUG: answer_question_for_course called with course_id: {course_id}, user_id: {user_id}, question: {question}")
             
+            # Answers that build on earlier turns are specific to that conversation,
+            # so only standalone questions go through the semantic answer cache
+            answer_cache = None
+            if not conversation_summary and (not conversation_context or len(conversation_context) <= 1):
+                answer_cache = SemanticAnswerCacheService()
+            
+            # The question must be embedded with the model the course's chunks are searched with
+            embedding_model = course_embedding_model(course_id)
+            query_embedding = None
+            try:
+                with metrics.timer('rag.embed'):
+                    query_embedding = self.course_document_processor.get_embedding(question, model=embedding_model)
+            except Exception as e:
+                print(f"Error embedding question for course {course_id}: {str(e)}")
+            
             # Step 1: Retrieve relevant chunks from course materials
-            relevant_chunks = self.course_document_processor.similarity_search_for_course(
-                question, course_id, user_id, top_k
-            )
+            with metrics.timer('rag.search'):
+                relevant_chunks = self.course_document_processor.similarity_search_for_course(
+                    question, course_id, user_id, top_k, query_embedding=query_embedding,
+                    embedding_model=embedding_model
+                )
             
             if not relevant_chunks:
                 # Handle when no course materials are available - provide conversational, general help
                 # Step: Prepare conversation history for general response
-                conversation_history = ""
-                if conversation_context and len(conversation_context) > 1:  # More than just current message
-                    history_parts = []
-                    for msg in conversation_context[:-1]:  # Exclude current message
-                        role = "Human" if msg['role'] == 'user' else "Assistant"
-                        history_parts.append(f"{role}: {msg['content']}")
-                    conversation_history = "\n\n".join(history_parts)
+                conversation_history = self._format_conversation_history(conversation_context, conversation_summary)
                 
                 # Step: Generate a conversational response for general questions
                 general_prompt = f"""You are a friendly, knowledgeable AI tutor and study companion. A student is asking you a question.
@@ -78,7 +99,25 @@ Remember: Be helpful and encouraging while being transparent about the lack of c
                         "context_used": 0
                     }
             
+            if answer_cache and query_embedding is not None:
+                with metrics.timer('rag.cache_lookup'):
+                    cached = answer_cache.lookup(course_id, query_embedding, relevant_chunks, embedding_model)
+                if cached:
+                    entry, similarity, mode = cached
+                    answer = entry.answer
+                    if mode == SemanticAnswerCacheService.ADAPT:
+                        answer = self._adapt_cached_answer(question, entry.question, entry.answer)
+                    return {
+                        "answer": answer,
+                        "source_files": entry.source_files or list({filename for _, _, filename in relevant_chunks}),
+                        "confidence": entry.confidence,
+                        "context_used": len(relevant_chunks),
+                        "cache": mode,
+                        "cache_similarity": similarity
+                    }
+            
             # Step 2: Prepare context from retrieved chunks
+            prompt_started = time.perf_counter()
             context_parts = []
             source_files = set()
             
@@ -89,13 +128,7 @@ Remember: Be helpful and encouraging while being transparent about the lack of c
             context = "\n\n".join(context_parts)
             
             # Step 3: Prepare conversation context if provided
-            conversation_history = ""  # Initialize the variable
-            if conversation_context and len(conversation_context) > 1:  # More than just current message
-                history_parts = []
-                for msg in conversation_context[:-1]:  # Exclude current message
-                    role = "Human" if msg['role'] == 'user' else "Assistant"
-                    history_parts.append(f"{role}: {msg['content']}")
-                conversation_history = "\n\n".join(history_parts)
+            conversation_history = self._format_conversation_history(conversation_context, conversation_summary)
             
             # Step 4: Generate answer using GPT with course context and conversation history
             if conversation_history:
@@ -149,27 +182,33 @@ Instructions for your response:
 
 Please provide a helpful, conversational response:"""
             
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a warm, knowledgeable AI tutor who helps students with both course-specific questions (using their uploaded materials) and general academic questions. Always be conversational, encouraging, and thorough in your explanations."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.4
-            )
+            metrics.observe('rag.prompt_build', (time.perf_counter() - prompt_started) * 1000)
+            
+            with metrics.timer('rag.completion'):
+                response = openai.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You are a warm, knowledgeable AI tutor who helps students with both course-specific questions (using their uploaded materials) and general academic questions. Always be conversational, encouraging, and thorough in your explanations."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=800,
+                    temperature=0.4
+                )
             
             answer = response.choices[0].message.content
             
             # Calculate average confidence based on similarity scores
             avg_similarity = sum(1 - dist for _, dist, _ in relevant_chunks) / len(relevant_chunks)
             
-            return {
+            result = {
                 "answer": answer,
                 "source_files": list(source_files),
                 "confidence": avg_similarity,
                 "context_used": len(relevant_chunks)
             }
+            if answer_cache and query_embedding is not None:
+                answer_cache.store(course_id, question, query_embedding, relevant_chunks, result, embedding_model)
+            return result
             
         except Exception as e:
             print(f"Error answering question for course {course_id}: {str(e)}")
@@ -180,6 +219,41 @@ Please provide a helpful, conversational response:"""
                 "context_used": 0
             }
 
+    def _format_conversation_history(self, conversation_context: List[Dict] = None, conversation_summary: str = None) -> str:
+        """Render the summary of older turns and the recent turns (minus the current message) for the prompt"""
+        history_parts = []
+        if conversation_summary:
+            history_parts.append(f"Summary of earlier conversation: {conversation_summary}")
+        if conversation_context and len(conversation_context) > 1:  # More than just current message
+            for msg in conversation_context[:-1]:  # Exclude current message
+                role = "Human" if msg['role'] == 'user' else "Assistant"
+                history_parts.append(f"{role}: {msg['content']}")
+        return "\n\n".join(history_parts)
+    
+    def _adapt_cached_answer(self, question: str, cached_question: str, cached_answer: str) -> str:
+        """Rephrase a cached answer to a near-identical question instead of regenerating it from the materials"""
+        try:
+            response = openai.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a warm, knowledgeable AI tutor. You adapt an existing answer to a student's slightly different wording without adding new facts."},
+                    {"role": "user", "content": f"""A student previously asked: {cached_question}
+
+The answer they received:
+{cached_answer}
+
+Another student now asks: {question}
+
+Rewrite the answer so it directly addresses the new question. Keep the facts and references to the course materials, drop anything that no longer applies, and keep the same friendly tone."""}
+                ],
+                max_tokens=800,
+                temperature=0.2
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Error adapting cached answer: {str(e)}")
+            return cached_answer
+
 
 class CourseDocumentProcessor(DocumentProcessor):
     """Extended document processor for course-specific materials"""
@@ -205,23 +279,18 @@ class CourseDocumentProcessor(DocumentProcessor):
             # Chunk the text
             chunks = self.chunk_text(text)
             
-            # Process each chunk
-            for i, chunk_text in enumerate(chunks):
-                # Clean chunk text
-                chunk_text = self._clean_text(chunk_text)
-                
-                if chunk_text.strip():  # Only process non-empty chunks
-                    # Generate embedding
-                    embedding = self.get_embedding(chunk_text)
-                    
-                    # Create chunk record
-                    chunk = MaterialChunk(
-                        file_id=uploaded_file.id,
-                        chunk_index=i,
-                        chunk_text=chunk_text,
-                        embedding=embedding
-                    )
-                    db.session.add(chunk)
+            # Chunks of cleaned text are already clean; keep original indexes and skip empty ones
+            indexed_chunks = [(i, chunk_text) for i, chunk_text in enumerate(chunks) if chunk_text.strip()]
+            
+            # Embed and store the chunks (duplicates of stored text reuse its embedding)
+            stored_chunks = self._store_chunks(uploaded_file.id, indexed_chunks)
+            
+            # Also embed with any model a migration is moving to, so cut-over courses see this file
+            db.session.flush()
+            store_versioned_embeddings(
+                ChunkEmbeddingVersion.SOURCE_MATERIAL_CHUNK,
+                [(chunk.id, chunk.chunk_text) for chunk in stored_chunks]
+            )
             
             db.session.commit()
             return uploaded_file
@@ -233,20 +302,14 @@ class CourseDocumentProcessor(DocumentProcessor):
     
     def _clean_text(self, text: str) -> str:
         """Clean text by removing null characters and other problematic characters"""
-        if not text:
-            return ""
-        
-        # Remove null characters and other control characters
-        cleaned_text = text.replace('\x00', '')  # Remove NUL characters
-        cleaned_text = ''.join(char for char in cleaned_text if ord(char) >= 32 or char in '\n\r\t')
-        
-        # Remove excessive whitespace
-        cleaned_text = ' '.join(cleaned_text.split())
-        
-        return cleaned_text
+        return clean_text(text)
     
-    def similarity_search_for_course(self, query: str, course_id: str, user_id: str, top_k: int = 5) -> List[Tuple[MaterialChunk, float, str]]:
-        """Perform similarity search against stored chunks for a specific course"""
+    def similarity_search_for_course(self, query: str, course_id: str, user_id: str, top_k: int = 5, query_embedding: List[float] = None, embedding_model: str = None) -> List[Tuple[MaterialChunk, float, str]]:
+        """Perform similarity search against stored chunks for a specific course
+        
+        Pass query_embedding when the caller already embedded the query to avoid a second API call;
+        it must come from embedding_model, which defaults to the course's current embedding model.
+        """
         try:
             print(f"DEBUG: Searching for materials - course_id: {course_id}, user_id: {user_id}, query: {query}")
             
@@ -266,21 +329,36 @@ class CourseDocumentProcessor(DocumentProcessor):
             ).count()
             print(f"DEBUG: Found {chunk_count} material chunks for course {course_id}")
             
+            if embedding_model is None:
+                embedding_model = course_embedding_model(course_id)
+            
             # Get query embedding
-            query_embedding = self.get_embedding(query)
+            if query_embedding is None:
+                query_embedding = self.get_embedding(query, model=embedding_model)
+            
+            if embedding_model != legacy_embedding_model():
+                results = self._versioned_search_for_course(course_id, user_id, top_k, query_embedding, embedding_model)
+                if results:
+                    return results
+                # Nothing re-embedded yet for this course: fall back to the legacy vectors
+                print(f"DEBUG: No {embedding_model} embeddings for course {course_id}, using legacy embeddings")
+                query_embedding = self.get_embedding(query)
             
             # Query chunks that belong to files from the specific course
+            distance = MaterialChunk.embedding_expression().cosine_distance(query_embedding)
             results_query = db.session.query(
                 MaterialChunk,
-                MaterialChunk.embedding.cosine_distance(query_embedding).label('distance'),
+                distance.label('distance'),
                 UploadedFile.filename
             ).join(
                 UploadedFile, MaterialChunk.file_id == UploadedFile.id
+            ).outerjoin(
+                SharedEmbedding, MaterialChunk.shared_embedding_id == SharedEmbedding.id
             ).filter(
                 UploadedFile.course_id == course_id,
                 UploadedFile.user_id == user_id
             ).order_by(
-                MaterialChunk.embedding.cosine_distance(query_embedding)
+                distance
             ).limit(top_k)
             
             results = []
@@ -295,6 +373,27 @@ class CourseDocumentProcessor(DocumentProcessor):
             print(f"Error performing course similarity search: {str(e)}")
             return []
     
+    def _versioned_search_for_course(self, course_id: str, user_id: str, top_k: int, query_embedding: List[float], embedding_model: str) -> List[Tuple[MaterialChunk, float, str]]:
+        """Similarity search over chunk embeddings produced by a migrated-to model"""
+        distance = ChunkEmbeddingVersion.embedding.cosine_distance(query_embedding)
+        results_query = db.session.query(
+            MaterialChunk,
+            distance.label('distance'),
+            UploadedFile.filename
+        ).join(
+            UploadedFile, MaterialChunk.file_id == UploadedFile.id
+        ).join(
+            ChunkEmbeddingVersion, db.and_(
+                ChunkEmbeddingVersion.source == ChunkEmbeddingVersion.SOURCE_MATERIAL_CHUNK,
+                ChunkEmbeddingVersion.source_id == MaterialChunk.id,
+                ChunkEmbeddingVersion.model == embedding_model
+            )
+        ).filter(
+            UploadedFile.course_id == course_id,
+            UploadedFile.user_id == user_id
+        ).order_by(distance).limit(top_k)
+        return [(chunk, distance, filename) for chunk, distance, filename in results_query]
+    
     def get_course_materials_count(self, course_id: str, user_id: str) -> int:
         """Get the number of materials uploaded for a specific course"""
         try:
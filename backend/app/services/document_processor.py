@@ -5,7 +5,10 @@ import docx
 from typing import List, Tuple
 from ..models.uploaded_file import UploadedFile
 from ..models.material_chunk import MaterialChunk
+from ..models.shared_embedding import SharedEmbedding
+from ..models.embedding_version import LEGACY_EMBEDDING_MODEL
 from ..extensions import db
+from ..utils.chunking import chunk_by_characters
 
 class DocumentProcessor:
     def __init__(self, openai_api_key: str = None):
@@ -53,43 +56,17 @@ class DocumentProcessor:
         return text
     
     def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """Split text into chunks with overlap"""
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            
-            # If this isn't the last chunk, try to end at a sentence boundary
-            if end < len(text):
-                # Look for sentence endings within the last 100 characters
-                for i in range(end - 100, end):
-                    if i > start and text[i] in '.!?\n':
-                        end = i + 1
-                        break
-            
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            # Move start position (with overlap)
-            start = end - overlap
-            if start >= len(text):
-                break
-        
-        return chunks
+        """Split text into chunks with overlap, ending chunks at sentence boundaries where possible"""
+        return chunk_by_characters(text, chunk_size, overlap)
     
-    def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using OpenAI API"""
+    def get_embedding(self, text: str, model: str = None) -> List[float]:
+        """Get embedding for text using OpenAI API (the legacy model unless model is given)"""
         if not self.openai_api_key:
             raise ValueError("OpenAI API key not configured")
         
         try:
             response = openai.embeddings.create(
-                model="text-embedding-ada-002",
+                model=model or LEGACY_EMBEDDING_MODEL,
                 input=text
             )
             return response.data[0].embedding
@@ -114,19 +91,8 @@ class DocumentProcessor:
             # Chunk the text
             chunks = self.chunk_text(text)
             
-            # Process each chunk
-            for i, chunk_text in enumerate(chunks):
-                # Generate embedding
-                embedding = self.get_embedding(chunk_text)
-                
-                # Create chunk record
-                chunk = MaterialChunk(
-                    file_id=uploaded_file.id,
-                    chunk_index=i,
-                    chunk_text=chunk_text,
-                    embedding=embedding  # pgvector will handle the list automatically
-                )
-                db.session.add(chunk)
+            # Embed and store each chunk
+            self._store_chunks(uploaded_file.id, list(enumerate(chunks)))
             
             db.session.commit()
             return uploaded_file
@@ -136,6 +102,37 @@ class DocumentProcessor:
             print(f"Error processing file {filename}: {str(e)}")
             raise
     
+    def _store_chunks(self, file_id: int, indexed_chunks: List[Tuple[int, str]]) -> List[MaterialChunk]:
+        """Create MaterialChunk rows for (chunk_index, text) pairs.
+        
+        With chunk de-duplication on, chunks reference a shared embedding and only text that is
+        not stored yet is embedded; otherwise each chunk gets its own inline embedding.
+        """
+        from .chunk_dedup import ChunkDeduplicator
+        
+        deduplicator = ChunkDeduplicator()
+        stored = []
+        if deduplicator.enabled:
+            resolved = deduplicator.resolve([chunk_text for _, chunk_text in indexed_chunks])
+            for (i, chunk_text), (shared_embedding_id, digest) in zip(indexed_chunks, resolved):
+                stored.append(MaterialChunk(
+                    file_id=file_id,
+                    chunk_index=i,
+                    chunk_text=chunk_text,
+                    content_hash=digest,
+                    shared_embedding_id=shared_embedding_id
+                ))
+        else:
+            for i, chunk_text in indexed_chunks:
+                stored.append(MaterialChunk(
+                    file_id=file_id,
+                    chunk_index=i,
+                    chunk_text=chunk_text,
+                    embedding=self.get_embedding(chunk_text)  # pgvector will handle the list automatically
+                ))
+        db.session.add_all(stored)
+        return stored
+    
     def similarity_search(self, query: str, top_k: int = 5) -> List[Tuple[MaterialChunk, float, str]]:
         """Perform similarity search against stored chunks"""
         try:
@@ -147,14 +144,17 @@ class DocumentProcessor:
             from pgvector.sqlalchemy import Vector
             
             # Query using ORM with distance function and filename
+            distance = MaterialChunk.embedding_expression().cosine_distance(query_embedding)
             results_query = db.session.query(
                 MaterialChunk,
-                MaterialChunk.embedding.cosine_distance(query_embedding).label('distance'),
+                distance.label('distance'),
                 UploadedFile.filename
             ).join(
                 UploadedFile, MaterialChunk.file_id == UploadedFile.id
+            ).outerjoin(
+                SharedEmbedding, MaterialChunk.shared_embedding_id == SharedEmbedding.id
             ).order_by(
-                MaterialChunk.embedding.cosine_distance(query_embedding)
+                distance
             ).limit(top_k)
             
             results = []
@@ -0,0 +1,309 @@
+"""
+Background re-embedding of stored chunks into a new embedding model.
+
+A migration walks material_chunks and document_embeddings in id order, embeds
+each batch with the target model and writes the vectors to
+chunk_embedding_versions. The legacy columns are never touched, so searches
+keep working on the old model throughout. The highest id done is checkpointed
+in the same transaction as the vectors, so a restart or pause resumes exactly
+where it stopped.
+
+While a migration exists, newly ingested chunks are embedded with its target
+model as well (dual write). Once it completes a course can be cut over with
+set_course_embedding_model(); from then on its searches read the versioned
+vectors, and cutting back to the legacy model is just removing the switch.
+
+Every serving process resumes running migrations at startup, but a migration
+is only worked on by the process holding its advisory lock for the whole run;
+the others wait on standby and take over if that process goes away.
+"""
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+import openai
+from ..models.embedding_version import (
+    ChunkEmbeddingVersion, EmbeddingMigration, CourseEmbeddingModel, LEGACY_EMBEDDING_MODEL
+)
+from ..models.material_chunk import MaterialChunk
+from ..models.document_embedding import DocumentEmbedding
+from ..extensions import db
+from ..utils import metrics
+from ..utils.advisory_locks import EMBEDDING_MIGRATION_LOCK_NAMESPACE
+
+MAX_BATCH_RETRIES = 3
+
+app_instance = None  # Store the Flask app instance
+_threads_lock = threading.Lock()
+_running_migrations = set()
+
+
+def legacy_embedding_model() -> str:
+    """Model whose vectors live in the original embedding columns (fixed, not a setting)"""
+    return LEGACY_EMBEDDING_MODEL
+
+
+def embed_texts(texts: List[str], model: str) -> List[List[float]]:
+    """Embed a batch of texts with one API call"""
+    openai.api_key = openai.api_key or os.getenv('OPENAI_API_KEY') or os.getenv('OPENAI_KEY')
+    response = openai.embeddings.create(model=model, input=texts)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def course_embedding_model(course_id: str) -> str:
+    """Model a course's searches should use - the legacy model unless the course was cut over"""
+    switch = CourseEmbeddingModel.query.get(course_id) if course_id else None
+    return switch.model if switch else legacy_embedding_model()
+
+
+def dual_write_models() -> List[str]:
+    """Models new chunks must also be embedded with: targets of unfinished or completed migrations"""
+    legacy = legacy_embedding_model()
+    rows = db.session.query(EmbeddingMigration.target_model).filter(
+        EmbeddingMigration.status != EmbeddingMigration.STATUS_FAILED
+    ).distinct().all()
+    return [model for (model,) in rows if model != legacy]
+
+
+def store_versioned_embeddings(source: str, rows: Iterable[Tuple[int, str]]):
+    """Embed freshly ingested (id, text) rows with every dual-write model.
+
+    Called inside the ingest transaction; the caller commits.
+    """
+    rows = [(source_id, text) for source_id, text in rows if text and text.strip()]
+    if not rows:
+        return
+    for model in dual_write_models():
+        embeddings = embed_texts([text for _, text in rows], model)
+        _upsert_versions(source, model, [source_id for source_id, _ in rows], embeddings)
+
+
+def _upsert_versions(source: str, model: str, source_ids: List[int], embeddings: List[List[float]]):
+    if not source_ids:
+        return
+    stmt = insert(ChunkEmbeddingVersion).values([
+        {'source': source, 'source_id': source_id, 'model': model,
+         'embedding': embedding, 'created_at': datetime.utcnow()}
+        for source_id, embedding in zip(source_ids, embeddings)
+    ])
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_chunk_embedding_versions_source_model',
+        set_={'embedding': stmt.excluded.embedding, 'created_at': stmt.excluded.created_at}
+    )
+    db.session.execute(stmt)
+
+
+def start_embedding_migration(target_model: str, batch_size: int = None,
+                              throttle_seconds: float = None) -> EmbeddingMigration:
+    """Create a migration into target_model (or return the unfinished one) and start it"""
+    if not target_model:
+        raise ValueError('target_model is required')
+    if target_model == legacy_embedding_model():
+        raise ValueError(f'{target_model} is already the legacy embedding model')
+
+    migration = EmbeddingMigration.query.filter(
+        EmbeddingMigration.target_model == target_model,
+        EmbeddingMigration.status.in_([EmbeddingMigration.STATUS_RUNNING, EmbeddingMigration.STATUS_PAUSED])
+    ).first()
+    if migration:
+        return resume_embedding_migration(migration.id)
+
+    migration = EmbeddingMigration(
+        target_model=target_model,
+        status=EmbeddingMigration.STATUS_RUNNING,
+        batch_size=batch_size or current_app.config.get('EMBEDDING_MIGRATION_BATCH_SIZE', 100),
+        throttle_seconds=(throttle_seconds if throttle_seconds is not None
+                          else current_app.config.get('EMBEDDING_MIGRATION_THROTTLE_SECONDS', 1.0)),
+        total_count=MaterialChunk.query.count() + DocumentEmbedding.query.count()
+    )
+    db.session.add(migration)
+    db.session.commit()
+    _spawn(migration.id)
+    return migration
+
+
+def pause_embedding_migration(migration_id: int) -> Optional[EmbeddingMigration]:
+    """Ask the worker to stop after its current batch; progress is kept"""
+    migration = EmbeddingMigration.query.get(migration_id)
+    if migration and migration.status == EmbeddingMigration.STATUS_RUNNING:
+        migration.status = EmbeddingMigration.STATUS_PAUSED
+        db.session.commit()
+    return migration
+
+
+def resume_embedding_migration(migration_id: int) -> Optional[EmbeddingMigration]:
+    """Continue a paused or failed migration from its checkpoints"""
+    migration = EmbeddingMigration.query.get(migration_id)
+    if not migration or migration.status == EmbeddingMigration.STATUS_COMPLETED:
+        return migration
+    migration.status = EmbeddingMigration.STATUS_RUNNING
+    migration.error = None
+    db.session.commit()
+    _spawn(migration.id)
+    return migration
+
+
+def set_course_embedding_model(course_id: str, model: str, force: bool = False) -> str:
+    """Cut a course's searches over to model (or back to the legacy model).
+
+    Cutting over requires a completed migration into model unless force is set.
+    """
+    from .semantic_cache import SemanticAnswerCacheService
+
+    legacy = legacy_embedding_model()
+    switch = CourseEmbeddingModel.query.get(course_id)
+    if model == legacy:
+        if switch:
+            db.session.delete(switch)
+    else:
+        completed = EmbeddingMigration.query.filter_by(
+            target_model=model, status=EmbeddingMigration.STATUS_COMPLETED
+        ).first()
+        if not completed and not force:
+            raise ValueError(f'No completed embedding migration into {model}')
+        if switch:
+            switch.model = model
+        else:
+            db.session.add(CourseEmbeddingModel(course_id=course_id, model=model))
+    db.session.commit()
+
+    # Cached answers are keyed by question embeddings from the previous model
+    SemanticAnswerCacheService().invalidate_course(course_id)
+    return model
+
+
+def init_embedding_migrations(flask_app=None):
+    """Resume migrations that were running when the process stopped - call during app startup"""
+    global app_instance
+    if flask_app:
+        app_instance = flask_app
+    with app_instance.app_context():
+        running = EmbeddingMigration.query.filter_by(status=EmbeddingMigration.STATUS_RUNNING).all()
+        for migration in running:
+            _spawn(migration.id)
+        if running:
+            print(f"Resumed {len(running)} embedding migrations")
+
+
+def _spawn(migration_id: int):
+    global app_instance
+    if app_instance is None:
+        app_instance = current_app._get_current_object()
+    with _threads_lock:
+        if migration_id in _running_migrations:
+            return
+        _running_migrations.add(migration_id)
+    thread = threading.Thread(target=_run_migration, args=(migration_id,),
+                              name=f'embedding-migration-{migration_id}', daemon=True)
+    thread.start()
+
+
+def _run_migration(migration_id: int):
+    try:
+        with app_instance.app_context():
+            with db.engine.connect() as lock_connection:
+                if not _acquire_migration_lock(lock_connection, migration_id):
+                    return
+                try:
+                    _migrate_until_stopped(migration_id)
+                finally:
+                    lock_connection.execute(db.select(
+                        db.func.pg_advisory_unlock(EMBEDDING_MIGRATION_LOCK_NAMESPACE, migration_id)
+                    ))
+                    lock_connection.commit()
+    finally:
+        with _threads_lock:
+            _running_migrations.discard(migration_id)
+
+
+def _acquire_migration_lock(lock_connection, migration_id: int) -> bool:
+    """Wait until this process holds the migration's lock; False once it is no longer running.
+
+    Another process holding the lock is running the migration, so this one stands by and
+    only takes over if that process stops while the migration is still running.
+    """
+    retry_seconds = app_instance.config.get('EMBEDDING_MIGRATION_LOCK_RETRY_SECONDS', 30)
+    while True:
+        acquired = lock_connection.execute(db.select(
+            db.func.pg_try_advisory_lock(EMBEDDING_MIGRATION_LOCK_NAMESPACE, migration_id)
+        )).scalar()
+        lock_connection.commit()  # The session-level lock outlives the transaction
+        if acquired:
+            return True
+        status = db.session.query(EmbeddingMigration.status).filter_by(id=migration_id).scalar()
+        db.session.remove()
+        if status != EmbeddingMigration.STATUS_RUNNING:
+            return False
+        time.sleep(retry_seconds)
+
+
+def _migrate_until_stopped(migration_id: int):
+    """Run batches until the migration completes, fails or is paused; the caller holds its lock"""
+    failures = 0
+    while True:
+        migration = EmbeddingMigration.query.get(migration_id)
+        if not migration or migration.status != EmbeddingMigration.STATUS_RUNNING:
+            return
+        try:
+            with metrics.timer('embedding_migration.batch'):
+                done = _migrate_next_batch(migration)
+            failures = 0
+        except Exception as e:
+            db.session.rollback()
+            failures += 1
+            print(f"Error in embedding migration {migration_id} (attempt {failures}): {str(e)}")
+            if failures >= MAX_BATCH_RETRIES:
+                EmbeddingMigration.query.filter_by(id=migration_id).update({
+                    EmbeddingMigration.status: EmbeddingMigration.STATUS_FAILED,
+                    EmbeddingMigration.error: str(e)
+                }, synchronize_session=False)
+                db.session.commit()
+                return
+            time.sleep(2 ** failures)
+            continue
+
+        if done == 0:
+            migration.status = EmbeddingMigration.STATUS_COMPLETED
+            migration.completed_at = datetime.utcnow()
+            db.session.commit()
+            print(f"Embedding migration {migration_id} into {migration.target_model} completed")
+            return
+        throttle = migration.throttle_seconds
+        db.session.remove()  # Release the connection while sleeping
+        time.sleep(throttle)
+
+
+def _migrate_next_batch(migration: EmbeddingMigration) -> int:
+    """Re-embed the next batch after the checkpoints; returns rows done (0 when finished)"""
+    chunks = MaterialChunk.query.with_entities(MaterialChunk.id, MaterialChunk.chunk_text).filter(
+        MaterialChunk.id > migration.last_material_chunk_id
+    ).order_by(MaterialChunk.id).limit(migration.batch_size).all()
+    if chunks:
+        _embed_batch(migration, ChunkEmbeddingVersion.SOURCE_MATERIAL_CHUNK, chunks)
+        migration.last_material_chunk_id = chunks[-1][0]
+        done = len(chunks)
+    else:
+        documents = DocumentEmbedding.query.with_entities(DocumentEmbedding.id, DocumentEmbedding.content_chunk).filter(
+            DocumentEmbedding.id > migration.last_document_embedding_id
+        ).order_by(DocumentEmbedding.id).limit(migration.batch_size).all()
+        if not documents:
+            return 0
+        _embed_batch(migration, ChunkEmbeddingVersion.SOURCE_DOCUMENT_EMBEDDING, documents)
+        migration.last_document_embedding_id = documents[-1][0]
+        done = len(documents)
+
+    migration.processed_count = (migration.processed_count or 0) + done
+    # Vectors and checkpoint commit together, so a crash never skips or half-writes a batch
+    db.session.commit()
+    metrics.increment('embedding_migration.rows', done)
+    return done
+
+
+def _embed_batch(migration: EmbeddingMigration, source: str, rows):
+    rows = [(source_id, text) for source_id, text in rows if text and text.strip()]
+    if rows:
+        embeddings = embed_texts([text for _, text in rows], migration.target_model)
+        _upsert_versions(source, migration.target_model, [source_id for source_id, _ in rows], embeddings)
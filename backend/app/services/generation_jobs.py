@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from flask import current_app
+from ..models.generation_job import GenerationJob
+from ..models.user import User
+from ..extensions import db, socketio
+
+# Background executor for generation jobs, created by init_generation_workers()
+job_executor = None
+app_instance = None  # Store the Flask app instance
+heartbeat_thread = None
+_executor_lock = threading.Lock()
+_job_handlers: Dict[str, Callable[[GenerationJob], Dict[str, Any]]] = {}
+_uncapped_job_types: Set[str] = set()  # Housekeeping jobs outside GENERATION_MAX_JOBS_PER_USER
+_worker_id = f"{socket.gethostname()}:{os.getpid()}"
+_owned_jobs: Set[str] = set()  # Jobs queued or running in this process's executor
+_owned_lock = threading.Lock()
+
+
+class GenerationLimitError(Exception):
+    """Raised when a user already has the maximum number of generation jobs in flight"""
+
+
+class GenerationFailedError(Exception):
+    """Raised when a generator reports an error instead of a result"""
+
+
+def job_handler(job_type: str, counts_toward_limit: bool = True):
+    """Register the function that produces the result for a job type.
+
+    Jobs that do not count toward the limit (e.g. indexing an upload) are never
+    refused and do not take a slot from the user's generations.
+    """
+    def decorator(func):
+        _job_handlers[job_type] = func
+        if not counts_toward_limit:
+            _uncapped_job_types.add(job_type)
+        return func
+    return decorator
+
+
+def init_generation_workers(flask_app=None):
+    """Start the generation executor and the heartbeat that takes over abandoned jobs - call during app startup"""
+    global app_instance, job_executor, heartbeat_thread
+    if flask_app:
+        app_instance = flask_app
+    with _executor_lock:
+        if job_executor is None:
+            max_workers = app_instance.config.get('GENERATION_WORKERS', 4)
+            job_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='generation')
+            print(f"Background generation workers started ({max_workers} threads)")
+        if heartbeat_thread is None or not heartbeat_thread.is_alive():
+            heartbeat_thread = threading.Thread(target=_heartbeat_loop, name='generation-heartbeat', daemon=True)
+            heartbeat_thread.start()
+
+
+def _heartbeat_loop():
+    """Keep this process's jobs fresh and take over jobs whose process stopped sending heartbeats"""
+    interval = app_instance.config.get('GENERATION_HEARTBEAT_SECONDS', 30)
+    stale_seconds = app_instance.config.get('GENERATION_STALE_SECONDS', 120)
+    while True:
+        with app_instance.app_context():
+            try:
+                send_heartbeat()
+                recover_stale_jobs(stale_seconds)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Generation heartbeat error: {str(e)}")
+            finally:
+                db.session.remove()
+        time.sleep(interval)
+
+
+def send_heartbeat() -> int:
+    """Refresh heartbeat_at on every job this process holds"""
+    with _owned_lock:
+        job_ids = list(_owned_jobs)
+    if not job_ids:
+        return 0
+    updated = GenerationJob.query.filter(
+        GenerationJob.id.in_(job_ids),
+        GenerationJob.locked_by == _worker_id,
+        GenerationJob.status.in_(GenerationJob.ACTIVE_STATUSES)
+    ).update({GenerationJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def recover_stale_jobs(stale_seconds: int = 120) -> int:
+    """Requeue, in this process, queued or running jobs left behind by a process that stopped"""
+    with _owned_lock:
+        owned = list(_owned_jobs)
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    query = GenerationJob.query.filter(
+        GenerationJob.status.in_(GenerationJob.ACTIVE_STATUSES),
+        db.or_(GenerationJob.heartbeat_at.is_(None), GenerationJob.heartbeat_at < cutoff)
+    )
+    if owned:
+        query = query.filter(GenerationJob.id.not_in(owned))
+    # SKIP LOCKED: when several processes recover at once each job goes to exactly one of them
+    stale = query.with_for_update(skip_locked=True).all()
+    now = datetime.utcnow()
+    for job in stale:
+        job.status = GenerationJob.STATUS_QUEUED
+        job.progress = 0
+        job.locked_by = _worker_id
+        job.heartbeat_at = now
+    db.session.commit()
+    for job in stale:
+        _submit(job.id)
+    if stale:
+        print(f"Resumed {len(stale)} interrupted generation jobs")
+    return len(stale)
+
+
+def _submit(job_id: str):
+    with _owned_lock:
+        _owned_jobs.add(job_id)
+    job_executor.submit(_run_job, job_id)
+
+
+def build_idempotency_key(job_type: str, course_id: Optional[str], params: Dict[str, Any]) -> str:
+    """Derive a stable key from the job inputs so duplicate submits attach to the same job"""
+    payload = json.dumps({'job_type': job_type, 'course_id': course_id, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def submit_generation_job(user_id: str, job_type: str, params: Dict[str, Any], course_id: str = None,
+                          idempotency_key: str = None) -> Tuple[GenerationJob, bool]:
+    """Create (or reuse) a generation job and queue it.
+
+    With a client supplied idempotency key any earlier non-failed job with that key is returned,
+    including completed ones, so retrying a request never generates twice. Without one, the key is
+    derived from the inputs and only an in-flight job is reused.
+
+    Returns (job, created).
+    """
+    if job_type not in _job_handlers:
+        raise ValueError(f"Unknown generation job type: {job_type}")
+
+    # Lock the user's row so concurrent submits check the cap (and reuse jobs) one at a time
+    User.query.filter_by(id=user_id).with_for_update().first()
+
+    query = GenerationJob.query.filter_by(user_id=user_id)
+    if idempotency_key:
+        existing = query.filter(
+            GenerationJob.idempotency_key == idempotency_key,
+            GenerationJob.status != GenerationJob.STATUS_FAILED
+        ).order_by(GenerationJob.created_at.desc()).first()
+    else:
+        idempotency_key = build_idempotency_key(job_type, course_id, params)
+        existing = query.filter(
+            GenerationJob.idempotency_key == idempotency_key,
+            GenerationJob.status.in_(GenerationJob.ACTIVE_STATUSES)
+        ).first()
+    if existing:
+        db.session.commit()
+        return existing, False
+
+    if job_type not in _uncapped_job_types:
+        max_jobs = current_app.config.get('GENERATION_MAX_JOBS_PER_USER', 2)
+        active_count = query.filter(
+            GenerationJob.status.in_(GenerationJob.ACTIVE_STATUSES),
+            GenerationJob.job_type.not_in(_uncapped_job_types)
+        ).count()
+        if active_count >= max_jobs:
+            db.session.rollback()
+            raise GenerationLimitError(f"You already have {active_count} generation jobs in progress. Please wait for one to finish.")
+
+    job = GenerationJob(
+        user_id=user_id,
+        course_id=course_id,
+        job_type=job_type,
+        idempotency_key=idempotency_key,
+        params=params,
+        status=GenerationJob.STATUS_QUEUED,
+        progress=0,
+        locked_by=_worker_id,
+        heartbeat_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    if job_executor is None:
+        init_generation_workers(current_app._get_current_object())
+    _submit(job.id)
+    _emit_job_update(job)
+    return job, True
+
+
+def update_job_progress(job: GenerationJob, progress: int):
+    """Persist and broadcast progress for a running job (handlers may call this)"""
+    job.progress = max(0, min(100, int(progress)))
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+    _emit_job_update(job)
+
+
+def _emit_job_update(job: GenerationJob):
+    try:
+        socketio.emit('generation_job_update', job.to_dict(), room=job.user_id)
+    except Exception as e:
+        print(f"Failed to emit generation job update for {job.id}: {str(e)}")
+
+
+def _run_job(job_id: str):
+    """Executor entry point: claim the job, run its handler and store the outcome"""
+    with app_instance.app_context():
+        try:
+            # Claim atomically so a job is never generated twice; a job another process
+            # took over after our heartbeat lapsed is no longer locked_by us
+            now = datetime.utcnow()
+            claimed = GenerationJob.query.filter_by(
+                id=job_id, status=GenerationJob.STATUS_QUEUED, locked_by=_worker_id
+            ).update({
+                GenerationJob.status: GenerationJob.STATUS_RUNNING,
+                GenerationJob.started_at: now,
+                GenerationJob.heartbeat_at: now,
+                GenerationJob.progress: 10
+            }, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                return
+
+            job = GenerationJob.query.get(job_id)
+            _emit_job_update(job)
+            try:
+                result = _job_handlers[job.job_type](job)
+                # Generators report failures as {'error': ...} rather than raising
+                if isinstance(result, dict) and result.get('error'):
+                    raise GenerationFailedError(result['error'])
+                job.result = result
+                job.status = GenerationJob.STATUS_COMPLETED
+                job.progress = 100
+            except Exception as e:
+                print(f"Generation job {job_id} ({job.job_type}) failed: {str(e)}")
+                db.session.rollback()
+                job = GenerationJob.query.get(job_id)
+                job.status = GenerationJob.STATUS_FAILED
+                job.error = getattr(e, 'message', None) or str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            _emit_job_update(job)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Generation worker error for job {job_id}: {str(e)}")
+        finally:
+            with _owned_lock:
+                _owned_jobs.discard(job_id)
+            db.session.remove()
+
+
+@job_handler('quiz')
+def _generate_quiz(job: GenerationJob) -> Dict[str, Any]:
+    from .rag_service import RAGService
+    params = job.params or {}
+    events = RAGService().generate_quiz_stream(
+        topic=params.get('topic'),
+        num_questions=params.get('num_questions', 5),
+        question_type=params.get('type', 'multiple_choice'),
+        question_config=params.get('question_config')
+    )
+
+    # Forward each question as it completes so the client can render before the quiz is done
+    questions = []
+    rejected = []
+    total = 0
+    for event in events:
+        if event['type'] == 'start':
+            total = event['total']
+        elif event['type'] == 'question':
+            questions.append(event['question'])
+            _emit_quiz_event(job, 'generation_job_question', {
+                'index': event['index'],
+                'question': event['question']
+            })
+            if total:
+                update_job_progress(job, 10 + 85 * len(questions) / total)
+        elif event['type'] == 'invalid_question':
+            # Kept out of the quiz, but reported so the client knows it came up short
+            rejected.append({'index': event['index'], 'errors': event['errors']})
+            _emit_quiz_event(job, 'generation_job_invalid_question', {
+                'index': event['index'],
+                'errors': event['errors']
+            })
+        elif event['type'] == 'error':
+            raise GenerationFailedError(event['message'])
+        elif event['type'] == 'done':
+            if not questions:
+                raise GenerationFailedError(
+                    f"No valid quiz questions were generated ({event['invalid']} invalid, "
+                    f"{event.get('parse_errors', 0)} malformed)"
+                )
+            return {
+                'questions': questions,
+                'topic': event['topic'],
+                'invalid_questions': event['invalid'],
+                'rejected_questions': rejected,
+                'malformed_questions': event.get('parse_errors', 0),
+                'first_question_ms': event['first_question_ms']
+            }
+    raise GenerationFailedError('Quiz generation ended before it finished')
+
+
+def _emit_quiz_event(job: GenerationJob, event_name: str, payload: Dict[str, Any]):
+    try:
+        socketio.emit(event_name, dict(payload, job_id=job.id), room=job.user_id)
+    except Exception as e:
+        print(f"Failed to emit {event_name} for job {job.id}: {str(e)}")
+
+
+@job_handler('flashcards')
+def _generate_flashcards(job: GenerationJob) -> Dict[str, Any]:
+    from .rag_service import RAGService
+    params = job.params or {}
+    return RAGService().generate_flashcards(params.get('topic'), params.get('num_cards', 10))
+
+
+@job_handler('summary')
+def _generate_summary(job: GenerationJob) -> Dict[str, Any]:
+    from .rag_service import RAGService
+    params = job.params or {}
+    return RAGService().generate_summary(params.get('topic'))
+
+
+@job_handler('study_plan')
+def _generate_study_plan(job: GenerationJob) -> Dict[str, Any]:
+    from .study_plan_service import StudyPlanService
+    params = job.params or {}
+    return StudyPlanService().generate(
+        course_id=job.course_id,
+        user_id=job.user_id,
+        goal_title=params.get('goal_title'),
+        goal_description=params.get('goal_description', ''),
+        document_filename=params.get('document_filename')
+    )
@@ -0,0 +1,283 @@
+"""
+Set-based editing of a goal's tasks and subtasks.
+
+PUT /api/goals/<id> and PUT /api/goals/<id>/tasks receive a goal's task list
+with nested subtasks. Walking it with nested loops, linear lookups and queries
+inside the loop cost hundreds of statements per save. Here the goal's rows are
+indexed by task and subtask id once (GoalRows), the payload is diffed against
+them (GoalEdits.plan_tasks), and the diff is written with a fixed number of
+statements (GoalEdits.apply):
+
+  * one multi-row INSERT for new subtasks and tasks
+  * one UPDATE for goal fields shared by all of the goal's rows
+  * one UPDATE ... FROM (VALUES ...) per set of changed columns, keyed by
+    subtask row id or, for task fields shared by all of a task's rows, task_id
+  * one DELETE for removed subtasks
+  * a recompute of the goal's progress counters (models/goal.py)
+
+Rows are written with Core statements, so loaded Goal objects are expired
+afterwards.
+"""
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from flask import current_app
+from ..extensions import db
+from ..models.goal import Goal, PLACEHOLDER_TASK_ID, recompute_progress_counters
+from ..models.study_goal import StudyGoal
+from ..utils.fractional_index import keys_between, spread_keys
+
+TASK_FIELDS = ('task_title', 'task_descr')
+SUBTASK_FIELDS = ('subtask_descr', 'subtask_type', 'subtask_completed')
+
+
+def parse_due_date(value) -> Optional[datetime]:
+    """A task due date from the payload: ISO datetime, YYYY-MM-DD or a datetime; raises ValueError"""
+    if not value:
+        return None
+    if not isinstance(value, str):
+        return value
+    if 'T' in value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return datetime.fromisoformat(value + 'T00:00:00')
+
+
+class GoalRows:
+    """A goal's rows indexed by task and subtask, built once per request"""
+
+    def __init__(self, rows: List[Goal]):
+        self.rows = rows
+        self.first = rows[0]
+        self.by_task: Dict[str, List[Goal]] = OrderedDict()
+        for row in rows:
+            self.by_task.setdefault(row.task_id, []).append(row)
+
+    def task_rows(self, task_id) -> List[Goal]:
+        return self.by_task.get(task_id, [])
+
+    def conflicting_subtasks(self, tasks: Iterable[dict]) -> List[str]:
+        """Subtasks scheduled to start after their task's (new or current) due date"""
+        conflicting = []
+        for task_data in tasks:
+            task_rows = self.task_rows(task_data.get('task_id'))
+            if task_data.get('task_due_date'):
+                try:
+                    due = parse_due_date(task_data['task_due_date'])
+                except (TypeError, ValueError):
+                    due = None
+            else:
+                due = task_rows[0].task_due_date if task_rows else None
+            if not due:
+                continue
+            for row in task_rows:
+                if row.task_id == PLACEHOLDER_TASK_ID or row.subtask_id == PLACEHOLDER_TASK_ID:
+                    continue
+                if row.start_time and row.start_time.date() > due.date():
+                    conflicting.append(row.subtask_id)
+        return conflicting
+
+
+class GoalEdits:
+    """Inserts, updates and deletes for one goal, planned against its rows and applied together"""
+
+    def __init__(self, goal: GoalRows, user_id: str, goal_id: str):
+        self.goal = goal
+        self.user_id = user_id
+        self.goal_id = goal_id
+        self.goal_updates: Dict[str, Any] = {}  # columns shared by all of the goal's rows
+        self.inserts: List[Dict[str, Any]] = []
+        self.row_updates: Dict[str, Dict[str, Any]] = {}  # row id -> changed columns
+        self.task_updates: Dict[str, Dict[str, Any]] = {}  # task_id -> columns for all of its rows
+        self.deletes: List[str] = []
+        self.task_flags: Dict[str, bool] = {}  # task_completed for existing tasks
+        self.updated_task_ids: List[str] = []
+
+    def update_goal(self, values: Dict[str, Any]):
+        """goal_descr, due_date and/or goal_completed for the whole goal"""
+        self.goal_updates.update(values)
+
+    def update_row(self, row: Goal, values: Dict[str, Any]):
+        changed = {key: value for key, value in values.items() if getattr(row, key) != value}
+        if changed:
+            self.row_updates.setdefault(row.id, {}).update(changed)
+
+    def plan_tasks(self, tasks: List[dict], with_due_dates: bool = False):
+        """Diff a task payload against the goal's rows.
+
+        Listed tasks are updated or created; unlisted tasks are kept. For a listed
+        task that carries 'subtasks', subtasks not in the list are deleted. With
+        with_due_dates, task_due_date is read from the payload as well.
+        """
+        first = self.goal.first
+        goal_values = {
+            'user_id': self.user_id, 'course_id': first.course_id, 'goal_id': self.goal_id,
+            'goal_descr': first.goal_descr, 'due_date': first.due_date, 'goal_completed': first.goal_completed
+        }
+        goal_values.update(self.goal_updates)
+
+        for task_data in tasks:
+            task_id = task_data.get('task_id')
+            task_rows = self.goal.task_rows(task_id) if task_id else []
+            if not task_rows:
+                # New task, with its subtasks or a default one
+                task_values = dict(
+                    goal_values,
+                    task_id=task_id or str(uuid.uuid4()),
+                    task_title=task_data.get('task_title', 'New Task'),
+                    task_descr=task_data.get('task_descr', ''),
+                    task_completed=task_data.get('task_completed', False),
+                    task_due_date=_payload_due_date(task_data) if with_due_dates else None
+                )
+                subtasks = task_data.get('subtasks') or [{
+                    'subtask_descr': 'Default Subtask', 'subtask_type': 'other', 'subtask_order': 0
+                }]
+                for subtask_data, rank in zip(subtasks, spread_keys(len(subtasks))):
+                    self.inserts.append(_new_row(task_values, subtask_data, rank))
+                continue
+
+            if task_id not in self.updated_task_ids:
+                self.updated_task_ids.append(task_id)
+            reference = task_rows[0]
+            task_values = {field: task_data[field] for field in TASK_FIELDS if field in task_data}
+            if with_due_dates and 'task_due_date' in task_data:
+                try:
+                    task_values['task_due_date'] = parse_due_date(task_data['task_due_date'])
+                except (TypeError, ValueError) as e:
+                    # Keep the current due date
+                    current_app.logger.error(f"Error parsing task_due_date: {task_data['task_due_date']}, error: {e}")
+            changed = {key: value for key, value in task_values.items() if getattr(reference, key) != value}
+            if changed:
+                self.task_updates.setdefault(task_id, {}).update(changed)
+            if 'task_completed' in task_data:
+                self.task_flags[task_id] = bool(task_data['task_completed'])
+
+            if 'subtasks' not in task_data:
+                continue
+            rows_by_subtask = {row.subtask_id: row for row in task_rows}
+            kept = set()
+            inherited = dict(
+                goal_values,
+                task_id=task_id,
+                task_title=task_values.get('task_title', reference.task_title),
+                task_descr=task_values.get('task_descr', reference.task_descr),
+                task_completed=self.task_flags.get(task_id, reference.task_completed),
+                task_due_date=task_values.get('task_due_date', reference.task_due_date) if with_due_dates else None
+            )
+            added = []
+            for subtask_data in task_data['subtasks']:
+                row = rows_by_subtask.get(subtask_data.get('subtask_id'))
+                if row is None:
+                    added.append(subtask_data)
+                    continue
+                kept.add(row.subtask_id)
+                self.update_row(row, {field: subtask_data[field] for field in SUBTASK_FIELDS if field in subtask_data})
+            # New subtasks go after the task's last one; a task not ranked yet is ranked by the rebalancer
+            ranks = [row.subtask_rank for row in task_rows]
+            if added and all(ranks):
+                new_ranks = keys_between(max(ranks), None, len(added))
+            else:
+                new_ranks = [None] * len(added)
+            for subtask_data, rank in zip(added, new_ranks):
+                self.inserts.append(_new_row(inherited, subtask_data, rank))
+            self.deletes.extend(row.id for row in task_rows if row.subtask_id not in kept)
+
+    def apply(self, derive_goal_completion: bool = False) -> Dict[str, int]:
+        """Write everything in the current transaction; the caller commits.
+
+        With derive_goal_completion the goal is complete when all of its tasks are,
+        otherwise it keeps its flag (or takes goal_completed from update_goal).
+        """
+        now = datetime.now(timezone.utc)
+        table = Goal.__table__
+        if self.deletes:
+            db.session.execute(table.delete().where(table.c.id.in_(self.deletes)))
+        if self.inserts:
+            db.session.execute(table.insert(), self.inserts)
+        if self.goal_updates:
+            db.session.execute(
+                table.update()
+                .where(table.c.user_id == self.user_id, table.c.goal_id == self.goal_id)
+                .values(dict(self.goal_updates, updated_at=now))
+            )
+        for key, updates, extra in (
+            ('id', self.row_updates, ()),
+            ('task_id', self.task_updates, (table.c.user_id == self.user_id, table.c.goal_id == self.goal_id))
+        ):
+            for columns, rows in _group_by_columns(updates).items():
+                _bulk_update(table, key, columns, rows, extra, now)
+        recompute_progress_counters(self.user_id, self.goal_id, task_flags=self.task_flags,
+                                    derive_goal_completion=derive_goal_completion)
+        if 'goal_completed' in self.goal_updates and not derive_goal_completion:
+            study_goals = StudyGoal.__table__
+            db.session.execute(
+                study_goals.update()
+                .where(study_goals.c.user_id == self.user_id, study_goals.c.goal_id == self.goal_id)
+                .values(goal_completed=self.goal_updates['goal_completed'], updated_at=now)
+            )
+        db.session.expire_all()
+        return {
+            'inserted': len(self.inserts),
+            'updated': len(self.row_updates) + len(self.task_updates) + (1 if self.goal_updates else 0),
+            'deleted': len(self.deletes)
+        }
+
+
+def _payload_due_date(task_data: dict) -> Optional[datetime]:
+    try:
+        return parse_due_date(task_data.get('task_due_date'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _new_row(task_values: Dict[str, Any], subtask_data: dict, rank: Optional[str]) -> Dict[str, Any]:
+    """Column values for a new subtask row; every row has the same keys so they insert as one batch"""
+    now = datetime.now(timezone.utc)
+    return dict(
+        task_values,
+        id=str(uuid.uuid4()),
+        subtask_id=subtask_data.get('subtask_id') or str(uuid.uuid4()),
+        subtask_descr=subtask_data.get('subtask_descr', 'New Subtask'),
+        subtask_type=subtask_data.get('subtask_type', 'other'),
+        subtask_completed=subtask_data.get('subtask_completed', False),
+        subtask_order=subtask_data.get('subtask_order', None),
+        subtask_rank=rank,
+        is_external=False,
+        is_conflicting=False,
+        sync_status='Not Synced',
+        task_is_being_tracked=False,
+        task_has_ever_been_completed=False,
+        created_at=now,
+        updated_at=now
+    )
+
+
+def update_rows(updates: Dict[str, Dict[str, Any]]):
+    """Write {row id: {column: value}} to users_courses_goal with one statement per set of columns"""
+    table = Goal.__table__
+    now = datetime.now(timezone.utc)
+    for columns, rows in _group_by_columns(updates).items():
+        _bulk_update(table, 'id', columns, rows, (), now)
+
+
+def _group_by_columns(updates: Dict[str, Dict[str, Any]]) -> Dict[tuple, List[tuple]]:
+    """{(columns...): [(key, values...), ...]} so each column set is written by one statement"""
+    groups: Dict[tuple, List[tuple]] = {}
+    for key, values in updates.items():
+        columns = tuple(sorted(values))
+        groups.setdefault(columns, []).append((key,) + tuple(values[column] for column in columns))
+    return groups
+
+
+def _bulk_update(table, key: str, columns: tuple, rows: List[tuple], extra_where: tuple, now: datetime):
+    """UPDATE table SET columns FROM (VALUES rows) WHERE table.key = v.key"""
+    changes = db.values(
+        db.column(key, db.String),
+        *(db.column(column, table.c[column].type) for column in columns),
+        name='changes'
+    ).data(rows)
+    values = {column: db.cast(changes.c[column], table.c[column].type) for column in columns}
+    values['updated_at'] = now
+    db.session.execute(
+        table.update().where(table.c[key] == changes.c[key], *extra_where).values(values)
+    )
@@ -0,0 +1,225 @@
+"""
+Per-user Google credentials and Calendar service objects, reused across calls.
+
+Every calendar helper used to rebuild Credentials, check (and possibly
+refresh) the access token and build a new discovery service for each
+operation. Here each user's Credentials are kept in process until shortly
+before the token expires, and the token is refreshed
+GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS before expiry rather than after a call
+fails.
+
+Refreshes are single-flight: a per-user lock makes concurrent callers wait
+for the one refresh in progress and then use its token instead of posting
+their own.
+
+Service objects sit on httplib2, which is not thread-safe, so they are cached
+per thread (a sync worker reuses one for a whole burst of jobs) and rebuilt
+when the user's credentials change.
+"""
+import threading
+import requests
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from flask import current_app
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from ..extensions import db
+from ..models.user import User
+from ..utils import metrics
+from ..utils.cache import TTLCache
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar"]
+SERVICES_PER_THREAD = 64
+
+_clients: Optional[TTLCache] = None
+_clients_lock = threading.Lock()
+_refresh_locks = {}
+_refresh_locks_lock = threading.Lock()
+_local = threading.local()
+
+
+class _UserClient:
+    """A user's current access token and the Credentials built from it"""
+
+    def __init__(self, user: User):
+        self.access_token = user.google_access_token
+        self.refresh_token = user.google_refresh_token
+        self.expiry = user.token_expiry
+        self.credentials = Credentials(
+            token=user.google_access_token,
+            refresh_token=user.google_refresh_token,
+            token_uri=TOKEN_URI,
+            client_id=current_app.config["GOOGLE_CLIENT_ID"],
+            client_secret=current_app.config["GOOGLE_CLIENT_SECRET"],
+            scopes=CALENDAR_SCOPES,
+            # google-auth compares against naive UTC
+            expiry=self.expiry.astimezone(timezone.utc).replace(tzinfo=None) if self.expiry else None
+        )
+
+    def fresh_for(self, user: User) -> bool:
+        return self.refresh_token == user.google_refresh_token and _is_fresh(self.expiry)
+
+
+def _cache() -> TTLCache:
+    global _clients
+    if _clients is None:
+        with _clients_lock:
+            if _clients is None:
+                _clients = TTLCache(max_entries=current_app.config.get('GOOGLE_CLIENT_CACHE_SIZE', 1024),
+                                    default_ttl=3600)
+    return _clients
+
+
+def _refresh_lock(user_id: str) -> threading.Lock:
+    with _refresh_locks_lock:
+        lock = _refresh_locks.get(user_id)
+        if lock is None:
+            lock = _refresh_locks[user_id] = threading.Lock()
+        return lock
+
+
+def _is_fresh(expiry: Optional[datetime]) -> bool:
+    if not expiry:
+        return False
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    margin = timedelta(seconds=current_app.config.get('GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS', 300))
+    return expiry - margin > datetime.now(timezone.utc)
+
+
+def _client_ttl(expiry: datetime) -> float:
+    """Seconds until the cached client should be refreshed"""
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    margin = current_app.config.get('GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS', 300)
+    return max(1.0, (expiry - datetime.now(timezone.utc)).total_seconds() - margin)
+
+
+def get_user_client(user: User) -> _UserClient:
+    """The user's cached client, refreshing the access token first when it is close to expiry.
+
+    Raises ValueError when the user has no refresh token or the refresh fails.
+    """
+    cache = _cache()
+    client = cache.get(user.id)
+    if client and client.fresh_for(user):
+        metrics.increment('google_clients.cache_hits')
+        return client
+
+    with _refresh_lock(user.id):
+        # Another thread may have refreshed while we waited
+        client = cache.get(user.id)
+        if client and client.fresh_for(user):
+            metrics.increment('google_clients.refresh_joined')
+            user.google_access_token = client.access_token
+            user.token_expiry = client.expiry
+            return client
+
+        metrics.increment('google_clients.cache_misses')
+        if not user.google_refresh_token:
+            print(f"❌ No refresh token found for user {user.id}")
+            raise ValueError("No refresh token found")
+        if not _is_fresh(user.token_expiry):
+            _request_token(user)
+        if not user.google_access_token:
+            raise ValueError("No access token found")
+        client = _UserClient(user)
+        cache.set(user.id, client, ttl=_client_ttl(client.expiry))
+        return client
+
+
+def ensure_fresh_token(user: User):
+    """Make sure user.google_access_token is valid for at least the refresh margin"""
+    get_user_client(user)
+
+
+def get_credentials(user: User) -> Credentials:
+    return get_user_client(user).credentials
+
+
+def build_calendar_service(credentials=None, http=None):
+    """Calendar v3 client; GOOGLE_API_ENDPOINT points it at another host (e.g. a fake Google for benchmarks)"""
+    endpoint = current_app.config.get('GOOGLE_API_ENDPOINT')
+    return build("calendar", "v3", credentials=credentials, http=http, cache_discovery=False,
+                 client_options={"api_endpoint": endpoint} if endpoint else None)
+
+
+def get_calendar_service(user: User):
+    """This thread's Calendar service for the user, built once per set of credentials"""
+    client = get_user_client(user)
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = TTLCache(max_entries=SERVICES_PER_THREAD, default_ttl=3600)
+    cached = services.get(user.id)
+    if cached and cached[0] is client:
+        return cached[1]
+    service = build_calendar_service(client.credentials)
+    services.set(user.id, (client, service))
+    metrics.increment('google_clients.services_built')
+    return service
+
+
+def forget_user(user_id: str):
+    """Drop a user's cached client, e.g. after they reconnect or disconnect Google Calendar.
+
+    Services other threads built from it are rebuilt the next time they are asked for.
+    """
+    _cache().delete(user_id)
+
+
+def _request_token(user: User):
+    """Exchange the user's refresh token for a new access token and commit it"""
+    print(f"🔄 Refreshing token for user {user.id}")
+    metrics.increment('google_clients.token_refreshes')
+    data = {
+        "client_id": current_app.config["GOOGLE_CLIENT_ID"],
+        "client_secret": current_app.config["GOOGLE_CLIENT_SECRET"],
+        "refresh_token": user.google_refresh_token,
+        "grant_type": "refresh_token"
+    }
+
+    try:
+        response = requests.post(TOKEN_URI, data=data)
+        print(f"🔍 Token refresh response status: {response.status_code}")
+
+        if response.status_code == 200:
+            new_token = response.json()
+            user.google_access_token = new_token["access_token"]
+            user.token_expiry = (datetime.now(timezone.utc)
+                                 + timedelta(seconds=new_token["expires_in"]))
+            db.session.commit()
+            print(f"✅ Successfully refreshed token for user {user.id}")
+        else:
+            error_data = response.json() if response.content else {}
+            error_message = error_data.get('error_description', error_data.get('error', 'Unknown error'))
+            print(f"❌ Failed to refresh token for user {user.id}: {response.status_code}")
+            print(f"❌ Error details: {error_message}")
+            print(f"❌ Response content: {response.text}")
+
+            # Handle specific error cases
+            if response.status_code == 400:
+                if 'invalid_grant' in error_message.lower():
+                    print(f"⚠️  Invalid grant - user {user.id} needs to re-authenticate")
+                    # Clear the invalid refresh token
+                    user.google_refresh_token = None
+                    user.google_access_token = None
+                    user.token_expiry = None
+                    db.session.commit()
+                    forget_user(user.id)
+                    raise ValueError("Invalid grant - user needs to re-authenticate")
+                elif 'invalid_client' in error_message.lower():
+                    print(f"⚠️  Invalid client credentials for user {user.id}")
+                    raise ValueError("Invalid client credentials")
+                else:
+                    print(f"⚠️  Unknown 400 error for user {user.id}: {error_message}")
+                    raise ValueError(f"Token refresh failed: {error_message}")
+            else:
+                raise ValueError(f"Token refresh failed with status {response.status_code}: {error_message}")
+
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Network error during token refresh for user {user.id}: {str(e)}")
+        raise ValueError(f"Network error during token refresh: {str(e)}")
+    except Exception as e:
+        print(f"❌ Unexpected error during token refresh for user {user.id}: {str(e)}")
+        raise ValueError(f"Unexpected error during token refresh: {str(e)}")
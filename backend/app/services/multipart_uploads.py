@@ -0,0 +1,255 @@
+"""
+Direct-to-S3 multipart uploads for large course materials.
+
+The browser asks for an upload, PUTs each part straight to S3 with a
+presigned URL and reports the part's ETag back, so the Flask worker never
+touches the file data. Confirmed parts are kept on the MultipartUpload row
+and S3's own part listing is consulted on resume and before completing, so
+an interrupted upload only resends the parts that are missing.
+
+Once S3 assembles the object a UserCourseMaterial is created and, for
+documents we can index, a background 'process_material' job extracts and
+embeds the text. Those jobs run on the generation workers but do not count
+toward the user's generation limit; if one cannot be queued the response
+says so in processing_error.
+
+The bucket's CORS configuration must allow PUT from the frontend origin and
+expose the ETag header.
+"""
+import os
+import math
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from flask import current_app
+from werkzeug.utils import secure_filename
+from ..extensions import db
+from ..models.multipart_upload import MultipartUpload
+from ..models.user_course_material import UserCourseMaterial
+from ..models.generation_job import GenerationJob
+from ..utils import s3
+from ..utils.storage import get_storage
+from .thumbnails import queue_thumbnails
+from .generation_jobs import job_handler, submit_generation_job, update_job_progress
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+MAX_PARTS = 10000
+PROCESSABLE_TYPES = ['pdf', 'docx', 'doc', 'txt']
+
+
+class MultipartUploadError(Exception):
+    """Raised when an upload request cannot be served; carries the HTTP status to report"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def get_upload(upload_id: str, user_id: str, course_id: str, lock: bool = False) -> MultipartUpload:
+    query = MultipartUpload.query.filter_by(id=upload_id, user_id=user_id, course_id=course_id)
+    if lock:
+        query = query.with_for_update()
+    upload = query.first()
+    if not upload:
+        raise MultipartUploadError('Upload not found', 404)
+    return upload
+
+
+def start_upload(user_id: str, course_id: str, filename: str, total_size: int,
+                 content_type: str = None) -> MultipartUpload:
+    """Begin a multipart upload, or return the unfinished one for the same file so it can resume"""
+    if get_storage().name != 'S3':
+        raise MultipartUploadError('Direct uploads need S3 storage; use /materials/upload instead', 400)
+    filename = secure_filename(filename or '')
+    if not filename:
+        raise MultipartUploadError('filename is required', 400)
+    if not isinstance(total_size, int) or total_size <= 0:
+        raise MultipartUploadError('size must be a positive number of bytes', 400)
+
+    storage_key = f"courses/{course_id}/{filename}"
+    existing = MultipartUpload.query.filter_by(
+        user_id=user_id, course_id=course_id, storage_key=storage_key,
+        total_size=total_size, status=MultipartUpload.STATUS_IN_PROGRESS
+    ).order_by(MultipartUpload.created_at.desc()).first()
+    if existing:
+        return sync_parts(existing)
+
+    part_size = max(
+        current_app.config.get('S3_MULTIPART_CHUNK_MB', 16) * 1024 * 1024,
+        MIN_PART_SIZE,
+        math.ceil(total_size / MAX_PARTS)
+    )
+    upload = MultipartUpload(
+        user_id=user_id,
+        course_id=course_id,
+        storage_key=storage_key,
+        upload_id=s3.create_multipart_upload(storage_key),
+        filename=filename,
+        content_type=content_type,
+        total_size=total_size,
+        part_size=part_size,
+        part_count=math.ceil(total_size / part_size),
+        parts={},
+        status=MultipartUpload.STATUS_IN_PROGRESS
+    )
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def presign_parts(upload: MultipartUpload, part_numbers: List[int] = None) -> Dict[int, str]:
+    """Upload URLs for the given parts (default: every part still missing)"""
+    _require_in_progress(upload)
+    part_numbers = part_numbers or upload.missing_parts()
+    invalid = [number for number in part_numbers if not isinstance(number, int) or not 1 <= number <= upload.part_count]
+    if invalid:
+        raise MultipartUploadError(f'Invalid part numbers: {invalid}', 400)
+    return s3.get_presigned_part_urls(upload.storage_key, upload.upload_id, part_numbers)
+
+
+def record_part(upload_id: str, user_id: str, course_id: str, part_number: int, etag: str, size: int) -> MultipartUpload:
+    """Store a part the browser finished uploading; parts arrive in parallel, so the row is locked"""
+    upload = get_upload(upload_id, user_id, course_id, lock=True)
+    _require_in_progress(upload)
+    if not 1 <= part_number <= upload.part_count:
+        raise MultipartUploadError('Invalid part number', 400)
+    if not etag:
+        raise MultipartUploadError('etag is required', 400)
+    parts = dict(upload.parts or {})
+    parts[str(part_number)] = {'etag': etag, 'size': int(size or 0)}
+    upload.parts = parts
+    db.session.commit()
+    return upload
+
+
+def sync_parts(upload: MultipartUpload) -> MultipartUpload:
+    """Replace the recorded parts with what S3 actually holds (parts confirmed but never stored vanish)"""
+    if upload.status != MultipartUpload.STATUS_IN_PROGRESS:
+        return upload
+    stored = s3.list_multipart_parts(upload.storage_key, upload.upload_id)
+    upload.parts = {str(number): part for number, part in stored.items()}
+    db.session.commit()
+    return upload
+
+
+def complete_upload(upload: MultipartUpload) -> Dict[str, Any]:
+    """Assemble the object, register the material and queue text processing"""
+    if upload.status == MultipartUpload.STATUS_COMPLETED:
+        return {'upload': upload.to_dict(), 'material_id': upload.material_id, 'processing_job': None,
+                'processing_error': None}
+    _require_in_progress(upload)
+    sync_parts(upload)
+    missing = upload.missing_parts()
+    if missing:
+        raise MultipartUploadError(f'{len(missing)} parts have not been uploaded yet', 409)
+
+    s3.complete_multipart_upload(upload.storage_key, upload.upload_id, upload.parts)
+    file_extension = upload.filename.rsplit('.', 1)[1].lower() if '.' in upload.filename else ''
+    now = datetime.utcnow()
+    material = UserCourseMaterial(
+        user_id=upload.user_id,
+        course_id=f"{upload.course_id}+{upload.user_id}",
+        file_path=upload.storage_key,
+        material_name=upload.filename,
+        is_pinned=False,
+        last_accessed=now,
+        created_at=now,
+        updated_at=now,
+        thumbnail_path=None,
+        file_type=file_extension,
+        file_size=upload.total_size,
+        original_filename=upload.filename
+    )
+    db.session.add(material)
+    db.session.flush()
+    upload.material_id = material.id
+    upload.status = MultipartUpload.STATUS_COMPLETED
+    db.session.commit()
+
+    try:
+        queue_thumbnails(material.id)
+    except Exception as e:
+        print(f"Failed to queue thumbnails for {upload.filename}: {str(e)}")
+
+    job = None
+    processing_error = None
+    if file_extension in PROCESSABLE_TYPES:
+        try:
+            job, _ = submit_generation_job(upload.user_id, 'process_material', {
+                'material_id': material.id,
+                'course_id': upload.course_id,
+                'filename': upload.filename
+            }, course_id=upload.course_id)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Could not queue processing for {upload.filename}: {str(e)}")
+            processing_error = f'The file was uploaded but could not be queued for indexing: {str(e)}'
+    return {
+        'upload': upload.to_dict(),
+        'material_id': material.id,
+        'processing_job': job.to_dict(include_result=False) if job else None,
+        'processing_error': processing_error
+    }
+
+
+def abort_upload(upload: MultipartUpload) -> MultipartUpload:
+    if upload.status == MultipartUpload.STATUS_IN_PROGRESS:
+        try:
+            s3.abort_multipart_upload(upload.storage_key, upload.upload_id)
+        except Exception as e:
+            print(f"Warning: Failed to abort multipart upload {upload.id}: {str(e)}")
+        upload.status = MultipartUpload.STATUS_ABORTED
+        db.session.commit()
+    return upload
+
+
+def abort_stale_uploads(max_age_hours: int = None, limit: int = 100) -> int:
+    """Abort unfinished uploads nobody has touched for max_age_hours, freeing their stored parts"""
+    if max_age_hours is None:
+        max_age_hours = current_app.config.get('S3_MULTIPART_EXPIRY_HOURS', 48)
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    stale = MultipartUpload.query.filter(
+        MultipartUpload.status == MultipartUpload.STATUS_IN_PROGRESS,
+        MultipartUpload.updated_at < cutoff
+    ).limit(limit).all()
+    for upload in stale:
+        abort_upload(upload)
+    return len(stale)
+
+
+def _require_in_progress(upload: MultipartUpload):
+    if upload.status != MultipartUpload.STATUS_IN_PROGRESS:
+        raise MultipartUploadError(f'Upload is {upload.status}', 409)
+
+
+@job_handler('process_material', counts_toward_limit=False)
+def _process_material(job: GenerationJob) -> Dict[str, Any]:
+    """Extract, chunk and embed a material uploaded straight to storage"""
+    from .course_rag_service import CourseDocumentProcessor
+
+    params = job.params or {}
+    material = UserCourseMaterial.query.get(params.get('material_id'))
+    if not material:
+        raise ValueError('Material no longer exists')
+    filename = params.get('filename') or material.material_name
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file_path = temp_file.name
+        try:
+            get_storage().download_to(material.file_path, temp_file)
+        except Exception:
+            os.unlink(temp_file_path)
+            raise
+    try:
+        update_job_progress(job, 40)
+        uploaded_file = CourseDocumentProcessor().process_and_store_course_file(
+            file_path=temp_file_path,
+            filename=filename,
+            course_id=params.get('course_id'),
+            user_id=job.user_id
+        )
+    finally:
+        if os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+    return {'material_id': material.id, 'file_id': getattr(uploaded_file, 'id', None)}
@@ -1,7 +1,49 @@
 import openai
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Iterator
 from .document_processor import DocumentProcessor
+from ..utils.incremental_json import JsonArrayStreamParser
+from ..utils import metrics
+
+
+def validate_quiz_question(question: Dict[str, Any], expected: Dict[str, Any] = None) -> List[str]:
+    """Check a generated question against its question_config entry; returns a list of problems"""
+    if not isinstance(question, dict):
+        return ["Question is not an object"]
+    errors = []
+    if not isinstance(question.get("question"), str) or not question.get("question").strip():
+        errors.append("Missing question text")
+    
+    q_type = question.get("type")
+    if expected is None:
+        errors.append("More questions were generated than requested")
+    elif q_type != expected.get("type", "multiple_choice"):
+        errors.append(f"Expected a {expected.get('type', 'multiple_choice')} question but got {q_type}")
+    
+    if q_type == "multiple_choice":
+        options = question.get("options")
+        if not isinstance(options, list) or len(options) < 2:
+            errors.append("Multiple choice questions need at least two options")
+        answer = question.get("correct_answer")
+        allow_multiple = bool(expected.get("allow_multiple", False)) if expected else bool(question.get("allow_multiple"))
+        if allow_multiple:
+            if not isinstance(answer, list) or not answer or not all(isinstance(a, str) for a in answer):
+                errors.append("correct_answer must be a list of letters for multiple-answer questions")
+        elif not isinstance(answer, str) or not answer.strip():
+            errors.append("correct_answer must be a single letter")
+    elif q_type == "true_false":
+        if not isinstance(question.get("correct_answer"), bool):
+            errors.append("correct_answer must be true or false")
+    elif q_type == "short_answer":
+        if not isinstance(question.get("sample_answer"), str):
+            errors.append("Short answer questions need a sample_answer")
+        if not isinstance(question.get("key_points", []), list):
+            errors.append("key_points must be a list")
+    else:
+        errors.append(f"Unknown question type: {q_type}")
+    return errors
+
 
 class RAGService:
     def __init__(self, openai_api_key: str = None):
@@ -112,18 +154,7 @@ Please respond to their message now:"""
             ]
         """
         try:
-            # If no specific topic, get a sample of chunks for general quiz
-            if topic:
-                relevant_chunks = self.document_processor.similarity_search(topic, top_k=10)
-            else:
-                # Get random chunks from all materials
-                from ..models.material_chunk import MaterialChunk
-                from ..models.uploaded_file import UploadedFile
-                from ..extensions import db
-                chunks_query = db.session.query(MaterialChunk, UploadedFile.filename).join(
-                    UploadedFile, MaterialChunk.file_id == UploadedFile.id
-                ).limit(10)
-                relevant_chunks = [(chunk, 0.0, filename) for chunk, filename in chunks_query]
+            relevant_chunks, context = self._get_quiz_context(topic)
             
             if not relevant_chunks:
                 return {
@@ -131,13 +162,6 @@ Please respond to their message now:"""
                     "message": "No materials available to generate quiz from. Please upload some materials first."
                 }
             
-            # Prepare context
-            context_parts = []
-            for chunk, _, _ in relevant_chunks:
-                context_parts.append(chunk.chunk_text)
-            
-            context = "\n\n".join(context_parts[:5])  # Limit context size
-            
             if question_config:
                 questions_to_generate = question_config
             else:
@@ -170,6 +194,106 @@ Please respond to their message now:"""
                 "message": f"Error generating quiz: {str(e)}"
             }
     
+    def generate_quiz_stream(self, topic: str = None, num_questions: int = 5, question_type: str = "multiple_choice", question_config: List[Dict] = None) -> Iterator[Dict[str, Any]]:
+        """Stream quiz generation, yielding an event for each question as soon as it is complete
+        
+        Events (dicts with a "type" key):
+            start            - {"total", "generated_from"}
+            question         - {"index", "question"} for a question that matches its config
+            invalid_question - {"index", "question", "errors"} for one that does not
+            done             - {"questions", "invalid", "parse_errors", "first_question_ms", "total_ms", "topic"}
+            error            - {"message"}
+        """
+        started = time.perf_counter()
+        try:
+            relevant_chunks, context = self._get_quiz_context(topic)
+            if not relevant_chunks:
+                yield {
+                    "type": "error",
+                    "message": "No materials available to generate quiz from. Please upload some materials first."
+                }
+                return
+            
+            if question_config:
+                questions_to_generate = question_config
+            else:
+                questions_to_generate = [{"type": question_type, "allow_multiple": False}] * num_questions
+            
+            yield {"type": "start", "total": len(questions_to_generate), "generated_from": len(relevant_chunks)}
+            
+            prompt = self._build_mixed_quiz_prompt(context, questions_to_generate, topic)
+            stream = openai.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are an expert quiz generator. Always respond with valid JSON in the exact format requested."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=2000,
+                temperature=0.3,
+                stream=True
+            )
+            
+            parser = JsonArrayStreamParser("questions")
+            index = 0
+            invalid = 0
+            first_question_ms = None
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                for question in parser.feed(delta or ""):
+                    expected = questions_to_generate[index] if index < len(questions_to_generate) else None
+                    errors = validate_quiz_question(question, expected)
+                    if errors:
+                        invalid += 1
+                        metrics.increment("quiz.invalid_questions")
+                        yield {"type": "invalid_question", "index": index, "question": question, "errors": errors}
+                    else:
+                        if first_question_ms is None:
+                            first_question_ms = (time.perf_counter() - started) * 1000
+                            metrics.observe("quiz.first_question_ms", first_question_ms)
+                        yield {"type": "question", "index": index, "question": question}
+                    index += 1
+                if parser.finished:
+                    break
+            
+            total_ms = (time.perf_counter() - started) * 1000
+            metrics.observe("quiz.stream_total_ms", total_ms)
+            for parse_error in parser.errors:
+                print(f"Error streaming quiz: {parse_error}")
+            yield {
+                "type": "done",
+                "questions": index - invalid,
+                "invalid": invalid,
+                "parse_errors": len(parser.errors),
+                "first_question_ms": round(first_question_ms, 1) if first_question_ms is not None else None,
+                "total_ms": round(total_ms, 1),
+                "topic": topic or "General"
+            }
+            
+        except Exception as e:
+            print(f"Error streaming quiz: {str(e)}")
+            yield {"type": "error", "message": f"Error generating quiz: {str(e)}"}
+    
+    def _get_quiz_context(self, topic: str = None):
+        """Retrieve the chunks a quiz is generated from and join them into prompt context"""
+        # If no specific topic, get a sample of chunks for general quiz
+        if topic:
+            relevant_chunks = self.document_processor.similarity_search(topic, top_k=10)
+        else:
+            # Get random chunks from all materials
+            from ..models.material_chunk import MaterialChunk
+            from ..models.uploaded_file import UploadedFile
+            from ..extensions import db
+            chunks_query = db.session.query(MaterialChunk, UploadedFile.filename).join(
+                UploadedFile, MaterialChunk.file_id == UploadedFile.id
+            ).limit(10)
+            relevant_chunks = [(chunk, 0.0, filename) for chunk, filename in chunks_query]
+        
+        context_parts = [chunk.chunk_text for chunk, _, _ in relevant_chunks]
+        context = "\n\n".join(context_parts[:5])  # Limit context size
+        return relevant_chunks, context
+    
     def _build_mixed_quiz_prompt(self, context: str, question_config: List[Dict], topic: str = None) -> str:
         """Builds a prompt for generating a mixed quiz based on question configurations."""
         
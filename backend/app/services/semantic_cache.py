@@ -0,0 +1,124 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app
+from ..models.semantic_answer_cache import SemanticAnswerCache
+from ..models.material_chunk import MaterialChunk
+from ..extensions import db
+from ..utils import metrics
+
+
+def chunks_fingerprint(chunks: List[MaterialChunk]) -> str:
+    """Hash the content of the retrieved chunks.
+
+    Content (not ids) is hashed so sections that uploaded the same material share cache
+    entries, and any edit or re-upload of the underlying text invalidates them.
+    """
+    digests = sorted(hashlib.sha256(chunk.chunk_text.encode('utf-8')).hexdigest() for chunk in chunks)
+    return hashlib.sha256('\n'.join(digests).encode('utf-8')).hexdigest()
+
+
+class SemanticAnswerCacheService:
+    """Per-course cache of generated answers looked up by question similarity"""
+
+    REUSE = 'reuse'
+    ADAPT = 'adapt'
+
+    def __init__(self, config=None):
+        config = config or current_app.config
+        self.enabled = config.get('SEMANTIC_CACHE_ENABLED', True)
+        self.reuse_threshold = config.get('SEMANTIC_CACHE_REUSE_THRESHOLD', 0.95)
+        self.adapt_threshold = config.get('SEMANTIC_CACHE_ADAPT_THRESHOLD', 0.90)
+        self.ttl = timedelta(seconds=config.get('SEMANTIC_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+        self.max_entries = config.get('SEMANTIC_CACHE_MAX_ENTRIES_PER_COURSE', 500)
+
+    def lookup(self, course_id: str, query_embedding: List[float],
+               relevant_chunks: List[Tuple[MaterialChunk, float, str]],
+               embedding_model: str) -> Optional[Tuple[SemanticAnswerCache, float, str]]:
+        """Find a cached answer for a similar question built from the same chunks.
+
+        Only entries embedded with embedding_model (the course's current model) are compared.
+
+        Returns (entry, similarity, mode) where mode is REUSE (serve as-is) or ADAPT
+        (rephrase for the new question), or None on a miss.
+        """
+        if not self.enabled or not relevant_chunks:
+            return None
+
+        distance = SemanticAnswerCache.question_embedding.cosine_distance(query_embedding)
+        try:
+            row = db.session.query(SemanticAnswerCache, distance.label('distance')).filter(
+                SemanticAnswerCache.course_id == course_id,
+                SemanticAnswerCache.embedding_model == embedding_model,
+                SemanticAnswerCache.created_at >= datetime.utcnow() - self.ttl
+            ).order_by(distance).first()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error reading semantic cache for course {course_id}: {str(e)}")
+            return None
+
+        if not row or 1 - row.distance < self.adapt_threshold:
+            self._record('misses')
+            return None
+
+        entry, similarity = row[0], 1 - row.distance
+        if entry.chunks_fingerprint != chunks_fingerprint([chunk for chunk, _, _ in relevant_chunks]):
+            # The material behind this answer changed (or retrieval now picks other chunks)
+            self._record('stale')
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        db.session.commit()
+
+        mode = self.REUSE if similarity >= self.reuse_threshold else self.ADAPT
+        self._record('hits')
+        metrics.increment(f'semantic_cache.{mode}')
+        return entry, similarity, mode
+
+    def store(self, course_id: str, question: str, query_embedding: List[float],
+              relevant_chunks: List[Tuple[MaterialChunk, float, str]], result: Dict[str, Any],
+              embedding_model: str):
+        """Remember a freshly generated answer and evict the least recently useful entries"""
+        if not self.enabled or not relevant_chunks:
+            return
+        try:
+            chunks = [chunk for chunk, _, _ in relevant_chunks]
+            db.session.add(SemanticAnswerCache(
+                course_id=course_id,
+                question=question,
+                embedding_model=embedding_model,
+                question_embedding=query_embedding,
+                chunk_ids=[chunk.id for chunk in chunks],
+                chunks_fingerprint=chunks_fingerprint(chunks),
+                answer=result['answer'],
+                source_files=result.get('source_files', []),
+                confidence=result.get('confidence', 0.0)
+            ))
+            db.session.flush()
+
+            keep = db.select(SemanticAnswerCache.id).where(
+                SemanticAnswerCache.course_id == course_id
+            ).order_by(
+                db.func.coalesce(SemanticAnswerCache.last_hit_at, SemanticAnswerCache.created_at).desc()
+            ).limit(self.max_entries)
+            SemanticAnswerCache.query.filter(
+                SemanticAnswerCache.course_id == course_id,
+                ~SemanticAnswerCache.id.in_(keep)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error storing semantic cache entry for course {course_id}: {str(e)}")
+
+    def invalidate_course(self, course_id: str) -> int:
+        """Drop every cached answer for a course"""
+        deleted = SemanticAnswerCache.query.filter_by(course_id=course_id).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def _record(self, outcome: str):
+        metrics.increment(f'semantic_cache.{outcome}')
+        hits = metrics.counter_value('semantic_cache.hits')
+        lookups = hits + metrics.counter_value('semantic_cache.misses') + metrics.counter_value('semantic_cache.stale')
+        metrics.set_gauge('semantic_cache.hit_rate', round(hits / lookups, 4) if lookups else 0.0)
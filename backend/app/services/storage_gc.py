@@ -0,0 +1,392 @@
+"""
+Garbage collection of orphaned material data.
+
+Deleting a material from a course removes the stored file and the
+user_course_materials row, but the chunks and embeddings built from it (and,
+when a delete fails half way, stored files) are left behind. They cost storage
+and, worse, every course search still scans their vectors.
+
+The collector finds orphans with set-based anti-joins (NOT EXISTS) and diffs
+storage listings (S3 or local) against the keys the database references. Everything is deleted
+in bounded batches with a commit per batch, and only once it is older than a
+grace period so uploads that are still in flight are never touched. A run
+returns a report of rows/objects removed and the space reclaimed.
+
+Course files are listed straight from storage, so a file without a
+user_course_materials row is not necessarily deleted: it may be an S3-only
+material that /materials/db/migrate has not adopted yet. Such files (under
+courses/) and the chunks built from them are left alone unless
+GC_COURSE_MATERIALS says that table is authoritative.
+
+When GC_ENABLED is set, a background thread runs the collector every
+GC_INTERVAL_SECONDS; a Postgres advisory lock makes sure only one process
+collects at a time.
+"""
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from flask import current_app
+from sqlalchemy.orm import aliased
+from ..models.uploaded_file import UploadedFile
+from ..models.material_chunk import MaterialChunk
+from ..models.shared_embedding import SharedEmbedding
+from ..models.document_embedding import DocumentEmbedding
+from ..models.embedding_version import ChunkEmbeddingVersion
+from ..models.user_course_material import UserCourseMaterial
+from ..models.study_artifact import StudyArtifact
+from ..models.course import Course
+from ..extensions import db
+from ..utils import metrics
+from ..utils.advisory_locks import GC_ADVISORY_LOCK_KEY
+
+S3_DELETE_BATCH = 1000  # delete_objects limit
+
+gc_thread = None
+app_instance = None  # Store the Flask app instance
+
+
+def delete_uploaded_files(file_ids: List[int]) -> int:
+    """Delete uploaded files with their chunks in bulk, keeping shared embedding ref counts right.
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    if not file_ids:
+        return 0
+    chunk_ids = db.select(MaterialChunk.id).where(MaterialChunk.file_id.in_(file_ids))
+    shared_ids = [row[0] for row in db.session.query(MaterialChunk.shared_embedding_id).filter(
+        MaterialChunk.file_id.in_(file_ids), MaterialChunk.shared_embedding_id.isnot(None)
+    ).distinct()]
+
+    ChunkEmbeddingVersion.query.filter(
+        ChunkEmbeddingVersion.source == ChunkEmbeddingVersion.SOURCE_MATERIAL_CHUNK,
+        ChunkEmbeddingVersion.source_id.in_(chunk_ids)
+    ).delete(synchronize_session=False)
+    MaterialChunk.query.filter(MaterialChunk.file_id.in_(file_ids)).delete(synchronize_session=False)
+    deleted = UploadedFile.query.filter(UploadedFile.id.in_(file_ids)).delete(synchronize_session=False)
+    recompute_shared_ref_counts(shared_ids)
+    return deleted
+
+
+def delete_course_file_chunks(course_id: str, user_id: str, filename: str) -> int:
+    """Drop the chunks a user's course upload produced, e.g. when the material is deleted"""
+    file_ids = [row[0] for row in db.session.query(UploadedFile.id).filter_by(
+        course_id=course_id, user_id=user_id, filename=filename
+    )]
+    return delete_uploaded_files(file_ids)
+
+
+def recompute_shared_ref_counts(shared_ids: List[int] = None) -> int:
+    """Set ref_count from the chunks that actually point at each shared embedding"""
+    actual = db.select(db.func.count(MaterialChunk.id)).where(
+        MaterialChunk.shared_embedding_id == SharedEmbedding.id
+    ).scalar_subquery()
+    query = SharedEmbedding.query.filter(SharedEmbedding.ref_count != actual)
+    if shared_ids is not None:
+        if not shared_ids:
+            return 0
+        query = query.filter(SharedEmbedding.id.in_(shared_ids))
+    return query.update({SharedEmbedding.ref_count: actual}, synchronize_session=False)
+
+
+class StorageGarbageCollector:
+    """One pass over every kind of orphan; use run() and read the report"""
+
+    def __init__(self, config=None, dry_run: bool = False):
+        config = config or current_app.config
+        self.config = config
+        self.dry_run = dry_run
+        self.batch_size = config.get('GC_BATCH_SIZE', 500)
+        self.max_batches = config.get('GC_MAX_BATCHES', 20)  # Per orphan kind, bounds the length of one run
+        self.cutoff = datetime.utcnow() - timedelta(seconds=config.get('GC_GRACE_SECONDS', 3600))
+        self.collect_course_materials = config.get('GC_COURSE_MATERIALS', False)
+        self.storage_prefixes = [p.strip() for p in config.get('GC_S3_PREFIXES', 'thumbnails/').split(',') if p.strip()]
+        if not self.collect_course_materials:
+            skipped = [p for p in self.storage_prefixes if p.startswith('courses/') or 'courses/'.startswith(p)]
+            if skipped:
+                print(f"Storage GC: not scanning {', '.join(skipped)} - set GC_COURSE_MATERIALS once "
+                      f"every course file has a user_course_materials row")
+            self.storage_prefixes = [p for p in self.storage_prefixes if p not in skipped]
+        self.report: Dict[str, Any] = OrderedDict()
+        self.errors: List[str] = []
+
+    def run(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        steps = [
+            ('uploaded_files', self.collect_orphaned_uploads),
+            ('superseded_uploads', self.collect_superseded_uploads),
+            ('material_chunks', self.collect_orphaned_chunks),
+            ('document_embeddings', self.collect_orphaned_document_embeddings),
+            ('embedding_versions', self.collect_orphaned_embedding_versions),
+            ('shared_embeddings', self.collect_unreferenced_shared_embeddings),
+            ('study_artifacts', self.collect_orphaned_study_artifacts),
+            ('storage_objects', self.collect_orphaned_storage_objects),
+            ('multipart_uploads', self.collect_stale_multipart_uploads),
+        ]
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                db.session.rollback()
+                self.errors.append(f"{name}: {str(e)}")
+                print(f"Storage GC step {name} failed: {str(e)}")
+
+        reclaimed = sum(entry.get('bytes', 0) for entry in self.report.values())
+        return {
+            'dry_run': self.dry_run,
+            'duration_seconds': round(time.perf_counter() - started, 3),
+            'bytes_reclaimed': reclaimed,
+            'collected': dict(self.report),
+            'errors': self.errors
+        }
+
+    def _record(self, name: str, rows: int, size: int):
+        entry = self.report.setdefault(name, {'rows': 0, 'bytes': 0})
+        entry['rows'] += rows
+        entry['bytes'] += int(size or 0)
+
+    def _row_bytes(self, model, id_column, ids) -> int:
+        """On-disk size of the rows, as pg_column_size of the whole row"""
+        row = db.literal_column(f'{model.__tablename__}.*')
+        return db.session.query(db.func.coalesce(db.func.sum(db.func.pg_column_size(row)), 0)).select_from(
+            model
+        ).filter(id_column.in_(ids)).scalar()
+
+    def _collect_batches(self, name: str, model, id_column, orphan_filters, delete_batch=None, measure_batch=None):
+        """Page through orphan ids by keyset and delete each page in its own transaction"""
+        last_id = None
+        for _ in range(self.max_batches):
+            query = db.session.query(id_column).filter(*orphan_filters)
+            if last_id is not None:
+                query = query.filter(id_column > last_id)
+            ids = [row[0] for row in query.order_by(id_column).limit(self.batch_size)]
+            if not ids:
+                break
+            self._record(name, len(ids), self._row_bytes(model, id_column, ids))
+            if measure_batch:
+                measure_batch(ids)
+            last_id = ids[-1]
+            if self.dry_run:
+                continue
+            if delete_batch:
+                delete_batch(ids)
+            else:
+                db.session.query(model).filter(id_column.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+
+    def _collect_upload_batches(self, name: str, orphan_filters):
+        def measure_batch(ids):
+            # The upload's chunks go with it and count towards what it frees
+            self._record(f'{name}.chunks', *self._chunk_totals(ids))
+        self._collect_batches(name, UploadedFile, UploadedFile.id, orphan_filters,
+                              delete_batch=delete_uploaded_files, measure_batch=measure_batch)
+
+    def _chunk_totals(self, file_ids):
+        row = db.literal_column(f'{MaterialChunk.__tablename__}.*')
+        return db.session.query(
+            db.func.count(MaterialChunk.id), db.func.coalesce(db.func.sum(db.func.pg_column_size(row)), 0)
+        ).filter(MaterialChunk.file_id.in_(file_ids)).one()
+
+    def collect_orphaned_uploads(self):
+        """Course uploads whose user_course_materials row is gone (only with GC_COURSE_MATERIALS)"""
+        if not self.collect_course_materials:
+            return
+        material_exists = db.session.query(UserCourseMaterial.id).filter(
+            UserCourseMaterial.course_id == UploadedFile.course_id + '+' + UploadedFile.user_id,
+            UserCourseMaterial.file_path == 'courses/' + UploadedFile.course_id + '/' + UploadedFile.filename
+        ).exists()
+        self._collect_upload_batches('uploaded_files', [
+            UploadedFile.course_id.isnot(None),
+            UploadedFile.user_id.isnot(None),
+            UploadedFile.uploaded_at < self.cutoff,
+            ~material_exists
+        ])
+
+    def collect_superseded_uploads(self):
+        """Older copies of a file the same user uploaded to the same course again"""
+        newer = aliased(UploadedFile)
+        newer_exists = db.session.query(newer.id).filter(
+            newer.course_id == UploadedFile.course_id,
+            newer.user_id == UploadedFile.user_id,
+            newer.filename == UploadedFile.filename,
+            newer.id > UploadedFile.id
+        ).exists()
+        self._collect_upload_batches('superseded_uploads', [
+            UploadedFile.course_id.isnot(None),
+            UploadedFile.uploaded_at < self.cutoff,
+            newer_exists
+        ])
+
+    def collect_orphaned_chunks(self):
+        """Chunks whose uploaded file no longer exists"""
+        file_exists = db.session.query(UploadedFile.id).filter(UploadedFile.id == MaterialChunk.file_id).exists()
+        self._collect_batches('material_chunks', MaterialChunk, MaterialChunk.id, [~file_exists],
+                              delete_batch=self._delete_chunks)
+
+    def _delete_chunks(self, ids):
+        shared_ids = [row[0] for row in db.session.query(MaterialChunk.shared_embedding_id).filter(
+            MaterialChunk.id.in_(ids), MaterialChunk.shared_embedding_id.isnot(None)
+        ).distinct()]
+        MaterialChunk.query.filter(MaterialChunk.id.in_(ids)).delete(synchronize_session=False)
+        recompute_shared_ref_counts(shared_ids)
+
+    def collect_orphaned_document_embeddings(self):
+        """document_embeddings rows for a course the user is no longer enrolled in"""
+        enrolled = db.session.query(Course.combo_id).filter(
+            Course.combo_id == DocumentEmbedding.course_id,
+            Course.user_id == DocumentEmbedding.user_id
+        ).exists()
+        self._collect_batches('document_embeddings', DocumentEmbedding, DocumentEmbedding.id, [
+            DocumentEmbedding.created_at < self.cutoff,
+            ~enrolled
+        ])
+
+    def collect_orphaned_embedding_versions(self):
+        """Re-embedded vectors whose source chunk is gone"""
+        chunk_exists = db.session.query(MaterialChunk.id).filter(
+            MaterialChunk.id == ChunkEmbeddingVersion.source_id
+        ).exists()
+        document_exists = db.session.query(DocumentEmbedding.id).filter(
+            DocumentEmbedding.id == ChunkEmbeddingVersion.source_id
+        ).exists()
+        self._collect_batches('embedding_versions', ChunkEmbeddingVersion, ChunkEmbeddingVersion.id, [
+            db.or_(
+                db.and_(ChunkEmbeddingVersion.source == ChunkEmbeddingVersion.SOURCE_MATERIAL_CHUNK, ~chunk_exists),
+                db.and_(ChunkEmbeddingVersion.source == ChunkEmbeddingVersion.SOURCE_DOCUMENT_EMBEDDING, ~document_exists)
+            )
+        ])
+
+    def collect_orphaned_study_artifacts(self):
+        """Saved quizzes/flashcards whose material was deleted (exported copies go with the storage objects)"""
+        material_exists = db.session.query(UserCourseMaterial.id).filter(
+            UserCourseMaterial.file_path == 'artifact://' + StudyArtifact.id
+        ).exists()
+        self._collect_batches('study_artifacts', StudyArtifact, StudyArtifact.id, [
+            StudyArtifact.created_at < self.cutoff,
+            ~material_exists
+        ])
+
+    def collect_unreferenced_shared_embeddings(self):
+        """Fix drifted reference counts, then drop shared embeddings nothing points at"""
+        if not self.dry_run:
+            corrected = recompute_shared_ref_counts()
+            db.session.commit()
+            self.report['shared_ref_counts_corrected'] = {'rows': corrected, 'bytes': 0}
+        referenced = db.session.query(MaterialChunk.id).filter(
+            MaterialChunk.shared_embedding_id == SharedEmbedding.id
+        ).exists()
+        self._collect_batches('shared_embeddings', SharedEmbedding, SharedEmbedding.id, [
+            SharedEmbedding.created_at < self.cutoff,
+            ~referenced
+        ])
+
+    def collect_orphaned_storage_objects(self):
+        """Stored files under the GC prefixes that no material or thumbnail references"""
+        if not self.storage_prefixes:
+            return
+        from ..utils.storage import get_storage
+
+        storage = get_storage()
+        if storage.name == 'S3' and not self.config.get('AWS_STORAGE_BUCKET_NAME'):
+            return
+        cutoff = self.cutoff.replace(tzinfo=timezone.utc)
+        deletes = 0
+        for prefix in self.storage_prefixes:
+            for page in storage.iter_objects(prefix, page_size=S3_DELETE_BATCH):
+                objects = [obj for obj in page if obj['last_modified'] < cutoff]
+                if not objects:
+                    continue
+                referenced = self._referenced_keys([obj['key'] for obj in objects])
+                orphans = [obj for obj in objects if obj['key'] not in referenced]
+                if not orphans:
+                    continue
+                self._record('storage_objects', len(orphans), sum(obj['size'] for obj in orphans))
+                if self.dry_run:
+                    continue
+                storage.delete_many([obj['key'] for obj in orphans])
+                deletes += 1
+                if deletes >= self.max_batches:
+                    return
+
+    def collect_stale_multipart_uploads(self):
+        """Abort browser uploads abandoned part way; S3 keeps (and bills) their parts until then"""
+        from .multipart_uploads import abort_stale_uploads
+
+        if self.dry_run:
+            return
+        for _ in range(self.max_batches):
+            aborted = abort_stale_uploads(limit=self.batch_size)
+            self._record('multipart_uploads', aborted, 0)
+            if aborted < self.batch_size:
+                break
+
+    def _referenced_keys(self, keys: List[str]) -> set:
+        """Which of these keys the database still points at (one query per listing page).
+
+        A content-hash thumbnail variant counts as referenced while any material
+        points at a variant of the same file.
+        """
+        from .thumbnails import THUMBNAIL_PREFIX, thumbnail_directory_length
+
+        referenced = set()
+        for column in (UserCourseMaterial.file_path, UserCourseMaterial.thumbnail_path, StudyArtifact.export_path):
+            referenced.update(row[0] for row in db.session.query(column).filter(column.in_(keys)).distinct())
+
+        length = thumbnail_directory_length()
+        directories = {key[:length] for key in keys if key.startswith(THUMBNAIL_PREFIX)}
+        if directories:
+            directory = db.func.left(UserCourseMaterial.thumbnail_path, length)
+            live = {row[0] for row in db.session.query(directory).filter(directory.in_(directories)).distinct()}
+            referenced.update(key for key in keys if key[:length] in live)
+        return referenced
+
+
+def run_storage_gc(dry_run: bool = False) -> Dict[str, Any]:
+    """Run one collection unless another process holds the GC lock; returns the report or None"""
+    with db.engine.connect() as lock_connection:
+        if not lock_connection.execute(db.select(db.func.pg_try_advisory_lock(GC_ADVISORY_LOCK_KEY))).scalar():
+            print("Storage GC already running in another process, skipping")
+            return None
+        try:
+            report = StorageGarbageCollector(dry_run=dry_run).run()
+        finally:
+            lock_connection.execute(db.select(db.func.pg_advisory_unlock(GC_ADVISORY_LOCK_KEY)))
+            lock_connection.commit()
+
+    if not dry_run:
+        metrics.increment('gc.runs')
+        metrics.increment('gc.bytes_reclaimed', report['bytes_reclaimed'])
+        metrics.set_gauge('gc.last_run_bytes_reclaimed', report['bytes_reclaimed'])
+        metrics.set_gauge('gc.last_run_at', time.time())
+    print(f"Storage GC {'dry run ' if dry_run else ''}finished: {report['bytes_reclaimed']} bytes, "
+          f"{sum(entry['rows'] for entry in report['collected'].values())} rows/objects")
+    return report
+
+
+def storage_gc_worker():
+    """Background worker running the collector on a fixed interval"""
+    interval = app_instance.config.get('GC_INTERVAL_SECONDS', 6 * 3600)
+    while True:
+        time.sleep(interval)
+        with app_instance.app_context():
+            try:
+                run_storage_gc()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Storage GC worker error: {str(e)}")
+            finally:
+                db.session.remove()
+
+
+def init_storage_gc(flask_app=None):
+    """Start the scheduled garbage collector - call during app startup"""
+    global app_instance, gc_thread
+    if flask_app:
+        app_instance = flask_app
+    if not app_instance.config.get('GC_ENABLED', True):
+        return
+    if gc_thread is None or not gc_thread.is_alive():
+        gc_thread = threading.Thread(target=storage_gc_worker, name='storage-gc', daemon=True)
+        gc_thread.start()
+        print("Storage garbage collector scheduled")
@@ -0,0 +1,147 @@
+"""
+Generated quizzes and flashcards kept in Postgres.
+
+Saving an artifact writes one StudyArtifact row (compressed JSONB) and the
+UserCourseMaterial that lists it, whose file_path is 'artifact://<id>'.
+Opening it is a primary-key read, and recently opened artifacts are served
+from an in-process LRU without touching the database.
+
+Materials saved before this point still point at a JSON file in storage;
+they are moved into the database the first time they are opened. With
+STUDY_ARTIFACT_EXPORT enabled a JSON copy is also written to storage.
+"""
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from flask import current_app
+from ..extensions import db
+from ..models.study_artifact import StudyArtifact
+from ..models.user_course_material import UserCourseMaterial
+from ..utils import metrics
+from ..utils.cache import TTLCache
+from ..utils.storage import get_storage
+
+ARTIFACT_SCHEME = 'artifact://'
+
+_artifact_cache = TTLCache(max_entries=512, default_ttl=3600)
+
+
+def is_artifact_path(file_path: Optional[str]) -> bool:
+    return bool(file_path) and file_path.startswith(ARTIFACT_SCHEME)
+
+
+def artifact_id_from_path(file_path: str) -> str:
+    return file_path[len(ARTIFACT_SCHEME):]
+
+
+def save_artifact(user_id: str, combo_id: str, artifact_type: str, material_name: str,
+                  content: Any) -> Tuple[StudyArtifact, UserCourseMaterial]:
+    """Store generated content and list it as a course material; the caller commits"""
+    serialized = json.dumps(content)
+    artifact = StudyArtifact(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        course_id=combo_id,
+        artifact_type=artifact_type,
+        content=content,
+        content_size=len(serialized.encode('utf-8'))
+    )
+    if current_app.config.get('STUDY_ARTIFACT_EXPORT', False):
+        artifact.export_path = _export(combo_id, artifact, serialized)
+    now = datetime.utcnow()
+    material = UserCourseMaterial(
+        user_id=user_id,
+        course_id=combo_id,
+        file_path=f"{ARTIFACT_SCHEME}{artifact.id}",
+        material_name=material_name,
+        is_pinned=False,
+        created_at=now,
+        updated_at=now,
+        file_type=artifact_type,
+        file_size=artifact.content_size,
+        original_filename=f"{material_name}.json"
+    )
+    db.session.add(artifact)
+    db.session.add(material)
+    _artifact_cache.set(artifact.id, content)
+    return artifact, material
+
+
+def load_artifact_content(material: UserCourseMaterial) -> Optional[Any]:
+    """The material's quiz/flashcard JSON, from the cache, the database or (legacy) storage"""
+    if not is_artifact_path(material.file_path):
+        return _import_legacy(material)
+
+    artifact_id = artifact_id_from_path(material.file_path)
+    content = _artifact_cache.get(artifact_id)
+    if content is not None:
+        metrics.increment('study_artifacts.cache_hits')
+        return content
+    metrics.increment('study_artifacts.cache_misses')
+    content = db.session.query(StudyArtifact.content).filter(
+        StudyArtifact.id == artifact_id,
+        StudyArtifact.user_id == material.user_id
+    ).scalar()
+    if content is not None:
+        _artifact_cache.set(artifact_id, content)
+    return content
+
+
+def delete_artifact(material: UserCourseMaterial):
+    """Remove the artifact behind a material (and its exported copy); the caller commits"""
+    if not is_artifact_path(material.file_path):
+        return
+    artifact_id = artifact_id_from_path(material.file_path)
+    _artifact_cache.delete(artifact_id)
+    artifact = StudyArtifact.query.filter_by(id=artifact_id, user_id=material.user_id).first()
+    if not artifact:
+        return
+    if artifact.export_path:
+        try:
+            get_storage().delete(artifact.export_path)
+        except Exception as e:
+            print(f"Warning: Failed to delete exported artifact {artifact.export_path}: {str(e)}")
+    db.session.delete(artifact)
+
+
+def _export(combo_id: str, artifact: StudyArtifact, serialized: str) -> Optional[str]:
+    export_path = f"courses/{combo_id}/materials/{artifact.artifact_type}_{artifact.id}.json"
+    try:
+        get_storage().save(io.BytesIO(serialized.encode('utf-8')), export_path)
+        return export_path
+    except Exception as e:
+        print(f"Warning: Failed to export {artifact.artifact_type} {artifact.id} to storage: {str(e)}")
+        return None
+
+
+def _import_legacy(material: UserCourseMaterial) -> Optional[Any]:
+    """Read a JSON file saved before artifacts lived in Postgres and move it into the database.
+
+    The storage object becomes unreferenced and is removed by the storage GC
+    (kept, as the export, when STUDY_ARTIFACT_EXPORT is on).
+    """
+    raw = get_storage().read_text(material.file_path)
+    if not raw:
+        return None
+    content = json.loads(raw)
+    try:
+        artifact = StudyArtifact(
+            id=str(uuid.uuid4()),
+            user_id=material.user_id,
+            course_id=material.course_id,
+            artifact_type=material.file_type,
+            content=content,
+            content_size=len(raw.encode('utf-8')),
+            export_path=material.file_path if current_app.config.get('STUDY_ARTIFACT_EXPORT', False) else None
+        )
+        db.session.add(artifact)
+        material.file_path = f"{ARTIFACT_SCHEME}{artifact.id}"
+        db.session.commit()
+        _artifact_cache.set(artifact.id, content)
+        metrics.increment('study_artifacts.imported')
+    except Exception as e:
+        db.session.rollback()
+        print(f"Warning: Failed to move material {material.id} into the database: {str(e)}")
+    return content
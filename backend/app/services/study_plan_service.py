@@ -0,0 +1,169 @@
+import os
+import json
+import uuid
+import tempfile
+from typing import Dict, Any
+import openai
+from ..models.course import Course
+from ..models.goal import Goal
+from ..extensions import db
+from ..utils.storage import get_storage
+from .document_processor import DocumentProcessor
+
+SUPPORTED_CONTENT_TYPES = ['pdf', 'docx', 'doc', 'txt']
+
+
+class StudyPlanError(Exception):
+    """Raised when a study plan cannot be generated; carries the HTTP status to report"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def load_course_material_text(course_id: str, filename: str) -> str:
+    """Download a course material from storage and return its extracted text"""
+    actual_filename = filename.split('/')[-1] if '/' in filename else filename
+    file_extension = actual_filename.rsplit('.', 1)[1].lower() if '.' in actual_filename else ''
+    if file_extension not in SUPPORTED_CONTENT_TYPES:
+        raise StudyPlanError('File type not supported for content extraction', 400)
+
+    storage_key = f"courses/{course_id}/{actual_filename}"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
+        temp_file_path = temp_file.name
+        try:
+            get_storage().download_to(storage_key, temp_file)
+            temp_file.flush()
+            return DocumentProcessor().extract_text_from_file(temp_file_path, actual_filename)
+        finally:
+            if os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+
+
+class StudyPlanService:
+    """Generates AI study plans and stores them as goal/task/subtask rows"""
+
+    def __init__(self, openai_api_key: str = None):
+        self.openai_api_key = openai_api_key or os.getenv('OPENAI_KEY')
+
+    def generate(self, course_id: str, user_id: str, goal_title: str, goal_description: str,
+                 document_filename: str) -> Dict[str, Any]:
+        """Generate a study plan from a course document and insert it for the user"""
+        if not goal_title or not document_filename:
+            raise StudyPlanError('Goal title and document filename are required', 400)
+
+        course = Course.query.filter_by(id=course_id, user_id=user_id).first()
+        if not course:
+            raise StudyPlanError('Course not found or you do not have access', 404)
+
+        document_content = load_course_material_text(course_id, document_filename)
+
+        if not self.openai_api_key:
+            raise StudyPlanError('OpenAI API key not configured', 500)
+        client = openai.OpenAI(api_key=self.openai_api_key)
+
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are an expert educational consultant who creates detailed, actionable study plans."},
+                {"role": "user", "content": self._build_prompt(document_content, goal_title, goal_description)}
+            ],
+            max_tokens=2000,
+            temperature=0.7
+        )
+
+        study_plan_text = response.choices[0].message.content.strip()
+        # Try to extract JSON from the response
+        if study_plan_text.startswith('```json'):
+            study_plan_text = study_plan_text[7:-3]  # Remove ```json and ```
+        elif study_plan_text.startswith('```'):
+            study_plan_text = study_plan_text[3:-3]  # Remove ``` and ```
+        try:
+            study_plan = json.loads(study_plan_text)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing OpenAI response: {e}")
+            print(f"Response content: {study_plan_text}")
+            raise StudyPlanError('Failed to parse AI response', 500)
+
+        goal_title = study_plan.get('goal_title') or goal_title
+        new_goal_id = str(uuid.uuid4())
+        # Insert each task and subtask as a row
+        for task in study_plan.get('tasks', []):
+            task_id = str(uuid.uuid4())
+            for subtask in task.get('subtasks', []):
+                goal_row = Goal(
+                    user_id=user_id,
+                    course_id=course.combo_id,
+                    goal_id=new_goal_id,
+                    goal_descr=goal_title,
+                    due_date=None,
+                    goal_completed=False,
+                    task_id=task_id,
+                    task_title=task.get('name'),
+                    task_descr=task.get('description'),
+                    task_completed=False,
+                    subtask_id=str(uuid.uuid4()),
+                    subtask_descr=subtask.get('name'),
+                    subtask_type=subtask.get('type', 'other'),
+                    subtask_completed=False,
+                    is_conflicting=False  # Default to False for AI-generated plans
+                )
+                db.session.add(goal_row)
+        db.session.commit()
+        print(f"[Inserted AI-generated goal_id]: {new_goal_id}")
+        return {
+            'success': True,
+            'goal_id': new_goal_id,
+            'message': 'AI-generated study plan inserted into database.'
+        }
+
+    def _build_prompt(self, document_content: str, goal_title: str, goal_description: str) -> str:
+        return f"""
+You are an expert study planner and educational consultant. Based on the following document content and learning goal, create a detailed study plan with tasks and subtasks.
+
+Document content: {document_content[:2000]}
+
+Goal: {goal_title}
+Description: {goal_description}
+
+Please create a study plan in the following JSON format:
+{{
+  "goal_title": "{goal_title}",
+  "goal_description": "{goal_description}",
+  "tasks": [
+    {{
+      "name": "Task name",
+      "description": "Task description",
+      "estimated_hours": 2,
+      "priority": "high|medium|low",
+      "subtasks": [
+        {{
+          "name": "Subtask name",
+          "description": "Subtask description",
+          "estimated_minutes": 30,
+          "type": "reading|flashcard|quiz|practice|review|other"
+        }}
+      ]
+    }}
+  ]
+}}
+
+Guidelines:
+1. Break down the goal into at least 4 but no more than 8 manageable tasks
+2. Each task should have 2-5 subtasks
+3. Focus on practical, actionable steps
+4. Use appropriate subtask types:
+   - "reading": Reading material, studying content
+   - "flashcard": Creating or reviewing flashcards
+   - "quiz": Taking quizzes or self-assessments
+   - "practice": Doing exercises, problem-solving
+   - "review": Reviewing previous material, summary
+   - "other": Any other learning activity
+5. Estimate realistic time requirements
+6. Prioritize tasks based on importance and dependencies
+7. Make sure the plan is comprehensive but achievable
+8. Include a variety of subtask types for effective learning
+
+Return only the JSON response, no additional text.
+"""
@@ -0,0 +1,283 @@
+"""
+Order of a task's subtasks, kept with fractional keys.
+
+Subtasks used to be ordered by an integer subtask_order that was rewritten
+for every subtask of the task (reindex_subtasks) whenever one was added or
+deleted, so every drag in a long task cost O(n) writes. Now each row carries a
+subtask_rank key (utils/fractional_index) and a task's subtasks are listed by
+it (Goal.subtask_ordering):
+
+  * adding a subtask gives it a key after the task's last one
+  * deleting one leaves the others alone
+  * moving one gives it a key between its new neighbours, one row written
+  * a full reorder (reorder_subtasks) keeps every subtask that is already in
+    order relative to the others (the longest increasing run of keys) and
+    re-keys only the rest, in one statement
+
+Keys grow when the same gap is split over and over. A task whose keys get
+longer than SUBTASK_RANK_MAX_LENGTH is queued for a rebalance that gives all
+its subtasks short, evenly spaced keys again. A background thread runs
+queued rebalances and periodically sweeps for tasks that need one, including
+rows written before subtask_rank existed; until then those are listed by
+their legacy subtask_order, after any ranked rows.
+
+Rank writes for a task are serialized with a transaction-scoped advisory lock,
+so concurrent moves and rebalances never compute keys from stale neighbours.
+"""
+import time
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy.orm.attributes import set_committed_value
+from ..extensions import db
+from ..models.goal import Goal, PLACEHOLDER_TASK_ID
+from ..utils import metrics
+from ..utils.fractional_index import key_between, keys_between, spread_keys
+from ..utils.advisory_locks import (
+    SUBTASK_SWEEP_ADVISORY_LOCK_KEY as SWEEP_ADVISORY_LOCK_KEY,
+    SUBTASK_TASK_LOCK_NAMESPACE as TASK_LOCK_NAMESPACE
+)
+from .goal_edits import update_rows
+
+rebalance_thread = None
+app_instance = None  # Store the Flask app instance
+_pending = set()  # (user_id, task_id) waiting for a rebalance
+_pending_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def lock_task(user_id: str, task_id: str):
+    """Serialize rank writes for one task until the current transaction ends"""
+    db.session.execute(
+        db.select(db.func.pg_advisory_xact_lock(TASK_LOCK_NAMESPACE, db.func.hashtext(f"{user_id}:{task_id}")))
+    )
+
+
+def task_subtasks(user_id: str, task_id: str) -> List[Goal]:
+    return Goal.query.filter_by(user_id=user_id, task_id=task_id).order_by(*Goal.subtask_ordering()).all()
+
+
+def _max_length() -> int:
+    return current_app.config.get('SUBTASK_RANK_MAX_LENGTH', 12)
+
+
+def _set_ranks(rows: List[Goal], ranks: List[str]) -> int:
+    """Write the rows' new keys in one statement and keep the loaded objects in step"""
+    updates = {row.id: {'subtask_rank': rank} for row, rank in zip(rows, ranks) if row.subtask_rank != rank}
+    if updates:
+        update_rows(updates)
+        for row, rank in zip(rows, ranks):
+            set_committed_value(row, 'subtask_rank', rank)
+    return len(updates)
+
+
+def rebalance_task(rows: List[Goal]) -> int:
+    """Short, evenly spaced keys for a task's subtasks in their current order; the caller holds the task lock"""
+    return _set_ranks(rows, spread_keys(len(rows)))
+
+
+def _ranked_subtasks(user_id: str, task_id: str) -> List[Goal]:
+    """The task's subtasks in order, locked, with every row ranked"""
+    if task_id == PLACEHOLDER_TASK_ID:
+        raise ValueError("Placeholder rows have no order")
+    lock_task(user_id, task_id)
+    rows = task_subtasks(user_id, task_id)
+    ranks = [row.subtask_rank for row in rows]
+    if not all(ranks) or len(set(ranks)) != len(ranks):
+        rebalance_task(rows)
+    return rows
+
+
+def _check_length(user_id: str, task_id: str, ranks):
+    if any(rank and len(rank) > _max_length() for rank in ranks):
+        request_rebalance(user_id, task_id)
+
+
+def next_position(user_id: str, task_id: str) -> Tuple[str, int]:
+    """subtask_rank and legacy subtask_order for a subtask added at the end of the task"""
+    lock_task(user_id, task_id)
+    last_rank, last_order, unranked = db.session.query(
+        db.func.max(Goal.subtask_rank),
+        db.func.max(Goal.subtask_order),
+        db.func.count(Goal.id).filter(Goal.subtask_rank.is_(None))
+    ).filter(Goal.user_id == user_id, Goal.task_id == task_id).one()
+    if unranked:
+        rows = task_subtasks(user_id, task_id)
+        rebalance_task(rows)
+        last_rank = rows[-1].subtask_rank
+    rank = key_between(last_rank, None)
+    _check_length(user_id, task_id, [rank])
+    return rank, (last_order + 1 if last_order is not None else 0)
+
+
+def move_subtask(subtask: Goal, position: Optional[int] = None, after_subtask_id: Optional[str] = None) -> str:
+    """Place a subtask at position among its siblings, or right after after_subtask_id (first when None).
+
+    Only the moved row is written (unless the task has to be ranked first).
+    Raises ValueError when after_subtask_id is not a sibling.
+    """
+    rows = _ranked_subtasks(subtask.user_id, subtask.task_id)
+    siblings = [row for row in rows if row.id != subtask.id]
+    if position is not None:
+        index = min(max(int(position), 0), len(siblings))
+    elif after_subtask_id is None:
+        index = 0
+    else:
+        index = next((i + 1 for i, row in enumerate(siblings) if row.subtask_id == after_subtask_id), None)
+        if index is None:
+            raise ValueError(f"Subtask {after_subtask_id} is not in task {subtask.task_id}")
+    left = siblings[index - 1].subtask_rank if index > 0 else None
+    right = siblings[index].subtask_rank if index < len(siblings) else None
+    if subtask.subtask_rank is not None and (left is None or left < subtask.subtask_rank) \
+            and (right is None or subtask.subtask_rank < right):
+        return subtask.subtask_rank  # Already there
+    subtask.subtask_rank = key_between(left, right)
+    _check_length(subtask.user_id, subtask.task_id, [subtask.subtask_rank])
+    return subtask.subtask_rank
+
+
+def reorder_subtasks(user_id: str, task_id: str, subtask_ids: List[str]) -> Dict[str, str]:
+    """Apply a complete new order for a task's subtasks; returns {subtask_id: rank} in the new order.
+
+    Raises ValueError unless subtask_ids lists every subtask of the task exactly once.
+    """
+    rows = _ranked_subtasks(user_id, task_id)
+    by_subtask = {row.subtask_id: row for row in rows}
+    if len(subtask_ids) != len(rows) or set(subtask_ids) != set(by_subtask):
+        raise ValueError("subtask_ids must list every subtask of the task exactly once")
+
+    ordered = [by_subtask[subtask_id] for subtask_id in subtask_ids]
+    ranks = [row.subtask_rank for row in ordered]
+    new_ranks = list(ranks)
+    # Subtasks already in order relative to each other keep their keys; the rest get keys between them
+    previous = -1
+    for kept in _longest_increasing(ranks) + [len(ranks)]:
+        if kept - previous > 1:
+            left = ranks[previous] if previous >= 0 else None
+            right = ranks[kept] if kept < len(ranks) else None
+            new_ranks[previous + 1:kept] = keys_between(left, right, kept - previous - 1)
+        previous = kept
+    moved = _set_ranks(ordered, new_ranks)
+    metrics.increment('subtask_ordering.reorders')
+    metrics.increment('subtask_ordering.reorder_rows_written', moved)
+    _check_length(user_id, task_id, new_ranks)
+    return {row.subtask_id: row.subtask_rank for row in ordered}
+
+
+def _longest_increasing(values: List[str]) -> List[int]:
+    """Indexes of one longest strictly increasing subsequence of values"""
+    tails = []  # tails[k]: index of the smallest last value of an increasing run of length k + 1
+    tail_values = []
+    previous = [-1] * len(values)
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tail_values, value)
+        if k:
+            previous[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_values.append(value)
+        else:
+            tails[k] = i
+            tail_values[k] = value
+    result = []
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        result.append(i)
+        i = previous[i]
+    return result[::-1]
+
+
+def request_rebalance(user_id: str, task_id: str):
+    """Queue a task for the background rebalance"""
+    with _pending_lock:
+        _pending.add((user_id, task_id))
+    metrics.increment('subtask_ordering.rebalances_requested')
+    _wake.set()
+
+
+def rebalance_now(user_id: str, task_id: str) -> int:
+    """Rebalance one task in its own transaction; returns the rows written"""
+    lock_task(user_id, task_id)
+    written = rebalance_task(task_subtasks(user_id, task_id))
+    db.session.commit()
+    metrics.increment('subtask_ordering.rebalances')
+    return written
+
+
+def find_tasks_to_rebalance(limit: int) -> List[Tuple[str, str]]:
+    """Tasks with unranked subtasks or keys longer than SUBTASK_RANK_MAX_LENGTH"""
+    return [tuple(row) for row in db.session.query(Goal.user_id, Goal.task_id).filter(
+        Goal.task_id != PLACEHOLDER_TASK_ID,
+        db.not_(db.func.coalesce(Goal.is_external, False)),
+        db.or_(Goal.subtask_rank.is_(None), db.func.length(Goal.subtask_rank) > _max_length())
+    ).distinct().limit(limit)]
+
+
+def sweep() -> Optional[int]:
+    """Rebalance up to SUBTASK_RANK_SWEEP_BATCH tasks that need it, unless another process is sweeping.
+
+    Returns how many were found (None when skipped).
+    """
+    with db.engine.connect() as lock_connection:
+        if not lock_connection.execute(db.select(db.func.pg_try_advisory_lock(SWEEP_ADVISORY_LOCK_KEY))).scalar():
+            return None
+        try:
+            tasks = find_tasks_to_rebalance(current_app.config.get('SUBTASK_RANK_SWEEP_BATCH', 500))
+            db.session.commit()
+            for user_id, task_id in tasks:
+                try:
+                    rebalance_now(user_id, task_id)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Subtask rebalance failed for task {task_id}: {str(e)}")
+        finally:
+            lock_connection.execute(db.select(db.func.pg_advisory_unlock(SWEEP_ADVISORY_LOCK_KEY)))
+            lock_connection.commit()
+    if tasks:
+        print(f"Subtask ordering sweep rebalanced {len(tasks)} tasks")
+    return len(tasks)
+
+
+def rebalance_worker():
+    """Background worker running queued rebalances as they come and a sweep on an interval"""
+    sweep_interval = app_instance.config.get('SUBTASK_RANK_SWEEP_SECONDS', 3600)
+    batch = app_instance.config.get('SUBTASK_RANK_SWEEP_BATCH', 500)
+    next_sweep = time.monotonic()  # First sweep at startup ranks rows written before subtask_rank existed
+    while True:
+        _wake.wait(timeout=max(0.0, next_sweep - time.monotonic()))
+        _wake.clear()
+        with _pending_lock:
+            tasks = list(_pending)
+            _pending.clear()
+        with app_instance.app_context():
+            try:
+                for user_id, task_id in tasks:
+                    try:
+                        rebalance_now(user_id, task_id)
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Subtask rebalance failed for task {task_id}: {str(e)}")
+                if time.monotonic() >= next_sweep:
+                    found = sweep()
+                    # A full batch means there is more to do; come back right away
+                    next_sweep = time.monotonic() + (0 if found == batch else sweep_interval)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Subtask ordering worker error: {str(e)}")
+                next_sweep = time.monotonic() + sweep_interval
+            finally:
+                db.session.remove()
+
+
+def init_subtask_ordering(flask_app=None):
+    """Start the rebalance worker - call during app startup"""
+    global app_instance, rebalance_thread
+    if flask_app:
+        app_instance = flask_app
+    if not app_instance.config.get('SUBTASK_RANK_REBALANCE_ENABLED', True):
+        return
+    if rebalance_thread is None or not rebalance_thread.is_alive():
+        rebalance_thread = threading.Thread(target=rebalance_worker, name='subtask-rebalance', daemon=True)
+        rebalance_thread.start()
+        print("Subtask ordering rebalancer started")
@@ -0,0 +1,208 @@
+"""
+Material thumbnails rendered in a background process pool.
+
+Each renderable material (PDFs, images) gets a thumbnail in every configured
+width (THUMBNAIL_WIDTHS) and format (WebP when Pillow is installed, PNG).
+Variants are stored under a key derived from the SHA-256 of the source file:
+
+    thumbnails/by-hash/ab/<sha256>/<width>.<format>
+
+so identical files uploaded to different courses share one set of
+thumbnails, and a key's content never changes. That lets them be served with
+an immutable, year-long Cache-Control. UserCourseMaterial.thumbnail_path
+points at the default variant; the others are derived from it.
+
+Rendering is CPU bound, so it runs in a ProcessPoolExecutor; a small thread
+pool downloads sources, waits on the renders and uploads the results, so
+requests never block on thumbnails.
+"""
+import io
+import os
+import re
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Dict, Optional
+from flask import current_app
+from ..extensions import db, socketio
+from ..models.user_course_material import UserCourseMaterial
+from ..utils import metrics
+from ..utils.storage import get_storage
+from ..utils.thumbnail_render import render_thumbnails, can_render, available_formats
+
+THUMBNAIL_PREFIX = 'thumbnails/by-hash/'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+HASH_BUFFER_SIZE = 1024 * 1024
+
+_THUMBNAIL_KEY_RE = re.compile(r'^thumbnails/by-hash/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})/\d+\.\w+$')
+
+app_instance = None
+_executor = None
+_render_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_thumbnails(flask_app=None):
+    """Remember the app for background thumbnail work - call during app startup"""
+    global app_instance
+    if flask_app:
+        app_instance = flask_app
+
+
+def thumbnail_key(digest: str, width: int, fmt: str) -> str:
+    return f"{THUMBNAIL_PREFIX}{digest[:2]}/{digest}/{width}.{fmt}"
+
+
+def thumbnail_directory_length() -> int:
+    """Length of the 'thumbnails/by-hash/ab/<sha256>/' part shared by every variant of a file"""
+    return len(THUMBNAIL_PREFIX) + 3 + 64 + 1
+
+
+def thumbnail_settings(config) -> Dict[str, Any]:
+    widths = sorted({int(w) for w in str(config.get('THUMBNAIL_WIDTHS', '160,320,640')).split(',') if w.strip()})
+    formats = available_formats()
+    default_width = config.get('THUMBNAIL_DEFAULT_WIDTH', 320)
+    return {
+        'widths': widths,
+        'formats': formats,
+        'default': (default_width if default_width in widths else widths[-1], formats[0])
+    }
+
+
+def thumbnail_variant_keys(thumbnail_path: Optional[str], config=None) -> Dict[str, Dict[int, str]]:
+    """{format: {width: key}} for a content-hash thumbnail_path; {} for legacy single thumbnails"""
+    match = _THUMBNAIL_KEY_RE.match(thumbnail_path or '')
+    if not match:
+        return {}
+    settings = thumbnail_settings(config or current_app.config)
+    return {
+        fmt: {width: thumbnail_key(match.group('digest'), width, fmt) for width in settings['widths']}
+        for fmt in settings['formats']
+    }
+
+
+def queue_thumbnails(material_id: str) -> bool:
+    """Render a material's thumbnails in the background; False when its type has none"""
+    global _executor
+    material = UserCourseMaterial.query.get(material_id)
+    if not material or not can_render(material.file_type):
+        return False
+    with _pool_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='thumbnails')
+    _executor.submit(_run, material_id)
+    return True
+
+
+def _run(material_id: str):
+    with app_instance.app_context():
+        try:
+            material = UserCourseMaterial.query.get(material_id)
+            if material and generate_material_thumbnails(material):
+                urls = get_storage().urls([material.thumbnail_path])
+                socketio.emit('material_thumbnail_ready', {
+                    'material_id': material.id,
+                    'thumbnail_path': material.thumbnail_path,
+                    'thumbnail_url': urls.get(material.thumbnail_path)
+                }, room=material.user_id)
+        except Exception as e:
+            db.session.rollback()
+            metrics.increment('thumbnails.failed')
+            print(f"Thumbnail generation failed for material {material_id}: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def _get_render_pool(config) -> ProcessPoolExecutor:
+    global _render_pool
+    with _pool_lock:
+        if _render_pool is None:
+            # spawn: forking a process that runs threads and DB connections is unsafe
+            _render_pool = ProcessPoolExecutor(
+                max_workers=config.get('THUMBNAIL_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    return _render_pool
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_obj:
+        for block in iter(lambda: file_obj.read(HASH_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def generate_material_thumbnails(material: UserCourseMaterial, force: bool = False) -> Optional[str]:
+    """Render (or reuse) every thumbnail variant and point the material at the default one"""
+    if not can_render(material.file_type):
+        return None
+    config = current_app.config
+    settings = thumbnail_settings(config)
+    storage = get_storage()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{material.file_type}') as temp_file:
+        temp_path = temp_file.name
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            storage.download_to(material.file_path, temp_file)
+        digest = file_digest(temp_path)
+        default_key = thumbnail_key(digest, *settings['default'])
+
+        # Every variant is checked, so a set left half written (or missing a newly added size) is completed
+        variants = [(width, fmt) for width in settings['widths'] for fmt in settings['formats']]
+        missing = variants if force else [
+            variant for variant in variants if not storage.exists(thumbnail_key(digest, *variant))
+        ]
+        if missing:
+            with metrics.timer('thumbnails.render_ms'):
+                outputs = _get_render_pool(config).submit(
+                    render_thumbnails, temp_path, material.file_type, settings['widths'], settings['formats']
+                ).result(timeout=config.get('THUMBNAIL_RENDER_TIMEOUT', 60))
+            # The default variant goes last: it is what materials point at
+            missing.sort(key=lambda variant: variant == settings['default'])
+            for variant in missing:
+                if variant in outputs:
+                    storage.save(io.BytesIO(outputs[variant]), thumbnail_key(digest, *variant),
+                                 cache_control=IMMUTABLE_CACHE_CONTROL)
+            metrics.increment('thumbnails.rendered')
+        else:
+            metrics.increment('thumbnails.reused')
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    material.thumbnail_path = default_key
+    db.session.commit()
+    return default_key
+
+
+def backfill_thumbnails(batch_size: int = 50, limit: int = None, force: bool = False) -> Dict[str, int]:
+    """Give existing materials content-hash thumbnails (those without one, or with a legacy one)"""
+    counts = {'processed': 0, 'failed': 0}
+    last_id = ''
+    while limit is None or counts['processed'] + counts['failed'] < limit:
+        query = UserCourseMaterial.query.filter(UserCourseMaterial.id > last_id)
+        if not force:
+            query = query.filter(db.or_(
+                UserCourseMaterial.thumbnail_path.is_(None),
+                ~UserCourseMaterial.thumbnail_path.startswith(THUMBNAIL_PREFIX)
+            ))
+        materials = query.order_by(UserCourseMaterial.id).limit(batch_size).all()
+        if not materials:
+            break
+        last_id = materials[-1].id
+        for material in materials:
+            if not can_render(material.file_type):
+                continue
+            try:
+                generate_material_thumbnails(material, force=force)
+                counts['processed'] += 1
+            except Exception as e:
+                db.session.rollback()
+                counts['failed'] += 1
+                print(f"Thumbnail backfill failed for {material.id}: {str(e)}")
+        print(f"Thumbnails backfilled: {counts['processed']} ({counts['failed']} failed)")
+    return counts
@@ -0,0 +1,20 @@
+"""
+Postgres advisory lock keys used across the app.
+
+Advisory locks are identified only by their key, so two features picking the
+same number silently serialize against (or skip because of) each other. Every
+key lives here so a new one cannot collide with an existing one: take the next
+number in the 724_311_9xx range.
+
+Single keys are used as pg_(try_)advisory_(xact_)lock(key). Namespaces are the
+first half of the two-key form, pg_advisory_lock(namespace, id), whose key
+space does not overlap with the single-key one.
+"""
+
+GC_ADVISORY_LOCK_KEY = 724_311_905  # One process runs the storage collector at a time
+CALENDAR_CLAIM_ADVISORY_LOCK_KEY = 724_311_906  # Serializes calendar sync claims so a user's jobs are never claimed twice
+CALENDAR_SCHEDULE_ADVISORY_LOCK_KEY = 724_311_907  # One process schedules calendar imports at a time
+SUBTASK_SWEEP_ADVISORY_LOCK_KEY = 724_311_908  # One process sweeps for subtask rank rebalances at a time
+SUBTASK_TASK_LOCK_NAMESPACE = 724_311_909  # (namespace, hashtext(user:task)) serializes rank writes per task
+COMPAT_VIEW_ADVISORY_LOCK_KEY = 724_311_910  # One process rebuilds users_courses_goal_view at a time
+EMBEDDING_MIGRATION_LOCK_NAMESPACE = 724_311_911  # (namespace, migration id) held by the process running a migration
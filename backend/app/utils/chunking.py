@@ -0,0 +1,91 @@
+"""
+Text normalisation and chunking shared by every ingestion path.
+
+All three functions are linear in the document size:
+
+  * clean_text strips control characters with one regex pass and collapses
+    whitespace with str.split/join, both implemented in C.
+  * chunk_by_characters looks for a sentence boundary with one compiled regex
+    search bounded to the end of each window, never rescanning text.
+  * chunk_by_tokens encodes the document once and slices the original string
+    at token offsets instead of decoding every window separately.
+
+Chunk windows stop once one reaches the end of the text, so the last chunk is
+never followed by a duplicate made of its own overlap.
+"""
+import re
+from functools import lru_cache
+from typing import List
+
+# C0 control characters except tab, newline and carriage return
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_SENTENCE_END_RE = re.compile(r'[.!?\n]')
+
+
+def clean_text(text: str) -> str:
+    """Remove NUL/control characters and collapse all whitespace runs to single spaces"""
+    if not text:
+        return ""
+    return ' '.join(_CONTROL_CHARS_RE.sub('', text).split())
+
+
+def chunk_by_characters(text: str, chunk_size: int = 1000, overlap: int = 200,
+                        boundary_window: int = 100) -> List[str]:
+    """Split text into ~chunk_size character chunks with overlap.
+
+    A chunk ends just after the first sentence end ('.', '!', '?' or newline) found in
+    its last boundary_window characters, or at chunk_size when there is none.
+    """
+    if len(text) <= chunk_size:
+        return [text]
+
+    length = len(text)
+    chunks = []
+    start = 0
+
+    while start < length:
+        end = start + chunk_size
+        if end < length:
+            boundary = _SENTENCE_END_RE.search(text, max(end - boundary_window, start + 1), end)
+            if boundary:
+                end = boundary.start() + 1
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+
+    return chunks
+
+
+@lru_cache(maxsize=4)
+def get_encoding(name: str = 'cl100k_base'):
+    """tiktoken encoding, loaded once per process"""
+    import tiktoken
+    return tiktoken.get_encoding(name)
+
+
+def chunk_by_tokens(text: str, chunk_size: int = 1000, overlap: int = 200, encoding=None) -> List[str]:
+    """Split text into windows of chunk_size tokens overlapping by overlap tokens"""
+    encoding = encoding or get_encoding()
+    tokens = encoding.encode(text or '', disallowed_special=())
+    if not tokens:
+        return []
+
+    # One decode for the whole document; offsets[i] is where token i starts in decoded
+    decoded, offsets = encoding.decode_with_offsets(tokens)
+    offsets.append(len(decoded))
+
+    chunks = []
+    step = max(chunk_size - overlap, 1)
+    for start in range(0, len(tokens), step):
+        end = min(start + chunk_size, len(tokens))
+        chunk = decoded[offsets[start]:offsets[end]].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end == len(tokens):
+            break
+
+    return chunks
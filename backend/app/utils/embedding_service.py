@@ -2,7 +2,10 @@ import openai
 import os
 from typing import List, Dict, Any
 from app.models.document_embedding import DocumentEmbedding
-import tiktoken
+from app.models.embedding_version import ChunkEmbeddingVersion, LEGACY_EMBEDDING_MODEL
+from app.services.embedding_migration import course_embedding_model, store_versioned_embeddings
+from app.init import db
+from app.utils.chunking import chunk_by_tokens, get_encoding
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,29 +17,21 @@ class EmbeddingService:
     """Service for handling document embeddings and vector operations"""
     
     def __init__(self):
-        self.encoding = tiktoken.get_encoding("cl100k_base")  # OpenAI's encoding
+        self.encoding = get_encoding("cl100k_base")  # OpenAI's encoding
         self.chunk_size = 1000  # tokens per chunk
         self.chunk_overlap = 200  # tokens overlap between chunks
+        self.embedding_model = LEGACY_EMBEDDING_MODEL
     
     def chunk_text(self, text: str) -> List[str]:
         """Split text into chunks for embedding"""
-        tokens = self.encoding.encode(text)
-        chunks = []
-        
-        for i in range(0, len(tokens), self.chunk_size - self.chunk_overlap):
-            chunk_tokens = tokens[i:i + self.chunk_size]
-            chunk_text = self.encoding.decode(chunk_tokens)
-            if chunk_text.strip():  # Only add non-empty chunks
-                chunks.append(chunk_text.strip())
-        
-        return chunks
+        return chunk_by_tokens(text, self.chunk_size, self.chunk_overlap, self.encoding)
     
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str, model: str = None) -> List[float]:
         """Get embedding for a text using OpenAI API"""
         try:
             response = openai.Embedding.create(
                 input=text,
-                model="text-embedding-ada-002"
+                model=model or self.embedding_model
             )
             return response['data'][0]['embedding']
         except Exception as e:
@@ -48,7 +43,7 @@ class EmbeddingService:
         try:
             response = openai.Embedding.create(
                 input=texts,
-                model="text-embedding-ada-002"
+                model=self.embedding_model
             )
             return [data['embedding'] for data in response['data']]
         except Exception as e:
@@ -71,6 +66,7 @@ class EmbeddingService:
         
         # Store embeddings in database
         embedding_ids = []
+        stored_chunks = []
         for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
             try:
                 embedding_id = DocumentEmbedding.insert_embedding(
@@ -85,10 +81,21 @@ class EmbeddingService:
                     metadata=metadata or {}
                 )
                 embedding_ids.append(embedding_id)
+                stored_chunks.append((embedding_id, chunk))
             except Exception as e:
                 print(f"Error storing embedding {i} for document {document_name}: {e}")
                 continue
         
+        # Also embed with any model a migration is moving to
+        try:
+            store_versioned_embeddings(
+                ChunkEmbeddingVersion.SOURCE_DOCUMENT_EMBEDDING, stored_chunks
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error storing versioned embeddings for document {document_name}: {e}")
+        
         print(f"Stored {len(embedding_ids)} embeddings for document: {document_name}")
         return embedding_ids
     
@@ -96,8 +103,12 @@ class EmbeddingService:
                         similarity_threshold: float = 0.7, limit: int = 5) -> List[Dict[str, Any]]:
         """Search for similar documents using semantic search"""
         try:
+            # Courses cut over to a migrated embedding model search that model's vectors
+            model = course_embedding_model(course_id)
+            versioned_model = model if model != self.embedding_model else None
+            
             # Get embedding for the query
-            query_embedding = self.get_embedding(query)
+            query_embedding = self.get_embedding(query, model=model)
             
             # Find similar documents
             similar_docs = DocumentEmbedding.find_similar_documents(
@@ -105,7 +116,8 @@ class EmbeddingService:
                 user_id=user_id,
                 course_id=course_id,
                 similarity_threshold=similarity_threshold,
-                limit=limit
+                limit=limit,
+                model=versioned_model
             )
             
             return similar_docs
@@ -0,0 +1,163 @@
+"""
+Fractional ordering keys: strings that sort between any two others.
+
+A key is an integer part followed by a base-62 fraction. The integer part's
+first character gives its length: 'a'..'z' start non-negative integers of 1..26
+digits, 'Z'..'A' negative ones of 1..26 digits, so "a0" is zero, "a1" one and
+"Zz" minus one. The fraction is written without trailing zeros, e.g. "a0V" is
+about 0.5. Keys compare with plain byte order (digits < upper case < lower
+case, i.e. the "C" collation), so a row can be placed between two neighbours by
+giving it key_between(left, right) without touching any other row.
+
+Adding at either end steps the integer part, which only gains a character
+every time it overflows (after 62, 3844, ... keys), so a list that is only
+appended to keeps short keys. Keys grow by about one character each time the
+same gap between two keys is split again; spread_keys() hands out short
+consecutive keys again when a list is rebalanced.
+"""
+from typing import List, Optional
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+_VALUES = {digit: value for value, digit in enumerate(DIGITS)}
+INTEGER_ZERO = 'a0'
+# The lowest integer has nothing below it, so it is only ever used with a fraction
+SMALLEST_INTEGER = 'A' + DIGITS[0] * 26
+
+
+def _integer_length(head: str) -> int:
+    if 'a' <= head <= 'z':
+        return ord(head) - ord('a') + 2
+    if 'A' <= head <= 'Z':
+        return ord('Z') - ord(head) + 2
+    raise ValueError(f"Invalid ordering key head: {head!r}")
+
+
+def _integer_part(key: str) -> str:
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"Invalid ordering key: {key!r}")
+    return key[:length]
+
+
+def validate_key(key: str):
+    if not key or key == SMALLEST_INTEGER or any(char not in _VALUES for char in key):
+        raise ValueError(f"Invalid ordering key: {key!r}")
+    if key[len(_integer_part(key)):].endswith(DIGITS[0]):
+        raise ValueError(f"Invalid ordering key: {key!r}")
+
+
+def _increment_integer(integer: str) -> Optional[str]:
+    """The next integer part, or None past the largest one"""
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = _VALUES[digits[i]] + 1
+        if value < BASE:
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = DIGITS[0]
+    # Every digit carried over: one more digit (or one less below zero)
+    if head == 'Z':
+        return INTEGER_ZERO
+    if head == 'z':
+        return None
+    head = chr(ord(head) + 1)
+    if head > 'a':
+        digits.append(DIGITS[0])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+
+def _decrement_integer(integer: str) -> Optional[str]:
+    """The previous integer part, or None below the smallest one"""
+    head, digits = integer[0], list(integer[1:])
+    for i in reversed(range(len(digits))):
+        value = _VALUES[digits[i]] - 1
+        if value >= 0:
+            digits[i] = DIGITS[value]
+            return head + ''.join(digits)
+        digits[i] = DIGITS[-1]
+    if head == 'a':
+        return 'Z' + DIGITS[-1]
+    if head == 'A':
+        return None
+    head = chr(ord(head) - 1)
+    if head < 'Z':
+        digits.append(DIGITS[-1])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """A key strictly between fraction digits a ('' for 0) and b (None for 1)"""
+    if b is not None:
+        # Shared prefix: the midpoint starts with it
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = _VALUES[a[0]] if a else 0
+    digit_b = _VALUES[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    # Adjacent digits: b's first digit alone fits when b continues, otherwise go one digit deeper
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """A key sorting after a and before b; None means the start / end of the list"""
+    if a is not None:
+        validate_key(a)
+    if b is not None:
+        validate_key(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Ordering keys out of order: {a!r} >= {b!r}")
+    if a is None:
+        if b is None:
+            return INTEGER_ZERO
+        integer_b = _integer_part(b)
+        if integer_b == SMALLEST_INTEGER:
+            return integer_b + _midpoint('', b[len(integer_b):])
+        if integer_b < b:
+            return integer_b  # b has a fraction, so its bare integer part sorts first
+        previous = _decrement_integer(integer_b)
+        if previous is None:
+            raise ValueError("Ordering keys exhausted at the start of the list")
+        return previous
+    integer_a = _integer_part(a)
+    fraction_a = a[len(integer_a):]
+    if b is None:
+        following = _increment_integer(integer_a)
+        return following if following is not None else integer_a + _midpoint(fraction_a, None)
+    integer_b = _integer_part(b)
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, b[len(integer_b):])
+    following = _increment_integer(integer_a)
+    if following is not None and following < b:
+        return following
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def keys_between(a: Optional[str], b: Optional[str], n: int) -> List[str]:
+    """n ascending keys between a and b, split evenly so none is much longer than the others"""
+    if n <= 0:
+        return []
+    if b is None or a is None:
+        # At an end, step the integer part key by key rather than halving the gap
+        keys = [key_between(a, b)]
+        while len(keys) < n:
+            keys.append(key_between(keys[-1], b) if b is None else key_between(a, keys[-1]))
+        return keys if b is None else keys[::-1]
+    middle = key_between(a, b)
+    left = n // 2
+    return keys_between(a, middle, left) + [middle] + keys_between(middle, b, n - left - 1)
+
+
+def spread_keys(n: int) -> List[str]:
+    """n ascending keys, consecutive integers from zero and so as short as possible"""
+    return keys_between(None, None, n)
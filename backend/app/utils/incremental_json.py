@@ -0,0 +1,83 @@
+"""
+Incremental parsing of streamed LLM JSON output.
+
+The model streams a document like {"questions": [{...}, {...}]} a few
+characters at a time. JsonArrayStreamParser watches for the named array and
+yields each element object as soon as its closing brace arrives, so callers
+can forward items while the rest of the response is still being generated.
+Every character is inspected once and only the object currently being built
+is buffered.
+"""
+import re
+import json
+from typing import Any, Dict, Iterator, List
+
+
+class JsonArrayStreamParser:
+    """Yield complete objects from a JSON array under array_key as text is fed in"""
+
+    def __init__(self, array_key: str):
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self._seek_buffer = ''
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current: List[str] = []
+        self.errors: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the array has been seen"""
+        return self._finished
+
+    def feed(self, text: str) -> Iterator[Dict[str, Any]]:
+        """Consume the next piece of streamed text and yield any objects it completes"""
+        if self._finished or not text:
+            return
+
+        if not self._in_array:
+            self._seek_buffer += text
+            match = self._key_pattern.search(self._seek_buffer)
+            if not match:
+                # Keep only a tail long enough to contain a split key
+                self._seek_buffer = self._seek_buffer[-256:]
+                return
+            text = self._seek_buffer[match.end():]
+            self._seek_buffer = ''
+            self._in_array = True
+
+        for char in text:
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self._current = [char]
+                elif char == ']':
+                    self._finished = True
+                    return
+                continue
+
+            self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = ''.join(self._current)
+                    self._current = []
+                    try:
+                        yield json.loads(raw)
+                    except json.JSONDecodeError as e:
+                        self.errors.append(f"Could not parse streamed item: {str(e)}")
@@ -0,0 +1,90 @@
+"""
+Lightweight in-process metrics: counters, gauges and latency samples.
+
+Values live in memory for the lifetime of the process and are exposed to admins
+(or callers with X-Metrics-Token) through GET /api/health/metrics. Timings keep
+a bounded window of recent samples so percentiles reflect current behaviour
+without unbounded growth.
+"""
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Any
+
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+_timings = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+
+def increment(name: str, value: int = 1):
+    """Add to a monotonically increasing counter"""
+    with _lock:
+        _counters[name] += value
+
+
+def counter_value(name: str) -> int:
+    """Current value of a counter (0 if never incremented)"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def set_gauge(name: str, value: float):
+    """Record the current value of something that goes up and down (e.g. queue depth)"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value_ms: float):
+    """Record a latency sample in milliseconds"""
+    with _lock:
+        _timings[name].append(value_ms)
+
+
+@contextmanager
+def timer(name: str):
+    """Time the wrapped block and record it under name"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - started) * 1000)
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def snapshot() -> Dict[str, Any]:
+    """Return a point-in-time copy of every metric"""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {name: list(samples) for name, samples in _timings.items()}
+
+    timing_stats = {}
+    for name, samples in timings.items():
+        timing_stats[name] = {
+            'count': len(samples),
+            'avg_ms': round(sum(samples) / len(samples), 2) if samples else 0.0,
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'max_ms': round(max(samples), 2) if samples else 0.0
+        }
+    return {'counters': counters, 'gauges': gauges, 'timings': timing_stats}
+
+
+def reset():
+    """Clear all metrics (used by benchmarks between runs)"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
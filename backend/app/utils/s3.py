@@ -1,22 +1,62 @@
+import threading
 import boto3
+from botocore.config import Config as BotoConfig
 from flask import current_app
 import mimetypes
+from typing import Dict, List, Optional
+from .cache import TTLCache
+from . import metrics
+
+PRESIGN_EXPIRES = 3600  # Seconds a presigned URL is valid for
+PRESIGN_REFRESH_MARGIN = 300  # Cached URLs are replaced this long before they expire
+
+# boto3 clients are thread-safe and hold the connection pool, so one per
+# credential set is shared by every request and worker thread.
+_clients = {}
+_clients_lock = threading.Lock()
+_presigned_urls = TTLCache(max_entries=20000, default_ttl=PRESIGN_EXPIRES - PRESIGN_REFRESH_MARGIN)
 
 def get_s3_client():
-    """Initializes and returns a boto3 S3 client from app config."""
-    return boto3.client(
-        's3',
-        aws_access_key_id=current_app.config['S3_KEY'],
-        aws_secret_access_key=current_app.config['S3_SECRET'],
-        region_name=current_app.config['S3_REGION']
+    """Returns the shared, pooled boto3 S3 client for the app config."""
+    config = current_app.config
+    settings = (
+        config['S3_KEY'],
+        config['S3_SECRET'],
+        config['S3_REGION'],
+        config.get('S3_ENDPOINT_URL') or None,
+        config.get('S3_MAX_POOL_CONNECTIONS', 50)
     )
+    client = _clients.get(settings)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(settings)
+            if client is None:
+                # A session per client: the default boto3 session is not thread-safe
+                client = boto3.session.Session().client(
+                    's3',
+                    aws_access_key_id=settings[0],
+                    aws_secret_access_key=settings[1],
+                    region_name=settings[2],
+                    endpoint_url=settings[3],
+                    config=BotoConfig(max_pool_connections=settings[4], retries={'max_attempts': 3, 'mode': 'standard'})
+                )
+                _clients[settings] = client
+                metrics.increment('s3.clients_created')
+    return client
 
-def upload_file_to_s3(file_obj, s3_path):
-    """
-    Uploads a file object to a specified path in the S3 bucket.
-    """
-    s3 = get_s3_client()
-    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+def get_transfer_config():
+    """Multipart settings for managed uploads: parts above the threshold are sent in parallel."""
+    from boto3.s3.transfer import TransferConfig
+    config = current_app.config
+    megabyte = 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=config.get('S3_MULTIPART_THRESHOLD_MB', 16) * megabyte,
+        multipart_chunksize=config.get('S3_MULTIPART_CHUNK_MB', 16) * megabyte,
+        max_concurrency=config.get('S3_UPLOAD_CONCURRENCY', 8),
+        use_threads=True
+    )
+
+def _upload_extra_args(s3_path):
     # Guess content type
     content_type, _ = mimetypes.guess_type(s3_path)
     
@@ -27,72 +67,228 @@ def upload_file_to_s3(file_obj, s3_path):
     extra_args = {'ACL': 'private', 'ContentDisposition': 'inline'}
     if content_type:
         extra_args['ContentType'] = content_type
+    return extra_args
+
+def upload_file_to_s3(file_obj, s3_path, cache_control=None):
+    """
+    Uploads a file object to a specified path in the S3 bucket.
+    Large files are sent as a parallel multipart upload (see get_transfer_config).
+    """
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    extra_args = _upload_extra_args(s3_path)
+    if cache_control:
+        extra_args['CacheControl'] = cache_control
         
-    print(f"DEBUG S3: Uploading {s3_path} with content type: {content_type}")
+    print(f"DEBUG S3: Uploading {s3_path} with content type: {extra_args.get('ContentType')}")
     
     s3.upload_fileobj(
         file_obj,
         bucket_name,
         s3_path,
-        ExtraArgs=extra_args
+        ExtraArgs=extra_args,
+        Config=get_transfer_config()
     )
     # Note: You might want a way to generate presigned URLs to access private files.
     # For now, we return the path. A separate endpoint can generate URLs.
     return s3_path
 
-def get_presigned_url(s3_key):
-    """Generates a presigned URL for an S3 object."""
+def upload_path_to_s3(file_path, s3_path):
+    """
+    Uploads a file on local disk; parts are read from the file concurrently
+    instead of through a single stream.
+    """
     s3 = get_s3_client()
     bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
-    
-    try:
-        print(f"DEBUG S3: Generating presigned URL for key: {s3_key}")
-        
-        params = {
-            'Bucket': bucket_name,
-            'Key': s3_key,
-            'ResponseContentDisposition': 'inline'
-        }
-        
-        # Set content type for JSON files
-        if s3_key.endswith('.json'):
-            params['ResponseContentType'] = 'application/json'
-            
-        url = s3.generate_presigned_url(
-            'get_object',
-            Params=params,
-            ExpiresIn=3600  # URL expires in 1 hour
+    s3.upload_file(
+        file_path,
+        bucket_name,
+        s3_path,
+        ExtraArgs=_upload_extra_args(s3_path),
+        Config=get_transfer_config()
+    )
+    return s3_path
+
+def create_multipart_upload(s3_path):
+    """Starts a multipart upload the browser will send parts to; returns the UploadId."""
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    response = s3.create_multipart_upload(Bucket=bucket_name, Key=s3_path, **_upload_extra_args(s3_path))
+    return response['UploadId']
+
+def get_presigned_part_urls(s3_path, upload_id, part_numbers, expires_in=PRESIGN_EXPIRES):
+    """Presigned PUT URLs for parts of a multipart upload: {part_number: url}."""
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    return {
+        part_number: s3.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': bucket_name, 'Key': s3_path, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=expires_in
         )
-        print(f"DEBUG S3: Generated presigned URL: {url}")
-        return url
-    except Exception as e:
-        print(f"Error generating presigned URL for {s3_key}: {e}")
-        return None
+        for part_number in part_numbers
+    }
 
-def list_files_in_s3(prefix):
+def list_multipart_parts(s3_path, upload_id):
+    """Parts S3 has received so far: {part_number: {'etag', 'size'}}."""
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    parts = {}
+    paginator = s3.get_paginator('list_parts')
+    for page in paginator.paginate(Bucket=bucket_name, Key=s3_path, UploadId=upload_id):
+        for part in page.get('Parts', []):
+            parts[part['PartNumber']] = {'etag': part['ETag'], 'size': part['Size']}
+    return parts
+
+def complete_multipart_upload(s3_path, upload_id, parts):
+    """Assembles the object from {part_number: {'etag', ...}}."""
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    s3.complete_multipart_upload(
+        Bucket=bucket_name,
+        Key=s3_path,
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [
+            {'PartNumber': int(number), 'ETag': parts[number]['etag']}
+            for number in sorted(parts, key=int)
+        ]}
+    )
+    return s3_path
+
+def abort_multipart_upload(s3_path, upload_id):
+    """Discards a multipart upload and the parts already stored for it."""
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    s3.abort_multipart_upload(Bucket=bucket_name, Key=s3_path, UploadId=upload_id)
+    return True
+
+def _presign(s3, bucket_name, s3_key, expires_in):
+    params = {
+        'Bucket': bucket_name,
+        'Key': s3_key,
+        'ResponseContentDisposition': 'inline'
+    }
+
+    # Set content type for JSON files
+    if s3_key.endswith('.json'):
+        params['ResponseContentType'] = 'application/json'
+
+    return s3.generate_presigned_url(
+        'get_object',
+        Params=params,
+        ExpiresIn=expires_in
+    )
+
+def get_presigned_url(s3_key, expires_in=PRESIGN_EXPIRES):
+    """Returns a presigned URL for an S3 object, reusing a cached one until shortly before it expires."""
+    return get_presigned_urls([s3_key], expires_in).get(s3_key)
+
+def get_presigned_urls(s3_keys: List[str], expires_in: int = PRESIGN_EXPIRES) -> Dict[str, Optional[str]]:
     """
-    Lists files in a given directory (prefix) in the S3 bucket.
+    Presigned URLs for many objects at once: {key: url or None}.
+    Cached URLs are reused; the rest are signed locally with the shared client.
+    """
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    ttl = max(expires_in - PRESIGN_REFRESH_MARGIN, 0)
+    urls = {}
+    s3 = None
+    misses = 0
+    for s3_key in s3_keys:
+        if not s3_key or s3_key in urls:
+            continue
+        cache_key = (bucket_name, s3_key, expires_in)
+        url = _presigned_urls.get(cache_key)
+        if url:
+            urls[s3_key] = url
+            continue
+        misses += 1
+        try:
+            s3 = s3 or get_s3_client()
+            url = _presign(s3, bucket_name, s3_key, expires_in)
+            if ttl:
+                _presigned_urls.set(cache_key, url, ttl)
+        except Exception as e:
+            print(f"Error generating presigned URL for {s3_key}: {e}")
+            url = None
+        urls[s3_key] = url
+    metrics.increment('s3.presign_cache_hits', len(urls) - misses)
+    metrics.increment('s3.presign_cache_misses', misses)
+    return urls
+
+def iter_s3_objects(prefix, page_size=1000):
+    """
+    Yields the raw listing entries under prefix one page (up to page_size keys) at a time,
+    following continuation tokens so folders with more than 1000 keys are listed completely.
     """
     s3 = get_s3_client()
     bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
-    print(f"AWS_STORAGE_BUCKET_NAME config value: {bucket_name} (type: {type(bucket_name)})", flush=True)
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=prefix)
-    
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, PaginationConfig={'PageSize': page_size}):
+        yield page.get('Contents', [])
+
+def _file_entries(objects):
+    """Listing entries -> file dicts, with presigned URLs signed in one batch."""
+    urls = get_presigned_urls([obj['Key'] for obj in objects])
     files = []
-    if 'Contents' in response:
-        for obj in response['Contents']:
-            # Generate a presigned URL for temporary access
-            url = get_presigned_url(obj['Key'])
-            
-            if url:
-                files.append({
-                    'key': obj['Key'],
-                    'url': url,
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified'].isoformat()
-                })
+    for obj in objects:
+        url = urls.get(obj['Key'])
+        if url:
+            files.append({
+                'key': obj['Key'],
+                'url': url,
+                'size': obj['Size'],
+                'last_modified': obj['LastModified'].isoformat()
+            })
     return files
 
+def iter_files_in_s3(prefix, page_size=1000):
+    """
+    Yields pages of files (key, url, size, last_modified) under prefix, so callers can
+    stream a large folder without holding the whole listing in memory.
+    """
+    for objects in iter_s3_objects(prefix, page_size):
+        yield _file_entries(objects)
+
+def list_files_in_s3(prefix):
+    """
+    Lists files in a given directory (prefix) in the S3 bucket.
+    """
+    return [file for page in iter_files_in_s3(prefix) for file in page]
+
+def list_s3_page(prefix, cursor=None, limit=100):
+    """
+    One page of files under prefix: {'items': [...], 'next_cursor': str or None}.
+    Pass next_cursor back as cursor to get the following page.
+    """
+    s3 = get_s3_client()
+    params = {
+        'Bucket': current_app.config['AWS_STORAGE_BUCKET_NAME'],
+        'Prefix': prefix,
+        'MaxKeys': limit
+    }
+    if cursor:
+        params['ContinuationToken'] = cursor
+    response = s3.list_objects_v2(**params)
+    return {
+        'items': _file_entries(response.get('Contents', [])),
+        'next_cursor': response.get('NextContinuationToken') if response.get('IsTruncated') else None
+    }
+
+def s3_object_exists(s3_path):
+    """
+    Whether an object exists (HEAD request).
+    """
+    from botocore.exceptions import ClientError
+    s3 = get_s3_client()
+    bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
+    try:
+        s3.head_object(Bucket=bucket_name, Key=s3_path)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
 def delete_file_from_s3(s3_path):
     """
     Deletes a file from a specified path in the S3 bucket.
@@ -100,7 +296,11 @@ def delete_file_from_s3(s3_path):
     s3 = get_s3_client()
     bucket_name = current_app.config['AWS_STORAGE_BUCKET_NAME']
     s3.delete_object(Bucket=bucket_name, Key=s3_path)
-    return True 
+    return True
+
+def forget_presigned_urls():
+    """Drops every cached presigned URL (e.g. after rotating S3 credentials)."""
+    _presigned_urls.clear() 
 
 def download_file_from_s3(s3_path):
     """
@@ -0,0 +1,45 @@
+"""
+Count the SQL statements a block of code sends to the database.
+
+A single engine event sees every statement; it only counts while a
+track_statements() block is open on the current thread, so requests running in
+parallel keep separate totals. An executemany counts as one statement (one
+round trip with many parameter sets), and its rows are reported separately.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from . import metrics
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        return
+    stats['statements'] += 1
+    if executemany:
+        stats['executemany'] += 1
+        stats['executemany_rows'] += len(parameters)
+
+
+@contextmanager
+def track_statements(name: str):
+    """Count statements and time the block; totals go to the yielded dict and to metrics under name"""
+    previous = getattr(_local, 'stats', None)
+    stats = _local.stats = {'statements': 0, 'executemany': 0, 'executemany_rows': 0, 'ms': 0.0}
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats['ms'] = (time.perf_counter() - started) * 1000
+        _local.stats = previous
+        if previous is not None:
+            for key in ('statements', 'executemany', 'executemany_rows'):
+                previous[key] += stats[key]
+        metrics.increment(f"{name}.statements", stats['statements'])
+        metrics.observe(f"{name}_ms", stats['ms'])
@@ -0,0 +1,292 @@
+"""
+File storage backends selected by Config.FILE_STORAGE.
+
+Routes and services talk to get_storage() instead of a particular backend:
+
+  * S3Storage keeps files in the configured bucket and hands out presigned URLs.
+  * LocalStorage keeps files under LOCAL_STORAGE_ROOT. Uploads are streamed to
+    disk in fixed-size blocks, and files are served by /api/storage behind an
+    HMAC-signed, expiring URL (the local equivalent of a presigned URL). Serving
+    goes through send_file, so Range requests get 206 responses and the WSGI
+    server can use sendfile(); with LOCAL_STORAGE_ACCEL_PREFIX set, nginx
+    serves the bytes itself via X-Accel-Redirect.
+
+Both backends expose the same methods and return the same listing dicts.
+"""
+import os
+import hmac
+import bisect
+import time
+import shutil
+import hashlib
+import tempfile
+import mimetypes
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote, urlencode
+from flask import current_app, has_request_context, request, send_file, abort, Response
+from werkzeug.security import safe_join
+
+COPY_BUFFER_SIZE = 1024 * 1024  # Bytes per read when streaming a file to disk
+DEFAULT_URL_EXPIRES = 3600
+URL_EXPIRY_STEP = 300  # Signed local URLs only change every five minutes
+
+
+class S3Storage:
+    """Files in the AWS_STORAGE_BUCKET_NAME bucket"""
+
+    name = 'S3'
+
+    def __init__(self, config):
+        self.bucket = config.get('AWS_STORAGE_BUCKET_NAME')
+
+    def save(self, file_obj, key: str, cache_control: str = None) -> str:
+        from .s3 import upload_file_to_s3
+        return upload_file_to_s3(file_obj, key, cache_control=cache_control)
+
+    def exists(self, key: str) -> bool:
+        from .s3 import s3_object_exists
+        return s3_object_exists(key)
+
+    def save_path(self, path: str, key: str, move: bool = False) -> str:
+        """Upload a file already on local disk; move only matters to LocalStorage"""
+        from .s3 import upload_path_to_s3
+        return upload_path_to_s3(path, key)
+
+    def url(self, key: str, expires_in: int = DEFAULT_URL_EXPIRES) -> Optional[str]:
+        from .s3 import get_presigned_url
+        return get_presigned_url(key, expires_in)
+
+    def urls(self, keys: List[str], expires_in: int = DEFAULT_URL_EXPIRES) -> Dict[str, Optional[str]]:
+        """{key: url} for many keys, signed in one batch"""
+        from .s3 import get_presigned_urls
+        return get_presigned_urls(keys, expires_in)
+
+    def list(self, prefix: str) -> List[Dict[str, Any]]:
+        from .s3 import list_files_in_s3
+        return list_files_in_s3(prefix)
+
+    def iter_files(self, prefix: str, page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Pages of {'key', 'url', 'size', 'last_modified' (ISO string)} under prefix"""
+        from .s3 import iter_files_in_s3
+        return iter_files_in_s3(prefix, page_size)
+
+    def list_page(self, prefix: str, cursor: str = None, limit: int = 100) -> Dict[str, Any]:
+        """{'items': [...], 'next_cursor': opaque string or None}"""
+        from .s3 import list_s3_page
+        return list_s3_page(prefix, cursor, limit)
+
+    def iter_objects(self, prefix: str, page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Pages of {'key', 'size', 'last_modified' (aware datetime)} under prefix"""
+        from .s3 import iter_s3_objects
+        for objects in iter_s3_objects(prefix, page_size):
+            yield [{'key': obj['Key'], 'size': obj['Size'], 'last_modified': obj['LastModified']} for obj in objects]
+
+    def read_text(self, key: str) -> Optional[str]:
+        from .s3 import download_file_from_s3
+        return download_file_from_s3(key)
+
+    def download_to(self, key: str, file_obj) -> None:
+        from .s3 import get_s3_client
+        get_s3_client().download_fileobj(self.bucket, key, file_obj)
+
+    def delete(self, key: str) -> bool:
+        from .s3 import delete_file_from_s3
+        return delete_file_from_s3(key)
+
+    def delete_many(self, keys: List[str]) -> None:
+        from .s3 import get_s3_client
+        get_s3_client().delete_objects(Bucket=self.bucket, Delete={
+            'Objects': [{'Key': key} for key in keys], 'Quiet': True
+        })
+
+
+class LocalStorage:
+    """Files under a directory on this server, served through signed /api/storage URLs"""
+
+    name = 'LOCAL'
+
+    def __init__(self, config):
+        self.root = os.path.abspath(config.get('LOCAL_STORAGE_ROOT'))
+        self.secret = (config.get('SECRET_KEY') or '').encode('utf-8')
+        self.accel_prefix = config.get('LOCAL_STORAGE_ACCEL_PREFIX') or ''
+        self.base_url = config.get('LOCAL_STORAGE_BASE_URL') or ''
+        self.url_expires = config.get('LOCAL_STORAGE_URL_EXPIRES', DEFAULT_URL_EXPIRES)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """Absolute path for key; keys that would escape the storage root are rejected"""
+        path = safe_join(self.root, key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, file_obj, key: str, cache_control: str = None) -> str:
+        """Stream file_obj to disk block by block, then move it into place atomically.
+
+        cache_control is applied when the file is served (see routes/storage.py), not stored.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        source = getattr(file_obj, 'stream', file_obj)  # werkzeug FileStorage
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as temp_file:
+            try:
+                shutil.copyfileobj(source, temp_file, COPY_BUFFER_SIZE)
+            except Exception:
+                os.unlink(temp_file.name)
+                raise
+        os.replace(temp_file.name, path)
+        return key
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def save_path(self, path: str, key: str, move: bool = False) -> str:
+        """Store a file already on disk; move=True renames it instead of copying"""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            shutil.move(path, target)
+        else:
+            shutil.copyfile(path, target)  # Uses sendfile() on Linux
+        return key
+
+    def url(self, key: str, expires_in: int = None) -> Optional[str]:
+        if not key:
+            return None
+        # Round the expiry up so the URL (and the browser's cached copy) stays the same for a while
+        expires = int(time.time()) + (expires_in or self.url_expires)
+        expires += -expires % URL_EXPIRY_STEP
+        query = urlencode({'expires': expires, 'signature': self.sign(key, expires)})
+        base = self.base_url or (request.host_url if has_request_context() else '')
+        return f"{base.rstrip('/')}/api/storage/{quote(key)}?{query}"
+
+    def urls(self, keys: List[str], expires_in: int = None) -> Dict[str, Optional[str]]:
+        return {key: self.url(key, expires_in) for key in keys if key}
+
+    def sign(self, key: str, expires: int) -> str:
+        return hmac.new(self.secret, f"{key}:{expires}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def verify(self, key: str, expires: str, signature: str) -> bool:
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.sign(key, expires), signature or '')
+
+    def send(self, key: str) -> Response:
+        """Response serving key; supports Range/conditional requests"""
+        path = self.path(key)
+        if not os.path.isfile(path):
+            abort(404)
+        if self.accel_prefix:
+            # nginx serves the bytes (and Range requests) from its internal location
+            response = Response(status=200)
+            response.headers['X-Accel-Redirect'] = f"{self.accel_prefix.rstrip('/')}/{quote(key)}"
+            response.headers['Content-Type'] = self._content_type(key)
+            response.headers['Content-Disposition'] = 'inline'
+            return response
+        return send_file(path, mimetype=self._content_type(key), conditional=True, max_age=self.url_expires)
+
+    def list(self, prefix: str) -> List[Dict[str, Any]]:
+        return [file for page in self.iter_files(prefix) for file in page]
+
+    def iter_files(self, prefix: str, page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        for page in self.iter_objects(prefix, page_size):
+            yield [self._file_entry(obj) for obj in page]
+
+    def list_page(self, prefix: str, cursor: str = None, limit: int = 100) -> Dict[str, Any]:
+        """{'items': [...], 'next_cursor': ...}; the cursor is the last key of the previous page"""
+        keys = self._keys(prefix)
+        start = bisect.bisect_right(keys, cursor) if cursor else 0
+        page = keys[start:start + limit]
+        return {
+            'items': [self._file_entry(obj) for obj in self._stat_all(page)],
+            'next_cursor': page[-1] if start + limit < len(keys) else None
+        }
+
+    def iter_objects(self, prefix: str, page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Pages of {'key', 'size', 'last_modified' (aware datetime)} under prefix, in key order"""
+        keys = self._keys(prefix)
+        for start in range(0, len(keys), page_size):
+            yield self._stat_all(keys[start:start + page_size])
+
+    def _keys(self, prefix: str) -> List[str]:
+        """Sorted keys under prefix (S3 prefix semantics: a plain string match, not a directory)"""
+        directory = os.path.dirname(self.path(prefix)) if prefix and not prefix.endswith('/') else self.path(prefix or '.')
+        keys = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+                if key.startswith(prefix):
+                    keys.append(key)
+        keys.sort()
+        return keys
+
+    def _stat_all(self, keys: List[str]) -> List[Dict[str, Any]]:
+        objects = []
+        for key in keys:
+            try:
+                stat = os.stat(self.path(key))
+            except FileNotFoundError:
+                continue  # Deleted since it was listed
+            objects.append({
+                'key': key,
+                'size': stat.st_size,
+                'last_modified': datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+            })
+        return objects
+
+    def _file_entry(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'key': obj['key'],
+            'url': self.url(obj['key']),
+            'size': obj['size'],
+            'last_modified': obj['last_modified'].isoformat()
+        }
+
+    def read_text(self, key: str) -> Optional[str]:
+        try:
+            with open(self.path(key), 'r', encoding='utf-8') as file_obj:
+                return file_obj.read()
+        except Exception as e:
+            print(f"Error reading file from local storage: {str(e)}")
+            return None
+
+    def download_to(self, key: str, file_obj) -> None:
+        with open(self.path(key), 'rb') as source:
+            shutil.copyfileobj(source, file_obj, COPY_BUFFER_SIZE)
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def delete_many(self, keys: List[str]) -> None:
+        for key in keys:
+            self.delete(key)
+
+    @staticmethod
+    def _content_type(key: str) -> str:
+        if key.endswith('.json'):
+            return 'application/json'
+        return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+
+BACKENDS = {'S3': S3Storage, 'LOCAL': LocalStorage}
+
+
+def get_storage():
+    """The storage backend for the current app, created once per app"""
+    storage = current_app.extensions.get('file_storage')
+    if storage is None:
+        backend = current_app.config.get('FILE_STORAGE', 'S3').upper()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown FILE_STORAGE backend: {backend}")
+        storage = BACKENDS[backend](current_app.config)
+        current_app.extensions['file_storage'] = storage
+    return storage
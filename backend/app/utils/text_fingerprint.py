@@ -0,0 +1,71 @@
+"""
+Content fingerprints used to de-duplicate chunks before embedding them.
+
+content_hash catches exact duplicates (after case and whitespace folding).
+simhash catches near duplicates - the same slide or handout re-exported with
+different punctuation or a changed footer - which land only a few bits apart.
+Splitting the 64-bit simhash into bands lets the database find candidates with
+plain equality lookups: two hashes within SIMHASH_BANDS - 1 bits of each other
+always agree on at least one band.
+"""
+import re
+import hashlib
+from typing import List
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SHINGLE_SIZE = 3
+
+_MASK = (1 << SIMHASH_BITS) - 1
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_for_hash(text: str) -> str:
+    """Case-fold and collapse whitespace so formatting-only differences hash the same"""
+    return ' '.join((text or '').lower().split())
+
+
+def content_hash(text: str) -> str:
+    """sha256 of the normalized text"""
+    return hashlib.sha256(normalize_for_hash(text).encode('utf-8')).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word shingles (unsigned)"""
+    tokens = _WORD_RE.findall((text or '').lower())
+    if len(tokens) >= SHINGLE_SIZE:
+        features = [' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    else:
+        features = tokens
+
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (value >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count('1')
+
+
+def simhash_bands(fingerprint: int) -> List[int]:
+    """Split a simhash into SIMHASH_BANDS equal integer bands"""
+    band_mask = (1 << _BAND_BITS) - 1
+    return [(fingerprint >> (band * _BAND_BITS)) & band_mask for band in range(SIMHASH_BANDS)]
+
+
+def to_signed64(value: int) -> int:
+    """Store an unsigned 64-bit hash in a signed BIGINT column"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_signed64(value: int) -> int:
+    return value & _MASK
@@ -0,0 +1,84 @@
+"""
+Thumbnail rendering, run inside the thumbnail process pool.
+
+Only depends on PyMuPDF (PDF pages) and Pillow (WebP output, image sources),
+both optional: without PyMuPDF PDFs get no thumbnail, without Pillow only
+PNG is produced. Everything here is a plain top-level function so it can be
+pickled into worker processes.
+"""
+import io
+from typing import Dict, List, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_TYPES = ('png', 'jpg', 'jpeg', 'gif', 'webp')
+WEBP_QUALITY = 80
+
+
+def available_formats() -> List[str]:
+    return ['webp', 'png'] if Image is not None else ['png']
+
+
+def can_render(file_type: str) -> bool:
+    file_type = (file_type or '').lower()
+    if file_type == 'pdf':
+        return fitz is not None
+    return file_type in IMAGE_TYPES and Image is not None
+
+
+def render_thumbnails(source_path: str, file_type: str, widths: List[int],
+                      formats: List[str]) -> Dict[Tuple[int, str], bytes]:
+    """Encoded thumbnails of the first page/image: {(width, format): bytes}.
+
+    Raster images narrower than a requested width are not upscaled; PDF pages are
+    vector, so they are rasterized at exactly each width.
+    """
+    formats = [fmt for fmt in formats if fmt in available_formats()]
+    if (file_type or '').lower() == 'pdf':
+        return _render_pdf(source_path, widths, formats)
+    return _render_image(source_path, widths, formats)
+
+
+def _render_pdf(source_path, widths, formats):
+    outputs = {}
+    with fitz.open(source_path) as document:
+        page = document.load_page(0)
+        for width in widths:
+            scale = width / page.rect.width
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            if 'png' in formats:
+                outputs[(width, 'png')] = pixmap.tobytes('png')
+            if 'webp' in formats:
+                image = Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+                outputs[(width, 'webp')] = _encode(image, 'webp')
+    return outputs
+
+
+def _render_image(source_path, widths, formats):
+    outputs = {}
+    with Image.open(source_path) as source:
+        source = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for width in widths:
+            image = source
+            if source.width > width:
+                image = source.resize((width, max(1, round(source.height * width / source.width))), Image.LANCZOS)
+            for fmt in formats:
+                outputs[(width, fmt)] = _encode(image, fmt)
+    return outputs
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,53 @@
+"""
+Decide whether this process should run background workers.
+
+create_app() is called by more than the server: the reloader's watcher process,
+`flask db upgrade` and other flask commands, and one-off scripts such as
+backfill_thumbnails.py all build the app. Workers started there would claim
+jobs and then abandon them when the process exits (or, for the watcher, run
+them next to the real server), so only the serving process starts them.
+
+Scripts pass create_app(start_workers=False). Otherwise BACKGROUND_WORKERS
+overrides the detection: 'true' always starts them, 'false' never does.
+"""
+import os
+import sys
+from typing import Optional
+
+# flask CLI options that take a value, so the value is not mistaken for the command
+_FLASK_OPTIONS_WITH_VALUE = {'--app', '-A', '--env-file', '-e'}
+
+
+def flask_cli_command() -> Optional[str]:
+    """The `flask` subcommand this process runs ('run', 'db', 'shell', ...), or None outside the flask CLI"""
+    program = sys.argv[0] if sys.argv else ''
+    if os.path.basename(program) not in ('flask', 'flask.exe') and \
+            not program.endswith(os.path.join('flask', '__main__.py')):
+        return None
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg in _FLASK_OPTIONS_WITH_VALUE:
+            next(args, None)
+        elif not arg.startswith('-'):
+            return arg
+    return None
+
+
+def should_start_workers(flask_app, start_workers: Optional[bool] = None) -> bool:
+    """True when this process serves requests and so should run the background workers"""
+    if start_workers is not None:
+        return start_workers
+    override = str(flask_app.config.get('BACKGROUND_WORKERS') or '').lower()
+    if override in ('true', 'false'):
+        return override == 'true'
+    if flask_app.config.get('TESTING'):
+        return False
+    command = flask_cli_command()
+    if command is not None and command != 'run':
+        return False
+    # With the reloader (`flask run` or `python run.py` in debug), the first process only
+    # watches files; the server is the child it starts, which has WERKZEUG_RUN_MAIN set
+    launched_directly = command == 'run' or (sys.argv[0] if sys.argv else '').endswith('.py')
+    if flask_app.debug and launched_directly and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    return True
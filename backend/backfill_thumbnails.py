@@ -0,0 +1,23 @@
+"""
+Render content-hash thumbnails (all sizes and formats) for existing course materials.
+
+    python backfill_thumbnails.py                 # materials with no thumbnail or a legacy one
+    python backfill_thumbnails.py --limit 100
+    python backfill_thumbnails.py --force         # re-render every material
+"""
+import argparse
+from app import create_app
+from app.services.thumbnails import backfill_thumbnails
+
+parser = argparse.ArgumentParser(description='Backfill material thumbnails')
+parser.add_argument('--batch-size', type=int, default=50)
+parser.add_argument('--limit', type=int, default=None, help='Stop after this many materials')
+parser.add_argument('--force', action='store_true', help='Re-render thumbnails that already exist')
+args = parser.parse_args()
+
+app = create_app(start_workers=False)
+
+with app.app_context():
+    print("🖼️  Backfilling material thumbnails...")
+    result = backfill_thumbnails(batch_size=args.batch_size, limit=args.limit, force=args.force)
+    print(f"✅ Thumbnails generated for {result['processed']} materials ({result['failed']} failed)")
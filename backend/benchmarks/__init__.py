@@ -0,0 +1 @@
+"""Local benchmarks that run against stubbed external services (see each module's docstring)."""
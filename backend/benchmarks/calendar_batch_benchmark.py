@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Google Calendar subtask sync against a fake Google endpoint.
+
+Starts a small in-process HTTP server that implements the handful of Calendar
+v3 calls the sync uses (calendarList, calendars.insert, events get/insert/update
+and the batch endpoint), with --latency-ms added to every HTTP round trip. It
+then syncs --subtasks subtasks of one course twice, first creating their events
+and then updating them, in two ways:
+
+  * legacy   - one subtask at a time, the way the app did it before batching: a
+               new service object, a full calendarList scan, an events.get and
+               an insert/update per subtask (kept here as a reference)
+  * batched  - write_subtask_events: one service object, one cached calendar
+               lookup and batch requests of up to 50 writes
+
+Database writes are not part of either path; only Google API traffic is timed.
+
+    python -m benchmarks.calendar_batch_benchmark
+    python -m benchmarks.calendar_batch_benchmark --subtasks 300 --latency-ms 50
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httplib2
+from flask import Flask
+from googleapiclient.errors import HttpError
+
+from app.routes import calendar as calendar_routes
+
+COURSE_TITLE = 'Benchmark Course'
+API_PREFIX = '/calendar/v3'
+BATCH_PATH = '/batch/calendar/v3'
+
+
+class FakeGoogle:
+    """Calendar state and request handling shared by plain and batched requests"""
+
+    def __init__(self, other_calendars, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.lock = threading.Lock()
+        self.http_requests = 0
+        self.operations = 0
+        self.calendars = {f"cal-{i}": f"Other Calendar {i}" for i in range(other_calendars)}
+        self.events = {}
+
+    def handle(self, method, path, body):
+        """(status, json) for one Calendar API call"""
+        with self.lock:
+            self.operations += 1
+        parts = [part for part in urlparse(path).path[len(API_PREFIX):].split('/') if part]
+        if parts == ['users', 'me', 'calendarList'] and method == 'GET':
+            items = [{'id': cal_id, 'summary': name} for cal_id, name in self.calendars.items()]
+            return 200, {'kind': 'calendar#calendarList', 'items': items}
+        if parts == ['calendars'] and method == 'POST':
+            cal_id = f"cal-{uuid.uuid4().hex[:12]}"
+            with self.lock:
+                self.calendars[cal_id] = body.get('summary')
+            return 200, {'id': cal_id, 'summary': body.get('summary')}
+        if len(parts) >= 3 and parts[0] == 'calendars' and parts[2] == 'events':
+            cal_id = parts[1]
+            if cal_id not in self.calendars:
+                return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+            if len(parts) == 3 and method == 'POST':
+                event = dict(body, id=uuid.uuid4().hex)
+                with self.lock:
+                    self.events[(cal_id, event['id'])] = event
+                return 200, event
+            if len(parts) == 4:
+                key = (cal_id, parts[3])
+                if key not in self.events:
+                    return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+                if method == 'GET':
+                    return 200, self.events[key]
+                if method == 'PUT':
+                    event = dict(body, id=parts[3])
+                    with self.lock:
+                        self.events[key] = event
+                    return 200, event
+        return 400, {'error': {'code': 400, 'message': f'Unsupported {method} {path}'}}
+
+    def handle_batch(self, content_type, payload):
+        """Run every request in a multipart/mixed batch and build the multipart response"""
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + payload)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        chunks = []
+        for part in message.get_payload():
+            raw = part.get_payload(decode=False)
+            head, _, body = raw.partition('\r\n\r\n') if '\r\n\r\n' in raw else raw.partition('\n\n')
+            method, path, _ = head.splitlines()[0].split(' ', 2)
+            status, result = self.handle(method, path, json.loads(body) if body.strip() else {})
+            content_id = part['Content-ID'].strip('<>')
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(result)}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", ''.join(chunks).encode()
+
+
+def make_handler(google):
+    class Handler(BaseHTTPRequestHandler):
+        def _serve(self):
+            with google.lock:
+                google.http_requests += 1
+            time.sleep(google.latency)
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = self.rfile.read(length) if length else b''
+            if self.path.startswith(BATCH_PATH):
+                content_type, body = google.handle_batch(self.headers['Content-Type'], payload)
+                status = 200
+            else:
+                status, result = google.handle(self.command, self.path, json.loads(payload) if payload else {})
+                content_type, body = 'application/json', json.dumps(result).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def make_subtasks(count):
+    start = datetime(2025, 1, 6, 9, 0)
+    return [SimpleNamespace(
+        id=f"row-{i}",
+        subtask_id=f"subtask-{i}",
+        task_id='benchmark-task',
+        task_title='Benchmark task',
+        subtask_descr=f"Read chapter {i}",
+        subtask_completed=False,
+        task_due_date=start + timedelta(days=30),
+        goal_descr='Benchmark goal',
+        start_time=start + timedelta(hours=i),
+        end_time=start + timedelta(hours=i, minutes=45),
+        google_event_id=None
+    ) for i in range(count)]
+
+
+def sync_legacy(subtasks):
+    """Per-subtask sync as before batching: new service, calendarList scan, get, then insert/update"""
+    for subtask in subtasks:
+        service = calendar_routes.build_calendar_service(http=httplib2.Http())
+        calendar_id = calendar_routes.get_or_create_calendar(service, COURSE_TITLE)
+        body = calendar_routes.subtask_event_body(subtask, COURSE_TITLE)
+        existing = None
+        if subtask.google_event_id:
+            try:
+                existing = service.events().get(calendarId=calendar_id, eventId=subtask.google_event_id).execute()
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+        if existing:
+            event = service.events().update(calendarId=calendar_id, eventId=subtask.google_event_id, body=body).execute()
+        else:
+            event = service.events().insert(calendarId=calendar_id, body=body).execute()
+        subtask.google_event_id = event['id']
+    return len(subtasks)
+
+
+def sync_batched(subtasks):
+    service = calendar_routes.build_calendar_service(http=httplib2.Http())
+    calendar_id = calendar_routes.get_or_create_calendar(service, COURSE_TITLE, 'benchmark-user')
+    results = calendar_routes.write_subtask_events(service, calendar_id, subtasks, COURSE_TITLE)
+    synced = 0
+    for subtask in subtasks:
+        result = results.get(str(subtask.id))
+        if isinstance(result, dict):
+            subtask.google_event_id = result['id']
+            synced += 1
+    return synced
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched Google Calendar subtask sync')
+    parser.add_argument('--subtasks', type=int, default=300)
+    parser.add_argument('--calendars', type=int, default=20, help='Other calendars in the fake calendarList')
+    parser.add_argument('--latency-ms', type=float, default=30.0, help='Added to every HTTP round trip')
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    google = FakeGoogle(args.calendars, args.latency_ms)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(google))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    app = Flask(__name__)
+    app.config.update(
+        GOOGLE_API_ENDPOINT=f"{base_url}{API_PREFIX}/",
+        GOOGLE_API_BATCH_URI=f"{base_url}{BATCH_PATH}",
+        GOOGLE_API_BATCH_SIZE=args.batch_size
+    )
+
+    print(f"\nCalendar sync benchmark ({args.subtasks} subtasks, {args.calendars} other calendars, "
+          f"{args.latency_ms:.0f} ms per round trip)")
+    print("=" * 72)
+    print(f"{'case':<18}{'ms':>10}{'events/s':>12}{'HTTP requests':>16}{'API calls':>12}")
+    try:
+        with app.app_context():
+            for name, sync in (('legacy', sync_legacy), ('batched', sync_batched)):
+                calendar_routes._calendar_ids.clear()
+                subtasks = make_subtasks(args.subtasks)
+                for phase in ('insert', 'update'):
+                    requests_before, operations_before = google.http_requests, google.operations
+                    started = time.perf_counter()
+                    synced = sync(subtasks)
+                    elapsed = time.perf_counter() - started
+                    print(f"{name + ' ' + phase:<18}{elapsed * 1000:>10.0f}{synced / elapsed:>12.1f}"
+                          f"{google.http_requests - requests_before:>16}{google.operations - operations_before:>12}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
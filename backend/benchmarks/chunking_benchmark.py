@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for text cleaning and chunking (app/utils/chunking.py).
+
+Builds a large fixture text from the synthetic corpus (with control characters
+and line breaks mixed in, like text extracted from PDFs), then times the
+chunking engine against the previous per-call-site implementations, which are
+kept here as references, and checks both produce the same chunks.
+
+    python -m benchmarks.chunking_benchmark
+    python -m benchmarks.chunking_benchmark --size-mb 20 --repeat 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import build_corpus
+from app.utils.chunking import clean_text, chunk_by_characters, chunk_by_tokens, get_encoding
+
+
+def legacy_clean_text(text):
+    """CourseDocumentProcessor._clean_text before the chunking engine"""
+    if not text:
+        return ""
+    cleaned_text = text.replace('\x00', '')
+    cleaned_text = ''.join(char for char in cleaned_text if ord(char) >= 32 or char in '\n\r\t')
+    return ' '.join(cleaned_text.split())
+
+
+def legacy_chunk_by_characters(text, chunk_size=1000, overlap=200):
+    """DocumentProcessor.chunk_text before the chunking engine"""
+    if len(text) <= chunk_size:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end < len(text):
+            for i in range(end - 100, end):
+                if i > start and text[i] in '.!?\n':
+                    end = i + 1
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = end - overlap
+        if start >= len(text):
+            break
+    return chunks
+
+
+def legacy_chunk_by_tokens(text, encoding, chunk_size=1000, overlap=200):
+    """EmbeddingService.chunk_text before the chunking engine"""
+    tokens = encoding.encode(text, disallowed_special=())
+    chunks = []
+    for i in range(0, len(tokens), chunk_size - overlap):
+        chunk_text = encoding.decode(tokens[i:i + chunk_size])
+        if chunk_text.strip():
+            chunks.append(chunk_text.strip())
+    return chunks
+
+
+def build_fixture_text(size_mb, seed):
+    """Concatenate corpus documents, with stray control characters, up to size_mb"""
+    rng = random.Random(seed)
+    documents, _ = build_corpus(num_docs=20, facts_per_doc=12, seed=seed)
+    noise = ['\x00', '\x0c', '\x07', '\r\n', '\t', '\n\n']
+    parts, size, target = [], 0, int(size_mb * 1024 * 1024)
+    while size < target:
+        document = rng.choice(documents)['text']
+        piece = ''.join(word + (rng.choice(noise) if rng.random() < 0.02 else ' ') for word in document.split(' '))
+        parts.append(piece)
+        size += len(piece)
+    return '\n'.join(parts)[:target]
+
+
+def best_of(repeat, func, *args):
+    """Fastest wall time over repeat runs, and the last result"""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def without_duplicate_tail(chunks):
+    """The old chunkers emitted the overlap of the final window again as an extra chunk"""
+    if len(chunks) > 1 and chunks[-1] in chunks[-2]:
+        return chunks[:-1]
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark text cleaning and chunking')
+    parser.add_argument('--size-mb', type=float, default=5.0, help='Size of the fixture text')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case (best time is reported)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the chunking engine')
+    args = parser.parse_args()
+
+    text = build_fixture_text(args.size_mb, args.seed)
+    megabytes = len(text) / (1024 * 1024)
+    cleaned = clean_text(text)
+
+    try:
+        encoding = get_encoding()
+    except ImportError:
+        encoding = None
+        print("tiktoken is not installed - skipping token chunking")
+
+    cases = [
+        ('clean_text', lambda: clean_text(text), lambda: legacy_clean_text(text), lambda a, b: a == b),
+        ('chunk_by_characters', lambda: chunk_by_characters(cleaned), lambda: legacy_chunk_by_characters(cleaned),
+         lambda a, b: a == without_duplicate_tail(b)),
+    ]
+    if encoding:
+        cases.append(('chunk_by_tokens', lambda: chunk_by_tokens(cleaned, encoding=encoding),
+                      lambda: legacy_chunk_by_tokens(cleaned, encoding),
+                      lambda a, b: a == without_duplicate_tail(b)))
+
+    print(f"\nChunking benchmark ({megabytes:.1f} MB fixture, best of {args.repeat})")
+    print("=" * 72)
+    print(f"{'case':<22}{'engine ms':>12}{'MB/s':>9}{'legacy ms':>12}{'speedup':>9}{'same':>8}")
+    mismatches = 0
+    for name, engine, legacy, same in cases:
+        engine_seconds, engine_result = best_of(args.repeat, engine)
+        line = f"{name:<22}{engine_seconds * 1000:>12.1f}{megabytes / engine_seconds:>9.1f}"
+        if not args.skip_legacy:
+            legacy_seconds, legacy_result = best_of(args.repeat, legacy)
+            matches = same(engine_result, legacy_result)
+            mismatches += 0 if matches else 1
+            line += f"{legacy_seconds * 1000:>12.1f}{legacy_seconds / engine_seconds:>8.1f}x{'yes' if matches else 'NO':>8}"
+        print(line)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Synthetic, seeded fixture corpus for retrieval benchmarks.
+
+Each document covers one made-up subject and mixes filler prose with "fact"
+sentences about uniquely named entities. Every query asks about one fact, and
+the fact sentence is the label: a chunk is relevant when it contains it. This
+keeps the labels valid whatever chunk size or chunking strategy is in use.
+"""
+import random
+from typing import Dict, List, Tuple
+
+SUBJECTS = [
+    'algorithms', 'databases', 'operating systems', 'linear algebra', 'organic chemistry',
+    'microeconomics', 'cell biology', 'compilers', 'statistics', 'computer networks'
+]
+ATTRIBUTES = [
+    'running time', 'deadline', 'inventor', 'default setting', 'key property',
+    'failure mode', 'typical use', 'exam weight', 'main limitation', 'unit of measure'
+]
+VALUES = [
+    'logarithmic', 'the third week', 'a research group', 'disabled', 'idempotence',
+    'starvation', 'caching', 'twenty percent', 'memory pressure', 'milliseconds',
+    'quadratic', 'the final lecture', 'a graduate student', 'enabled', 'monotonicity',
+    'deadlock', 'indexing', 'forty percent', 'network latency', 'kilobytes'
+]
+FILLER = [
+    'Students should review the lecture notes before attempting the problem set.',
+    'This section builds on concepts introduced earlier in the course.',
+    'Several worked examples are provided at the end of the chapter.',
+    'Office hours are a good place to ask about anything that remains unclear.',
+    'The textbook treats this material in more depth than the slides.',
+    'Practice problems are ungraded but strongly recommended.',
+    'A short recap follows before moving on to the next topic.',
+    'Diagrams in the appendix illustrate the general idea.'
+]
+SYLLABLES = ['ka', 'zor', 'mi', 'tal', 'ven', 'qua', 'rox', 'lin', 'dra', 'pel', 'sut', 'gor', 'fe', 'nix']
+
+
+def _entity_name(rng: random.Random, used: set) -> str:
+    while True:
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def build_corpus(num_docs: int = 10, facts_per_doc: int = 8, filler_per_fact: int = 4,
+                 seed: int = 42) -> Tuple[List[Dict], List[Dict]]:
+    """Return (documents, queries).
+
+    documents: [{'filename', 'text'}]
+    queries:   [{'question', 'evidence', 'filename'}]
+    """
+    rng = random.Random(seed)
+    used_names = set()
+    documents, queries = [], []
+
+    for doc_index in range(num_docs):
+        subject = SUBJECTS[doc_index % len(SUBJECTS)]
+        filename = f"bench_{doc_index:03d}_{subject.replace(' ', '_')}.txt"
+        paragraphs = [f"Lecture notes on {subject}."]
+        for _ in range(facts_per_doc):
+            entity = _entity_name(rng, used_names)
+            attribute = rng.choice(ATTRIBUTES)
+            value = rng.choice(VALUES)
+            fact = f"The {attribute} of the {entity} method is {value}."
+            sentences = [rng.choice(FILLER) for _ in range(filler_per_fact)]
+            sentences.insert(rng.randrange(len(sentences) + 1), fact)
+            paragraphs.append(' '.join(sentences))
+            queries.append({
+                'question': f"What is the {attribute} of the {entity} method?",
+                'evidence': fact,
+                'filename': filename
+            })
+        documents.append({'filename': filename, 'text': '\n\n'.join(paragraphs)})
+
+    rng.shuffle(queries)
+    return documents, queries
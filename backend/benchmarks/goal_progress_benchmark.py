@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Course goal listing (GET /api/courses/<id>/goals) against Postgres.
+
+Seeds one throwaway user and course with --goals goals of --tasks tasks and
+--subtasks subtasks each (10,000 rows by default), then times building the
+listing two ways:
+
+  * legacy   - load every row of the course and, for each goal, rescan the
+               whole list to count its tasks and subtasks (the route before
+               the grouped query, kept here as a reference)
+  * grouped  - course_goal_summaries: one DISTINCT ON query with the goals'
+               StudyGoal counters joined in
+
+Rows are added through the ORM, so the flush listener fills in the counters
+as it does in the app. Both must return the same goals and counts. Everything
+runs in one transaction that is rolled back, so the database is left as it
+was; it needs the app's tables (run the migrations first).
+
+    DATABASE_URL=postgresql://... python -m benchmarks.goal_progress_benchmark
+    python -m benchmarks.goal_progress_benchmark --goals 200 --tasks 10 --subtasks 10 --repeat 5
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from app.extensions import db
+from app.models.goal import Goal
+from app.models.user import User
+from app.models.course import Course
+from app.routes.goals import course_goal_summaries
+from app.utils.metrics import percentile
+
+PROGRESS_KEYS = ('total_tasks', 'completed_tasks', 'total_subtasks', 'completed_subtasks', 'progress')
+
+
+def legacy_goal_summaries(user_id, combo_id):
+    """get_course_goals before the grouped query: quadratic in the course's rows"""
+    goals = Goal.query.filter_by(course_id=combo_id, user_id=user_id).all()
+    unique_goals = {}
+    for goal in goals:
+        if goal.goal_id not in unique_goals:
+            unique_goals[goal.goal_id] = goal
+    result = []
+    for goal in unique_goals.values():
+        goal_dict = goal.to_dict()
+        goal_rows = [g for g in goals if g.goal_id == goal.goal_id]
+        real_task_rows = [g for g in goal_rows if g.task_id != 'placeholder' and g.task_title]
+        unique_tasks = {}
+        for row in real_task_rows:
+            if row.task_id not in unique_tasks:
+                unique_tasks[row.task_id] = {'completed': row.task_completed, 'subtasks': 0, 'completed_subtasks': 0}
+            unique_tasks[row.task_id]['subtasks'] += 1
+            if row.subtask_completed:
+                unique_tasks[row.task_id]['completed_subtasks'] += 1
+        total_subtasks = sum(task['subtasks'] for task in unique_tasks.values())
+        completed_subtasks = sum(task['completed_subtasks'] for task in unique_tasks.values())
+        goal_dict.update({
+            'total_tasks': len(unique_tasks),
+            'completed_tasks': sum(1 for task in unique_tasks.values() if task['completed']),
+            'total_subtasks': total_subtasks,
+            'completed_subtasks': completed_subtasks,
+            'progress': round((completed_subtasks / total_subtasks) * 100) if total_subtasks else 0
+        })
+        result.append(goal_dict)
+    return result
+
+
+def seed(goals, tasks, subtasks, seed_value):
+    rng = random.Random(seed_value)
+    suffix = uuid.uuid4().hex[:12]
+    user = User(id=str(uuid.uuid4()), email=f"goal-benchmark-{suffix}@example.com")
+    course = Course(combo_id=f"{uuid.uuid4()}+{uuid.uuid4()}", id=str(uuid.uuid4()), user_id=user.id,
+                    title='Benchmark Course', subject='Benchmarks', semester='Fall', description='Seeded rows')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(course)
+    db.session.flush()
+
+    created = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    rows = []
+    for g in range(goals):
+        goal_id = str(uuid.uuid4())
+        # Every goal keeps the placeholder row new goals are created with
+        placeholder = Goal(user_id=user.id, course_id=course.combo_id, goal_id=goal_id, goal_descr=f"Goal {g}",
+                           task_id='placeholder', task_title='', subtask_id='placeholder', subtask_descr='')
+        placeholder.created_at = created + timedelta(minutes=g)
+        rows.append(placeholder)
+        for t in range(tasks):
+            task_id = str(uuid.uuid4())
+            task_completed = rng.random() < 0.3
+            for s in range(subtasks):
+                row = Goal(
+                    user_id=user.id, course_id=course.combo_id, goal_id=goal_id, goal_descr=f"Goal {g}",
+                    task_id=task_id, task_title=f"Task {t}", task_completed=task_completed,
+                    subtask_id=str(uuid.uuid4()), subtask_descr=f"Subtask {s}",
+                    subtask_completed=task_completed or rng.random() < 0.5
+                )
+                row.created_at = created + timedelta(minutes=g, seconds=t * subtasks + s + 1)
+                rows.append(row)
+    db.session.add_all(rows)
+    db.session.flush()
+    return user.id, course.combo_id, len(rows)
+
+
+def run(fn, user_id, combo_id, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expire_all()
+        started = time.perf_counter()
+        result = fn(user_id, combo_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark course goal progress aggregation')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'))
+    parser.add_argument('--goals', type=int, default=100)
+    parser.add_argument('--tasks', type=int, default=10, help='Tasks per goal')
+    parser.add_argument('--subtasks', type=int, default=10, help='Subtasks per task')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('set DATABASE_URL or pass --database-url (a Postgres database with the app schema)')
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=args.database_url, SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+
+    with app.app_context():
+        try:
+            user_id, combo_id, row_count = seed(args.goals, args.tasks, args.subtasks, args.seed)
+            print(f"\nCourse goal listing ({row_count} rows, {args.goals} goals, {args.repeat} runs)")
+            print("=" * 60)
+            print(f"{'case':<12}{'p50 ms':>12}{'p95 ms':>12}{'goals':>10}")
+            results = {}
+            for name, fn in (('legacy', legacy_goal_summaries), ('grouped', course_goal_summaries)):
+                result, timings = run(fn, user_id, combo_id, args.repeat)
+                results[name] = {goal['goal_id']: tuple(goal[key] for key in PROGRESS_KEYS) for goal in result}
+                print(f"{name:<12}{percentile(timings, 50):>12.1f}{percentile(timings, 95):>12.1f}{len(result):>10}")
+            if results['legacy'] != results['grouped']:
+                print("\nMISMATCH: grouped counts differ from the legacy listing")
+                return 1
+        finally:
+            db.session.rollback()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+RAG latency and retrieval-quality benchmark.
+
+Seeds a synthetic corpus into a Postgres+pgvector database through the normal
+ingestion path (CourseDocumentProcessor), serves embeddings and completions
+from the deterministic stub in benchmarks/stub_openai.py, replays the query
+set through CourseRAGService.answer_question_for_course and reports:
+
+  * p50/p95 latency per stage (embed, search, prompt build, completion) and end to end
+  * recall@k and hit@k of similarity_search_for_course against the labeled fact chunks
+
+Use a scratch database - seeded rows are removed afterwards unless --keep is given:
+
+    BENCH_DATABASE_URL=postgresql://localhost/coursemate_bench python -m benchmarks.rag_benchmark
+    python -m benchmarks.rag_benchmark --save-baseline bench_rag.json
+    python -m benchmarks.rag_benchmark --baseline bench_rag.json   # exit 1 on regression
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import build_corpus
+from benchmarks.stub_openai import StubOpenAIServer
+
+BENCH_USER_ID = 'benchmark-user'
+BENCH_COURSE_ID = 'benchmark-course'
+STAGES = ['rag.embed', 'rag.search', 'rag.prompt_build', 'rag.completion', 'rag.total']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark RAG latency per stage and recall@k')
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'),
+                        help='Scratch Postgres database with pgvector (default: $BENCH_DATABASE_URL)')
+    parser.add_argument('--docs', type=int, default=10, help='Number of fixture documents')
+    parser.add_argument('--facts-per-doc', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=50, help='Number of queries to replay (max docs*facts)')
+    parser.add_argument('--repeat', type=int, default=1, help='Replay the query set this many times')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--embed-latency-ms', type=float, default=0, help='Simulated embedding API latency')
+    parser.add_argument('--completion-latency-ms', type=float, default=0, help='Simulated completion API latency')
+    parser.add_argument('--with-cache', action='store_true', help='Leave the semantic answer cache enabled')
+    parser.add_argument('--keep', action='store_true', help='Keep seeded rows after the run')
+    parser.add_argument('--verbose', action='store_true', help='Show application debug output')
+    parser.add_argument('--json', dest='json_path', help='Write the report as JSON to this path')
+    parser.add_argument('--save-baseline', help='Write the report as a baseline for later comparison')
+    parser.add_argument('--baseline', help='Compare against a saved baseline and exit 1 on regression')
+    parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                        help='Allowed relative p95 slowdown per stage before flagging a regression')
+    parser.add_argument('--recall-tolerance', type=float, default=0.02,
+                        help='Allowed absolute recall@k drop before flagging a regression')
+    return parser.parse_args()
+
+
+def ensure_pgvector(database_url):
+    from sqlalchemy import create_engine, text
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE EXTENSION IF NOT EXISTS vector'))
+    engine.dispose()
+
+
+def quiet(enabled):
+    """Swallow the app's per-request debug prints unless --verbose"""
+    return contextlib.redirect_stdout(io.StringIO()) if enabled else contextlib.nullcontext()
+
+
+def seed_corpus(documents, verbose):
+    from app.services.course_rag_service import CourseDocumentProcessor
+
+    processor = CourseDocumentProcessor()
+    with tempfile.TemporaryDirectory() as workdir:
+        for document in documents:
+            path = os.path.join(workdir, document['filename'])
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(document['text'])
+            with quiet(not verbose):
+                processor.process_and_store_course_file(path, document['filename'], BENCH_COURSE_ID, BENCH_USER_ID)
+
+
+def cleanup(db):
+    from app.models.uploaded_file import UploadedFile
+    from app.models.semantic_answer_cache import SemanticAnswerCache
+    from app.services.chunk_dedup import ChunkDeduplicator
+    for uploaded_file in UploadedFile.query.filter_by(course_id=BENCH_COURSE_ID, user_id=BENCH_USER_ID).all():
+        db.session.delete(uploaded_file)
+    SemanticAnswerCache.query.filter_by(course_id=BENCH_COURSE_ID).delete(synchronize_session=False)
+    db.session.commit()
+    ChunkDeduplicator().prune_unreferenced()
+
+
+def measure_recall(queries, top_k, verbose):
+    from app.services.course_rag_service import CourseDocumentProcessor
+    from app.models.material_chunk import MaterialChunk
+    from app.models.uploaded_file import UploadedFile
+
+    processor = CourseDocumentProcessor()
+    recalls, hits, unlabeled = [], 0, 0
+    for query in queries:
+        relevant = {
+            chunk_id for (chunk_id,) in MaterialChunk.query.join(
+                UploadedFile, MaterialChunk.file_id == UploadedFile.id
+            ).filter(
+                UploadedFile.course_id == BENCH_COURSE_ID,
+                UploadedFile.user_id == BENCH_USER_ID,
+                UploadedFile.filename == query['filename'],
+                MaterialChunk.chunk_text.contains(query['evidence'])
+            ).with_entities(MaterialChunk.id)
+        }
+        if not relevant:
+            unlabeled += 1  # The chunker split the fact sentence
+            continue
+        with quiet(not verbose):
+            results = processor.similarity_search_for_course(query['question'], BENCH_COURSE_ID, BENCH_USER_ID, top_k)
+        retrieved = {chunk.id for chunk, _, _ in results}
+        found = len(relevant & retrieved)
+        recalls.append(found / len(relevant))
+        hits += 1 if found else 0
+
+    labeled = len(recalls)
+    return {
+        'recall_at_k': round(sum(recalls) / labeled, 4) if labeled else 0.0,
+        'hit_at_k': round(hits / labeled, 4) if labeled else 0.0,
+        'labeled_queries': labeled,
+        'unlabeled_queries': unlabeled
+    }
+
+
+def replay_queries(queries, repeat, top_k, verbose):
+    from app.services.course_rag_service import CourseRAGService
+    from app.utils import metrics
+
+    rag = CourseRAGService()
+    for _ in range(repeat):
+        for query in queries:
+            with quiet(not verbose), metrics.timer('rag.total'):
+                rag.answer_question_for_course(query['question'], BENCH_COURSE_ID, BENCH_USER_ID, top_k=top_k)
+
+
+def compare_to_baseline(report, baseline, latency_tolerance, recall_tolerance):
+    regressions = []
+    for stage, stats in report['stages'].items():
+        previous = baseline.get('stages', {}).get(stage)
+        if not previous:
+            continue
+        # 1ms of slack keeps sub-millisecond stages from flagging on noise
+        if stats['p95_ms'] > previous['p95_ms'] * (1 + latency_tolerance) + 1.0:
+            regressions.append(f"{stage} p95 {previous['p95_ms']}ms -> {stats['p95_ms']}ms")
+    previous_recall = baseline.get('retrieval', {}).get('recall_at_k')
+    if previous_recall is not None and report['retrieval']['recall_at_k'] < previous_recall - recall_tolerance:
+        regressions.append(f"recall@k {previous_recall} -> {report['retrieval']['recall_at_k']}")
+    return regressions
+
+
+def print_report(report):
+    print("\nRAG benchmark")
+    print("=" * 64)
+    print(f"{'stage':<22}{'count':>8}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<22}{stats['count']:>8}{stats['p50_ms']:>11.2f}{stats['p95_ms']:>11.2f}{stats['max_ms']:>11.2f}")
+    retrieval = report['retrieval']
+    print("-" * 64)
+    print(f"recall@{report['config']['top_k']}: {retrieval['recall_at_k']:.3f}   "
+          f"hit@{report['config']['top_k']}: {retrieval['hit_at_k']:.3f}   "
+          f"labeled queries: {retrieval['labeled_queries']} (unlabeled {retrieval['unlabeled_queries']})")
+    print(f"seeded {report['corpus']['documents']} documents / {report['corpus']['chunks']} chunks "
+          f"in {report['corpus']['ingest_seconds']:.2f}s")
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        print("Set --database-url or BENCH_DATABASE_URL to a scratch Postgres database with pgvector")
+        return 2
+
+    stub = StubOpenAIServer(embed_latency_ms=args.embed_latency_ms,
+                            completion_latency_ms=args.completion_latency_ms).start()
+    # Must be set before the app (and the openai client) is imported
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['OPENAI_BASE_URL'] = stub.base_url
+    os.environ['OPENAI_API_KEY'] = 'benchmark'
+    os.environ['OPENAI_KEY'] = 'benchmark'
+
+    ensure_pgvector(args.database_url)
+    with quiet(not args.verbose):
+        from app import create_app
+        from app.init import db
+        app = create_app(start_workers=False)
+    app.config['SEMANTIC_CACHE_ENABLED'] = args.with_cache
+
+    from app.utils import metrics
+    from app.models.material_chunk import MaterialChunk
+    from app.models.uploaded_file import UploadedFile
+
+    documents, queries = build_corpus(args.docs, args.facts_per_doc, seed=args.seed)
+    queries = queries[:args.queries]
+
+    with app.app_context():
+        cleanup(db)
+        try:
+            started = time.perf_counter()
+            seed_corpus(documents, args.verbose)
+            ingest_seconds = time.perf_counter() - started
+            chunk_count = MaterialChunk.query.join(UploadedFile, MaterialChunk.file_id == UploadedFile.id).filter(
+                UploadedFile.course_id == BENCH_COURSE_ID
+            ).count()
+
+            retrieval = measure_recall(queries, args.top_k, args.verbose)
+            metrics.reset()
+            replay_queries(queries, args.repeat, args.top_k, args.verbose)
+            timings = metrics.snapshot()['timings']
+        finally:
+            if not args.keep:
+                cleanup(db)
+            stub.stop()
+
+    report = {
+        'config': {
+            'docs': args.docs, 'queries': len(queries), 'repeat': args.repeat, 'top_k': args.top_k,
+            'seed': args.seed, 'embed_latency_ms': args.embed_latency_ms,
+            'completion_latency_ms': args.completion_latency_ms, 'with_cache': args.with_cache
+        },
+        'corpus': {'documents': len(documents), 'chunks': chunk_count, 'ingest_seconds': round(ingest_seconds, 3)},
+        'stages': {stage: timings[stage] for stage in STAGES if stage in timings},
+        'retrieval': retrieval
+    }
+    print_report(report)
+
+    for path in (args.json_path, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Report written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.latency_tolerance, args.recall_tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
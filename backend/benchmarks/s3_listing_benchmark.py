@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Course material listing latency against a local S3 stand-in.
+
+Seeds a bucket with --objects small files under one course prefix, then times
+listing them with presigned URLs three ways:
+
+  * legacy  - a new boto3 client for the listing and another per presigned URL
+              (the app before the shared client and URL cache, kept here as a reference)
+  * cold    - the shared pooled client with an empty presigned-URL cache
+  * warm    - the shared client with every URL already cached
+  * page    - the first 100-file page, as served by GET /materials?limit=100
+
+Listings follow continuation tokens, so --objects may exceed S3's 1000-key page.
+
+By default S3 is served in-process by moto; pass --endpoint-url to use a
+running MinIO or moto server instead:
+
+    python -m benchmarks.s3_listing_benchmark
+    python -m benchmarks.s3_listing_benchmark --objects 500 --repeat 10
+    python -m benchmarks.s3_listing_benchmark --endpoint-url http://localhost:9000
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from flask import Flask
+
+from app.utils import s3 as s3_utils
+from app.utils.metrics import percentile
+
+BUCKET = 'coursemate-benchmark'
+PREFIX = 'courses/benchmark-course/'
+CLIENTS_METRIC = 's3.clients_created'
+
+
+def legacy_list_files(config, prefix):
+    """list_files_in_s3 + get_presigned_url before the shared client (one request, at most 1000 keys)"""
+    def client():
+        s3_utils.metrics.increment(CLIENTS_METRIC)
+        return boto3.client('s3', aws_access_key_id=config['S3_KEY'], aws_secret_access_key=config['S3_SECRET'],
+                            region_name=config['S3_REGION'], endpoint_url=config['S3_ENDPOINT_URL'])
+
+    response = client().list_objects_v2(Bucket=BUCKET, Prefix=prefix)
+    files = []
+    for obj in response.get('Contents', []):
+        url = client().generate_presigned_url('get_object', Params={
+            'Bucket': BUCKET, 'Key': obj['Key'], 'ResponseContentDisposition': 'inline'
+        }, ExpiresIn=3600)
+        files.append({'key': obj['Key'], 'url': url, 'size': obj['Size'],
+                      'last_modified': obj['LastModified'].isoformat()})
+    return files
+
+
+def make_app(endpoint_url):
+    app = Flask(__name__)
+    app.config.update(
+        AWS_STORAGE_BUCKET_NAME=BUCKET,
+        S3_KEY='benchmark',
+        S3_SECRET='benchmark',
+        S3_REGION='us-east-1',
+        S3_ENDPOINT_URL=endpoint_url,
+        S3_MAX_POOL_CONNECTIONS=50
+    )
+    return app
+
+
+def seed(objects):
+    s3 = s3_utils.get_s3_client()
+    with contextlib.suppress(Exception):
+        s3.create_bucket(Bucket=BUCKET)
+    for i in range(objects):
+        s3.put_object(Bucket=BUCKET, Key=f"{PREFIX}lecture_{i:05d}.pdf", Body=b'%PDF-1.4 benchmark')
+
+
+def time_runs(repeat, func, before=None):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, result
+
+
+def reset_shared_client():
+    s3_utils._clients.clear()
+    s3_utils.forget_presigned_urls()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark S3 listing with presigned URLs')
+    parser.add_argument('--objects', type=int, default=200, help='Objects in the course folder')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--endpoint-url', default=os.getenv('BENCH_S3_ENDPOINT_URL'),
+                        help='S3-compatible endpoint; moto runs in-process when unset')
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if not args.endpoint_url:
+            try:
+                from moto import mock_aws
+            except ImportError:
+                from moto import mock_s3 as mock_aws
+            os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+            stack.enter_context(mock_aws())
+
+        app = make_app(args.endpoint_url)
+        stack.enter_context(app.app_context())
+        seed(args.objects)
+
+        cases = [
+            ('legacy', lambda: legacy_list_files(app.config, PREFIX), None),
+            ('cold', lambda: s3_utils.list_files_in_s3(PREFIX), reset_shared_client),
+            ('warm', lambda: s3_utils.list_files_in_s3(PREFIX), None),
+            ('page', lambda: s3_utils.list_s3_page(PREFIX, limit=100)['items'], None),
+        ]
+
+        print(f"\nS3 listing benchmark ({args.objects} objects, {args.repeat} runs)")
+        print("=" * 60)
+        print(f"{'case':<10}{'p50 ms':>12}{'p95 ms':>12}{'objects':>10}{'clients':>10}")
+        for name, func, before in cases:
+            created = s3_utils.metrics.counter_value(CLIENTS_METRIC)
+            samples, files = time_runs(args.repeat, func, before)
+            clients = s3_utils.metrics.counter_value(CLIENTS_METRIC) - created
+            print(f"{name:<10}{percentile(samples, 50):>12.1f}{percentile(samples, 95):>12.1f}"
+                  f"{len(files):>10}{clients:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
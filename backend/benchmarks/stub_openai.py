@@ -0,0 +1,190 @@
+"""
+Deterministic stand-in for the OpenAI embeddings and chat completions API.
+
+The server speaks just enough of the REST protocol for the openai client:
+point OPENAI_BASE_URL at it and every embedding/completion call the app makes
+is answered locally, with identical output for identical input.
+
+Embeddings are hashed bag-of-words vectors, so texts sharing words are close
+in cosine space and retrieval quality can be measured meaningfully.
+Optional fixed delays stand in for network and model latency.
+
+Run standalone:  python -m benchmarks.stub_openai --port 8765
+"""
+import re
+import json
+import time
+import base64
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIMENSIONS = 1536
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how', 'in', 'is', 'it', 'of',
+    'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'which', 'who', 'why', 'with'
+}
+
+
+def stub_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS):
+    """Hashed bag-of-words embedding, L2 normalised"""
+    vector = [0.0] * dimensions
+    for token in re.findall(r'[a-z0-9]+', (text or '').lower()):
+        if token in STOPWORDS:
+            continue
+        digest = hashlib.md5(token.encode('utf-8')).digest()
+        index = int.from_bytes(digest[:4], 'little') % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = sum(v * v for v in vector) ** 0.5
+    if not norm:
+        vector[0] = 1.0
+        return vector
+    return [v / norm for v in vector]
+
+
+def stub_completion(messages) -> str:
+    """Deterministic reply; quiz prompts get a well-formed quiz document"""
+    prompt = messages[-1].get('content', '') if messages else ''
+    quiz_match = re.search(r'create (\d+) questions', prompt)
+    if quiz_match:
+        questions = []
+        for i in range(int(quiz_match.group(1))):
+            questions.append({
+                'type': 'multiple_choice',
+                'question': f'Stub question {i + 1}?',
+                'options': ['A) One', 'B) Two', 'C) Three', 'D) Four'],
+                'correct_answer': 'A',
+                'allow_multiple': False,
+                'explanation': 'Stub explanation.'
+            })
+        return json.dumps({'questions': questions})
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+    return f"I found relevant information in your course materials (stub answer {digest})."
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = 'StubOpenAI/1.0'
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.endswith('/embeddings'):
+            time.sleep(self.server.embed_latency_ms / 1000.0)
+            self._send_json(self._embeddings(body))
+        elif self.path.endswith('/chat/completions'):
+            time.sleep(self.server.completion_latency_ms / 1000.0)
+            content = stub_completion(body.get('messages', []))
+            if body.get('stream'):
+                self._send_stream(body, content)
+            else:
+                self._send_json(self._completion(body, content))
+        else:
+            self._send_json({'error': {'message': f'Unknown path {self.path}'}}, status=404)
+
+    def _embeddings(self, body):
+        inputs = body.get('input', '')
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = []
+        for index, text in enumerate(inputs):
+            vector = stub_embedding(text)
+            if body.get('encoding_format') == 'base64':
+                # The openai client asks for base64 floats when numpy is installed
+                vector = base64.b64encode(struct.pack(f'<{len(vector)}f', *vector)).decode('ascii')
+            data.append({'object': 'embedding', 'index': index, 'embedding': vector})
+        tokens = sum(len(str(text).split()) for text in inputs)
+        return {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model', 'text-embedding-ada-002'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        }
+
+    def _completion(self, body, content):
+        return {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-3.5-turbo'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(content.split()), 'total_tokens': len(content.split())}
+        }
+
+    def _send_stream(self, body, content):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        piece_size = 16
+        for start in range(0, len(content), piece_size):
+            chunk = {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model', 'gpt-3.5-turbo'),
+                'choices': [{'index': 0, 'delta': {'content': content[start:start + piece_size]}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            if self.server.stream_delay_ms:
+                self.wfile.flush()
+                time.sleep(self.server.stream_delay_ms / 1000.0)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubOpenAIServer:
+    """Run the stub on a background thread; use .base_url as OPENAI_BASE_URL"""
+
+    def __init__(self, host='127.0.0.1', port=0, embed_latency_ms=0, completion_latency_ms=0, stream_delay_ms=0):
+        self.httpd = ThreadingHTTPServer((host, port), StubOpenAIHandler)
+        self.httpd.embed_latency_ms = embed_latency_ms
+        self.httpd.completion_latency_ms = completion_latency_ms
+        self.httpd.stream_delay_ms = stream_delay_ms
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Deterministic OpenAI API stub for local benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--embed-latency-ms', type=float, default=0)
+    parser.add_argument('--completion-latency-ms', type=float, default=0)
+    parser.add_argument('--stream-delay-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    server = StubOpenAIServer(args.host, args.port, args.embed_latency_ms, args.completion_latency_ms, args.stream_delay_ms)
+    print(f"Stub OpenAI API listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
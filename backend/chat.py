@@ -24,7 +24,8 @@ class ChatGPTWrapper:
         message: str, 
         conversation_history: List[Dict] = None,
         course_context: str = None,
-        materials_context: str = None
+        materials_context: str = None,
+        conversation_summary: str = None
     ) -> Dict:
         """
         Generate a response using ChatGPT with course context
@@ -34,6 +35,7 @@ class ChatGPTWrapper:
             conversation_history: Previous messages in the conversation
             course_context: Information about the current course
             materials_context: Relevant course materials content
+            conversation_summary: Running summary of turns older than conversation_history
             
         Returns:
             Dict containing response and metadata
@@ -45,9 +47,15 @@ class ChatGPTWrapper:
             # Prepare conversation history
             messages = [{"role": "system", "content": system_prompt}]
             
-            # Add conversation history (last 10 messages to stay within token limits)
-            if conversation_history:
-                for msg in conversation_history[-10:]:
+            # With a running summary the history is every turn after it, so all of it is sent;
+            # client-sent history without one keeps the last 10 messages to stay within token limits
+            if conversation_summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation: {conversation_summary}"})
+                recent_history = conversation_history or []
+            else:
+                recent_history = (conversation_history or [])[-10:]
+            if recent_history:
+                for msg in recent_history:
                     role = "user" if msg.get("type") == "user" else "assistant"
                     messages.append({"role": role, "content": msg.get("content", "")})
             
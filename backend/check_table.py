@@ -2,7 +2,7 @@ from app import create_app
 from app.init import db
 from sqlalchemy import inspect
 
-app = create_app()
+app = create_app(start_workers=False)
 
 with app.app_context():
     # Get the inspector
@@ -2,7 +2,7 @@ from app import create_app
 from app.init import db
 from app.models.goal import Goal
 
-app = create_app()
+app = create_app(start_workers=False)
 
 with app.app_context():
     # Create the users_courses_goal table
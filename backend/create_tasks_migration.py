@@ -14,7 +14,7 @@ from app.models.task import Task
 
 def create_tasks_table():
     """Create the tasks table"""
-    app = create_app()
+    app = create_app(start_workers=False)
     
     with app.app_context():
         try:
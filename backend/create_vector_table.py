@@ -2,7 +2,7 @@ from app import create_app
 from app.init import db
 from sqlalchemy import text
 
-app = create_app()
+app = create_app(start_workers=False)
 
 with app.app_context():
     conn = db.engine.connect()
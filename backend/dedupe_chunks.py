@@ -0,0 +1,38 @@
+"""
+Move existing inline chunk embeddings into the shared embedding store and report the savings.
+
+    python dedupe_chunks.py            # report only
+    python dedupe_chunks.py --backfill # share embeddings of chunks uploaded before de-duplication
+    python dedupe_chunks.py --prune    # delete shared embeddings no chunk references
+"""
+import argparse
+from app import create_app
+from app.services.chunk_dedup import ChunkDeduplicator, dedup_report
+
+parser = argparse.ArgumentParser(description='De-duplicate stored material chunk embeddings')
+parser.add_argument('--backfill', action='store_true', help='Move inline embeddings into the shared store')
+parser.add_argument('--prune', action='store_true', help='Delete unreferenced shared embeddings')
+parser.add_argument('--batch-size', type=int, default=500)
+args = parser.parse_args()
+
+app = create_app(start_workers=False)
+
+with app.app_context():
+    deduplicator = ChunkDeduplicator()
+
+    if args.backfill:
+        print("🔁 Moving inline embeddings into the shared store...")
+        result = deduplicator.backfill(batch_size=args.batch_size)
+        print(f"✅ Moved {result['chunks_moved']} chunks")
+
+    if args.prune:
+        print(f"🧹 Pruned {deduplicator.prune_unreferenced()} unreferenced shared embeddings")
+
+    report = dedup_report()
+    print("\n📊 Chunk embedding de-duplication")
+    print("=" * 50)
+    print(f"Shared embeddings:   {report['shared_embeddings']}")
+    print(f"Chunk references:    {report['shared_references']} (x{report['dedup_ratio']} per stored vector)")
+    print(f"Inline embeddings:   {report['inline_embeddings']}")
+    print(f"Vector bytes stored: {report['stored_bytes']:,}")
+    print(f"Vector bytes saved:  {report['bytes_saved']:,}")
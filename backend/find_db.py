@@ -2,7 +2,7 @@
 from app import create_app
 import os
 
-app = create_app()
+app = create_app(start_workers=False)
 with app.app_context():
     # Get the configured database URI
     db_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
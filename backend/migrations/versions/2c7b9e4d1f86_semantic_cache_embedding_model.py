@@ -0,0 +1,40 @@
+"""Record which model embedded each semantic answer cache question
+
+Revision ID: 2c7b9e4d1f86
+Revises: d8f3b1a5c27e
+Create Date: 2025-09-04 14:05:27.913652
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2c7b9e4d1f86'
+down_revision = 'd8f3b1a5c27e'
+branch_labels = None
+depends_on = None
+
+LEGACY_EMBEDDING_MODEL = 'text-embedding-ada-002'
+
+
+def upgrade():
+    # semantic_answer_cache is created by the app's create_all(); a fresh table already has the column
+    inspector = sa.inspect(op.get_bind())
+    if 'semantic_answer_cache' not in inspector.get_table_names():
+        return
+    existing = {column['name'] for column in inspector.get_columns('semantic_answer_cache')}
+    if 'embedding_model' not in existing:
+        # Every entry so far was embedded with the legacy model (1536 dimensions)
+        op.add_column('semantic_answer_cache', sa.Column(
+            'embedding_model', sa.String(100), nullable=False, server_default=LEGACY_EMBEDDING_MODEL
+        ))
+        op.alter_column('semantic_answer_cache', 'embedding_model', server_default=None)
+    # Drop the fixed dimension so courses cut over to another model can store their questions
+    op.execute("ALTER TABLE semantic_answer_cache ALTER COLUMN question_embedding TYPE vector")
+
+
+def downgrade():
+    # Entries of other models cannot go back into a 1536-dimension column
+    op.execute(f"DELETE FROM semantic_answer_cache WHERE embedding_model <> '{LEGACY_EMBEDDING_MODEL}'")
+    op.execute("ALTER TABLE semantic_answer_cache ALTER COLUMN question_embedding TYPE vector(1536)")
+    op.drop_column('semantic_answer_cache', 'embedding_model')
@@ -0,0 +1,34 @@
+"""Add rolling summary memory to conversations
+
+Revision ID: 3f9c2d7a1b54
+Revises: 057d43985215
+Create Date: 2025-08-04 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2d7a1b54'
+down_revision = '057d43985215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summarized_message_count', sa.Integer(), server_default='0', nullable=True))
+        batch_op.add_column(sa.Column('summary_updated_at', sa.DateTime(), nullable=True))
+
+    op.create_index('ix_conversation_messages_conversation_created', 'conversation_messages',
+                    ['conversation_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_conversation_messages_conversation_created', table_name='conversation_messages')
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_column('summary_updated_at')
+        batch_op.drop_column('summarized_message_count')
+        batch_op.drop_column('summary')
@@ -0,0 +1,38 @@
+"""Import each Google Calendar event once per user
+
+Revision ID: 5d2a9c41e7b3
+Revises: 8b41e6c09d27
+Create Date: 2025-08-14 10:12:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5d2a9c41e7b3'
+down_revision = '8b41e6c09d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older syncs could import an event twice; keep the most recently updated copy.
+    # ROW_NUMBER rather than a pairwise comparison, so rows with no timestamps are deduped too.
+    op.execute("""
+        DELETE FROM users_courses_goal g
+        USING (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id, google_event_id
+                ORDER BY COALESCE(updated_at, created_at) DESC NULLS LAST, id DESC
+            ) AS position
+            FROM users_courses_goal
+            WHERE is_external AND google_event_id IS NOT NULL
+        ) ranked
+        WHERE ranked.id = g.id AND ranked.position > 1
+    """)
+    op.create_index('ux_goal_user_imported_event', 'users_courses_goal', ['user_id', 'google_event_id'],
+                    unique=True, postgresql_where=sa.text('is_external AND google_event_id IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ux_goal_user_imported_event', table_name='users_courses_goal')
@@ -0,0 +1,60 @@
+"""Share embeddings between duplicate material chunks
+
+Revision ID: 8b41e6c09d27
+Revises: 3f9c2d7a1b54
+Create Date: 2025-08-06 14:27:09.552180
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision = '8b41e6c09d27'
+down_revision = '3f9c2d7a1b54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app's create_all() may already have created the new table
+    if 'shared_embeddings' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            'shared_embeddings',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('model', sa.String(length=100), nullable=False),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('simhash', sa.BigInteger(), nullable=False),
+            sa.Column('simhash_band0', sa.Integer(), nullable=False),
+            sa.Column('simhash_band1', sa.Integer(), nullable=False),
+            sa.Column('simhash_band2', sa.Integer(), nullable=False),
+            sa.Column('simhash_band3', sa.Integer(), nullable=False),
+            sa.Column('embedding', Vector(1536), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('byte_size', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('content_hash', 'model', name='uq_shared_embeddings_hash_model')
+        )
+        for band in range(4):
+            op.create_index(f'ix_shared_embeddings_simhash_band{band}', 'shared_embeddings',
+                            [f'simhash_band{band}'], unique=False)
+
+    with op.batch_alter_table('material_chunks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('shared_embedding_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_material_chunks_content_hash', ['content_hash'], unique=False)
+        batch_op.create_index('ix_material_chunks_shared_embedding_id', ['shared_embedding_id'], unique=False)
+        batch_op.create_foreign_key('fk_material_chunks_shared_embedding_id', 'shared_embeddings',
+                                    ['shared_embedding_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('material_chunks', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_material_chunks_shared_embedding_id', type_='foreignkey')
+        batch_op.drop_index('ix_material_chunks_shared_embedding_id')
+        batch_op.drop_index('ix_material_chunks_content_hash')
+        batch_op.drop_column('shared_embedding_id')
+        batch_op.drop_column('content_hash')
+
+    op.drop_table('shared_embeddings')
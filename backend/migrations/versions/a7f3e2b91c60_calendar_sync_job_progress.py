@@ -0,0 +1,35 @@
+"""Track progress and results of background Google Calendar imports
+
+Revision ID: a7f3e2b91c60
+Revises: 5d2a9c41e7b3
+Create Date: 2025-08-18 09:41:03.552817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7f3e2b91c60'
+down_revision = '5d2a9c41e7b3'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = ('params', 'progress', 'result')
+
+
+def upgrade():
+    # calendar_sync_jobs is created by the app's create_all(); a fresh table already has the columns
+    inspector = sa.inspect(op.get_bind())
+    if 'calendar_sync_jobs' not in inspector.get_table_names():
+        return
+    existing = {column['name'] for column in inspector.get_columns('calendar_sync_jobs')}
+    with op.batch_alter_table('calendar_sync_jobs', schema=None) as batch_op:
+        for name in NEW_COLUMNS:
+            if name not in existing:
+                batch_op.add_column(sa.Column(name, sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('calendar_sync_jobs', schema=None) as batch_op:
+        for name in NEW_COLUMNS:
+            batch_op.drop_column(name)
@@ -0,0 +1,38 @@
+"""Record which process holds a generation job and when it last sent a heartbeat
+
+Revision ID: b6d0e2f7c915
+Revises: f4c1a8e6b203
+Create Date: 2025-09-02 11:27:49.180334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b6d0e2f7c915'
+down_revision = 'f4c1a8e6b203'
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = (
+    ('locked_by', sa.String(255)),
+    ('heartbeat_at', sa.DateTime()),
+)
+
+
+def upgrade():
+    # generation_jobs is created by the app's create_all(); a fresh table already has the columns
+    inspector = sa.inspect(op.get_bind())
+    if 'generation_jobs' not in inspector.get_table_names():
+        return
+    existing = {column['name'] for column in inspector.get_columns('generation_jobs')}
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        for name, column_type in NEW_COLUMNS:
+            if name not in existing:
+                batch_op.add_column(sa.Column(name, column_type, nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('generation_jobs', schema=None) as batch_op:
+        for name, _ in NEW_COLUMNS:
+            batch_op.drop_column(name)
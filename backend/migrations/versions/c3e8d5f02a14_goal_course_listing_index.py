@@ -0,0 +1,22 @@
+"""Index goal rows by user, course and goal for course goal listings
+
+Revision ID: c3e8d5f02a14
+Revises: a7f3e2b91c60
+Create Date: 2025-08-21 15:40:09.552813
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8d5f02a14'
+down_revision = 'a7f3e2b91c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_goal_user_course_goal', 'users_courses_goal', ['user_id', 'course_id', 'goal_id'])
+
+
+def downgrade():
+    op.drop_index('ix_goal_user_course_goal', table_name='users_courses_goal')
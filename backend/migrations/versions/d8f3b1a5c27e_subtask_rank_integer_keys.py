@@ -0,0 +1,63 @@
+"""Re-key subtask_rank with integer-part fractional keys
+
+Revision ID: d8f3b1a5c27e
+Revises: b6d0e2f7c915
+Create Date: 2025-09-03 09:41:12.672018
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3b1a5c27e'
+down_revision = 'b6d0e2f7c915'
+branch_labels = None
+depends_on = None
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+def digit(expression):
+    return f"substr('{DIGITS}', ({expression}) + 1, 1)"
+
+
+def upgrade():
+    # Keys written before utils/fractional_index gained an integer part are plain fractions,
+    # which the new scheme rejects. Give every subtask the consecutive integer key spread_keys()
+    # would ("a0", "a1", ... "az", "b00", ...) in its current order; this also ranks rows that
+    # had none yet. Tasks with more than 62^3 subtasks are left to the background sweep.
+    op.execute(f"""
+        UPDATE users_courses_goal g SET subtask_rank = CASE
+                WHEN ranked.position < 62 THEN 'a' || {digit('ranked.position')}
+                WHEN ranked.position < 3906 THEN 'b' || {digit('(ranked.position - 62) / 62')}
+                                                     || {digit('(ranked.position - 62) % 62')}
+                WHEN ranked.position < 242234 THEN 'c' || {digit('(ranked.position - 3906) / 3844')}
+                                                       || {digit('(ranked.position - 3906) / 62 % 62')}
+                                                       || {digit('(ranked.position - 3906) % 62')}
+            END
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id, task_id
+                ORDER BY subtask_rank NULLS LAST, subtask_order NULLS LAST, created_at
+            ) - 1 AS position
+            FROM users_courses_goal
+            WHERE task_id <> 'placeholder' AND NOT COALESCE(is_external, false)
+        ) ranked
+        WHERE ranked.id = g.id
+    """)
+
+
+def downgrade():
+    # The older code cannot read these keys: keep the order in subtask_order and let its sweep re-rank
+    op.execute("""
+        UPDATE users_courses_goal g SET subtask_order = ranked.position, subtask_rank = NULL
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id, task_id
+                ORDER BY subtask_rank NULLS LAST, subtask_order NULLS LAST, created_at
+            ) - 1 AS position
+            FROM users_courses_goal
+            WHERE task_id <> 'placeholder'
+        ) ranked
+        WHERE ranked.id = g.id
+    """)
@@ -0,0 +1,117 @@
+"""Goal and task completion with progress counters in study_goals / study_tasks
+
+Revision ID: e91b4d7c3f58
+Revises: c3e8d5f02a14
+Create Date: 2025-08-26 11:02:47.190365
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e91b4d7c3f58'
+down_revision = 'c3e8d5f02a14'
+branch_labels = None
+depends_on = None
+
+VIEW = 'users_courses_goal_view'
+OVERLAYS = {
+    'goal_completed': 'COALESCE(sg.goal_completed, g.goal_completed) AS goal_completed',
+    'task_completed': 'COALESCE(st.task_completed, g.task_completed) AS task_completed'
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'study_goals' not in tables:
+        op.create_table(
+            'study_goals',
+            sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('goal_id', sa.String(), primary_key=True),
+            sa.Column('course_id', sa.String(), nullable=False),
+            sa.Column('goal_completed', sa.Boolean(), nullable=False),
+            sa.Column('total_tasks', sa.Integer(), nullable=False),
+            sa.Column('completed_tasks', sa.Integer(), nullable=False),
+            sa.Column('total_subtasks', sa.Integer(), nullable=False),
+            sa.Column('completed_subtasks', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True)
+        )
+        op.create_index('ix_study_goals_course_id', 'study_goals', ['course_id'])
+    if 'study_tasks' not in tables:
+        op.create_table(
+            'study_tasks',
+            sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('task_id', sa.String(), primary_key=True),
+            sa.Column('goal_id', sa.String(), nullable=False),
+            sa.Column('course_id', sa.String(), nullable=False),
+            sa.Column('task_completed', sa.Boolean(), nullable=False),
+            sa.Column('total_subtasks', sa.Integer(), nullable=False),
+            sa.Column('completed_subtasks', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True)
+        )
+        op.create_index('ix_study_tasks_user_goal', 'study_tasks', ['user_id', 'goal_id'])
+
+    # Counters for every existing goal and task; imported calendar events are not tracked.
+    # Rows create_all already made may hold stale counters, so those are overwritten
+    op.execute("""
+        INSERT INTO study_tasks (user_id, task_id, goal_id, course_id, task_completed,
+                                 total_subtasks, completed_subtasks, created_at, updated_at)
+        SELECT user_id, task_id, MIN(goal_id), MIN(course_id), COALESCE(BOOL_AND(task_completed), false),
+               COUNT(*), COUNT(*) FILTER (WHERE subtask_completed), now(), now()
+        FROM users_courses_goal
+        WHERE NOT COALESCE(is_external, false) AND task_id <> 'placeholder'
+        GROUP BY user_id, task_id
+        ON CONFLICT (user_id, task_id) DO UPDATE
+        SET goal_id = EXCLUDED.goal_id, course_id = EXCLUDED.course_id,
+            total_subtasks = EXCLUDED.total_subtasks, completed_subtasks = EXCLUDED.completed_subtasks,
+            updated_at = EXCLUDED.updated_at
+    """)
+    op.execute("""
+        INSERT INTO study_goals (user_id, goal_id, course_id, goal_completed, total_tasks, completed_tasks,
+                                 total_subtasks, completed_subtasks, created_at, updated_at)
+        SELECT r.user_id, r.goal_id, MIN(r.course_id), COALESCE(BOOL_AND(r.goal_completed), false),
+               COALESCE(MAX(t.total_tasks), 0), COALESCE(MAX(t.completed_tasks), 0),
+               COALESCE(MAX(t.total_subtasks), 0), COALESCE(MAX(t.completed_subtasks), 0), now(), now()
+        FROM users_courses_goal r
+        LEFT JOIN (
+            SELECT user_id, goal_id, COUNT(*) AS total_tasks, COUNT(*) FILTER (WHERE task_completed) AS completed_tasks,
+                   SUM(total_subtasks) AS total_subtasks, SUM(completed_subtasks) AS completed_subtasks
+            FROM study_tasks GROUP BY user_id, goal_id
+        ) t ON t.user_id = r.user_id AND t.goal_id = r.goal_id
+        WHERE NOT COALESCE(r.is_external, false)
+        GROUP BY r.user_id, r.goal_id
+        ON CONFLICT (user_id, goal_id) DO UPDATE
+        SET total_tasks = EXCLUDED.total_tasks, completed_tasks = EXCLUDED.completed_tasks,
+            total_subtasks = EXCLUDED.total_subtasks, completed_subtasks = EXCLUDED.completed_subtasks,
+            updated_at = EXCLUDED.updated_at
+    """)
+
+    # Same rows as users_courses_goal, with the flags the app now keeps in study_goals / study_tasks
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('users_courses_goal')]
+    select_list = ',\n       '.join(OVERLAYS.get(name, f'g."{name}"') for name in columns)
+    op.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    op.execute(
+        f"CREATE VIEW {VIEW} AS\n"
+        f"SELECT {select_list}\n"
+        "FROM users_courses_goal g\n"
+        "LEFT JOIN study_goals sg ON sg.user_id = g.user_id AND sg.goal_id = g.goal_id\n"
+        "LEFT JOIN study_tasks st ON st.user_id = g.user_id AND st.task_id = g.task_id"
+    )
+
+
+def downgrade():
+    # Copy the current flags back onto the rows before dropping the tables
+    op.execute("""
+        UPDATE users_courses_goal g SET task_completed = st.task_completed
+        FROM study_tasks st WHERE st.user_id = g.user_id AND st.task_id = g.task_id
+    """)
+    op.execute("""
+        UPDATE users_courses_goal g SET goal_completed = sg.goal_completed
+        FROM study_goals sg WHERE sg.user_id = g.user_id AND sg.goal_id = g.goal_id
+    """)
+    op.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    op.drop_table('study_tasks')
+    op.drop_table('study_goals')
@@ -0,0 +1,62 @@
+"""Fractional order keys for subtasks (users_courses_goal.subtask_rank)
+
+Revision ID: f4c1a8e6b203
+Revises: e91b4d7c3f58
+Create Date: 2025-08-29 10:14:36.508127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1a8e6b203'
+down_revision = 'e91b4d7c3f58'
+branch_labels = None
+depends_on = None
+
+VIEW = 'users_courses_goal_view'
+OVERLAYS = {
+    'goal_completed': 'COALESCE(sg.goal_completed, g.goal_completed) AS goal_completed',
+    'task_completed': 'COALESCE(st.task_completed, g.task_completed) AS task_completed'
+}
+
+
+def recreate_view():
+    """users_courses_goal_view lists the table's columns as of its creation, so rebuild it"""
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('users_courses_goal')]
+    select_list = ',\n       '.join(OVERLAYS.get(name, f'g."{name}"') for name in columns)
+    op.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    op.execute(
+        f"CREATE VIEW {VIEW} AS\n"
+        f"SELECT {select_list}\n"
+        "FROM users_courses_goal g\n"
+        "LEFT JOIN study_goals sg ON sg.user_id = g.user_id AND sg.goal_id = g.goal_id\n"
+        "LEFT JOIN study_tasks st ON st.user_id = g.user_id AND st.task_id = g.task_id"
+    )
+
+
+def upgrade():
+    # Existing rows stay unranked (listed by subtask_order) until the app's background sweep ranks them
+    op.add_column('users_courses_goal', sa.Column('subtask_rank', sa.String(collation='C'), nullable=True))
+    op.create_index('ix_goal_user_task_rank', 'users_courses_goal', ['user_id', 'task_id', 'subtask_rank'])
+    recreate_view()
+
+
+def downgrade():
+    # Keep the current order in subtask_order before dropping the keys
+    op.execute("""
+        UPDATE users_courses_goal g SET subtask_order = ranked.position
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id, task_id
+                ORDER BY subtask_rank NULLS LAST, subtask_order NULLS LAST, created_at
+            ) - 1 AS position
+            FROM users_courses_goal
+            WHERE task_id <> 'placeholder'
+        ) ranked
+        WHERE ranked.id = g.id
+    """)
+    op.execute(f"DROP VIEW IF EXISTS {VIEW}")
+    op.drop_index('ix_goal_user_task_rank', table_name='users_courses_goal')
+    op.drop_column('users_courses_goal', 'subtask_rank')
+    recreate_view()
@@ -3,7 +3,7 @@ from app.models.goal import Goal
 from app.init import db
 from sqlalchemy import text
 
-app = create_app()
+app = create_app(start_workers=False)
 
 with app.app_context():
     # Drop the users_courses_goal table first
@@ -0,0 +1,25 @@
+"""
+Run the storage garbage collector once and print what it reclaimed.
+
+    python run_storage_gc.py --dry-run   # report orphans without deleting
+    python run_storage_gc.py
+"""
+import json
+import argparse
+from app import create_app
+from app.services.storage_gc import run_storage_gc
+
+parser = argparse.ArgumentParser(description='Collect orphaned chunks, embeddings and stored files')
+parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+args = parser.parse_args()
+
+app = create_app(start_workers=False)
+
+with app.app_context():
+    print("🧹 Running storage garbage collection" + (" (dry run)" if args.dry_run else "") + "...")
+    report = run_storage_gc(dry_run=args.dry_run)
+    if report is None:
+        print("⏭️  Another process is collecting right now")
+    else:
+        print(json.dumps(report, indent=2))
+        print(f"✅ {'Would reclaim' if args.dry_run else 'Reclaimed'} {report['bytes_reclaimed']:,} bytes")
@@ -3,7 +3,7 @@ from app.utils.llama_index_service import LlamaIndexService
 import os
 import tempfile
 
-app = create_app()
+app = create_app(start_workers=False)
 
 def test_llama_index_integration():
     """Test LlamaIndex integration with vector database"""
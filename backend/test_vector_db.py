@@ -5,7 +5,7 @@ from app.models.document_embedding import DocumentEmbedding
 from sqlalchemy import text
 import os
 
-app = create_app()
+app = create_app(start_workers=False)
 embedding_service = EmbeddingService()
 
 def test_vector_database():
@@ -0,0 +1,116 @@
+import pytest
+
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+def test_entries_expire_after_the_default_ttl(clock):
+    cache = TTLCache(default_ttl=10)
+    cache.set('url', 'signed')
+
+    clock.now += 9.9
+    assert cache.get('url') == 'signed'
+    clock.now += 0.1
+    assert cache.get('url') is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl_overrides_the_default(clock):
+    cache = TTLCache(default_ttl=10)
+    cache.set('short', 1, ttl=1)
+    cache.set('long', 2, ttl=100)
+
+    clock.now += 50
+    assert cache.get('short', 'gone') == 'gone'
+    assert cache.get('long') == 2
+
+
+def test_setting_again_restarts_the_ttl(clock):
+    cache = TTLCache(default_ttl=10)
+    cache.set('key', 'old')
+    clock.now += 8
+    cache.set('key', 'new')
+    clock.now += 8
+
+    assert cache.get('key') == 'new'
+
+
+def test_least_recently_used_entry_is_evicted_when_full(clock):
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_overwriting_marks_the_entry_recently_used(clock):
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 10)
+    cache.set('c', 3)
+
+    assert cache.get('a') == 10
+    assert cache.get('b') is None
+
+
+def test_get_or_set_computes_once_until_expiry(clock):
+    cache = TTLCache(default_ttl=10)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_set('key', factory) == 1
+    assert cache.get_or_set('key', factory) == 1
+    clock.now += 10
+    assert cache.get_or_set('key', factory) == 2
+
+
+def test_get_or_set_does_not_cache_none(clock):
+    cache = TTLCache()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_set('key', factory) is None
+    assert cache.get_or_set('key', factory) is None
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_delete_and_clear(clock):
+    cache = TTLCache()
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.delete('a')
+    cache.delete('missing')
+    assert cache.get('a') is None
+    assert len(cache) == 1
+
+    cache.clear()
+    assert len(cache) == 0
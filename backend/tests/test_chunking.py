@@ -0,0 +1,102 @@
+import pytest
+
+from app.utils.chunking import clean_text, chunk_by_characters, chunk_by_tokens
+
+
+class CharacterEncoding:
+    """One token per character, enough to check window arithmetic without tiktoken"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(char) for char in text]
+
+    def decode_with_offsets(self, tokens):
+        return ''.join(chr(token) for token in tokens), list(range(len(tokens)))
+
+
+def test_clean_text_strips_control_characters_and_collapses_whitespace():
+    assert clean_text('a\x00b\x07c \t\n\r  d\x1f\n') == 'abc d'
+
+
+@pytest.mark.parametrize('text', ['', None])
+def test_clean_text_of_nothing(text):
+    assert clean_text(text) == ''
+
+
+def test_text_shorter_than_a_chunk_is_one_chunk():
+    assert chunk_by_characters('short text', chunk_size=100) == ['short text']
+
+
+def test_chunks_without_sentence_ends_overlap_exactly():
+    text = 'abcdefghijklmnopqrstuvwxy'
+
+    chunks = chunk_by_characters(text, chunk_size=10, overlap=3)
+
+    assert chunks == [text[0:10], text[7:17], text[14:24], text[21:25]]
+
+
+def test_last_chunk_is_not_followed_by_its_own_overlap():
+    text = 'abcdefghijklmnopq'
+
+    assert chunk_by_characters(text, chunk_size=10, overlap=3) == [text[0:10], text[7:17]]
+
+
+def test_chunks_end_at_a_sentence_end_inside_the_boundary_window():
+    text = 'First one. Second one. Third one here.'
+
+    chunks = chunk_by_characters(text, chunk_size=15, overlap=0, boundary_window=10)
+
+    assert chunks[:2] == ['First one.', 'Second one.']
+    assert ''.join(chunks).replace(' ', '') == text.replace(' ', '')
+
+
+def test_sentence_end_outside_the_boundary_window_is_ignored():
+    text = 'Hi. ' + 'x' * 30
+
+    chunks = chunk_by_characters(text, chunk_size=20, overlap=0, boundary_window=5)
+
+    assert chunks[0] == text[:20]
+
+
+def test_overlap_larger_than_the_chunk_still_advances():
+    text = 'x' * 50
+
+    chunks = chunk_by_characters(text, chunk_size=5, overlap=10)
+
+    assert len(chunks) == 46
+    assert all(chunk == 'xxxxx' for chunk in chunks)
+
+
+def test_whitespace_only_windows_are_dropped():
+    text = 'a' * 10 + ' ' * 10 + 'b' * 10
+
+    assert chunk_by_characters(text, chunk_size=10, overlap=0) == ['a' * 10, 'b' * 10]
+
+
+def test_token_windows_overlap_and_stop_at_the_end():
+    chunks = chunk_by_tokens('abcdefghij', chunk_size=4, overlap=1, encoding=CharacterEncoding())
+
+    assert chunks == ['abcd', 'defg', 'ghij']
+
+
+def test_token_chunking_of_nothing():
+    assert chunk_by_tokens('', encoding=CharacterEncoding()) == []
+
+
+def test_token_overlap_not_smaller_than_the_chunk_still_advances():
+    chunks = chunk_by_tokens('abcdef', chunk_size=2, overlap=5, encoding=CharacterEncoding())
+
+    assert chunks == ['ab', 'bc', 'cd', 'de', 'ef']
+
+
+def test_token_chunks_respect_the_size_with_tiktoken():
+    pytest.importorskip('tiktoken')
+    from app.utils.chunking import get_encoding
+    encoding = get_encoding()
+    text = ' '.join(f'Sentence number {i} about cells and energy.' for i in range(200))
+
+    chunks = chunk_by_tokens(text, chunk_size=50, overlap=10)
+
+    assert len(chunks) > 1
+    assert all(len(encoding.encode(chunk)) <= 50 for chunk in chunks)
+    assert chunks[0].startswith('Sentence number 0')
+    assert chunks[-1].endswith('Sentence number 199 about cells and energy.')
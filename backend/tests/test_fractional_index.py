@@ -0,0 +1,110 @@
+import random
+import pytest
+
+from app.utils.fractional_index import (
+    key_between, keys_between, spread_keys, validate_key, INTEGER_ZERO, SMALLEST_INTEGER
+)
+
+
+def c_sorted(keys):
+    """Order keys the way Postgres does with COLLATE "C" (plain byte order)"""
+    return sorted(keys, key=lambda key: key.encode('ascii'))
+
+
+def assert_strictly_ascending(keys):
+    assert c_sorted(keys) == keys
+    assert len(set(keys)) == len(keys)
+
+
+def test_first_key_is_integer_zero():
+    assert key_between(None, None) == INTEGER_ZERO
+
+
+def test_appends_step_the_integer_part_and_stay_short():
+    keys = [key_between(None, None)]
+    for _ in range(3999):
+        keys.append(key_between(keys[-1], None))
+
+    assert_strictly_ascending(keys)
+    assert keys[:3] == ['a0', 'a1', 'a2']
+    assert keys[61:63] == ['az', 'b00']
+    assert max(len(key) for key in keys) == 4
+
+
+def test_prepends_step_the_integer_part_down():
+    keys = [key_between(None, None)]
+    for _ in range(999):
+        keys.insert(0, key_between(None, keys[0]))
+
+    assert_strictly_ascending(keys)
+    assert keys[-2:] == ['Zz', 'a0']
+    assert max(len(key) for key in keys) == 3
+
+
+def test_key_between_neighbours_sorts_between_them():
+    rng = random.Random(7)
+    keys = spread_keys(5)
+    for _ in range(2000):
+        index = rng.randint(0, len(keys))
+        left = keys[index - 1] if index > 0 else None
+        right = keys[index] if index < len(keys) else None
+        keys.insert(index, key_between(left, right))
+
+    assert_strictly_ascending(keys)
+    for key in keys:
+        validate_key(key)
+
+
+def test_splitting_the_same_gap_grows_keys_slowly():
+    left, right = 'a0', 'a1'
+    for _ in range(100):
+        right = key_between(left, right)
+
+    assert left < right < 'a1'
+    assert len(right) <= 2 + 100 // 5  # About one character per 5-6 splits
+
+
+def test_mixed_case_keys_follow_c_collation():
+    # Upper case sorts before lower case bytewise, unlike most locale collations
+    assert key_between('Zz', 'a0') == 'ZzV'
+    assert c_sorted(['a0', 'Zz', 'a0V', 'Zzz']) == ['Zz', 'Zzz', 'a0', 'a0V']
+
+
+@pytest.mark.parametrize('a, b', [('a1', 'a0'), ('a0', 'a0')])
+def test_out_of_order_neighbours_are_rejected(a, b):
+    with pytest.raises(ValueError):
+        key_between(a, b)
+
+
+@pytest.mark.parametrize('key', ['', 'a', 'a10', '5', 'V', 'a0!', SMALLEST_INTEGER])
+def test_invalid_keys_are_rejected(key):
+    with pytest.raises(ValueError):
+        validate_key(key)
+
+
+@pytest.mark.parametrize('a, b', [(None, None), ('a5', None), (None, 'a0'), ('a0', 'a1'), ('a0V', 'a0W')])
+def test_keys_between_returns_n_ascending_keys_inside_the_bounds(a, b):
+    keys = keys_between(a, b, 10)
+
+    assert len(keys) == 10
+    assert_strictly_ascending(keys)
+    assert a is None or a < keys[0]
+    assert b is None or keys[-1] < b
+
+
+def test_keys_between_at_the_end_are_consecutive_integers():
+    assert keys_between('a5', None, 3) == ['a6', 'a7', 'a8']
+    assert keys_between(None, 'a0', 3) == ['Zx', 'Zy', 'Zz']
+
+
+def test_keys_between_nothing():
+    assert keys_between('a0', 'a1', 0) == []
+
+
+def test_spread_keys_are_short_consecutive_integers():
+    keys = spread_keys(500)
+
+    assert_strictly_ascending(keys)
+    assert keys[0] == INTEGER_ZERO
+    assert max(len(key) for key in keys) == 3
+    assert spread_keys(0) == []
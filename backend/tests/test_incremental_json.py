@@ -0,0 +1,97 @@
+import json
+
+from app.utils.incremental_json import JsonArrayStreamParser
+
+QUESTIONS = [
+    {'question': 'What is 2 + 2?', 'options': ['3', '4'], 'answer': '4'},
+    {'question': 'Quote: "a {brace}" and a ] bracket', 'options': ['x\\y', '{]'], 'answer': 'x\\y'},
+    {'question': 'Nested', 'meta': {'tags': [{'name': 'a'}, {'name': 'b'}]}, 'answer': None},
+]
+DOCUMENT = 'Here you go:\n```json\n' + json.dumps({'title': 'Quiz', 'questions': QUESTIONS}) + '\n```'
+
+
+def feed_in_pieces(parser, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+
+def test_items_are_yielded_as_each_object_closes():
+    parser = JsonArrayStreamParser('questions')
+
+    items = feed_in_pieces(parser, DOCUMENT, 1)
+
+    assert items == QUESTIONS
+    assert parser.finished
+    assert parser.errors == []
+
+
+def test_piece_size_does_not_change_the_result():
+    for size in (2, 3, 7, 64, len(DOCUMENT)):
+        parser = JsonArrayStreamParser('questions')
+        assert feed_in_pieces(parser, DOCUMENT, size) == QUESTIONS
+
+
+def test_an_item_is_available_before_the_stream_ends():
+    parser = JsonArrayStreamParser('questions')
+    first = json.dumps(QUESTIONS[0])
+
+    assert list(parser.feed('{"questions": [' + first[:-1])) == []
+    assert list(parser.feed('}, {"question": "still stream')) == [QUESTIONS[0]]
+    assert not parser.finished
+
+
+def test_key_split_across_pieces_is_found():
+    parser = JsonArrayStreamParser('questions')
+
+    assert list(parser.feed('{"ques')) == []
+    assert list(parser.feed('tions"  :\n [{"a": 1}]}')) == [{'a': 1}]
+
+
+def test_escaped_quotes_and_backslashes_do_not_end_strings():
+    parser = JsonArrayStreamParser('items')
+    text = r'{"items": [{"s": "say \"}]\" then \\"}, {"s": "\\\""}]}'
+
+    assert feed_in_pieces(parser, text, 1) == [{'s': 'say "}]" then \\'}, {'s': '\\"'}]
+    assert parser.finished
+
+
+def test_truncated_stream_keeps_only_complete_items():
+    parser = JsonArrayStreamParser('questions')
+    text = json.dumps({'questions': QUESTIONS})
+    cut = text.index('"Nested"')
+
+    assert feed_in_pieces(parser, text[:cut], 5) == QUESTIONS[:2]
+    assert not parser.finished
+    assert parser.errors == []
+
+
+def test_stream_truncated_inside_an_escape_keeps_only_complete_items():
+    parser = JsonArrayStreamParser('items')
+
+    assert list(parser.feed('{"items": [{"a": 1}, {"b": "x\\')) == [{'a': 1}]
+    assert not parser.finished
+
+
+def test_text_after_the_array_is_ignored():
+    parser = JsonArrayStreamParser('items')
+
+    assert list(parser.feed('{"items": [{"a": 1}], "other": [{"b": 2}]}')) == [{'a': 1}]
+    assert parser.finished
+    assert list(parser.feed('{"c": 3}')) == []
+
+
+def test_malformed_item_is_reported_and_parsing_continues():
+    parser = JsonArrayStreamParser('items')
+
+    items = list(parser.feed('{"items": [{"a": }, {"b": 2}]}'))
+
+    assert items == [{'b': 2}]
+    assert len(parser.errors) == 1
+
+
+def test_other_arrays_before_the_key_are_skipped():
+    parser = JsonArrayStreamParser('items')
+
+    assert list(parser.feed('{"notes": [{"n": 0}], "items": [{"a": 1}]}')) == [{'a': 1}]
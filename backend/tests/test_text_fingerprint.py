@@ -0,0 +1,62 @@
+import random
+import pytest
+
+from app.utils.text_fingerprint import (
+    content_hash, simhash, simhash_bands, hamming_distance, to_signed64, from_signed64,
+    SIMHASH_BANDS, SIMHASH_BITS
+)
+
+SLIDE = ("Photosynthesis converts light energy into chemical energy stored in glucose. "
+         "It takes place in the chloroplasts of plant cells, where chlorophyll absorbs light. "
+         "The light dependent reactions produce ATP and NADPH, which power the Calvin cycle. "
+         "Carbon dioxide is fixed into three carbon sugars that the plant uses to grow.")
+OTHER = ("The French Revolution began in 1789 with the storming of the Bastille and ended "
+         "with the rise of Napoleon, reshaping European politics for the following century.")
+
+
+def test_content_hash_ignores_case_and_whitespace():
+    assert content_hash('Hello   World\n') == content_hash('hello world')
+    assert content_hash('hello world') != content_hash('hello, world')
+
+
+def test_simhash_is_deterministic_and_64_bit():
+    assert simhash(SLIDE) == simhash(SLIDE)
+    assert 0 <= simhash(SLIDE) < 1 << SIMHASH_BITS
+
+
+def test_punctuation_only_changes_hash_the_same():
+    assert simhash(SLIDE) == simhash(SLIDE.replace('to grow.', 'to grow!!'))
+
+
+def test_near_duplicates_are_closer_than_unrelated_text():
+    near = simhash(SLIDE + ' Page 3')
+
+    assert hamming_distance(simhash(SLIDE), near) <= SIMHASH_BANDS
+    assert hamming_distance(simhash(SLIDE), simhash(OTHER)) > 16
+
+
+def test_bands_reassemble_the_hash():
+    fingerprint = simhash(SLIDE)
+    bands = simhash_bands(fingerprint)
+    width = SIMHASH_BITS // SIMHASH_BANDS
+
+    assert len(bands) == SIMHASH_BANDS
+    assert sum(band << (index * width) for index, band in enumerate(bands)) == fingerprint
+
+
+def test_hashes_a_few_bits_apart_share_a_band():
+    rng = random.Random(3)
+    for _ in range(500):
+        fingerprint = rng.getrandbits(SIMHASH_BITS)
+        flipped = fingerprint
+        for bit in rng.sample(range(SIMHASH_BITS), SIMHASH_BANDS - 1):
+            flipped ^= 1 << bit
+        assert any(a == b for a, b in zip(simhash_bands(fingerprint), simhash_bands(flipped)))
+
+
+@pytest.mark.parametrize('value', [0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1])
+def test_signed_storage_round_trips(value):
+    signed = to_signed64(value)
+
+    assert -(1 << 63) <= signed < 1 << 63
+    assert from_signed64(signed) == value
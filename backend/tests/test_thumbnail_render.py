@@ -0,0 +1,52 @@
+import io
+import pytest
+
+fitz = pytest.importorskip('fitz')
+Image = pytest.importorskip('PIL.Image')
+
+from app.utils.thumbnail_render import render_thumbnails
+
+WIDTHS = [160, 320, 640, 1280]
+US_LETTER = (612, 792)  # Points, i.e. 72 dpi
+
+
+def _width(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.width
+
+
+@pytest.fixture
+def letter_pdf(tmp_path):
+    path = tmp_path / 'letter.pdf'
+    document = fitz.open()
+    page = document.new_page(width=US_LETTER[0], height=US_LETTER[1])
+    page.insert_text((72, 72), 'Lecture 1')
+    document.save(str(path))
+    document.close()
+    return str(path)
+
+
+def test_pdf_variants_are_rendered_at_each_width(letter_pdf):
+    outputs = render_thumbnails(letter_pdf, 'pdf', WIDTHS, ['png', 'webp'])
+
+    for width in WIDTHS:
+        assert _width(outputs[(width, 'png')]) == width
+        assert _width(outputs[(width, 'webp')]) == width
+
+
+def test_pdf_variants_keep_the_page_aspect_ratio(letter_pdf):
+    outputs = render_thumbnails(letter_pdf, 'pdf', [640], ['png'])
+
+    with Image.open(io.BytesIO(outputs[(640, 'png')])) as image:
+        assert image.height == pytest.approx(640 * US_LETTER[1] / US_LETTER[0], abs=1)
+
+
+def test_raster_images_are_not_upscaled(tmp_path):
+    path = tmp_path / 'small.png'
+    Image.new('RGB', (400, 300), 'white').save(path)
+
+    outputs = render_thumbnails(str(path), 'png', [160, 320, 640], ['png'])
+
+    assert _width(outputs[(160, 'png')]) == 160
+    assert _width(outputs[(320, 'png')]) == 320
+    assert _width(outputs[(640, 'png')]) == 400